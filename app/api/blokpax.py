@@ -3,12 +3,13 @@ Blokpax API endpoints for frontend integration.
 Provides access to WOTF storefront data, floor prices, and sales history.
 """
 
-from typing import Any, List, Optional
+from typing import Any, List, Optional, Type
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlmodel import Session, select, desc
 from datetime import datetime, timedelta, timezone
 from pydantic import BaseModel
 
+from app.core.fast_json import FastJSONResponse, schema_columns, schema_encoder
 from app.core.typing import col
 from app.db import get_session
 from app.models.blokpax import (
@@ -100,6 +101,17 @@ class BlokpaxOfferOut(BaseModel):
     model_config = {"from_attributes": True}
 
 
+def _list_response(session: Session, statement: Any, schema: Type[BaseModel]) -> FastJSONResponse:
+    """
+    Run a column-only select and encode its rows as a list of `schema`.
+
+    response_model on the routes still documents the shape; returning a Response
+    skips FastAPI's per-row validation and re-encoding.
+    """
+    encode = schema_encoder(schema)
+    return FastJSONResponse(content=[encode(row._mapping) for row in session.execute(statement)])
+
+
 @router.get("/storefronts", response_model=List[BlokpaxStorefrontOut])
 def list_storefronts(
     session: Session = Depends(get_session),
@@ -107,8 +119,8 @@ def list_storefronts(
     """
     List all WOTF storefronts with current floor prices.
     """
-    storefronts = session.exec(select(BlokpaxStorefront).order_by(col(BlokpaxStorefront.name))).all()
-    return [BlokpaxStorefrontOut.model_validate(s) for s in storefronts]
+    statement = select(*schema_columns(BlokpaxStorefront, BlokpaxStorefrontOut)).order_by(col(BlokpaxStorefront.name))
+    return _list_response(session, statement, BlokpaxStorefrontOut)
 
 
 @router.get("/storefronts/{slug}", response_model=BlokpaxStorefrontOut)
@@ -145,15 +157,14 @@ def get_storefront_snapshots(
 
     cutoff = datetime.now(timezone.utc) - timedelta(days=days)
 
-    snapshots = session.exec(
-        select(BlokpaxSnapshot)
+    statement = (
+        select(*schema_columns(BlokpaxSnapshot, BlokpaxSnapshotOut))
         .where(BlokpaxSnapshot.storefront_slug == slug)
         .where(col(BlokpaxSnapshot.timestamp) >= cutoff)
         .order_by(desc(BlokpaxSnapshot.timestamp), desc(BlokpaxSnapshot.id))
         .limit(limit)
-    ).all()
-
-    return [BlokpaxSnapshotOut.model_validate(s) for s in snapshots]
+    )
+    return _list_response(session, statement, BlokpaxSnapshotOut)
 
 
 @router.get("/storefronts/{slug}/sales", response_model=List[BlokpaxSaleOut])
@@ -177,11 +188,13 @@ def get_storefront_sales(
 
     # For now, get all WOTF sales and let frontend filter by storefront if needed
     # This is a simplification - ideally we'd add storefront_slug to BlokpaxSale
-    sales = session.exec(
-        select(BlokpaxSale).where(BlokpaxSale.filled_at >= cutoff).order_by(desc(BlokpaxSale.filled_at)).limit(limit)
-    ).all()
-
-    return [BlokpaxSaleOut.model_validate(s) for s in sales]
+    statement = (
+        select(*schema_columns(BlokpaxSale, BlokpaxSaleOut))
+        .where(BlokpaxSale.filled_at >= cutoff)
+        .order_by(desc(BlokpaxSale.filled_at))
+        .limit(limit)
+    )
+    return _list_response(session, statement, BlokpaxSaleOut)
 
 
 @router.get("/sales", response_model=List[BlokpaxSaleOut])
@@ -195,11 +208,13 @@ def list_all_sales(
     """
     cutoff = datetime.now(timezone.utc) - timedelta(days=days)
 
-    sales = session.exec(
-        select(BlokpaxSale).where(BlokpaxSale.filled_at >= cutoff).order_by(desc(BlokpaxSale.filled_at)).limit(limit)
-    ).all()
-
-    return [BlokpaxSaleOut.model_validate(s) for s in sales]
+    statement = (
+        select(*schema_columns(BlokpaxSale, BlokpaxSaleOut))
+        .where(BlokpaxSale.filled_at >= cutoff)
+        .order_by(desc(BlokpaxSale.filled_at))
+        .limit(limit)
+    )
+    return _list_response(session, statement, BlokpaxSaleOut)
 
 
 @router.get("/assets", response_model=List[BlokpaxAssetOut])
@@ -211,15 +226,14 @@ def list_assets(
     """
     List indexed Blokpax assets, optionally filtered by storefront.
     """
-    query = select(BlokpaxAssetDB)
+    query = select(*schema_columns(BlokpaxAssetDB, BlokpaxAssetOut))
 
     if storefront_slug:
         query = query.where(BlokpaxAssetDB.storefront_slug == storefront_slug)
 
     query = query.order_by(col(BlokpaxAssetDB.floor_price_usd).asc()).limit(limit)
 
-    assets = session.exec(query).all()
-    return [BlokpaxAssetOut.model_validate(a) for a in assets]
+    return _list_response(session, query, BlokpaxAssetOut)
 
 
 @router.get("/summary")
@@ -279,15 +293,14 @@ def list_offers(
     """
     List all offers/bids across WOTF storefronts.
     """
-    query = select(BlokpaxOffer)
+    query = select(*schema_columns(BlokpaxOffer, BlokpaxOfferOut))
 
     if status:
         query = query.where(BlokpaxOffer.status == status)
 
     query = query.order_by(desc(BlokpaxOffer.price_usd)).limit(limit)
 
-    offers = session.exec(query).all()
-    return [BlokpaxOfferOut.model_validate(o) for o in offers]
+    return _list_response(session, query, BlokpaxOfferOut)
 
 
 @router.get("/offers/asset/{asset_id}", response_model=List[BlokpaxOfferOut])
@@ -299,12 +312,11 @@ def get_asset_offers(
     """
     Get all offers for a specific asset.
     """
-    query = select(BlokpaxOffer).where(BlokpaxOffer.asset_id == asset_id)
+    query = select(*schema_columns(BlokpaxOffer, BlokpaxOfferOut)).where(BlokpaxOffer.asset_id == asset_id)
 
     if status:
         query = query.where(BlokpaxOffer.status == status)
 
     query = query.order_by(desc(BlokpaxOffer.price_usd))
 
-    offers = session.exec(query).all()
-    return [BlokpaxOfferOut.model_validate(o) for o in offers]
+    return _list_response(session, query, BlokpaxOfferOut)
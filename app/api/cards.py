@@ -1,30 +1,46 @@
 import hashlib
 import json
-import threading
 from datetime import datetime, timedelta, timezone
-from typing import Any, List, Optional
+from typing import Any, List, Optional, Tuple
 
-from cachetools import TTLCache
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.responses import JSONResponse
 from sqlalchemy import text
 from sqlmodel import Session, desc, func, select
 
+from app.core.cache import get_cache
+from app.core.cache_invalidation import card_tags, tagged_ttl
+from app.core.cache_prewarm import record_request, register_warmer
 from app.core.config import settings
+from app.core.fast_json import FastJSONResponse, schema_encoder, schema_columns
+from app.core.http_cache import EncodedJSON, encode_json, encoded_json_response
+from app.core.pagination import InvalidCursorError, decode_cursor, encode_cursor, keyset_after
 from app.core.typing import col, ensure_int
-from app.db import get_session
+from app.db import engine, get_session
 from app.models.card import Card, Rarity
 from app.models.market import MarketPrice, MarketSnapshot
 from app.schemas import CardListItem, CardOut, MarketPriceOut, MarketSnapshotOut
-from app.services.floor_price import get_floor_price_service
+from app.services.floor_price import (
+    ConfidenceLevel,
+    FloorPriceConfig,
+    FloorPriceResult,
+    FloorPriceSource,
+    get_floor_price_service,
+)
 from app.services.order_book import get_order_book_analyzer
 from app.services.pricing import FMP_AVAILABLE, FairMarketPriceService
+from app.services.search import matches as search_matches, ranked as search_ranked
 
 router = APIRouter()
 
-# Thread-safe LRU cache with TTL
-_cache = TTLCache(maxsize=settings.CARDS_CACHE_MAXSIZE, ttl=settings.CARDS_CACHE_TTL_SECONDS)
-_cache_lock = threading.Lock()
+# Response cache (in-process or shared Redis tier, see app.core.cache)
+_cache = get_cache("cards", ttl=settings.CARDS_CACHE_TTL_SECONDS, maxsize=settings.CARDS_CACHE_MAXSIZE)
+
+# Sort identity embedded in /{card_id}/history cursors
+_HISTORY_CURSOR_SORT = "sold_date:desc"
+
+# Max cards per /batch request
+BATCH_MAX_CARDS = 50
 
 
 def get_cache_key(endpoint: str, **params) -> str:
@@ -34,15 +50,21 @@ def get_cache_key(endpoint: str, **params) -> str:
 
 
 def get_cached(key: str) -> Optional[Any]:
-    """Get cached response if not expired (thread-safe)."""
-    with _cache_lock:
-        return _cache.get(key)
+    """Get cached response if not expired."""
+    return _cache.get(key)
 
 
-def set_cache(key: str, value: Any):
-    """Set cache entry (thread-safe). TTL managed by TTLCache."""
-    with _cache_lock:
-        _cache[key] = value
+def set_cache(key: str, value: Any, tags: Optional[List[str]] = None):
+    """
+    Set cache entry. TTL managed by the cache backend.
+
+    Tagged entries are evicted when scrapers write to the tagged cards, so they
+    get the longer invalidation TTL instead of the default.
+    """
+    if tags:
+        _cache.set(key, value, ttl=tagged_ttl(settings.CARDS_CACHE_TTL_SECONDS), tags=tags)
+    else:
+        _cache.set(key, value)
 
 
 def normalize_floor_cutoff(days: int = 30) -> datetime:
@@ -62,6 +84,7 @@ def normalize_floor_cutoff(days: int = 30) -> datetime:
 
 @router.get("/")
 def read_cards(
+    request: Request,
     session: Session = Depends(get_session),
     skip: int = Query(default=0, ge=0, description="Offset for pagination"),
     limit: int = Query(
@@ -79,26 +102,91 @@ def read_cards(
 ) -> Any:
     """
     Retrieve cards with latest market data - OPTIMIZED with caching.
-    Single batch query instead of N+1 + 5-minute cache.
+    Single batch query instead of N+1, cached with single-flight recompute and
+    stale-while-revalidate (see Cache.get_or_compute). Entries hold the final
+    JSON/gzip bytes, and If-None-Match against the ETag returns 304.
     Returns paginated response with {items, total?, hasMore} when include_total=true.
     Use slim=true for ~50% smaller payload (recommended for list views).
     """
-    # Check cache first (v15 = platform filter support)
-    cache_key = get_cache_key(
-        "cards_v15",
+    params = dict(
         skip=skip,
         limit=limit,
-        search=search or "",
+        search=search,
         time_period=time_period,
-        product_type=product_type or "",
-        platform=platform or "",
+        product_type=product_type,
+        platform=platform,
         include_total=include_total,
         slim=slim,
     )
-    cached = get_cached(cache_key)
-    if cached:
-        return JSONResponse(content=cached, headers={"X-Cache": "HIT"})
+    record_request("cards", params)
+
+    def refresh() -> Tuple[EncodedJSON, List[str]]:
+        # Background refreshes outlive the request, so they can't use its session
+        with Session(engine) as refresh_session:
+            return _encode_cards_response(refresh_session, params)
+
+    (encoded, _tags), status = _cache.get_or_compute(
+        _cards_cache_key(params),
+        lambda: _encode_cards_response(session, params),
+        ttl=tagged_ttl(settings.CARDS_CACHE_TTL_SECONDS),
+        stale_ttl=settings.CACHE_STALE_TTL_SECONDS,
+        tags=lambda entry: entry[1],
+        refresh=refresh,
+    )
+    return encoded_json_response(request, encoded, headers={"X-Cache": status})
+
+
+def _cards_cache_key(params: dict) -> str:
+    """Cache key for a read_cards parameter set."""
+    # v18 = search results ranked by trigram similarity
+    return get_cache_key(
+        "cards_v18",
+        skip=params["skip"],
+        limit=params["limit"],
+        search=params["search"] or "",
+        time_period=params["time_period"],
+        product_type=params["product_type"] or "",
+        platform=params["platform"] or "",
+        include_total=params["include_total"],
+        slim=params["slim"],
+    )
+
+
+def _warm_cards(params: dict) -> None:
+    """Recompute a popular read_cards variant after a scrape cycle (see app.core.cache_prewarm)."""
+    with Session(engine) as session:
+        _cache.warm(
+            _cards_cache_key(params),
+            lambda: _encode_cards_response(session, params),
+            ttl=tagged_ttl(settings.CARDS_CACHE_TTL_SECONDS),
+            stale_ttl=settings.CACHE_STALE_TTL_SECONDS,
+            tags=lambda entry: entry[1],
+        )
+
+
+register_warmer("cards", _warm_cards)
+
+
+def _encode_cards_response(session: Session, params: dict) -> Tuple[EncodedJSON, List[str]]:
+    """Build a read_cards payload and encode it, with its invalidation tags."""
+    response_data = _build_cards_response(session, **params)
+    items = response_data["items"] if isinstance(response_data, dict) else response_data
+    # Not narrowed to time_period: floors fall back to 90d sales and the latest sale is unbounded
+    return encode_json(response_data), card_tags(item["id"] for item in items)
+
 
+def _build_cards_response(
+    session: Session,
+    skip: int,
+    limit: int,
+    search: Optional[str],
+    time_period: Optional[str],
+    product_type: Optional[str],
+    platform: Optional[str],
+    include_total: bool,
+    slim: bool,
+) -> Any:
+    """Run the read_cards queries and build the JSON-ready payload."""
     # Calculate time cutoff
     time_cutoffs = {
         "24h": timedelta(days=1),
@@ -113,7 +201,8 @@ def read_cards(
     # Build base query with filters
     base_query = select(Card)
     if search:
-        base_query = base_query.where(col(Card.name).ilike(f"%{search}%"))
+        # Substring or close trigram match, so typos still find the card (pg_trgm index)
+        base_query = base_query.where(search_matches(col(Card.name), search))
     if product_type:
         base_query = base_query.where(col(Card.product_type).ilike(product_type))
 
@@ -123,8 +212,9 @@ def read_cards(
         count_query = select(func.count()).select_from(base_query.subquery())
         total = session.execute(count_query).scalar_one()
 
-    # Fetch paginated cards with deterministic ordering
-    card_query = base_query.order_by(col(Card.name), col(Card.id)).offset(skip).limit(limit)
+    # Fetch paginated cards with deterministic ordering (best matches first when searching)
+    order_by = search_ranked(col(Card.name), search) if search else [col(Card.name)]
+    card_query = base_query.order_by(*order_by, col(Card.id)).offset(skip).limit(limit)
     cards = session.execute(card_query).scalars().all()
 
     if not cards:
@@ -413,7 +503,8 @@ def read_cards(
         if last_price and card_floor_price and card_floor_price > 0:
             floor_delta = round(((last_price - card_floor_price) / card_floor_price) * 100, 1)
 
-        c_out = CardOut(
+        # Plain dict in CardOut field terms; encoded below without building pydantic models
+        values = dict(
             id=ensure_int(card.id),
             name=card.name,
             set_name=card.set_name,
@@ -452,34 +543,11 @@ def read_cards(
             last_sale_diff=floor_delta,
             last_sale_treatment=last_treatment,
         )
-        results.append(c_out)
-
-    # Convert to dict for caching - use slim schema if requested
-    if slim:
-        results_dict = [
-            CardListItem(
-                id=r.id,
-                name=r.name,
-                slug=r.slug,
-                set_name=r.set_name,
-                rarity_name=r.rarity_name,
-                product_type=r.product_type,
-                floor_price=r.floor_price,
-                latest_price=r.latest_price,
-                lowest_ask=r.lowest_ask,
-                max_price=r.max_price,
-                volume=r.volume,
-                inventory=r.inventory,
-                price_delta=r.price_delta,
-                last_treatment=r.last_treatment,
-                image_url=r.image_url,
-                orbital=r.orbital,
-                orbital_color=r.orbital_color,
-            ).model_dump(mode="json")
-            for r in results
-        ]
-    else:
-        results_dict = [r.model_dump(mode="json") for r in results]
+        results.append(values)
+
+    # Encode straight to the response shape (same output as CardOut/CardListItem.model_dump)
+    encode = schema_encoder(CardListItem if slim else CardOut)
+    results_dict = [encode(values) for values in results]
 
     # Build response with pagination metadata
     if include_total:
@@ -494,9 +562,7 @@ def read_cards(
         # Backwards compatible: return array directly when no pagination requested
         response_data = results_dict
 
-    set_cache(cache_key, response_data)
-
-    return JSONResponse(content=response_data, headers={"X-Cache": "MISS"})
+    return response_data
 
 
 def get_card_by_id_or_slug(session: Session, card_identifier: str) -> tuple[Card, str]:
@@ -588,10 +654,225 @@ def get_meta_cards(
     ]
 
     response = {"cards": cards, "count": len(cards)}
-    set_cache(cache_key, response)
+    set_cache(cache_key, response, tags=card_tags([c["id"] for c in cards], "30d"))
     return response
 
 
+@router.get("/batch")
+def read_cards_batch(
+    ids: str = Query(..., description=f"Comma-separated card IDs (max {BATCH_MAX_CARDS})"),
+    days: int = Query(default=30, ge=1, le=90, description="Floor price / order book lookback window"),
+    session: Session = Depends(get_session),
+) -> Any:
+    """
+    Get detail, floor price and order book summaries for several cards at once.
+
+    For watchlists, portfolios and comparison views: replaces one /{id},
+    /{id}/floor-price and /{id}/order-book request per card with a single
+    request whose query count doesn't grow with the number of cards.
+
+    Each entry has:
+    - card: the /{id} detail fields (fair_market_price is detail-page only and omitted)
+    - floor: /{id}/floor-price result (card level, expanding to 90 days like the single endpoint)
+    - order_book: /{id}/order-book summary without the bucket breakdown
+
+    Cards are returned in request order; unknown IDs are listed in `missing`.
+    """
+    try:
+        card_ids = list(dict.fromkeys(int(part) for part in ids.split(",") if part.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+    if not card_ids:
+        raise HTTPException(status_code=400, detail="ids is required")
+    if len(card_ids) > BATCH_MAX_CARDS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_CARDS} cards per request")
+
+    cache_key = get_cache_key("cards_batch", ids=card_ids, days=days)
+    cached = get_cached(cache_key)
+    if cached:
+        return FastJSONResponse(content=cached, headers={"X-Cache": "HIT"})
+
+    result = _build_cards_batch(session, card_ids, days)
+    set_cache(cache_key, result, tags=card_tags(card_ids))
+    return FastJSONResponse(content=result, headers={"X-Cache": "MISS"})
+
+
+def _build_cards_batch(session: Session, card_ids: List[int], days: int) -> dict:
+    """Set-based equivalent of read_card + read_card_floor_price + read_card_order_book for many cards."""
+    from sqlalchemy import DateTime, bindparam
+
+    rows = session.execute(
+        select(Card, Rarity.name)
+        .outerjoin(Rarity, col(Card.rarity_id) == col(Rarity.id))
+        .where(col(Card.id).in_(card_ids))
+    ).all()
+    cards = {card.id: (card, rarity_name or "Unknown") for card, rarity_name in rows}
+    found_ids = [cid for cid in card_ids if cid in cards]
+    missing = [cid for cid in card_ids if cid not in cards]
+    if not found_ids:
+        return {"cards": [], "missing": missing}
+
+    now = datetime.now(timezone.utc)
+    params = {"card_ids": found_ids, "cutoff_30d": now - timedelta(days=30), "cutoff_90d": now - timedelta(days=90)}
+
+    # read_card's consolidated CTE, grouped by card instead of filtered to one
+    stats_query = text("""
+        WITH ranked_sales AS (
+            SELECT card_id, price, treatment, COALESCE(sold_date, scraped_at) AS sale_date,
+                   ROW_NUMBER() OVER (PARTITION BY card_id ORDER BY COALESCE(sold_date, scraped_at) DESC) AS rn
+            FROM marketprice
+            WHERE card_id IN :card_ids AND listing_type = 'sold' AND is_bulk_lot = FALSE
+        ),
+        sales AS (
+            SELECT card_id,
+                   AVG(price) AS avg_price,
+                   MAX(price) AS max_price,
+                   AVG(CASE WHEN sale_date >= :cutoff_30d THEN price END) AS avg_30d,
+                   COUNT(CASE WHEN sale_date >= :cutoff_30d THEN 1 END) AS volume_30d,
+                   AVG(CASE WHEN sale_date >= :cutoff_90d THEN price END) AS avg_90d
+            FROM ranked_sales
+            GROUP BY card_id
+        ),
+        active_stats AS (
+            SELECT card_id, MIN(price) AS lowest_ask, COUNT(*) AS inventory
+            FROM marketprice
+            WHERE card_id IN :card_ids AND listing_type = 'active'
+            GROUP BY card_id
+        )
+        SELECT s.card_id, ls.price AS last_sale_price, ls.treatment AS last_sale_treatment,
+               ls.sale_date AS last_updated, s.avg_price, s.max_price, s.avg_30d, s.volume_30d, s.avg_90d,
+               a.lowest_ask, a.inventory
+        FROM sales s
+        LEFT JOIN ranked_sales ls ON ls.card_id = s.card_id AND ls.rn = 1
+        LEFT JOIN active_stats a ON a.card_id = s.card_id
+        UNION ALL
+        SELECT a.card_id, NULL, NULL, NULL, NULL, NULL, NULL, 0, NULL, a.lowest_ask, a.inventory
+        FROM active_stats a
+        WHERE a.card_id NOT IN (SELECT card_id FROM sales)
+    """).bindparams(bindparam("card_ids", expanding=True))
+    stats = {row.card_id: row for row in session.execute(stats_query.columns(last_updated=DateTime), params)}
+
+    # Note: Must GROUP BY the full CASE expression, not the alias
+    lowest_ask_variant_query = text("""
+        SELECT card_id,
+               CASE
+                   WHEN product_subtype IS NOT NULL AND product_subtype != ''
+                   THEN product_subtype
+                   ELSE treatment
+               END AS variant,
+               MIN(price) AS lowest_ask
+        FROM marketprice
+        WHERE card_id IN :card_ids
+          AND listing_type = 'active'
+        GROUP BY card_id,
+                 CASE
+                     WHEN product_subtype IS NOT NULL AND product_subtype != ''
+                     THEN product_subtype
+                     ELSE treatment
+                 END
+        ORDER BY card_id, lowest_ask ASC
+    """).bindparams(bindparam("card_ids", expanding=True))
+    lowest_ask_by_variant: dict = {}
+    for card_id, variant, lowest_ask in session.execute(lowest_ask_variant_query, {"card_ids": found_ids}):
+        lowest_ask_by_variant.setdefault(card_id, {})[variant] = round(float(lowest_ask), 2)
+
+    floor_service = get_floor_price_service(session)
+
+    # Detail floor_by_variant: same 90-day + order book fallback call read_card makes
+    floor_by_variant: dict = {}
+    for (cid, variant), floor in floor_service.get_floor_prices_batch(
+        found_ids, days=90, by_variant=True, include_order_book_fallback=True
+    ).items():
+        if floor.price is not None:
+            floor_by_variant.setdefault(cid, {})[variant] = floor.price
+
+    # Card-level floor: `days` window, then the 90-day expansion /floor-price applies
+    floors = floor_service.get_floor_prices_batch(found_ids, days=days, include_order_book_fallback=True)
+    unresolved = [cid for cid in found_ids if cid not in floors]
+    if unresolved and days < FloorPriceConfig.EXPANDED_LOOKBACK_DAYS:
+        floors.update(
+            floor_service.get_floor_prices_batch(
+                unresolved, days=FloorPriceConfig.EXPANDED_LOOKBACK_DAYS, include_order_book_fallback=True
+            )
+        )
+
+    days_searched = max(days, FloorPriceConfig.EXPANDED_LOOKBACK_DAYS)
+
+    order_books = get_order_book_analyzer(session).estimate_floors_batch(found_ids, days=days)
+
+    encode_card = schema_encoder(CardOut)
+    items = []
+    for cid in found_ids:
+        card, rarity_name = cards[cid]
+        row = stats.get(cid)
+        real_price = row.last_sale_price if row else None
+        avg_price = row.avg_price if row else None
+        lowest_ask = row.lowest_ask if row else None
+        rolling_avg_price = (row.avg_30d or row.avg_90d or avg_price) if row else None
+
+        price_delta = 0.0
+        if real_price and rolling_avg_price and rolling_avg_price > 0:
+            price_delta = ((real_price - rolling_avg_price) / rolling_avg_price) * 100
+        sale_delta = 0.0
+        if real_price and lowest_ask and lowest_ask > 0:
+            sale_delta = ((real_price - lowest_ask) / lowest_ask) * 100
+
+        variants = floor_by_variant.get(cid)
+        card_out = encode_card(
+            {
+                "id": cid,
+                "slug": card.slug,
+                "name": card.name,
+                "set_name": card.set_name,
+                "rarity_id": card.rarity_id,
+                "rarity_name": rarity_name,
+                "latest_price": real_price,
+                "volume_30d": (row.volume_30d or 0) if row else 0,
+                "price_delta_24h": price_delta,
+                "last_sale_diff": sale_delta,
+                "last_sale_treatment": row.last_sale_treatment if row else None,
+                "lowest_ask": lowest_ask,
+                "lowest_ask_by_variant": lowest_ask_by_variant.get(cid),
+                "inventory": (row.inventory or 0) if row else 0,
+                "product_type": card.product_type,
+                "max_price": float(row.max_price) if row and row.max_price else None,
+                "avg_price": float(avg_price) if avg_price else None,
+                "vwap": float(row.avg_30d) if row and row.avg_30d else (float(avg_price) if avg_price else None),
+                "last_updated": row.last_updated if row else None,
+                "floor_price": min(variants.values()) if variants else None,
+                "floor_by_variant": variants,
+                "image_url": card.image_url,
+                "card_type": card.card_type,
+                "orbital": card.orbital,
+                "orbital_color": card.orbital_color,
+                "card_number": card.card_number,
+                "cardeio_image_url": card.cardeio_image_url,
+            }
+        )
+
+        floor = floors.get(cid) or FloorPriceResult(
+            price=None,
+            source=FloorPriceSource.NONE,
+            confidence=ConfidenceLevel.LOW,
+            confidence_score=0.0,
+            metadata={"reason": "insufficient_data", "days_searched": days_searched},
+        )
+        order_book = order_books.get(cid)
+        ob_summary = None
+        if order_book:
+            ob_summary = order_book.to_dict()
+            del ob_summary["buckets"]
+        items.append(
+            {
+                "card": card_out,
+                "floor": floor.to_dict(),
+                "order_book": ob_summary,
+            }
+        )
+
+    return {"cards": items, "missing": missing}
+
+
 @router.get("/{card_id}", response_model=CardOut)
 def read_card(
     card_id: str,  # Accept string to support both ID and slug
@@ -790,7 +1071,7 @@ def read_card(
 
     # Cache result
     result_dict = c_out.model_dump(mode="json")
-    set_cache(cache_key, result_dict)
+    set_cache(cache_key, result_dict, tags=card_tags([card.id]))
 
     return JSONResponse(content=result_dict, headers={"X-Cache": "MISS"})
 
@@ -823,6 +1104,7 @@ def read_sales_history(
     session: Session = Depends(get_session),
     limit: int = Query(default=50, ge=1, le=200, description="Items per page"),
     offset: int = Query(default=0, ge=0, description="Offset for pagination"),
+    cursor: Optional[str] = Query(default=None, description="nextCursor from the previous page (offset is ignored)"),
     paginated: bool = Query(default=False, description="Return paginated response with metadata"),
 ) -> Any:
     """
@@ -830,26 +1112,41 @@ def read_sales_history(
     Uses COALESCE(sold_date, scraped_at) for proper date ordering.
 
     By default returns array of items (backwards compatible).
-    Use paginated=true to get {items, total, hasMore} format.
+    Use paginated=true to get {items, total, hasMore, nextCursor} format.
+    The next page's cursor is also sent as the X-Next-Cursor header, so
+    array clients can switch from offset to cursor paging.
     """
     card, _ = get_card_by_id_or_slug(session, card_id)
 
-    # Fetch results
+    # Fetch only the MarketPriceOut columns and encode rows directly (no ORM/pydantic round trip)
+    # (sort value, id) orders rows uniquely and is served by ix_marketprice_card_sold_keyset
+    sale_date = func.coalesce(MarketPrice.sold_date, MarketPrice.scraped_at)
     statement = (
-        select(MarketPrice)
+        select(*schema_columns(MarketPrice, MarketPriceOut), sale_date.label("sort_value"))
         .where(MarketPrice.card_id == card.id, MarketPrice.listing_type == "sold")
-        .order_by(desc(func.coalesce(MarketPrice.sold_date, MarketPrice.scraped_at)))
-        .offset(offset)
-        .limit(limit)
+        .order_by(desc(sale_date), desc(MarketPrice.id))
     )
-    prices = session.execute(statement).scalars().all()
+    if cursor:
+        try:
+            after_date, after_id = decode_cursor(cursor, _HISTORY_CURSOR_SORT)
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        statement = statement.where(keyset_after(sale_date, MarketPrice.id, after_date, after_id, descending=True))
+    else:
+        statement = statement.offset(offset)
 
-    # Convert to output schema
-    prices_out = [MarketPriceOut.model_validate(p) for p in prices]
+    # Fetch limit+1 to know whether there is a next page
+    rows = session.execute(statement.limit(limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(_HISTORY_CURSOR_SORT, rows[-1].sort_value, rows[-1].id) if has_more else None
+    encode = schema_encoder(MarketPriceOut)
+    prices_out = [encode(row._mapping) for row in rows]
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
 
     # Return array by default (backwards compatible)
     if not paginated:
-        return prices_out
+        return FastJSONResponse(content=prices_out, headers=headers)
 
     # Get total count only when paginated (avoids extra query)
     count_stmt = select(func.count(MarketPrice.id)).where(
@@ -857,13 +1154,17 @@ def read_sales_history(
     )
     total = session.execute(count_stmt).scalar_one()
 
-    return {
-        "items": prices_out,
-        "total": total,
-        "offset": offset,
-        "limit": limit,
-        "hasMore": offset + len(prices_out) < total,
-    }
+    return FastJSONResponse(
+        content={
+            "items": prices_out,
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "hasMore": has_more,
+            "nextCursor": next_cursor,
+        },
+        headers=headers,
+    )
 
 
 @router.get("/{card_id}/active", response_model=List[MarketPriceOut])
@@ -1019,13 +1320,12 @@ def read_card_order_book_by_treatment(
         "OCM Serialized",
     ]
 
+    # One pass over the card's listings for every treatment plus the overall floor
+    estimates = analyzer.estimate_floors_by_treatment(ensure_int(card.id), treatments, days=days)
+
     results = []
     for treatment in treatments:
-        result = analyzer.estimate_floor(
-            card_id=ensure_int(card.id),
-            treatment=treatment,
-            days=days,
-        )
+        result = estimates.get(treatment)
         if result:
             results.append(
                 {
@@ -1048,7 +1348,7 @@ def read_card_order_book_by_treatment(
             )
 
     # Also get overall floor (all treatments combined)
-    overall = analyzer.estimate_floor(card_id=ensure_int(card.id), days=days)
+    overall = estimates.get(None)
 
     return {
         "card_id": card.id,
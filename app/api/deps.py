@@ -10,7 +10,7 @@ from app.db import get_session
 from app.models.user import User
 from app.models.api_key import APIKey
 from app.core.config import settings
-from app.core.anti_scraping import api_key_limiter
+from app.core.anti_scraping import api_key_limiter, export_limiter
 from app.core.jwt import decode_token
 
 # Cookie name for auth token
@@ -137,18 +137,8 @@ def get_current_superuser(
 # ============== API KEY AUTHENTICATION ==============
 
 
-def validate_api_key(
-    request: Request,
-    api_key: Optional[str] = Depends(api_key_header),
-    session: Session = Depends(get_session),
-) -> Optional[Tuple[APIKey, User]]:
-    """
-    Validate API key from X-API-Key header.
-    Returns (api_key, user) tuple or None if no key provided.
-    """
-    if not api_key:
-        return None
-
+def _lookup_api_key(session: Session, api_key: str) -> APIKey:
+    """Find an API key by its raw value and check it is usable. Raises 401 otherwise."""
     # Hash the key for lookup
     key_hash = APIKey.hash_key(api_key)
 
@@ -175,28 +165,60 @@ def validate_api_key(
             detail="API key has expired",
         )
 
+    return db_key
+
+
+def _raise_rate_limited(reason: str) -> None:
+    """Raise the 429 matching an APIKeyRateLimiter.check_limit() reason."""
+    if reason == "daily_limit":
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Daily API limit exceeded. Limit resets at midnight UTC.",
+        )
+    raise HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Rate limit exceeded. Please slow down.",
+        headers={"Retry-After": "60"},
+    )
+
+
+def _api_key_owner(session: Session, db_key: APIKey) -> User:
+    """Get the active user owning an API key. Raises 401 if the account is inactive."""
+    user = session.get(User, db_key.user_id)
+    if not user or not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="API key owner account is inactive",
+        )
+    return user
+
+
+def validate_api_key(
+    request: Request,
+    api_key: Optional[str] = Depends(api_key_header),
+    session: Session = Depends(get_session),
+) -> Optional[Tuple[APIKey, User]]:
+    """
+    Validate API key from X-API-Key header.
+    Returns (api_key, user) tuple or None if no key provided.
+    """
+    if not api_key:
+        return None
+
+    db_key = _lookup_api_key(session, api_key)
+
     # Check rate limits
     allowed, reason = api_key_limiter.check_limit(
-        key_hash,
+        db_key.key_hash,
         per_minute=db_key.rate_limit_per_minute,
         per_day=db_key.rate_limit_per_day,
     )
 
     if not allowed:
-        if reason == "daily_limit":
-            raise HTTPException(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail="Daily API limit exceeded. Limit resets at midnight UTC.",
-            )
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail="Rate limit exceeded. Please slow down.",
-                headers={"Retry-After": "60"},
-            )
+        _raise_rate_limited(reason)
 
     # Record the request
-    api_key_limiter.record_request(key_hash)
+    api_key_limiter.record_request(db_key.key_hash)
 
     # Update usage stats
     db_key.requests_today += 1
@@ -205,15 +227,7 @@ def validate_api_key(
     session.add(db_key)
     session.commit()
 
-    # Get the user
-    user = session.get(User, db_key.user_id)
-    if not user or not user.is_active:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="API key owner account is inactive",
-        )
-
-    return db_key, user
+    return db_key, _api_key_owner(session, db_key)
 
 
 def require_api_key(
@@ -232,6 +246,44 @@ def require_api_key(
     return api_key_data
 
 
+def require_export_api_key(
+    api_key: Optional[str] = Depends(api_key_header),
+    session: Session = Depends(get_session),
+) -> Tuple[APIKey, User]:
+    """
+    Require a valid API key for bulk export endpoints.
+
+    Exports are counted against their own budget (EXPORT_RATE_LIMIT_PER_MINUTE /
+    EXPORT_RATE_LIMIT_PER_DAY) instead of the key's per-request limits: one
+    export replaces thousands of paginated requests, so it shouldn't exhaust them,
+    and regular API traffic shouldn't block a sync.
+    """
+    if not api_key:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="API key required. Get your key at /api/v1/users/api-keys",
+            headers={"WWW-Authenticate": "ApiKey"},
+        )
+
+    db_key = _lookup_api_key(session, api_key)
+
+    allowed, reason = export_limiter.check_limit(
+        db_key.key_hash,
+        per_minute=settings.EXPORT_RATE_LIMIT_PER_MINUTE,
+        per_day=settings.EXPORT_RATE_LIMIT_PER_DAY,
+    )
+    if not allowed:
+        _raise_rate_limited(reason)
+    export_limiter.record_request(db_key.key_hash)
+
+    db_key.requests_total += 1
+    db_key.last_used_at = datetime.now(timezone.utc)
+    session.add(db_key)
+    session.commit()
+
+    return db_key, _api_key_owner(session, db_key)
+
+
 # ============== PROTECTED DATA ACCESS ==============
 
 
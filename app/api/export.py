@@ -0,0 +1,106 @@
+"""
+Bulk export endpoints for API-key consumers.
+
+GET /export/sales streams full sale history as NDJSON or CSV in one long request
+(see app/services/sales_export.py). Exports need an API key and count against
+their own rate budget, and each key may run EXPORT_MAX_CONCURRENT_PER_KEY streams
+at a time since every open stream holds a database connection.
+"""
+
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterator, Literal, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+
+from app.api.deps import require_export_api_key
+from app.core.config import settings
+from app.core.pagination import InvalidCursorError
+from app.db import engine
+from app.models.api_key import APIKey
+from app.models.user import User
+from app.services.sales_export import (
+    MEDIA_TYPES,
+    build_sales_export_query,
+    decode_export_cursor,
+    stream_sales_export,
+)
+
+router = APIRouter()
+
+_streams_lock = threading.Lock()
+_active_streams: Dict[str, int] = defaultdict(int)  # {key_hash: open export streams}
+
+
+def _acquire_stream(key_hash: str) -> bool:
+    with _streams_lock:
+        if _active_streams[key_hash] >= settings.EXPORT_MAX_CONCURRENT_PER_KEY:
+            return False
+        _active_streams[key_hash] += 1
+        return True
+
+
+def _release_stream(key_hash: str) -> None:
+    with _streams_lock:
+        _active_streams[key_hash] -= 1
+        if _active_streams[key_hash] <= 0:
+            del _active_streams[key_hash]
+
+
+def _held_stream(chunks: Iterator[bytes], key_hash: str) -> Iterator[bytes]:
+    """Yield chunks, releasing the key's stream slot when the response ends or the client disconnects."""
+    try:
+        yield from chunks
+    finally:
+        _release_stream(key_hash)
+
+
+@router.get("/sales")
+def export_sales(
+    format: Literal["ndjson", "csv"] = Query(default="ndjson", description="Output format"),
+    start: Optional[datetime] = Query(default=None, description="Sales on/after this time (ISO 8601)"),
+    end: Optional[datetime] = Query(default=None, description="Sales before this time (ISO 8601)"),
+    platform: Optional[str] = Query(default=None, description="Filter by platform: ebay, opensea"),
+    product_type: Optional[str] = Query(default=None, description="Filter by product type: Single, Box, Pack..."),
+    cursor: Optional[str] = Query(default=None, description="Resume after the row this cursor came from"),
+    api_key_data: Tuple[APIKey, User] = Depends(require_export_api_key),
+) -> Any:
+    """
+    Stream every sale matching the filters, oldest scrape first.
+
+    One request replaces walking /cards/{id}/history for every card. Rows are
+    read through a server-side cursor and written as they arrive, so the
+    response can be arbitrarily large. Every row has a `cursor` field: if the
+    download is interrupted, repeat the request with the same filters and
+    `cursor` set to the last one received. Sales converted from tracked
+    listings after that row was sent are included on resume.
+
+    Requires an API key (X-API-Key). Exports have their own rate budget.
+    """
+    resume: Dict[str, Any] = {}
+    if cursor:
+        try:
+            resume = decode_export_cursor(cursor)
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if start and end and start >= end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="start must be before end")
+
+    statement = build_sales_export_query(start=start, end=end, platform=platform, product_type=product_type, **resume)
+
+    key_hash = api_key_data[0].key_hash
+    if not _acquire_stream(key_hash):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="An export is already running for this API key.",
+            headers={"Retry-After": "60"},
+        )
+
+    filename = f"wonders-sales-{datetime.now().strftime('%Y%m%d')}.{format}"
+    return StreamingResponse(
+        _held_stream(stream_sales_export(engine, statement, format), key_hash),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -1,24 +1,60 @@
 from typing import Any, Optional
-import threading
 import time
 import logging
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import JSONResponse
 from sqlmodel import Session, select, desc
 from datetime import datetime, timedelta, timezone
-from cachetools import TTLCache
 
+from app.core.cache import get_cache
+from app.core.cache_invalidation import market_tags, tagged_ttl, window_for_days
+from app.core.cache_prewarm import record_request, register_warmer
+from app.core.config import settings
+from app.core.fast_json import FastJSONResponse
+from app.core.pagination import InvalidCursorError, decode_cursor, encode_cursor, keyset_after
 from app.core.typing import col
-from app.db import get_session
+from app.db import engine, get_session
 from app.models.card import Card
 from app.models.market import MarketPrice
+from app.services.search import MIN_TRIGRAM_LENGTH, contains as search_contains
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# Thread-safe cache with TTL (5 min for market data - balance freshness vs performance)
-_market_cache = TTLCache(maxsize=100, ttl=300)
-_market_cache_lock = threading.Lock()
+# Cache with TTL (5 min for market data - balance freshness vs performance)
+_market_cache = get_cache("market", ttl=300, maxsize=100)
+
+# MarketPrice columns read by /listings
+_LISTING_COLUMNS = [
+    col(getattr(MarketPrice, name))
+    for name in (
+        "id",
+        "card_id",
+        "title",
+        "price",
+        "platform",
+        "treatment",
+        "product_subtype",
+        "listing_type",
+        "listing_format",
+        "condition",
+        "bid_count",
+        "seller_name",
+        "seller_feedback_score",
+        "seller_feedback_percent",
+        "shipping_cost",
+        "grading",
+        "traits",
+        "url",
+        "image_url",
+        "sold_date",
+        "scraped_at",
+        "listed_at",
+    )
+]
+
+# Floor price lookback per /overview time_period (longer than the period for a stable floor)
+_OVERVIEW_FLOOR_DAYS = {"1h": 30, "24h": 30, "7d": 30, "30d": 30, "90d": 90, "all": 365}
 
 
 def log_query_time(operation: str, start_time: float, threshold: float = 0.5):
@@ -30,13 +66,12 @@ def log_query_time(operation: str, start_time: float, threshold: float = 0.5):
 
 
 def get_market_cache(key: str) -> Optional[Any]:
-    with _market_cache_lock:
-        return _market_cache.get(key)
+    return _market_cache.get(key)
 
 
-def set_market_cache(key: str, value: Any):
-    with _market_cache_lock:
-        _market_cache[key] = value
+def set_market_cache(key: str, value: Any, window: Optional[str] = None):
+    """Cache a market-wide aggregate; evicted when scrapers write to any card in `window`."""
+    _market_cache.set(key, value, ttl=tagged_ttl(300), tags=market_tags(window))
 
 
 @router.get("/treatments")
@@ -82,14 +117,55 @@ def read_market_overview(
     """
     Get robust market overview statistics with temporal data.
     OPTIMIZED: Single CTE query replaces 6+ separate queries.
-    Cached for 5 minutes (longer periods get longer cache).
+    Cached with single-flight recompute and stale-while-revalidate, so an
+    expiring entry never sends every concurrent request to Postgres at once.
     """
-    # Check cache first
-    cache_key = f"market_overview_{time_period}"
-    cached = get_market_cache(cache_key)
-    if cached:
-        return JSONResponse(content=cached, headers={"X-Cache": "HIT"})
+    record_request("market_overview", {"time_period": time_period})
+
+    def refresh() -> Any:
+        # Background refreshes outlive the request, so they can't use its session
+        with Session(engine) as refresh_session:
+            return _build_market_overview(refresh_session, time_period)
+
+    overview_data, status = _market_cache.get_or_compute(
+        _overview_cache_key(time_period),
+        lambda: _build_market_overview(session, time_period),
+        ttl=tagged_ttl(300),
+        stale_ttl=settings.CACHE_STALE_TTL_SECONDS,
+        tags=_overview_tags(time_period),
+        refresh=refresh,
+    )
+    return JSONResponse(content=overview_data, headers={"X-Cache": status})
+
+
+def _overview_cache_key(time_period: Optional[str]) -> str:
+    # v2 = freshness-stamped entries (see Cache.get_or_compute)
+    return f"market_overview_v2_{time_period}"
+
+
+def _overview_tags(time_period: Optional[str]) -> list:
+    # floor_days always spans time_period, so it bounds which writes can change this entry
+    return market_tags(window_for_days(_OVERVIEW_FLOOR_DAYS.get(time_period, 30)))
+
+
+def _warm_market_overview(params: dict) -> None:
+    """Recompute a popular overview variant after a scrape cycle (see app.core.cache_prewarm)."""
+    time_period = params["time_period"]
+    with Session(engine) as session:
+        _market_cache.warm(
+            _overview_cache_key(time_period),
+            lambda: _build_market_overview(session, time_period),
+            ttl=tagged_ttl(300),
+            stale_ttl=settings.CACHE_STALE_TTL_SECONDS,
+            tags=_overview_tags(time_period),
+        )
 
+
+register_warmer("market_overview", _warm_market_overview)
+
+
+def _build_market_overview(session: Session, time_period: Optional[str]) -> list:
+    """Run the consolidated overview query and build the JSON-ready rows."""
     from sqlalchemy import text
 
     # Calculate time cutoff
@@ -105,7 +181,7 @@ def read_market_overview(
     cutoff_time = datetime.now(timezone.utc) - cutoff_delta
 
     # Floor price lookback (use longer window for floor calculation)
-    floor_days = {"1h": 30, "24h": 30, "7d": 30, "30d": 30, "90d": 90, "all": 365}.get(time_period, 30)
+    floor_days = _OVERVIEW_FLOOR_DAYS.get(time_period, 30)
     floor_cutoff = datetime.now(timezone.utc) - timedelta(days=floor_days)
 
     # SINGLE CONSOLIDATED CTE QUERY - replaces 6+ separate queries
@@ -225,8 +301,6 @@ def read_market_overview(
             }
         )
 
-    # Cache the result
-    set_market_cache(cache_key, overview_data)
     return overview_data
 
 
@@ -281,20 +355,25 @@ def read_market_listings(
     sort_order: Optional[str] = Query(default="desc", description="Sort order: asc or desc"),
     limit: int = Query(default=100, ge=1, le=500, description="Items per page"),
     offset: int = Query(default=0, ge=0, description="Offset for pagination"),
+    cursor: Optional[str] = Query(default=None, description="nextCursor from the previous page (offset is ignored)"),
 ) -> Any:
     """
     Get marketplace listings across all cards with comprehensive filtering.
     Returns individual listings from MarketPrice table with card details including floor price.
     Cached for 2 minutes to improve performance.
+
+    Pages can be walked with offset or, preferably, with the opaque nextCursor
+    returned by every page: cursor pages cost the same at any depth and don't
+    skip or repeat rows when new listings arrive.
     """
     # Normalize search for cache key (strip and lowercase)
-    search_normalized = search.strip().lower() if search and len(search.strip()) >= 3 else None
+    search_normalized = search.strip().lower() if search and len(search.strip()) >= MIN_TRIGRAM_LENGTH else None
 
     # Build cache key from all filter parameters
-    cache_key = f"listings_{listing_type}_{platform}_{product_type}_{treatment}_{time_period}_{min_price}_{max_price}_{search_normalized}_{sort_by}_{sort_order}_{limit}_{offset}"
+    cache_key = f"listings_{listing_type}_{platform}_{product_type}_{treatment}_{time_period}_{min_price}_{max_price}_{search_normalized}_{sort_by}_{sort_order}_{limit}_{offset}_{cursor}"
     cached = get_market_cache(cache_key)
     if cached:
-        return JSONResponse(content=cached, headers={"X-Cache": "HIT"})
+        return FastJSONResponse(content=cached, headers={"X-Cache": "HIT"})
 
     start_time = time.time()
     from sqlalchemy import func, or_, text
@@ -311,8 +390,18 @@ def read_market_listings(
     cutoff_time = datetime.now(timezone.utc) - cutoff_delta if cutoff_delta else None
 
     # Build base query with join to Card for product info
-    # Select both full models for type-safe tuple unpacking
-    query = select(MarketPrice, Card).join(Card, col(MarketPrice.card_id) == col(Card.id))
+    # Select only the columns the response uses: plain rows are much cheaper than ORM instances
+    query = (
+        select(
+            *_LISTING_COLUMNS,
+            col(Card.name).label("card_name"),
+            col(Card.slug).label("card_slug"),
+            col(Card.product_type).label("card_product_type"),
+            col(Card.image_url).label("card_image_url"),
+        )
+        .select_from(MarketPrice)
+        .join(Card, col(MarketPrice.card_id) == col(Card.id))
+    )
 
     # Apply listing type filter
     if listing_type and listing_type != "all":
@@ -352,13 +441,12 @@ def read_market_listings(
     if max_price is not None:
         query = query.where(MarketPrice.price <= max_price)
 
-    # Apply search filter (minimum 3 characters to avoid expensive ILIKE on short strings)
-    if search and len(search.strip()) >= 3:
-        search_pattern = f"%{search.strip()}%"
+    # Apply search filter (minimum one trigram: shorter terms can't use the pg_trgm indexes)
+    if search and len(search.strip()) >= MIN_TRIGRAM_LENGTH:
         query = query.where(
             or_(
-                col(MarketPrice.title).ilike(search_pattern),
-                col(Card.name).ilike(search_pattern),
+                search_contains(col(MarketPrice.title), search.strip()),
+                search_contains(col(Card.name), search.strip()),
             )
         )
 
@@ -367,27 +455,41 @@ def read_market_listings(
     total = None  # Not calculated - frontend should use hasMore instead
 
     # Apply sorting - use explicit Any typing for SQLAlchemy column expressions
-    sort_key = sort_by if sort_by else "scraped_at"
+    # Sort expressions are never NULL (scraped_at always is set), as keyset pagination requires
     sort_column_map: dict[str, Any] = {
         "price": col(MarketPrice.price),
         "scraped_at": col(MarketPrice.scraped_at),
         "listed_at": func.coalesce(MarketPrice.listed_at, MarketPrice.scraped_at),
         "sold_date": func.coalesce(MarketPrice.sold_date, MarketPrice.scraped_at),
     }
-    sort_column: Any = sort_column_map.get(sort_key, col(MarketPrice.scraped_at))
+    sort_key = sort_by if sort_by in sort_column_map else "scraped_at"
 
     # For active listings default to listed_at (more meaningful than scraped_at)
     if sort_key == "scraped_at" and listing_type == "active":
-        sort_column = func.coalesce(MarketPrice.listed_at, MarketPrice.scraped_at)
+        sort_key = "listed_at"
+    sort_column: Any = sort_column_map[sort_key]
+    descending = sort_order != "asc"
+    cursor_sort = f"{sort_key}:{'desc' if descending else 'asc'}"
 
     # Add secondary sort by id for deterministic ordering when primary sort values are equal
-    if sort_order == "asc":
+    # (and so (sort value, id) identifies a position for keyset pagination)
+    if descending:
+        query = query.order_by(desc(sort_column), col(MarketPrice.id).desc())
+    else:
         query = query.order_by(sort_column, col(MarketPrice.id))
+    query = query.add_columns(sort_column.label("sort_value"))
+
+    # Apply pagination - seek past the cursor when given, otherwise OFFSET
+    # Fetch limit+1 to determine hasMore
+    if cursor:
+        try:
+            after_value, after_id = decode_cursor(cursor, cursor_sort)
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        query = query.where(keyset_after(sort_column, col(MarketPrice.id), after_value, after_id, descending))
     else:
-        query = query.order_by(desc(sort_column), col(MarketPrice.id).desc())
-
-    # Apply pagination - fetch limit+1 to determine hasMore
-    query = query.offset(offset).limit(limit + 1)
+        query = query.offset(offset)
+    query = query.limit(limit + 1)
 
     results = session.execute(query).all()
 
@@ -395,9 +497,10 @@ def read_market_listings(
     has_more = len(results) > limit
     if has_more:
         results = results[:limit]  # Trim to requested limit
+    next_cursor = encode_cursor(cursor_sort, results[-1].sort_value, results[-1].id) if has_more else None
 
     # Get unique card IDs to batch fetch floor prices and VWAP
-    card_ids = list(set(listing.card_id for listing, _ in results))
+    card_ids = list(set(listing.card_id for listing in results))
     floor_by_variant_map: dict[int, dict[str, float]] = {}
     floor_price_map: dict[int, float] = {}
     vwap_map: dict[int, float] = {}
@@ -469,11 +572,7 @@ def read_market_listings(
 
     # Format results
     listings = []
-    for listing, card in results:
-        card_name = card.name
-        card_slug = card.slug
-        card_product_type = card.product_type
-        card_image_url = card.image_url
+    for listing in results:
         # Get treatment-specific floor price if available
         # Determine variant key: use product_subtype for sealed, treatment for singles
         # Use lowercase for case-insensitive matching
@@ -489,10 +588,10 @@ def read_market_listings(
             {
                 "id": listing.id,
                 "card_id": listing.card_id,
-                "card_name": card_name,
-                "card_slug": card_slug,
-                "card_image_url": card_image_url,
-                "product_type": card_product_type or "Single",
+                "card_name": listing.card_name,
+                "card_slug": listing.card_slug,
+                "card_image_url": listing.card_image_url,
+                "product_type": listing.card_product_type or "Single",
                 "title": listing.title,
                 "price": listing.price,
                 "floor_price": floor_price,
@@ -526,12 +625,13 @@ def read_market_listings(
         "offset": offset,
         "limit": limit,
         "hasMore": has_more,  # Determined by fetching limit+1
+        "nextCursor": next_cursor,  # Pass as ?cursor= to fetch the next page
     }
 
     # Cache the result for 2 minutes
     set_market_cache(cache_key, result)
 
-    return JSONResponse(content=result, headers={"X-Cache": "MISS"})
+    return FastJSONResponse(content=result, headers={"X-Cache": "MISS"})
 
 
 # ============== LISTING REPORTS ==============
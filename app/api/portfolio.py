@@ -1,15 +1,19 @@
 from typing import Any, List, Optional
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlmodel import Session, select, func, desc
+from sqlmodel import Session, select, desc
 
 from app.api import deps
 from app.core.typing import col, ensure_int
 from app.db import get_session
 from app.models.portfolio import PortfolioItem, PortfolioCard
 from app.models.card import Card, Rarity
-from app.models.market import MarketSnapshot, MarketPrice
 from app.models.user import User
+from app.services.portfolio_valuation import (
+    PortfolioValuationService,
+    cached_value_history,
+    invalidate_portfolio_history,
+)
 from app.schemas import (
     PortfolioItemCreate,
     PortfolioItemOut,
@@ -22,39 +26,40 @@ from app.schemas import (
 )
 
 
-def get_live_market_price(session: Session, card_id: int) -> float:
-    """
-    Get live market price for a card, preferring actual data over snapshots.
-    Priority: 1) Latest sold price, 2) Live lowest_ask, 3) Snapshot avg_price
-    """
-    # Try to get most recent sold price
-    last_sale = session.exec(
-        select(MarketPrice.price)
-        .where(MarketPrice.card_id == card_id)
-        .where(MarketPrice.listing_type == "sold")
-        .order_by(desc(MarketPrice.sold_date))
-        .limit(1)
-    ).first()
-    if last_sale:
-        return last_sale
-
-    # Fallback to live lowest_ask from active listings
-    live_ask = session.exec(
-        select(func.min(MarketPrice.price))
-        .where(MarketPrice.card_id == card_id)
-        .where(MarketPrice.listing_type == "active")
-    ).first()
-    if live_ask:
-        return live_ask
-
-    # Final fallback to snapshot avg_price
-    snapshot = session.exec(
-        select(MarketSnapshot)
-        .where(MarketSnapshot.card_id == card_id)
-        .order_by(desc(MarketSnapshot.timestamp), desc(MarketSnapshot.id))
-        .limit(1)
-    ).first()
-    return snapshot.avg_price if snapshot and snapshot.avg_price else 0.0
+def build_portfolio_item_outs(session: Session, items: List[PortfolioItem]) -> List[PortfolioItemOut]:
+    """Build PortfolioItemOut for legacy holdings, priced in one batch (card-level prices)."""
+    valuation = PortfolioValuationService(session)
+    card_ids = {item.card_id for item in items}
+    details = valuation.card_details(card_ids)
+    prices = valuation.card_prices(card_ids)
+
+    results = []
+    for item in items:
+        card = details[item.card_id][0] if item.card_id in details else None
+        current_price = prices[item.card_id]
+
+        current_value = current_price * item.quantity
+        cost_basis = item.purchase_price * item.quantity
+        gain_loss = current_value - cost_basis
+        gain_loss_percent = (gain_loss / cost_basis * 100) if cost_basis > 0 else 0.0
+
+        results.append(
+            PortfolioItemOut(
+                id=ensure_int(item.id),
+                user_id=item.user_id,
+                card_id=item.card_id,
+                quantity=item.quantity,
+                purchase_price=item.purchase_price,
+                acquired_at=item.acquired_at,
+                card_name=card.name if card else "Unknown",
+                card_set=card.set_name if card else "",
+                current_market_price=current_price,
+                current_value=current_value,
+                gain_loss=gain_loss,
+                gain_loss_percent=gain_loss_percent,
+            )
+        )
+    return results
 
 
 router = APIRouter()
@@ -108,36 +113,8 @@ def read_portfolio(
     stmt = select(PortfolioItem).where(PortfolioItem.user_id == current_user.id)
     items = session.exec(stmt).all()
 
-    results = []
-    for item in items:
-        # Fetch Card Info
-        card = session.get(Card, item.card_id)
-
-        # Get LIVE market price (prefers recent sale > lowest_ask > snapshot)
-        current_price = get_live_market_price(session, item.card_id)
-
-        current_value = current_price * item.quantity
-        cost_basis = item.purchase_price * item.quantity
-        gain_loss = current_value - cost_basis
-        gain_loss_percent = (gain_loss / cost_basis * 100) if cost_basis > 0 else 0.0
-
-        out = PortfolioItemOut(
-            id=ensure_int(item.id),
-            user_id=item.user_id,
-            card_id=item.card_id,
-            quantity=item.quantity,
-            purchase_price=item.purchase_price,
-            acquired_at=item.acquired_at,
-            card_name=card.name if card else "Unknown",
-            card_set=card.set_name if card else "",
-            current_market_price=current_price,
-            current_value=current_value,
-            gain_loss=gain_loss,
-            gain_loss_percent=gain_loss_percent,
-        )
-        results.append(out)
-
-    return results
+    # Prices come from live data (recent sale > lowest_ask > snapshot), batched for all items
+    return build_portfolio_item_outs(session, list(items))
 
 
 @router.put("/{item_id}", response_model=PortfolioItemOut)
@@ -168,31 +145,7 @@ def update_portfolio_item(
     session.commit()
     session.refresh(item)
 
-    # Get card details
-    card = session.get(Card, item.card_id)
-
-    # Get LIVE market price (prefers recent sale > lowest_ask > snapshot)
-    current_price = get_live_market_price(session, item.card_id)
-
-    current_value = current_price * item.quantity
-    cost_basis = item.purchase_price * item.quantity
-    gain_loss = current_value - cost_basis
-    gain_loss_percent = (gain_loss / cost_basis * 100) if cost_basis > 0 else 0.0
-
-    return PortfolioItemOut(
-        id=ensure_int(item.id),
-        user_id=item.user_id,
-        card_id=item.card_id,
-        quantity=item.quantity,
-        purchase_price=item.purchase_price,
-        acquired_at=item.acquired_at,
-        card_name=card.name if card else "Unknown",
-        card_set=card.set_name if card else "",
-        current_market_price=current_price,
-        current_value=current_value,
-        gain_loss=gain_loss,
-        gain_loss_percent=gain_loss_percent,
-    )
+    return build_portfolio_item_outs(session, [item])[0]
 
 
 @router.delete("/{item_id}", response_model=PortfolioItemOut)
@@ -232,153 +185,13 @@ def delete_portfolio_item(
 # =============================================================================
 
 
-def batch_get_treatment_market_prices(
-    session: Session, card_treatment_pairs: List[tuple[int, str]]
-) -> dict[tuple[int, str], float]:
-    """
-    Batch fetch market prices for multiple card+treatment pairs.
-    Returns a dict of (card_id, treatment) -> price.
-    Much more efficient than calling get_treatment_market_price in a loop.
-    """
-
-    if not card_treatment_pairs:
-        return {}
-
-    cutoff = datetime.now(timezone.utc) - timedelta(days=30)
-
-    # Get unique card_ids and treatments
-    card_ids = list(set(pair[0] for pair in card_treatment_pairs))
-    treatments = list(set(pair[1] for pair in card_treatment_pairs))
-
-    # Batch query: Get VWAP for all card+treatment combinations in one query
-    # Use SQLAlchemy ORM instead of raw SQL for SQLite compatibility (tests use SQLite)
-
-    results = session.exec(
-        select(MarketPrice.card_id, MarketPrice.treatment, func.avg(MarketPrice.price).label("avg_price"))
-        .where(col(MarketPrice.card_id).in_(card_ids))
-        .where(col(MarketPrice.treatment).in_(treatments))
-        .where(MarketPrice.listing_type == "sold")
-        .where(func.coalesce(MarketPrice.sold_date, MarketPrice.scraped_at) >= cutoff)
-        .group_by(col(MarketPrice.card_id), col(MarketPrice.treatment))
-    ).all()
-
-    # Build lookup dict
-    prices: dict[tuple[int, str], float] = {}
-    for row in results:
-        # Access tuple elements by index for SQLAlchemy compatibility
-        card_id, treatment, avg_price = row[0], row[1], row[2]
-        prices[(card_id, treatment)] = float(avg_price)
-
-    # For pairs without recent sales, try to get last sale (any time)
-    missing_pairs = [p for p in card_treatment_pairs if p not in prices]
-    if missing_pairs:
-        missing_card_ids = list(set(p[0] for p in missing_pairs))
-        missing_treatments = list(set(p[1] for p in missing_pairs))
-
-        # Use subquery approach for getting last sale per card+treatment (SQLite compatible)
-
-        # Get all sold prices for missing combinations, ordered by date
-        last_sales = session.exec(
-            select(MarketPrice.card_id, MarketPrice.treatment, MarketPrice.price, MarketPrice.sold_date)
-            .where(col(MarketPrice.card_id).in_(missing_card_ids))
-            .where(col(MarketPrice.treatment).in_(missing_treatments))
-            .where(MarketPrice.listing_type == "sold")
-            .order_by(col(MarketPrice.card_id), col(MarketPrice.treatment), col(MarketPrice.sold_date).desc())
-        ).all()
-
-        # Take first (most recent) for each card+treatment pair
-        seen_keys = set()
-        for row in last_sales:
-            card_id, treatment, price = row[0], row[1], row[2]
-            key = (card_id, treatment)
-            if key not in prices and key not in seen_keys:
-                seen_keys.add(key)
-                prices[key] = float(price)
-
-    # Final fallback: get card-level prices for anything still missing
-    still_missing = [p for p in card_treatment_pairs if p not in prices]
-    if still_missing:
-        still_missing_card_ids = list(set(p[0] for p in still_missing))
-
-        # Get latest sold price per card (any treatment) - SQLite compatible
-        fallback_results = session.exec(
-            select(MarketPrice.card_id, MarketPrice.price, MarketPrice.sold_date)
-            .where(col(MarketPrice.card_id).in_(still_missing_card_ids))
-            .where(MarketPrice.listing_type == "sold")
-            .order_by(col(MarketPrice.card_id), col(MarketPrice.sold_date).desc())
-        ).all()
-
-        # Take first (most recent) for each card
-        fallback_prices: dict[int, float] = {}
-        for row in fallback_results:
-            cid, price = row[0], row[1]
-            if cid not in fallback_prices:
-                fallback_prices[cid] = float(price)
-
-        for card_id, treatment in still_missing:
-            if card_id in fallback_prices:
-                prices[(card_id, treatment)] = fallback_prices[card_id]
-            else:
-                prices[(card_id, treatment)] = 0.0
-
-    return prices
-
-
-def get_treatment_market_price(session: Session, card_id: int, treatment: str) -> float:
-    """
-    Get market price for a specific card + treatment combination.
-    Falls back to card-level price if treatment-specific not available.
-    """
-    # Try to get treatment-specific VWAP (last 30 days)
-    cutoff = datetime.now(timezone.utc) - timedelta(days=30)
-
-    treatment_avg = session.exec(
-        select(func.avg(MarketPrice.price))
-        .where(MarketPrice.card_id == card_id)
-        .where(MarketPrice.treatment == treatment)
-        .where(MarketPrice.listing_type == "sold")
-        .where(col(MarketPrice.sold_date) >= cutoff)
-    ).first()
-
-    if treatment_avg and treatment_avg > 0:
-        return float(treatment_avg)
-
-    # Fallback: Get most recent sale for this treatment (any time)
-    last_treatment_sale = session.exec(
-        select(MarketPrice.price)
-        .where(MarketPrice.card_id == card_id)
-        .where(MarketPrice.treatment == treatment)
-        .where(MarketPrice.listing_type == "sold")
-        .order_by(desc(MarketPrice.sold_date))
-        .limit(1)
-    ).first()
-
-    if last_treatment_sale:
-        return float(last_treatment_sale)
-
-    # Final fallback: Use card-level price (any treatment)
-    return get_live_market_price(session, card_id)
-
-
 def build_portfolio_card_out(
-    session: Session,
     card: PortfolioCard,
     db_card: Optional[Card],
     rarity: Optional[Rarity],
-    preloaded_market_price: Optional[float] = None,
+    market_price: Optional[float],
 ) -> PortfolioCardOut:
-    """Build PortfolioCardOut with market data.
-
-    Args:
-        preloaded_market_price: If provided, skip the DB query and use this price.
-                               Used for batch operations to avoid N+1 queries.
-    """
-    market_price = (
-        preloaded_market_price
-        if preloaded_market_price is not None
-        else get_treatment_market_price(session, card.card_id, card.treatment)
-    )
-
+    """Build PortfolioCardOut with market data."""
     # Handle null/zero market prices gracefully
     if market_price is None or market_price == 0:
         profit_loss = None
@@ -419,6 +232,27 @@ def build_portfolio_card_out(
     )
 
 
+def build_portfolio_cards_out(session: Session, cards: List[PortfolioCard]) -> List[PortfolioCardOut]:
+    """
+    Build PortfolioCardOut for any number of holdings with a fixed number of queries.
+
+    Card/rarity details are one query and treatment prices one query per
+    price tier (see PortfolioValuationService).
+    """
+    if not cards:
+        return []
+
+    valuation = PortfolioValuationService(session)
+    details = valuation.card_details({c.card_id for c in cards})
+    market_prices = valuation.treatment_prices({(c.card_id, c.treatment) for c in cards})
+
+    results = []
+    for card in cards:
+        db_card, rarity = details.get(card.card_id, (None, None))
+        results.append(build_portfolio_card_out(card, db_card, rarity, market_prices[(card.card_id, card.treatment)]))
+    return results
+
+
 @router.post("/cards", response_model=List[PortfolioCardOut])
 def create_portfolio_card(
     card_in: PortfolioCardCreate,
@@ -469,15 +303,12 @@ def create_portfolio_card(
         created_cards.append(card)
 
     session.commit()
+    invalidate_portfolio_history(ensure_int(current_user.id))
 
     # Refresh and build response
-    rarity = session.get(Rarity, db_card.rarity_id) if db_card.rarity_id else None
-    results = []
     for card in created_cards:
         session.refresh(card)
-        results.append(build_portfolio_card_out(session, card, db_card, rarity))
-
-    return results
+    return build_portfolio_cards_out(session, created_cards)
 
 
 @router.post("/cards/batch", response_model=List[PortfolioCardOut])
@@ -537,16 +368,12 @@ def create_portfolio_cards_batch(
             created_cards.append(card)
 
     session.commit()
+    invalidate_portfolio_history(ensure_int(current_user.id))
 
     # Refresh and build response
-    results = []
     for card in created_cards:
         session.refresh(card)
-        db_card = db_cards[card.card_id]
-        rarity = session.get(Rarity, db_card.rarity_id) if db_card.rarity_id else None
-        results.append(build_portfolio_card_out(session, card, db_card, rarity))
-
-    return results
+    return build_portfolio_cards_out(session, created_cards)
 
 
 @router.get("/cards", response_model=List[PortfolioCardOut])
@@ -582,33 +409,7 @@ def read_portfolio_cards(
     query = query.order_by(desc(PortfolioCard.created_at))
     cards = session.exec(query).all()
 
-    if not cards:
-        return []
-
-    # Batch fetch card details
-    card_ids = set(c.card_id for c in cards)
-    db_cards = {c.id: c for c in session.exec(select(Card).where(col(Card.id).in_(card_ids))).all()} if card_ids else {}
-
-    # Batch fetch rarities
-    rarity_ids = set(c.rarity_id for c in db_cards.values() if c.rarity_id)
-    rarities = (
-        {r.id: r for r in session.exec(select(Rarity).where(col(Rarity.id).in_(rarity_ids))).all()}
-        if rarity_ids
-        else {}
-    )
-
-    # Batch fetch market prices (fixes N+1 query problem)
-    card_treatment_pairs = [(c.card_id, c.treatment) for c in cards]
-    market_prices = batch_get_treatment_market_prices(session, card_treatment_pairs)
-
-    results = []
-    for card in cards:
-        db_card = db_cards.get(card.card_id)
-        rarity = rarities.get(db_card.rarity_id) if db_card and db_card.rarity_id else None
-        market_price = market_prices.get((card.card_id, card.treatment))
-        results.append(build_portfolio_card_out(session, card, db_card, rarity, preloaded_market_price=market_price))
-
-    return results
+    return build_portfolio_cards_out(session, list(cards))
 
 
 @router.get("/cards/summary", response_model=PortfolioSummary)
@@ -640,9 +441,8 @@ def read_portfolio_summary(
             by_source={},
         )
 
-    # Batch fetch all market prices in a single query (fixes N+1)
-    card_treatment_pairs = [(c.card_id, c.treatment) for c in cards]
-    market_prices = batch_get_treatment_market_prices(session, card_treatment_pairs)
+    # Batch fetch all market prices (one query per price tier)
+    market_prices = PortfolioValuationService(session).treatment_prices((c.card_id, c.treatment) for c in cards)
 
     # Calculate market values
     total_market_value = 0.0
@@ -702,9 +502,7 @@ def read_portfolio_card(
     if card.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    db_card = session.get(Card, card.card_id)
-    rarity = session.get(Rarity, db_card.rarity_id) if db_card and db_card.rarity_id else None
-    return build_portfolio_card_out(session, card, db_card, rarity)
+    return build_portfolio_cards_out(session, [card])[0]
 
 
 @router.patch("/cards/{card_id}", response_model=PortfolioCardOut)
@@ -748,10 +546,9 @@ def update_portfolio_card(
     session.add(card)
     session.commit()
     session.refresh(card)
+    invalidate_portfolio_history(ensure_int(current_user.id))
 
-    db_card = session.get(Card, card.card_id)
-    rarity = session.get(Rarity, db_card.rarity_id) if db_card and db_card.rarity_id else None
-    return build_portfolio_card_out(session, card, db_card, rarity)
+    return build_portfolio_cards_out(session, [card])[0]
 
 
 @router.delete("/cards/{card_id}", response_model=PortfolioCardOut)
@@ -774,10 +571,9 @@ def delete_portfolio_card(
     session.add(card)
     session.commit()
     session.refresh(card)
+    invalidate_portfolio_history(ensure_int(current_user.id))
 
-    db_card = session.get(Card, card.card_id)
-    rarity = session.get(Rarity, db_card.rarity_id) if db_card and db_card.rarity_id else None
-    return build_portfolio_card_out(session, card, db_card, rarity)
+    return build_portfolio_cards_out(session, [card])[0]
 
 
 @router.get("/treatments", response_model=List[str])
@@ -817,7 +613,8 @@ def get_portfolio_value_history(
     """
     Get portfolio value history over time.
     Returns daily portfolio value based on cards owned at each date.
-    Now uses treatment-specific pricing for accurate historical values.
+    Uses treatment-specific pricing, forward-filling each day from the latest sale on or before it.
+    Cached per user until their holdings change or a held card gets new sales.
     """
 
     # Get all user's portfolio cards (including purchase dates)
@@ -827,92 +624,4 @@ def get_portfolio_value_history(
         .where(col(PortfolioCard.deleted_at).is_(None))
     ).all()
 
-    if not cards:
-        return {"history": [], "cost_basis_history": []}
-
-    # Build date range
-    end_date = datetime.now(timezone.utc).date()
-    start_date = end_date - timedelta(days=days)
-
-    # Get unique card_ids and treatments
-    card_ids = list(set(c.card_id for c in cards))
-    treatments = list(set(c.treatment for c in cards))
-
-    # Get historical prices for all cards WITH treatment-specific pricing
-    # Use SQLAlchemy ORM for SQLite compatibility
-    sale_date_col = func.date(func.coalesce(MarketPrice.sold_date, MarketPrice.scraped_at))
-
-    price_results = session.exec(
-        select(
-            MarketPrice.card_id,
-            MarketPrice.treatment,
-            sale_date_col.label("sale_date"),
-            func.avg(MarketPrice.price).label("avg_price"),
-        )
-        .where(col(MarketPrice.card_id).in_(card_ids))
-        .where(col(MarketPrice.treatment).in_(treatments))
-        .where(MarketPrice.listing_type == "sold")
-        .where(func.coalesce(MarketPrice.sold_date, MarketPrice.scraped_at) >= start_date)
-        .group_by(col(MarketPrice.card_id), col(MarketPrice.treatment), sale_date_col)
-        .order_by(col(MarketPrice.card_id), col(MarketPrice.treatment), sale_date_col)
-    ).all()
-
-    # Build price lookup: {(card_id, treatment): {date: price}}
-    price_by_card_treatment_date: dict[tuple[int, str], dict] = {}
-    for row in price_results:
-        cid, treatment, sale_date, avg_price = row[0], row[1], row[2], row[3]
-        key = (cid, treatment)
-        if key not in price_by_card_treatment_date:
-            price_by_card_treatment_date[key] = {}
-        # Handle both date objects and strings from different DBs
-        if isinstance(sale_date, str):
-            from datetime import date as date_type
-
-            sale_date = date_type.fromisoformat(sale_date)
-        price_by_card_treatment_date[key][sale_date] = float(avg_price)
-
-    # Get current prices as fallback using batch fetch
-    card_treatment_pairs = [(c.card_id, c.treatment) for c in cards]
-    current_prices = batch_get_treatment_market_prices(session, card_treatment_pairs)
-
-    # Calculate daily portfolio value
-    history = []
-    cost_basis_history = []
-    current_date = start_date
-
-    while current_date <= end_date:
-        daily_value = 0.0
-        daily_cost = 0.0
-
-        for card in cards:
-            # Check if card was owned on this date
-            card_purchase_date = card.purchase_date
-            if card_purchase_date and card_purchase_date > current_date:
-                continue  # Card not yet purchased
-
-            # Add cost basis
-            daily_cost += card.purchase_price
-
-            # Get treatment-specific price for this card on this date
-            key = (card.card_id, card.treatment)
-            card_prices = price_by_card_treatment_date.get(key, {})
-
-            # Find the most recent price on or before current_date
-            price = None
-            for d in sorted(card_prices.keys(), reverse=True):
-                if d <= current_date:
-                    price = card_prices[d]
-                    break
-
-            # If no historical price, use current price
-            if price is None:
-                price = current_prices.get(key, card.purchase_price)
-
-            daily_value += price
-
-        history.append({"date": current_date.isoformat(), "value": round(daily_value, 2)})
-        cost_basis_history.append({"date": current_date.isoformat(), "value": round(daily_cost, 2)})
-
-        current_date += timedelta(days=1)
-
-    return {"history": history, "cost_basis_history": cost_basis_history}
+    return cached_value_history(session, ensure_int(current_user.id), list(cards), days)
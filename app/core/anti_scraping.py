@@ -44,6 +44,7 @@ class AntiScrapingMiddleware(BaseHTTPMiddleware):
         "/api/v1/analytics",  # Analytics tracking
         "/api/v1/billing",  # Billing endpoints
         "/api/v1/webhooks",  # Webhook endpoints
+        "/api/v1/export",  # Already requires API key
         "/",
         "/docs",
         "/openapi.json",
@@ -464,3 +465,5 @@ class APIKeyRateLimiter:
 
 # Global instances
 api_key_limiter = APIKeyRateLimiter()
+# Separate budget for bulk export streams (see require_export_api_key)
+export_limiter = APIKeyRateLimiter()
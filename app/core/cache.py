@@ -0,0 +1,618 @@
+"""
+Pluggable cache backends for API response and pricing caches.
+
+Two backends are provided:
+- MemoryCacheBackend: process-local LRU with per-entry TTL (default)
+- RedisCacheBackend: shared cache over the Redis protocol, so one computation
+  serves every uvicorn worker and replica
+
+Callers don't talk to backends directly. They get a namespaced Cache via
+get_cache(), and the backend is chosen by settings.CACHE_BACKEND:
+
+    _cache = get_cache("cards", ttl=300, maxsize=250)
+    cached = _cache.get(key)
+    if cached is None:
+        cached = compute()
+        _cache.set(key, cached)
+
+Expensive endpoints use get_or_compute() instead, which coalesces concurrent
+misses for a key into one computation (single-flight) and, once an entry is past
+its TTL, keeps serving the stale value while one background refresh runs:
+
+    value, status = _cache.get_or_compute(key, compute, stale_ttl=600)
+
+Entries can carry tags (e.g. "card:42", "window:7d"). invalidate_tags() evicts
+only the entries matching a tag set, which is how scrape writers keep card data
+fresh without blind short TTLs (see app.core.cache_invalidation). Backends
+also count invalidations per tag, so a get_or_compute() that was already
+reading when its tags were invalidated stores its result with the namespace's
+short TTL instead of the long one.
+
+Values are pickled when stored in Redis, so the Redis instance must be trusted
+infrastructure (same model as Django's Redis cache). A Redis outage never fails
+a request: errors are logged, treated as misses, and a circuit breaker stops
+hitting Redis until it recovers.
+"""
+
+import logging
+import pickle
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from app.core.circuit_breaker import CircuitBreakerRegistry
+from app.core.config import settings
+from app.core.metrics import cache_metrics
+
+logger = logging.getLogger(__name__)
+
+# Redis tag sets outlive any single entry; stale members are harmless (DEL of a
+# missing key is a no-op) and the set expires once nothing refreshes it.
+TAG_INDEX_TTL_SECONDS = 24 * 60 * 60
+
+
+class CacheBackend(ABC):
+    """Key/value store with per-entry TTL. Keys are fully qualified strings."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None on miss/expiry."""
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        """Store a value for ttl seconds."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove a single key (no-op if missing)."""
+
+    @abstractmethod
+    def clear(self, prefix: str = "") -> None:
+        """Remove every key starting with prefix."""
+
+    @abstractmethod
+    def tag(self, key: str, tags: Iterable[str]) -> None:
+        """Index an existing key under each tag."""
+
+    @abstractmethod
+    def keys_for_tags(self, tags: Iterable[str]) -> Set[str]:
+        """Return the keys indexed under any of the tags."""
+
+    @abstractmethod
+    def delete_many(self, keys: Iterable[str]) -> int:
+        """Remove several keys, returning how many existed."""
+
+    @abstractmethod
+    def invalidation_seq(self) -> int:
+        """Return the current invalidation counter."""
+
+    @abstractmethod
+    def mark_invalidated(self, tags: Iterable[str]) -> None:
+        """Bump the invalidation counter and record it as each tag's generation."""
+
+    @abstractmethod
+    def invalidated_since(self, tags: Iterable[str], seq: int) -> bool:
+        """Return True if any of the tags was invalidated after counter value seq."""
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    Thread-safe in-process LRU cache with per-entry expiry.
+
+    Entries past their TTL are dropped lazily on read; the LRU bound keeps
+    memory flat regardless of how many keys are written.
+    """
+
+    def __init__(self, maxsize: int = 1000):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}  # tag -> keys
+        self._key_tags: Dict[str, Set[str]] = {}  # key -> tags
+        self._seq = 0
+        self._generations: Dict[str, int] = {}  # tag -> seq of its last invalidation
+        self._lock = threading.Lock()
+
+    def _drop(self, key: str) -> bool:
+        """Remove a key and its tag index entries. Caller holds the lock."""
+        existed = self._data.pop(key, None) is not None
+        for tag in self._key_tags.pop(key, ()):
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+        return existed
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                self._drop(key)
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._drop(key)
+            self._data[key] = (time.monotonic() + ttl, value)
+            while len(self._data) > self.maxsize:
+                self._drop(next(iter(self._data)))
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._drop(key)
+
+    def clear(self, prefix: str = "") -> None:
+        with self._lock:
+            if not prefix:
+                self._data.clear()
+                self._tags.clear()
+                self._key_tags.clear()
+                return
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                self._drop(key)
+
+    def tag(self, key: str, tags: Iterable[str]) -> None:
+        with self._lock:
+            if key not in self._data:
+                return
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+                self._key_tags.setdefault(key, set()).add(tag)
+
+    def keys_for_tags(self, tags: Iterable[str]) -> Set[str]:
+        with self._lock:
+            keys: Set[str] = set()
+            for tag in tags:
+                keys |= self._tags.get(tag, set())
+            return keys
+
+    def delete_many(self, keys: Iterable[str]) -> int:
+        with self._lock:
+            return sum(1 for key in list(keys) if self._drop(key))
+
+    def invalidation_seq(self) -> int:
+        with self._lock:
+            return self._seq
+
+    def mark_invalidated(self, tags: Iterable[str]) -> None:
+        with self._lock:
+            self._seq += 1
+            for tag in tags:
+                self._generations[tag] = self._seq
+
+    def invalidated_since(self, tags: Iterable[str], seq: int) -> bool:
+        with self._lock:
+            return any(self._generations.get(tag, 0) > seq for tag in tags)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Shared cache backend speaking the Redis protocol.
+
+    Accepts any redis-py compatible client (redis.Redis, fakeredis.FakeRedis),
+    which keeps it testable without a server. Use from_url() in production.
+    """
+
+    def __init__(self, client: Any):
+        self.client = client
+        self._breaker = CircuitBreakerRegistry.get("redis_cache", failure_threshold=3, recovery_timeout=30.0)
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisCacheBackend":
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' extra (poetry install --extras redis)") from e
+        return cls(redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5))
+
+    def _call(self, op: str, fn, default: Any = None) -> Any:
+        """Run a Redis command, degrading to `default` when Redis is unavailable."""
+        if not self._breaker.allow_request():
+            return default
+        try:
+            result = fn()
+        except Exception as e:
+            self._breaker.record_failure()
+            logger.warning(f"[Cache] Redis {op} failed: {e}")
+            return default
+        self._breaker.record_success()
+        return result
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self._call("GET", lambda: self.client.get(key))
+        if raw is None:
+            return None
+        try:
+            return pickle.loads(raw)
+        except Exception as e:
+            logger.warning(f"[Cache] Dropping undecodable entry {key}: {e}")
+            self.delete(key)
+            return None
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self._call("SET", lambda: self.client.set(key, payload, px=max(1, int(ttl * 1000))))
+
+    def delete(self, key: str) -> None:
+        self._call("DEL", lambda: self.client.delete(key))
+
+    def clear(self, prefix: str = "") -> None:
+        def _clear():
+            batch = []
+            for key in self.client.scan_iter(match=f"{prefix}*", count=500):
+                batch.append(key)
+                if len(batch) >= 500:
+                    self.client.delete(*batch)
+                    batch = []
+            if batch:
+                self.client.delete(*batch)
+
+        self._call("SCAN/DEL", _clear)
+
+    @staticmethod
+    def _tag_key(tag: str) -> str:
+        return f"{settings.CACHE_KEY_PREFIX}tag:{tag}"
+
+    @staticmethod
+    def _generation_key(tag: Optional[str] = None) -> str:
+        """The invalidation counter, or a tag's generation when tag is given."""
+        return f"{settings.CACHE_KEY_PREFIX}tag-gen" + (f":{tag}" if tag is not None else "")
+
+    def tag(self, key: str, tags: Iterable[str]) -> None:
+        tags = list(tags)
+        if not tags:
+            return
+
+        def _tag():
+            pipe = self.client.pipeline(transaction=False)
+            for tag in tags:
+                pipe.sadd(self._tag_key(tag), key)
+                pipe.expire(self._tag_key(tag), TAG_INDEX_TTL_SECONDS)
+            pipe.execute()
+
+        self._call("SADD", _tag)
+
+    def keys_for_tags(self, tags: Iterable[str]) -> Set[str]:
+        tag_keys = [self._tag_key(tag) for tag in tags]
+        if not tag_keys:
+            return set()
+        members = self._call("SUNION", lambda: self.client.sunion(tag_keys), default=set())
+        return {m.decode() if isinstance(m, bytes) else m for m in members}
+
+    def delete_many(self, keys: Iterable[str]) -> int:
+        keys = list(keys)
+        if not keys:
+            return 0
+        return self._call("DEL", lambda: self.client.delete(*keys), default=0) or 0
+
+    def invalidation_seq(self) -> int:
+        return int(self._call("GET", lambda: self.client.get(self._generation_key())) or 0)
+
+    def mark_invalidated(self, tags: Iterable[str]) -> None:
+        tags = list(tags)
+        if not tags:
+            return
+
+        def _mark():
+            seq = self.client.incr(self._generation_key())
+            pipe = self.client.pipeline(transaction=False)
+            for tag in tags:
+                pipe.set(self._generation_key(tag), seq, ex=TAG_INDEX_TTL_SECONDS)
+            pipe.execute()
+
+        self._call("INCR", _mark)
+
+    def invalidated_since(self, tags: Iterable[str], seq: int) -> bool:
+        keys = [self._generation_key(tag) for tag in tags]
+        if not keys:
+            return False
+        generations = self._call("MGET", lambda: self.client.mget(keys), default=[])
+        return any(int(g) > seq for g in generations if g is not None)
+
+
+@dataclass(frozen=True)
+class _Stamped:
+    """A get_or_compute() entry: the value plus when it stops being fresh (wall clock, so valid across hosts)."""
+
+    value: Any
+    fresh_until: float
+
+
+class _Flight:
+    """An in-progress computation that concurrent callers for the same key wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class Cache:
+    """A namespace within a backend, with a default TTL."""
+
+    def __init__(self, namespace: str, backend: CacheBackend, ttl: float, maxsize: int = 1000):
+        self.namespace = namespace
+        self.backend = backend
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._prefix = f"{settings.CACHE_KEY_PREFIX}{namespace}:"
+        self._flights: Dict[str, _Flight] = {}
+        self._flights_lock = threading.Lock()
+
+    def _key(self, key: str) -> str:
+        return f"{self._prefix}{key}"
+
+    def get(self, key: str) -> Optional[Any]:
+        return self.backend.get(self._key(key))
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[float] = None,
+        tags: Optional[Iterable[str]] = None,
+    ) -> None:
+        """Store a value. Tagged entries can be evicted early via invalidate_tags()."""
+        full_key = self._key(key)
+        self.backend.set(full_key, value, self.ttl if ttl is None else ttl)
+        if tags:
+            self.backend.tag(full_key, tags)
+
+    def delete(self, key: str) -> None:
+        self.backend.delete(self._key(key))
+
+    def clear(self) -> None:
+        """Drop every entry in this namespace."""
+        self.backend.clear(self._prefix)
+
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        ttl: Optional[float] = None,
+        stale_ttl: float = 0.0,
+        tags: Union[Iterable[str], Callable[[Any], Iterable[str]], None] = None,
+        refresh: Optional[Callable[[], Any]] = None,
+    ) -> Tuple[Any, str]:
+        """
+        Return the cached value for key, computing it at most once per process.
+
+        Concurrent misses for the same key wait for a single call to compute()
+        instead of each running it. After `ttl` the entry is stale: for up to
+        `stale_ttl` more seconds it is still returned while one background
+        thread recomputes it. Entries evicted by invalidate_tags() are gone,
+        not stale, so the next caller always recomputes. A value whose tags
+        were invalidated while compute() ran may predate the write, so it is
+        stored with the namespace TTL and no stale window instead.
+
+        Args:
+            key: Cache key within this namespace
+            compute: Builds the value on a miss (runs in the caller's thread)
+            ttl: Seconds the value is fresh (defaults to the namespace TTL)
+            stale_ttl: Seconds a stale value may be served while refreshing
+            tags: Invalidation tags, or a callable deriving them from the value
+            refresh: Used instead of compute for background refreshes, e.g. to
+                open a new DB session rather than reuse a request-scoped one
+
+        Returns:
+            (value, status) where status is "HIT", "STALE" or "MISS"
+        """
+        ttl = self.ttl if ttl is None else ttl
+        entry = self.get(key)
+        if isinstance(entry, _Stamped):
+            if time.time() < entry.fresh_until:
+                return entry.value, "HIT"
+            if stale_ttl > 0:
+                self._refresh_in_background(key, refresh or compute, ttl, stale_ttl, tags)
+                cache_metrics.record_stale(self.namespace)
+                return entry.value, "STALE"
+        elif entry is not None:
+            # Written by plain set(); there is no freshness stamp to check
+            return entry, "HIT"
+
+        return self._compute_once(key, compute, ttl, stale_ttl, tags), "MISS"
+
+    def warm(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        ttl: Optional[float] = None,
+        stale_ttl: float = 0.0,
+        tags: Union[Iterable[str], Callable[[Any], Iterable[str]], None] = None,
+    ) -> Any:
+        """
+        Recompute key now and swap the result in, as get_or_compute() would store it.
+
+        Readers keep getting the previous entry until the new one is stored, and
+        concurrent get_or_compute() misses for the key wait on this computation.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        return self._compute_once(key, compute, ttl, stale_ttl, tags, background=True)
+
+    def _store_computed(
+        self, key: str, compute: Callable[[], Any], ttl: float, stale_ttl: float, tags, background: bool
+    ) -> Any:
+        """Run compute(), record its latency, and store the stamped result."""
+        seq = self.backend.invalidation_seq() if tags else 0
+        started = time.monotonic()
+        try:
+            value = compute()
+        except Exception:
+            cache_metrics.record_failure(self.namespace)
+            raise
+        cache_metrics.record_refresh(self.namespace, time.monotonic() - started, background=background)
+
+        entry_tags = list(tags(value) if callable(tags) else tags or ())
+        self.set(key, _Stamped(value, time.time() + ttl), ttl=ttl + stale_ttl, tags=entry_tags)
+        # Checked after storing: an invalidation marked later also evicts the entry just stored
+        if entry_tags and self.backend.invalidated_since(entry_tags, seq):
+            short_ttl = min(ttl, self.ttl)
+            self.set(key, _Stamped(value, time.time() + short_ttl), ttl=short_ttl, tags=entry_tags)
+        return value
+
+    def _compute_once(
+        self, key: str, compute: Callable[[], Any], ttl: float, stale_ttl: float, tags, background: bool = False
+    ) -> Any:
+        """Compute key in the calling thread, or wait for the call already running."""
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            cache_metrics.record_coalesced(self.namespace)
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = self._store_computed(key, compute, ttl, stale_ttl, tags, background=background)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._flights_lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+        return flight.value
+
+    def _refresh_in_background(self, key: str, compute: Callable[[], Any], ttl: float, stale_ttl: float, tags) -> None:
+        """Start one refresh thread for key unless a computation is already running."""
+        with self._flights_lock:
+            if key in self._flights:
+                return
+            flight = self._flights[key] = _Flight()
+
+        def _run():
+            try:
+                flight.value = self._store_computed(key, compute, ttl, stale_ttl, tags, background=True)
+            except Exception as e:
+                # The stale value keeps being served until stale_ttl runs out
+                flight.error = e
+                logger.warning(f"[Cache] Background refresh of {self.namespace}:{key} failed: {e}")
+            finally:
+                with self._flights_lock:
+                    self._flights.pop(key, None)
+                flight.done.set()
+
+        threading.Thread(target=_run, name=f"cache-refresh-{self.namespace}", daemon=True).start()
+
+
+_caches: Dict[str, Cache] = {}
+_shared_backend: Optional[CacheBackend] = None
+_registry_lock = threading.Lock()
+
+
+def _get_shared_backend() -> Optional[CacheBackend]:
+    """Return the fleet-wide backend if one is configured, else None (use per-namespace memory)."""
+    global _shared_backend
+    if _shared_backend is None and settings.CACHE_BACKEND == "redis":
+        if not settings.REDIS_URL:
+            logger.warning("[Cache] CACHE_BACKEND=redis but REDIS_URL is empty - using in-process cache")
+            return None
+        _shared_backend = RedisCacheBackend.from_url(settings.REDIS_URL)
+        logger.info("[Cache] Using Redis cache backend")
+    return _shared_backend
+
+
+def get_cache(namespace: str, ttl: float, maxsize: int = 1000) -> Cache:
+    """
+    Get (or create) the cache for a namespace.
+
+    Args:
+        namespace: Logical cache name, used as key prefix (e.g. "cards", "market")
+        ttl: Default entry lifetime in seconds
+        maxsize: Entry bound for the in-process backend (ignored by Redis)
+    """
+    with _registry_lock:
+        cache = _caches.get(namespace)
+        if cache is None:
+            backend = _get_shared_backend() or MemoryCacheBackend(maxsize=maxsize)
+            cache = Cache(namespace, backend, ttl, maxsize)
+            _caches[namespace] = cache
+        return cache
+
+
+def set_cache_backend(backend: Optional[CacheBackend]) -> None:
+    """
+    Point every registered namespace at a new shared backend.
+
+    Passing None restores per-namespace in-process caches. Used by tests and by
+    startup code that wants to inject a preconfigured client.
+    """
+    global _shared_backend
+    with _registry_lock:
+        _shared_backend = backend
+        for cache in _caches.values():
+            if backend is not None:
+                cache.backend = backend
+            elif not isinstance(cache.backend, MemoryCacheBackend):
+                cache.backend = MemoryCacheBackend(maxsize=cache.maxsize)
+
+
+def invalidate_tags(tags: Iterable[str], within: Optional[Iterable[str]] = None) -> int:
+    """
+    Evict every entry tagged with any of `tags` across all registered namespaces.
+
+    If `within` is given, only entries that also carry one of those tags are
+    evicted - e.g. the card tags of a scrape batch, within the time windows the
+    new rows fall into.
+
+    Returns:
+        Number of entries evicted
+    """
+    tags = list(tags)
+    within = list(within) if within is not None else None
+    if not tags:
+        return 0
+
+    with _registry_lock:
+        backends: List[CacheBackend] = []
+        for cache in _caches.values():
+            if not any(cache.backend is b for b in backends):
+                backends.append(cache.backend)
+
+    evicted = 0
+    for backend in backends:
+        # Marked before evicting, so computations already running see it (see Cache._store_computed)
+        backend.mark_invalidated(tags)
+        keys = backend.keys_for_tags(tags)
+        if within is not None and keys:
+            keys &= backend.keys_for_tags(within)
+        if keys:
+            evicted += backend.delete_many(keys)
+    return evicted
+
+
+def clear_all_caches() -> None:
+    """Clear every registered namespace. Useful for testing."""
+    with _registry_lock:
+        caches = list(_caches.values())
+    for cache in caches:
+        cache.clear()
+
+
+__all__ = [
+    "CacheBackend",
+    "MemoryCacheBackend",
+    "RedisCacheBackend",
+    "Cache",
+    "get_cache",
+    "set_cache_backend",
+    "invalidate_tags",
+    "clear_all_caches",
+]
@@ -0,0 +1,186 @@
+"""
+Write-driven invalidation for card data caches.
+
+Scrape writers publish the card_ids they touched after committing:
+
+    publish_card_updates({card.id}, since=earliest_sold_date, source="ebay")
+
+Cached responses are tagged by card and time window when they are stored
+(card_tag / window_tag / MARKET_TAG), so a publish evicts only the entries the
+new rows can change: a sale from 20 days ago clears 30d/90d/all windows for
+that card but leaves its 24h and 7d entries alone. Market-wide aggregates carry
+MARKET_TAG and are evicted whenever any card in their window changes.
+
+Because stale entries are evicted on write, tagged entries can live much longer
+than the old blind 5-minute TTL - see tagged_ttl(). Other components (cache
+prewarming, alerts) can react to the same events via subscribe().
+"""
+
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional
+
+from app.core.cache import invalidate_tags
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Time windows used by cached endpoints. None = unbounded ("all").
+TIME_WINDOWS: Dict[str, Optional[timedelta]] = {
+    "1h": timedelta(hours=1),
+    "24h": timedelta(days=1),
+    "7d": timedelta(days=7),
+    "30d": timedelta(days=30),
+    "90d": timedelta(days=90),
+    "all": None,
+}
+
+# Tag carried by aggregates over every card (market overview, treatments, ...)
+MARKET_TAG = "scope:market"
+
+
+@dataclass(frozen=True)
+class CardUpdateEvent:
+    """A committed write touching one or more cards."""
+
+    card_ids: FrozenSet[int]
+    since: Optional[datetime]  # Oldest timestamp written (None = unknown, affects every window)
+    source: str = ""
+
+
+_subscribers: List[Callable[[CardUpdateEvent], None]] = []
+_subscribers_lock = threading.Lock()
+
+
+def card_tag(card_id: int) -> str:
+    return f"card:{card_id}"
+
+
+def window_tag(window: Optional[str]) -> str:
+    """Tag for a time window name ("24h", "7d", ...). None/unknown means "all"."""
+    return f"window:{window if window in TIME_WINDOWS else 'all'}"
+
+
+def window_for_days(days: int) -> str:
+    """Smallest named window covering a lookback of `days`."""
+    for name, span in TIME_WINDOWS.items():
+        if span is not None and span >= timedelta(days=days):
+            return name
+    return "all"
+
+
+def card_tags(card_ids: Iterable[int], window: Optional[str] = None) -> List[str]:
+    """Tags for an entry derived from `card_ids` over `window`."""
+    return [card_tag(cid) for cid in card_ids] + [window_tag(window)]
+
+
+def market_tags(window: Optional[str] = None) -> List[str]:
+    """Tags for a market-wide aggregate over `window`."""
+    return [MARKET_TAG, window_tag(window)]
+
+
+def windows_covering(since: Optional[datetime], now: Optional[datetime] = None) -> List[str]:
+    """Names of the windows that include timestamps at or after `since`."""
+    if since is None:
+        return list(TIME_WINDOWS)
+    now = now or datetime.now(timezone.utc)
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    age = now - since
+    return [name for name, span in TIME_WINDOWS.items() if span is None or age <= span]
+
+
+def tagged_ttl(default: float) -> float:
+    """
+    TTL for entries that are kept fresh by invalidation.
+
+    Invalidation only reaches entries the publishing process can see: any entry
+    in a shared (Redis) cache, or the local cache when scrapers run in this
+    process. Otherwise fall back to the endpoint's short default TTL.
+    """
+    shared = settings.CACHE_BACKEND == "redis" and bool(settings.REDIS_URL)
+    in_process = settings.RUN_SCHEDULER and not settings.USE_TASK_QUEUE
+    if shared or in_process:
+        return max(default, settings.CACHE_INVALIDATED_TTL_SECONDS)
+    return default
+
+
+def subscribe(callback: Callable[[CardUpdateEvent], None]) -> None:
+    """Register a callback invoked after each publish (after cache eviction)."""
+    with _subscribers_lock:
+        if callback not in _subscribers:
+            _subscribers.append(callback)
+
+
+def unsubscribe(callback: Callable[[CardUpdateEvent], None]) -> None:
+    with _subscribers_lock:
+        if callback in _subscribers:
+            _subscribers.remove(callback)
+
+
+def publish_card_updates(
+    card_ids: Iterable[Optional[int]],
+    since: Optional[datetime] = None,
+    source: str = "",
+) -> int:
+    """
+    Announce committed writes to `card_ids` and evict the affected cache entries.
+
+    Call after the transaction commits, never before - otherwise a concurrent
+    request can re-cache pre-commit data.
+
+    Args:
+        card_ids: Cards whose MarketPrice/MarketSnapshot rows changed
+        since: Oldest sold/listed timestamp written (None = evict every window)
+        source: Writer name, for logging and subscribers
+
+    Returns:
+        Number of cache entries evicted
+    """
+    ids = frozenset(int(cid) for cid in card_ids if cid)
+    if not ids:
+        return 0
+
+    windows = windows_covering(since)
+    try:
+        evicted = invalidate_tags(
+            [card_tag(cid) for cid in ids] + [MARKET_TAG],
+            within=[window_tag(w) for w in windows],
+        )
+    except Exception as e:
+        # Never fail a scrape because of the cache; TTLs still bound staleness
+        logger.warning(f"[CacheInvalidation] Eviction failed for {len(ids)} cards: {e}")
+        evicted = 0
+
+    if evicted:
+        logger.debug(f"[CacheInvalidation] {source or 'write'}: {len(ids)} cards, windows={windows}, evicted={evicted}")
+
+    event = CardUpdateEvent(card_ids=ids, since=since, source=source)
+    with _subscribers_lock:
+        subscribers = list(_subscribers)
+    for callback in subscribers:
+        try:
+            callback(event)
+        except Exception as e:
+            logger.warning(f"[CacheInvalidation] Subscriber {getattr(callback, '__name__', callback)} failed: {e}")
+
+    return evicted
+
+
+__all__ = [
+    "TIME_WINDOWS",
+    "MARKET_TAG",
+    "CardUpdateEvent",
+    "card_tag",
+    "window_tag",
+    "window_for_days",
+    "card_tags",
+    "market_tags",
+    "windows_covering",
+    "tagged_ttl",
+    "subscribe",
+    "unsubscribe",
+    "publish_card_updates",
+]
@@ -0,0 +1,152 @@
+"""
+Prewarming of popular API response caches after scrape cycles.
+
+Scrape writers evict the cache entries they affect (app.core.cache_invalidation),
+so right after an ingestion cycle the most requested /cards and /market/overview
+variants are cold. This module remembers which variants users ask for and
+recomputes the most popular ones in the background once a cycle finishes:
+
+    # endpoint module, at import time
+    register_warmer("cards", _warm_cards)
+
+    # endpoint, on every request
+    record_request("cards", params)
+
+    # scheduler, after each ingestion batch
+    prewarm_popular_caches()
+
+Warmers recompute through Cache.warm(), which swaps the new entry in only once
+it is complete, so readers keep getting the previous entry until then.
+
+Request counts are process-local. Every process also publishes its current top
+list to the shared cache tier, which lets a separate scheduler worker prewarm
+what the web processes serve when CACHE_BACKEND=redis.
+"""
+
+import json
+import logging
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.cache import get_cache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Bound on distinct request variants tracked per process
+MAX_TRACKED_REQUESTS = 500
+# Publish the local top list to the shared tier every N recorded requests
+PUBLISH_EVERY = 50
+
+_popular_cache = get_cache("prewarm", ttl=24 * 60 * 60, maxsize=1)
+_POPULAR_KEY = "popular"
+
+Warmer = Callable[[Dict[str, Any]], None]
+
+_warmers: Dict[str, Warmer] = {}
+
+
+class RequestTracker:
+    """Thread-safe frequency counter of (endpoint, params) request variants."""
+
+    def __init__(self, maxsize: int = MAX_TRACKED_REQUESTS):
+        self.maxsize = maxsize
+        self._counts: Counter = Counter()
+        self._recorded = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name: str, params: Dict[str, Any]) -> str:
+        return json.dumps([name, params], sort_keys=True)
+
+    def record(self, name: str, params: Dict[str, Any]) -> bool:
+        """Count one request. Returns True when it's time to publish the top list."""
+        key = self._key(name, params)
+        with self._lock:
+            self._counts[key] += 1
+            if len(self._counts) > self.maxsize:
+                # Keep the most popular half; one-off variants aren't worth prewarming
+                self._counts = Counter(dict(self._counts.most_common(self.maxsize // 2)))
+            self._recorded += 1
+            return self._recorded % PUBLISH_EVERY == 0
+
+    def most_common(self, n: int) -> List[Tuple[str, Dict[str, Any]]]:
+        """The n most requested variants as (name, params)."""
+        with self._lock:
+            top = self._counts.most_common(n)
+        return [tuple(json.loads(key)) for key, _count in top]
+
+    def decay(self) -> None:
+        """Halve every count so shifts in traffic show up within a few cycles."""
+        with self._lock:
+            self._counts = Counter({key: count // 2 for key, count in self._counts.items() if count > 1})
+
+    def clear(self) -> None:
+        with self._lock:
+            self._counts.clear()
+            self._recorded = 0
+
+
+request_tracker = RequestTracker()
+
+
+def register_warmer(name: str, warmer: Warmer) -> None:
+    """Register the function that recomputes cache entries for an endpoint's params."""
+    _warmers[name] = warmer
+
+
+def record_request(name: str, params: Dict[str, Any]) -> None:
+    """Count a request to a prewarmable endpoint. Params must be JSON-serializable."""
+    if request_tracker.record(name, params):
+        top = request_tracker.most_common(settings.CACHE_PREWARM_TOP_N)
+        _popular_cache.set(_POPULAR_KEY, [[name, params] for name, params in top])
+
+
+def popular_requests(limit: int) -> List[Tuple[str, Dict[str, Any]]]:
+    """Most requested variants seen by this process, topped up from the shared list."""
+    requests = request_tracker.most_common(limit)
+    seen = {RequestTracker._key(name, params) for name, params in requests}
+    for name, params in _popular_cache.get(_POPULAR_KEY) or []:
+        if len(requests) >= limit:
+            break
+        key = RequestTracker._key(name, params)
+        if key not in seen:
+            seen.add(key)
+            requests.append((name, params))
+    return requests
+
+
+def prewarm_popular_caches(limit: Optional[int] = None) -> int:
+    """
+    Recompute cache entries for the most requested endpoint variants.
+
+    Blocking (runs DB queries); call via asyncio.to_thread from async jobs.
+    Failures are logged per variant and never raised.
+
+    Returns:
+        Number of variants warmed
+    """
+    limit = settings.CACHE_PREWARM_TOP_N if limit is None else limit
+    warmed = 0
+    for name, params in popular_requests(limit):
+        warmer = _warmers.get(name)
+        if warmer is None:
+            continue
+        try:
+            warmer(params)
+            warmed += 1
+        except Exception as e:
+            logger.warning(f"[CachePrewarm] Failed to warm {name} {params}: {e}")
+    request_tracker.decay()
+    return warmed
+
+
+__all__ = [
+    "RequestTracker",
+    "request_tracker",
+    "register_warmer",
+    "record_request",
+    "popular_requests",
+    "prewarm_popular_caches",
+]
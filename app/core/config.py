@@ -33,6 +33,12 @@ class Settings(BaseSettings):
     RESEND_API_KEY: str = ""
     FROM_EMAIL: str = "WondersTracker <noreply@wonderstracker.com>"
     ADMIN_EMAIL: str = "digitalcody@gmail.com"  # Admin notification email
+    RESEND_API_URL: str = "https://api.resend.com"
+    # Email outbox delivery (app.services.email_outbox)
+    EMAIL_BATCH_SIZE: int = 100  # Emails per provider batch request (Resend max 100)
+    EMAIL_SEND_CONCURRENCY: int = 4  # Batch requests in flight at once
+    EMAIL_RATE_LIMIT_PER_SECOND: float = 2.0  # Provider requests per second (Resend default limit)
+    EMAIL_MAX_ATTEMPTS: int = 5  # Delivery attempts before an email is marked failed
 
     # Polar Billing
     POLAR_ACCESS_TOKEN: str = ""
@@ -65,12 +71,36 @@ class Settings(BaseSettings):
     # CSRF Protection
     CSRF_SECRET: str = ""  # Falls back to SECRET_KEY if not set
 
+    # Shared cache tier ("memory" = per-process, "redis" = shared across workers/replicas)
+    CACHE_BACKEND: str = "memory"
+    REDIS_URL: str = ""
+    CACHE_KEY_PREFIX: str = "wt:"
+    # TTL for card/market entries evicted by scrape writers (app.core.cache_invalidation)
+    CACHE_INVALIDATED_TTL_SECONDS: int = 3600
+    # How long past TTL an expensive response may be served while one refresh runs
+    CACHE_STALE_TTL_SECONDS: int = 600
+    # Most requested /cards and /market/overview variants recomputed after each scrape cycle
+    CACHE_PREWARM_TOP_N: int = 20
+
     # Cards API tuning
     CARDS_CACHE_MAXSIZE: int = 250
     CARDS_CACHE_TTL_SECONDS: int = 300
     CARDS_DEFAULT_LIMIT: int = 200
     CARDS_MAX_LIMIT: int = 500  # Allow fetching all ~355 cards at once
 
+    # Bulk export (/export/sales) - own budget per API key, separate from per-request limits
+    EXPORT_RATE_LIMIT_PER_MINUTE: int = 2
+    EXPORT_RATE_LIMIT_PER_DAY: int = 50
+    EXPORT_MAX_CONCURRENT_PER_KEY: int = 1
+    EXPORT_FETCH_SIZE: int = 2000  # Rows per server-side cursor fetch
+
+    # In-memory columnar MarketPrice store for pricing lookups (app/services/price_store.py)
+    PRICE_STORE_ENABLED: bool = False
+    PRICE_STORE_DAYS: int = 365  # Rows loaded; lookbacks longer than this query the database
+    PRICE_STORE_MAX_MB: int = 256  # Memory budget; the store disables itself above this
+    PRICE_STORE_POLL_SECONDS: int = 60  # Interval for appending new rows
+    PRICE_STORE_RELOAD_SECONDS: int = 3600  # Full reload (in-place updates, deletes, aged-out rows)
+
     # ===== Browser Scraper Settings =====
     # Concurrent browser tab operations (4 tabs balances speed vs memory)
     BROWSER_SEMAPHORE_LIMIT: int = 2  # Reduced from 4 to avoid eBay rate limits
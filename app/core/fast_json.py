@@ -0,0 +1,129 @@
+"""
+Fast JSON encoding for list endpoints.
+
+List endpoints used to build pydantic models per row, dump them back to dicts and
+let FastAPI re-validate and re-encode the result. This module skips those round
+trips:
+
+- schema_encoder(Schema) builds a plain function that turns a row mapping (or
+  any dict of values) into exactly the dict Schema(...).model_dump(mode="json")
+  would produce, with no validation.
+- schema_columns(Model, Schema) selects only the columns the schema exposes, so
+  rows come back as lightweight tuples instead of ORM instances.
+- FastJSONResponse / dumps() encode with orjson (a project dependency), falling
+  back to the stdlib json module if it isn't installed.
+
+    rows = session.execute(select(*schema_columns(BlokpaxSale, BlokpaxSaleOut))).all()
+    encode = schema_encoder(BlokpaxSaleOut)
+    return FastJSONResponse([encode(row._mapping) for row in rows])
+
+scripts/benchmark_json.py compares this path against the pydantic one.
+"""
+
+import json
+import types
+import typing
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Mapping, Optional, Type
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+
+def dumps(content: Any) -> bytes:
+    """Encode content to compact UTF-8 JSON, as JSONResponse does (float exponents may be spelled differently)."""
+    if ORJSON_AVAILABLE:
+        # OPT_NON_STR_KEYS matches json.dumps for int-keyed dicts
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when available. Content must already be JSON-ready."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def json_datetime(value: Optional[datetime]) -> Optional[str]:
+    """Format a datetime the way pydantic's JSON mode does (UTC offset as "Z")."""
+    if value is None:
+        return None
+    text = value.isoformat()
+    return text[:-6] + "Z" if text.endswith("+00:00") else text
+
+
+def _json_date(value: Optional[date]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+def _json_float(value: Any) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+def _converter_for(annotation: Any) -> Optional[Callable[[Any], Any]]:
+    """Conversion pydantic would apply for a field annotation, or None for pass-through."""
+    if typing.get_origin(annotation) in (typing.Union, types.UnionType):
+        args = [a for a in typing.get_args(annotation) if a is not type(None)]
+        if len(args) != 1:
+            return None
+        annotation = args[0]
+    if annotation is float:
+        return _json_float
+    if annotation is datetime:
+        return json_datetime
+    if annotation is date:
+        return _json_date
+    if annotation is Decimal:
+        return lambda v: str(v) if v is not None else None
+    return None
+
+
+@lru_cache(maxsize=None)
+def schema_encoder(schema: Type[BaseModel]) -> Callable[[Mapping[str, Any]], Dict[str, Any]]:
+    """
+    Build a function mapping values to schema(**values).model_dump(mode="json") output.
+
+    Fields are emitted in schema order; missing values take the field default.
+    Only float, datetime, date and Decimal fields are converted - the values are
+    trusted to already have the schema's types otherwise (they come from our own
+    columns), which is what makes this cheaper than validating.
+    """
+    fields = [
+        (name, _converter_for(field.annotation), None if field.is_required() else field.get_default())
+        for name, field in schema.model_fields.items()
+    ]
+
+    def encode(values: Mapping[str, Any]) -> Dict[str, Any]:
+        out = {}
+        for name, convert, default in fields:
+            value = values.get(name, default)
+            out[name] = convert(value) if convert is not None else value
+        return out
+
+    return encode
+
+
+def schema_columns(model: Any, schema: Type[BaseModel]) -> List[Any]:
+    """The model columns backing each schema field, for column-only selects."""
+    return [getattr(model, name) for name in schema.model_fields]
+
+
+__all__ = [
+    "ORJSON_AVAILABLE",
+    "dumps",
+    "FastJSONResponse",
+    "json_datetime",
+    "schema_encoder",
+    "schema_columns",
+]
@@ -0,0 +1,90 @@
+"""
+Pre-encoded JSON responses with ETag revalidation.
+
+Cached API payloads are stored as final bytes instead of Python objects, so a
+cache hit skips JSON serialization and gzip entirely:
+
+    encoded = encode_json(payload)          # once, when the cache entry is built
+    return encoded_json_response(request, encoded)
+
+encode_json() renders the body like JSONResponse (with orjson when installed, see
+app.core.fast_json), precompresses it when it is large enough for GZipMiddleware
+to bother, and derives a weak ETag from the raw bytes. encoded_json_response()
+answers If-None-Match with 304 and picks the gzip variant when the client
+accepts it. GZipMiddleware passes responses that
+already carry Content-Encoding through untouched.
+"""
+
+import gzip
+import hashlib
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from app.core.fast_json import dumps
+
+# Match GZipMiddleware(minimum_size=1000) in app.main; smaller bodies aren't worth compressing
+GZIP_MINIMUM_SIZE = 1000
+GZIP_COMPRESS_LEVEL = 9
+
+
+@dataclass(frozen=True)
+class EncodedJSON:
+    """A JSON body rendered once, with its gzip variant and ETag."""
+
+    body: bytes
+    gzip_body: Optional[bytes]
+    etag: str
+
+
+def encode_json(content: Any) -> EncodedJSON:
+    """Render `content` the way JSONResponse does and precompute its variants."""
+    body = dumps(content)
+    gzip_body = None
+    if len(body) >= GZIP_MINIMUM_SIZE:
+        # mtime=0 keeps the compressed bytes identical across processes
+        gzip_body = gzip.compress(body, compresslevel=GZIP_COMPRESS_LEVEL, mtime=0)
+    # Weak: the raw and gzip representations are semantically the same resource
+    etag = f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    return EncodedJSON(body=body, gzip_body=gzip_body, etag=etag)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag (RFC 9110 13.1.2)."""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+
+def encoded_json_response(
+    request: Request,
+    encoded: EncodedJSON,
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """
+    Build the response for a pre-encoded body.
+
+    Returns 304 Not Modified when If-None-Match matches, the gzip variant when
+    the client accepts it, and the raw bytes otherwise.
+    """
+    response_headers = {"ETag": encoded.etag, "Vary": "Accept-Encoding", **(headers or {})}
+
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match and _etag_matches(if_none_match, encoded.etag):
+        return Response(status_code=304, headers=response_headers)
+
+    if encoded.gzip_body is not None and "gzip" in request.headers.get("Accept-Encoding", ""):
+        response_headers["Content-Encoding"] = "gzip"
+        return Response(content=encoded.gzip_body, media_type="application/json", headers=response_headers)
+
+    return Response(content=encoded.body, media_type="application/json", headers=response_headers)
+
+
+__all__ = [
+    "EncodedJSON",
+    "encode_json",
+    "encoded_json_response",
+]
@@ -131,3 +131,83 @@ class MetricsStore:
 
 # Global metrics store
 scraper_metrics = MetricsStore()
+
+
+@dataclass
+class CacheRefreshMetrics:
+    """Recompute counters for one cache namespace."""
+
+    refreshes: int = 0
+    background_refreshes: int = 0
+    failures: int = 0
+    stale_served: int = 0
+    coalesced_waiters: int = 0
+    total_refresh_seconds: float = 0.0
+    max_refresh_seconds: float = 0.0
+    last_refresh_seconds: float = 0.0
+
+
+@dataclass
+class CacheMetricsStore:
+    """Thread-safe store for cache recompute metrics (see Cache.get_or_compute)."""
+
+    _lock: Lock = field(default_factory=Lock)
+    _namespaces: dict = field(default_factory=dict)  # namespace -> CacheRefreshMetrics
+
+    def _get(self, namespace: str) -> CacheRefreshMetrics:
+        """Caller holds the lock."""
+        if namespace not in self._namespaces:
+            self._namespaces[namespace] = CacheRefreshMetrics()
+        return self._namespaces[namespace]
+
+    def record_refresh(self, namespace: str, seconds: float, background: bool = False) -> None:
+        """Record a completed recompute and how long it took."""
+        with self._lock:
+            metrics = self._get(namespace)
+            metrics.refreshes += 1
+            if background:
+                metrics.background_refreshes += 1
+            metrics.total_refresh_seconds += seconds
+            metrics.last_refresh_seconds = seconds
+            metrics.max_refresh_seconds = max(metrics.max_refresh_seconds, seconds)
+
+    def record_failure(self, namespace: str) -> None:
+        """Record a recompute that raised."""
+        with self._lock:
+            self._get(namespace).failures += 1
+
+    def record_stale(self, namespace: str) -> None:
+        """Record a stale value served while a refresh runs."""
+        with self._lock:
+            self._get(namespace).stale_served += 1
+
+    def record_coalesced(self, namespace: str) -> None:
+        """Record a request that waited on another request's recompute."""
+        with self._lock:
+            self._get(namespace).coalesced_waiters += 1
+
+    def get_all_metrics(self) -> dict:
+        """Get all metrics as a dictionary."""
+        with self._lock:
+            return {
+                namespace: {
+                    "refreshes": m.refreshes,
+                    "background_refreshes": m.background_refreshes,
+                    "failures": m.failures,
+                    "stale_served": m.stale_served,
+                    "coalesced_waiters": m.coalesced_waiters,
+                    "avg_refresh_seconds": round(m.total_refresh_seconds / m.refreshes, 3) if m.refreshes else 0,
+                    "max_refresh_seconds": round(m.max_refresh_seconds, 3),
+                    "last_refresh_seconds": round(m.last_refresh_seconds, 3),
+                }
+                for namespace, m in self._namespaces.items()
+            }
+
+    def reset(self) -> None:
+        """Drop all counters. Useful for testing."""
+        with self._lock:
+            self._namespaces.clear()
+
+
+# Global cache metrics store
+cache_metrics = CacheMetricsStore()
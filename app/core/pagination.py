@@ -0,0 +1,93 @@
+"""
+Keyset (cursor) pagination helpers.
+
+OFFSET pagination makes the database walk and discard every skipped row, so deep
+pages get linearly slower, and rows inserted while a client pages shift the
+window (duplicates or gaps). Keyset pagination instead remembers the sort key and
+id of the last row served and asks for rows strictly after it, which an index on
+(sort key, id) answers with a single seek:
+
+    sort = "scraped_at:desc"
+    statement = statement.order_by(desc(sort_expr), desc(MarketPrice.id))
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort)
+        statement = statement.where(keyset_after(sort_expr, MarketPrice.id, value, last_id, descending=True))
+    rows = session.execute(statement.limit(limit + 1)).all()
+    next_cursor = encode_cursor(sort, rows[limit - 1].sort_value, rows[limit - 1].id) if len(rows) > limit else None
+
+Cursors are opaque URL-safe strings. They carry the sort they were issued for,
+so a cursor can't silently be replayed against a different ordering. The sort
+expression must not be NULL for any row (wrap nullable columns in COALESCE).
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.sql.elements import ColumnElement
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor is malformed or was issued for another sort."""
+
+
+def encode_cursor(sort: str, value: Any, row_id: int) -> str:
+    """Encode the (sort key, id) of the last row served as an opaque cursor."""
+    if isinstance(value, datetime):
+        value = {"dt": value.isoformat()}
+    payload = json.dumps([sort, value, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[Any, int]:
+    """
+    Decode a cursor issued by encode_cursor() for the same sort.
+
+    Returns:
+        (sort key value, row id) of the last row of the previous page
+
+    Raises:
+        InvalidCursorError: if the cursor is malformed or belongs to another sort
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if isinstance(value, dict):
+            value = datetime.fromisoformat(value["dt"])
+    except (binascii.Error, UnicodeError, ValueError, TypeError, KeyError) as e:
+        raise InvalidCursorError("Invalid pagination cursor") from e
+
+    if cursor_sort != sort:
+        raise InvalidCursorError(f"Cursor was issued for sort '{cursor_sort}', not '{sort}'")
+    if not isinstance(row_id, int) or isinstance(value, (list, dict, bool)):
+        raise InvalidCursorError("Invalid pagination cursor")
+    return value, row_id
+
+
+def keyset_after(
+    sort_expr: Any,
+    id_column: Any,
+    value: Any,
+    row_id: int,
+    descending: bool,
+) -> ColumnElement:
+    """
+    Condition selecting rows after (value, row_id) in ORDER BY sort_expr, id_column.
+
+    Both keys must be ordered in the same direction. Uses a row-value comparison,
+    which PostgreSQL answers with an index seek on (sort_expr, id).
+    """
+    row = tuple_(sort_expr, id_column)
+    last = tuple_(value, row_id)
+    return row < last if descending else row > last
+
+
+__all__ = [
+    "InvalidCursorError",
+    "encode_cursor",
+    "decode_cursor",
+    "keyset_after",
+]
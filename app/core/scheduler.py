@@ -41,6 +41,11 @@ from app.models.market import MarketPrice
 from app.core.metrics import scraper_metrics
 from app.core.circuit_breaker import CircuitBreakerRegistry
 from app.services.meta_sync import sync_all_meta_status
+from app.services.fmp_snapshots import capture_daily_fmp_snapshots
+from app.services.price_alerts import check_price_alerts, start_price_alerts
+from app.services.email_outbox import deliver_outbox, purge_outbox
+from app.services.digest_assembler import digest_period, queue_digests
+from app.services.market_patterns import refresh_card_treatment_stats
 from app.services.task_queue import enqueue_task_sync, get_queue_stats_sync, cleanup_old_tasks_sync
 from datetime import datetime, timedelta, timezone
 
@@ -102,6 +107,27 @@ async def scrape_single_card(card: Card):
         return False
 
 
+async def prewarm_api_caches(log_prefix: str):
+    """
+    Recompute the most requested /cards and /market/overview cache entries.
+
+    Runs after each ingestion cycle, once scrape writes have evicted the entries
+    they affect, so users don't pay the cold aggregate cost.
+    """
+    # Importing the endpoint modules registers their warmers (worker processes don't load the API)
+    import app.api.cards  # noqa: F401
+    import app.api.market  # noqa: F401
+    from app.core.cache_prewarm import prewarm_popular_caches
+
+    try:
+        start = time.time()
+        warmed = await asyncio.to_thread(prewarm_popular_caches)
+        if warmed:
+            print(f"[{log_prefix}] Prewarmed {warmed} API cache entries in {time.time() - start:.1f}s")
+    except Exception as e:
+        print(f"[{log_prefix}] Cache prewarm failed: {type(e).__name__}: {e}")
+
+
 async def job_update_market_data():
     """
     Optimized polling job - scrapes cards in batches with concurrency control.
@@ -115,6 +141,9 @@ async def job_update_market_data():
     async with _browser_job_lock:
         await _job_update_market_data_impl()
 
+    # Outside the browser lock: prewarming only touches the DB
+    await prewarm_api_caches("Polling")
+
 
 async def _job_update_market_data_impl():
     """Implementation of market data update (called under lock)."""
@@ -366,6 +395,8 @@ async def job_update_blokpax_data():
     async with _browser_job_lock:
         await _job_update_blokpax_data_impl()
 
+    await prewarm_api_caches("Blokpax")
+
 
 async def _job_update_blokpax_data_impl():
     """Implementation of Blokpax/OpenSea update (called under lock)."""
@@ -556,57 +587,41 @@ async def _job_update_blokpax_data_impl():
 async def job_send_daily_digests():
     """
     Send daily market digest emails to users who have opted in.
+    Subscribers are read a page at a time in one query per page (app.services.digest_assembler).
     Runs once daily at 9 AM UTC.
     """
     print(f"[{datetime.now(timezone.utc)}] Sending Daily Digest Emails...")
 
     try:
-        from app.models.watchlist import EmailPreferences
-        from app.models.user import User
-        from app.services.email import send_daily_market_digest
         from app.services.market_insights import get_insights_generator
 
-        with Session(engine) as session:
-            # Get users who want daily digests
-            prefs = (
-                session.execute(select(EmailPreferences).where(EmailPreferences.daily_digest == True)).scalars().all()
-            )
-
-            if not prefs:
-                print("[Digest] No users subscribed to daily digest")
-                return
-
-            # Gather market data once for all users
-            generator = get_insights_generator()
-            data = generator.gather_market_data(days=1)
-
-            # Format for email
-            market_data = {
-                "total_sales": data.get("total_sales", 0),
-                "total_volume": data.get("total_volume", 0),
-                "market_sentiment": "bullish"
-                if data.get("volume_change", 0) > 10
-                else "bearish"
-                if data.get("volume_change", 0) < -10
-                else "neutral",
-                "top_gainers": data.get("top_gainers", []),
-                "top_losers": data.get("top_losers", []),
-                "hot_deals": data.get("hot_deals", []),
-            }
-
-            sent_count = 0
-            for pref in prefs:
-                user = session.get(User, pref.user_id)
-                if user and user.email:
-                    try:
-                        name = user.username or user.email.split("@")[0]
-                        success = send_daily_market_digest(user.email, name, market_data)
-                        if success:
-                            sent_count += 1
-                    except Exception as e:
-                        print(f"[Digest] Failed to send to {user.email}: {e}")
-
-            print(f"[Digest] Sent daily digest to {sent_count} users")
+        # Gather market data once for all users
+        generator = get_insights_generator()
+        data = generator.gather_market_data(days=1)
+
+        # Format for email
+        market_data = {
+            "total_sales": data.get("total_sales", 0),
+            "total_volume": data.get("total_volume", 0),
+            "market_sentiment": "bullish"
+            if data.get("volume_change", 0) > 10
+            else "bearish"
+            if data.get("volume_change", 0) < -10
+            else "neutral",
+            "top_gainers": data.get("top_gainers", []),
+            "top_losers": data.get("top_losers", []),
+            "hot_deals": data.get("hot_deals", []),
+        }
+
+        # Queue one email per subscriber, page by page; re-running the job the same day doesn't queue twice
+        today = digest_period("daily_digest", datetime.now(timezone.utc))
+        queued = await asyncio.to_thread(queue_digests, "daily_digest", market_data, period=today)
+        if not queued:
+            print("[Digest] No daily digests to queue")
+            return
+
+        stats = await deliver_outbox()
+        print(f"[Digest] Queued daily digest for {queued} users, sent {stats.sent} emails ({stats.retried} retrying)")
 
     except Exception as e:
         print(f"[Digest] Error sending daily digests: {e}")
@@ -668,64 +683,48 @@ async def job_send_personal_welcome_emails():
 async def job_send_weekly_reports():
     """
     Send weekly market report emails to users who have opted in.
+    Subscribers are read a page at a time in one query per page (app.services.digest_assembler).
     Runs once weekly on Monday at 9 AM UTC.
     """
     print(f"[{datetime.now(timezone.utc)}] Sending Weekly Report Emails...")
 
     try:
-        from app.models.watchlist import EmailPreferences
-        from app.models.user import User
-        from app.services.email import send_weekly_market_report
         from app.services.market_insights import get_insights_generator
 
-        with Session(engine) as session:
-            # Get users who want weekly reports
-            prefs = (
-                session.execute(select(EmailPreferences).where(EmailPreferences.weekly_report == True)).scalars().all()
-            )
-
-            if not prefs:
-                print("[Weekly] No users subscribed to weekly report")
-                return
-
-            # Gather market data for the week
-            generator = get_insights_generator()
-            data = generator.gather_market_data(days=7)
-
-            # Format for email
-            week_end = datetime.now(timezone.utc)
-            week_start = week_end - timedelta(days=7)
-
-            report_data = {
-                "week_start": week_start.strftime("%b %d"),
-                "week_end": week_end.strftime("%b %d"),
-                "total_sales": data.get("total_sales", 0),
-                "total_volume": data.get("total_volume", 0),
-                "volume_change": data.get("volume_change", 0),
-                "avg_sale_price": data.get("avg_price", 0),
-                "daily_breakdown": data.get("daily_breakdown", []),
-                "top_cards_by_volume": data.get("top_cards", []),
-                "price_movers": data.get("price_movers", []),
-                "market_health": {
-                    "unique_buyers": data.get("unique_buyers", 0),
-                    "unique_sellers": data.get("unique_sellers", 0),
-                    "liquidity_score": data.get("liquidity_score", 0),
-                },
-            }
-
-            sent_count = 0
-            for pref in prefs:
-                user = session.get(User, pref.user_id)
-                if user and user.email:
-                    try:
-                        name = user.username or user.email.split("@")[0]
-                        success = send_weekly_market_report(user.email, name, report_data)
-                        if success:
-                            sent_count += 1
-                    except Exception as e:
-                        print(f"[Weekly] Failed to send to {user.email}: {e}")
-
-            print(f"[Weekly] Sent weekly report to {sent_count} users")
+        # Gather market data for the week
+        generator = get_insights_generator()
+        data = generator.gather_market_data(days=7)
+
+        # Format for email
+        week_end = datetime.now(timezone.utc)
+        week_start = week_end - timedelta(days=7)
+
+        report_data = {
+            "week_start": week_start.strftime("%b %d"),
+            "week_end": week_end.strftime("%b %d"),
+            "total_sales": data.get("total_sales", 0),
+            "total_volume": data.get("total_volume", 0),
+            "volume_change": data.get("volume_change", 0),
+            "avg_sale_price": data.get("avg_price", 0),
+            "daily_breakdown": data.get("daily_breakdown", []),
+            "top_cards_by_volume": data.get("top_cards", []),
+            "price_movers": data.get("price_movers", []),
+            "market_health": {
+                "unique_buyers": data.get("unique_buyers", 0),
+                "unique_sellers": data.get("unique_sellers", 0),
+                "liquidity_score": data.get("liquidity_score", 0),
+            },
+        }
+
+        # Queue one email per subscriber, page by page; re-running the job the same week doesn't queue twice
+        week = digest_period("weekly_report", week_end)
+        queued = await asyncio.to_thread(queue_digests, "weekly_report", report_data, period=week)
+        if not queued:
+            print("[Weekly] No weekly reports to queue")
+            return
+
+        stats = await deliver_outbox()
+        print(f"[Weekly] Queued weekly report for {queued} users, sent {stats.sent} emails ({stats.retried} retrying)")
 
     except Exception as e:
         print(f"[Weekly] Error sending weekly reports: {e}")
@@ -733,91 +732,18 @@ async def job_send_weekly_reports():
 
 async def job_check_price_alerts():
     """
-    Check watchlist price alerts and send notifications.
-    Runs every 30 minutes.
+    Evaluate watchlist price alerts on cards whose prices changed since the last run.
+    Runs every 5 minutes; a run with no changed cards costs one query.
+    Alerts that fire are queued in the email outbox and delivered right away.
     """
-    print(f"[{datetime.now(timezone.utc)}] Checking Price Alerts...")
-
     try:
-        from app.models.watchlist import Watchlist
-        from app.models.user import User
-        from app.models.card import Card
-        from app.services.email import send_price_alert
-
-        with Session(engine) as session:
-            # Get all active alerts with target prices
-            alerts = (
-                session.execute(
-                    select(Watchlist).where(
-                        Watchlist.alert_enabled == True,
-                        Watchlist.target_price != None,
-                        Watchlist.notify_email == True,
-                    )
-                )
-                .scalars()
-                .all()
-            )
-
-            if not alerts:
-                print("[Alerts] No active price alerts")
-                return
-
-            sent_count = 0
-            for alert in alerts:
-                card = session.get(Card, alert.card_id)
-                user = session.get(User, alert.user_id)
-
-                if not card or not user:
-                    continue
-
-                # floor_price/latest_price are computed fields, not on Card model
-                # Use getattr to safely access (will return None if not present)
-                current_price: float = float(
-                    getattr(card, "floor_price", None) or getattr(card, "latest_price", None) or 0
-                )
-                target_price: float = float(alert.target_price or 0)
-
-                # Skip if already alerted at this price
-                if alert.last_alerted_price and abs(current_price - alert.last_alerted_price) < 0.01:
-                    continue
-
-                # Check if alert should trigger
-                should_alert = False
-                if alert.alert_type == "below" and current_price <= target_price:
-                    should_alert = True
-                elif alert.alert_type == "above" and current_price >= target_price:
-                    should_alert = True
-                elif alert.alert_type == "any":
-                    should_alert = True
-
-                # Cooldown: don't alert more than once per hour per card
-                if alert.last_alerted_at:
-                    time_since_last = datetime.now(timezone.utc) - alert.last_alerted_at
-                    if time_since_last.total_seconds() < 3600:
-                        continue
-
-                if should_alert:
-                    name = user.username or user.email.split("@")[0]
-                    alert_data = {
-                        "card_name": card.name,
-                        "card_slug": card.slug,
-                        "alert_type": alert.alert_type,
-                        "target_price": alert.target_price,
-                        "current_price": current_price,
-                        "treatment": alert.treatment or "Any Treatment",
-                    }
-
-                    success = send_price_alert(user.email, name, alert_data)
-                    if success:
-                        sent_count += 1
-                        # Update alert tracking
-                        alert.last_alerted_at = datetime.now(timezone.utc)
-                        alert.last_alerted_price = current_price
-                        session.add(alert)
-
-            session.commit()
-            print(f"[Alerts] Sent {sent_count} price alerts")
-
+        evaluated, queued = await asyncio.to_thread(check_price_alerts)
+        if evaluated or queued:
+            scope = "all cards" if evaluated < 0 else f"{evaluated} changed cards"
+            print(f"[{datetime.now(timezone.utc)}] [Alerts] Checked {scope}, queued {queued} price alerts")
+        if queued:
+            stats = await deliver_outbox()
+            print(f"[Alerts] Sent {stats.sent} emails ({stats.retried} retrying, {stats.failed} failed)")
     except Exception as e:
         print(f"[Alerts] Error checking price alerts: {e}")
 
@@ -1265,6 +1191,38 @@ async def job_sync_meta_status():
         log_scrape_error("Meta Sync", str(e))
 
 
+async def job_refresh_card_treatment_stats():
+    """
+    Rebuild card_treatment_stats (treatments seen, sales counts, observed multipliers).
+
+    One grouped query over recent sales; pricing fallbacks read the table
+    instead of discovering treatments per card.
+    """
+    print("[TreatmentStats] Refreshing card treatment stats...")
+    try:
+        rows = await asyncio.to_thread(refresh_card_treatment_stats)
+        print(f"[TreatmentStats] Refresh complete: {rows} card/treatment rows")
+    except Exception as e:
+        print(f"[TreatmentStats] Error during refresh: {e}")
+        log_scrape_error("Treatment Stats", str(e))
+
+
+async def job_capture_fmp_snapshots():
+    """
+    Capture FMPSnapshot rows for the days completed since the last capture.
+
+    Normally computes only yesterday; a missed run is caught up from the
+    latest stored snapshot date.
+    """
+    print("[FMPSnapshots] Capturing daily floor snapshots...")
+    try:
+        total = await asyncio.to_thread(capture_daily_fmp_snapshots)
+        print(f"[FMPSnapshots] Capture complete: {total} snapshots")
+    except Exception as e:
+        print(f"[FMPSnapshots] Error during capture: {e}")
+        log_scrape_error("FMP Snapshots", str(e))
+
+
 async def job_enqueue_stale_cards():
     """
     Enqueue stale cards to the persistent task queue for worker processing.
@@ -1341,9 +1299,27 @@ async def job_enqueue_stale_cards():
         log_scrape_error("Enqueue Stale Cards", str(e))
 
 
+async def job_deliver_email_outbox():
+    """
+    Deliver queued emails that are due: retries after provider errors or rate
+    limits, and anything a producer queued without delivering.
+    Runs every minute.
+    """
+    try:
+        stats = await deliver_outbox()
+        if stats.sent or stats.retried or stats.failed:
+            print(
+                f"[{datetime.now(timezone.utc)}] [Email Outbox] Sent {stats.sent}, "
+                f"retrying {stats.retried}, failed {stats.failed}"
+            )
+    except Exception as e:
+        print(f"[Email Outbox] Error delivering emails: {e}")
+
+
 async def job_cleanup_task_queue():
     """
-    Clean up old completed/failed tasks from the task queue.
+    Clean up old completed/failed tasks from the task queue, and old
+    delivered/failed emails from the email outbox.
     Runs daily at 3 AM UTC.
 
     Prevents the scrape_task table from growing unbounded by removing
@@ -1363,6 +1339,8 @@ async def job_cleanup_task_queue():
                 f"[Queue Cleanup] Deleted {result['completed_deleted']} completed, "
                 f"{result['failed_deleted']} failed tasks"
             )
+            emails_deleted = purge_outbox(session, days_to_keep=30)
+            print(f"[Queue Cleanup] Deleted {emails_deleted} delivered/failed outbox emails")
     except Exception as e:
         print(f"[Queue Cleanup] Error: {e}")
         log_scrape_error("Task Queue Cleanup", str(e))
@@ -1454,13 +1432,25 @@ def start_scheduler():
         replace_existing=True,
     )
 
-    # Price alert checks every 30 minutes
+    # Price alert checks every 5 minutes, on cards changed since the last check
+    start_price_alerts()
     scheduler.add_job(
         job_check_price_alerts,
-        IntervalTrigger(minutes=30),
+        IntervalTrigger(minutes=5),
         id="job_check_price_alerts",
         max_instances=1,
-        misfire_grace_time=900,  # 15 minutes
+        misfire_grace_time=300,  # 5 minutes
+        coalesce=True,
+        replace_existing=True,
+    )
+
+    # Email outbox delivery every minute - retries and anything queued without delivery
+    scheduler.add_job(
+        job_deliver_email_outbox,
+        IntervalTrigger(minutes=1),
+        id="job_deliver_email_outbox",
+        max_instances=1,
+        misfire_grace_time=60,  # 1 minute
         coalesce=True,
         replace_existing=True,
     )
@@ -1515,6 +1505,30 @@ def start_scheduler():
         replace_existing=True,
     )
 
+    # Card treatment stats every 6 hours, and once at startup so the table is never empty
+    # Treatment mix and multipliers move slowly; fallbacks read the table between refreshes
+    scheduler.add_job(
+        job_refresh_card_treatment_stats,
+        IntervalTrigger(hours=6),
+        id="job_refresh_card_treatment_stats",
+        next_run_time=datetime.now(timezone.utc),
+        max_instances=1,
+        misfire_grace_time=3600,  # 1 hour
+        coalesce=True,
+        replace_existing=True,
+    )
+
+    # FMP snapshots daily at 0:15 UTC, once the previous day is complete
+    scheduler.add_job(
+        job_capture_fmp_snapshots,
+        CronTrigger(hour=0, minute=15),
+        id="job_capture_fmp_snapshots",
+        max_instances=1,
+        misfire_grace_time=7200,  # 2 hours
+        coalesce=True,
+        replace_existing=True,
+    )
+
     # Task queue cleanup daily at 3 AM UTC
     # Removes completed/failed tasks older than 7 days to prevent table bloat
     scheduler.add_job(
@@ -1549,11 +1563,14 @@ def start_scheduler():
     print("  - job_update_blokpax_data (Blokpax+OpenSea): 8h interval, 1h grace")
     print("  - job_market_insights (Discord AI): 9:00 & 18:00 UTC, 1h grace")
     print("  - job_sync_meta_status (Meta): 4:00 UTC daily, 2h grace")
+    print("  - job_refresh_card_treatment_stats (Pricing): 6h interval + startup, 1h grace")
+    print("  - job_capture_fmp_snapshots (Pricing): 0:15 UTC daily, 2h grace")
     print("  - job_cleanup_task_queue (Queue Cleanup): 3:00 UTC daily, 2h grace")
     print("  - job_send_daily_digests (Email): 9:15 UTC daily, 1h grace")
     print("  - job_send_personal_welcome_emails (Email): 10:00 UTC daily, 1h grace")
     print("  - job_send_weekly_reports (Email): Mon 9:30 UTC, 2h grace")
-    print("  - job_check_price_alerts (Email): 30m interval, 15m grace")
+    print("  - job_check_price_alerts (Email): 5m interval on changed cards, 5m grace")
+    print("  - job_deliver_email_outbox (Email): 1m interval, 1m grace")
     print("  - job_seller_priority_queue (Seller): 1h interval, 30m grace")
     print("  - job_backfill_seller_data (Seller): 4h interval, 1h grace")
     print("  - job_scraper_health_check (Monitoring): 2h interval, 30m grace")
@@ -429,3 +429,52 @@ def check_and_log_deal(
     except Exception as e:
         print(f"Deal detection failed: {e}")
         return False
+
+
+def check_and_log_deals(
+    card_name: str,
+    listings: list[dict],
+    min_quality: str = "good",
+) -> list[bool]:
+    """
+    check_and_log_deal() for a page of listings of one card.
+
+    Deal verdicts for the whole page come from DealDetector.check_deals(), so
+    floors and volatilities are looked up once per page instead of per listing.
+
+    Args:
+        card_name: Name of the card (for display)
+        listings: List of dicts with card_id, price, treatment (optional), url (optional)
+        min_quality: Minimum quality to log ("marginal", "good", "hot")
+
+    Returns:
+        One flag per listing, True if a deal was detected and logged
+    """
+    try:
+        from app.services.market_patterns import get_deal_detector
+
+        results = get_deal_detector().check_deals(listings)
+    except Exception as e:
+        print(f"Deal detection failed: {e}")
+        return [False] * len(listings)
+
+    quality_order = {"not_a_deal": 0, "marginal": 1, "good": 2, "hot": 3}
+    logged = []
+    for listing, result in zip(listings, results):
+        if quality_order.get(result.deal_quality, 0) < quality_order.get(min_quality, 1):
+            logged.append(False)
+            continue
+        logged.append(
+            log_hot_deal(
+                card_name=card_name,
+                price=result.price,
+                floor_price=result.floor_price,
+                discount_pct=result.discount_pct,
+                deal_quality=result.deal_quality,
+                treatment=listing.get("treatment"),
+                url=listing.get("url"),
+                volatility_cv=result.volatility_cv,
+                threshold_pct=result.threshold_pct,
+            )
+        )
+    return logged
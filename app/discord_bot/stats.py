@@ -8,6 +8,7 @@ from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Any, Optional, Sequence
 from dataclasses import dataclass
 
+from sqlalchemy import and_, case, or_
 from sqlmodel import Session, select, func, desc
 from app.db import engine
 from app.models.card import Card, Rarity
@@ -55,9 +56,33 @@ def get_period_bounds(period: str) -> tuple[datetime, datetime]:
     return start, now
 
 
+def _query_ask_vs_avg(session: Session) -> Sequence[Any]:
+    """Fetch (name, live lowest ask, snapshot lowest ask, snapshot avg) for every card in one query."""
+    live_asks = (
+        select(MarketPrice.card_id, func.min(MarketPrice.price).label("lowest_ask"))
+        .where(MarketPrice.listing_type == "active")
+        .group_by(MarketPrice.card_id)
+        .subquery()
+    )
+    latest_snapshots = (
+        select(MarketSnapshot.card_id, func.max(MarketSnapshot.timestamp).label("timestamp"))
+        .group_by(MarketSnapshot.card_id)
+        .subquery()
+    )
+    return session.exec(
+        select(Card.name, live_asks.c.lowest_ask, MarketSnapshot.lowest_ask, MarketSnapshot.avg_price)
+        .outerjoin(live_asks, live_asks.c.card_id == Card.id)
+        .outerjoin(latest_snapshots, latest_snapshots.c.card_id == Card.id)
+        .outerjoin(
+            MarketSnapshot,
+            and_(MarketSnapshot.card_id == Card.id, MarketSnapshot.timestamp == latest_snapshots.c.timestamp),
+        )
+    ).all()
+
+
 def _generate_insights(
     session: Session,
-    sales: Sequence[Any],
+    total_volume: float,
     top_movers: List[Dict[str, Any]],
     top_volume: List[Dict[str, Any]],
     new_highs: List[Dict[str, Any]],
@@ -139,36 +164,20 @@ def _generate_insights(
     # Insight 5: Underpriced cards (current ask significantly below recent avg sale)
     # Compute LIVE lowest_ask from MarketPrice table instead of stale snapshot
     underpriced = []
-    for card in session.exec(select(Card)).all():
-        # Get LIVE lowest_ask from active listings in MarketPrice
-        live_ask_result = session.exec(
-            select(func.min(MarketPrice.price))
-            .where(MarketPrice.card_id == card.id)
-            .where(MarketPrice.listing_type == "active")
-        ).first()
-        live_lowest_ask = live_ask_result if live_ask_result else None
-
-        # Get avg_price from snapshot (this is fine - it's historical aggregate)
-        snapshot = session.exec(
-            select(MarketSnapshot)
-            .where(MarketSnapshot.card_id == card.id)
-            .order_by(desc(MarketSnapshot.timestamp))
-            .limit(1)
-        ).first()
-
+    for name, live_lowest_ask, snapshot_ask, snapshot_avg in _query_ask_vs_avg(session):
         # Use live lowest_ask, fallback to snapshot only if no active listings
-        lowest_ask = live_lowest_ask if live_lowest_ask is not None else (snapshot.lowest_ask if snapshot else None)
-        avg_price: Optional[float] = snapshot.avg_price if snapshot else None
+        lowest_ask = live_lowest_ask if live_lowest_ask is not None else snapshot_ask
+        card_avg: Optional[float] = snapshot_avg
 
         if not lowest_ask or lowest_ask <= 0:
             continue
-        if not avg_price or avg_price <= 0:
+        if not card_avg or card_avg <= 0:
             continue
 
         # If current ask is 20%+ below avg sold price
-        discount_pct = ((avg_price - lowest_ask) / avg_price) * 100
+        discount_pct = ((card_avg - lowest_ask) / card_avg) * 100
         if discount_pct > 20 and lowest_ask >= 5:  # Min $5 to avoid junk
-            underpriced.append({"name": card.name, "ask": lowest_ask, "avg": avg_price, "discount": discount_pct})
+            underpriced.append({"name": name, "ask": lowest_ask, "avg": card_avg, "discount": discount_pct})
 
     if underpriced and len(insights) < 4:
         underpriced.sort(key=lambda x: x["discount"], reverse=True)
@@ -183,20 +192,18 @@ def _generate_insights(
         )
 
     # Insight 6: High volume concentration (one card dominating)
-    if top_volume and sales:
+    if top_volume and total_volume > 0:
         top_card_volume = top_volume[0].get("total_volume", 0)
-        total_vol = sum(s.price for s in sales)
-        if total_vol > 0:
-            concentration = (top_card_volume / total_vol) * 100
-            if concentration > 30:
-                insights.append(
-                    {
-                        "type": "info",
-                        "icon": "👀",
-                        "title": "Concentrated Volume",
-                        "text": f"**{top_volume[0]['name']}** accounts for {concentration:.0f}% of all volume. Watch for price swings.",
-                    }
-                )
+        concentration = (top_card_volume / total_volume) * 100
+        if concentration > 30:
+            insights.append(
+                {
+                    "type": "info",
+                    "icon": "👀",
+                    "title": "Concentrated Volume",
+                    "text": f"**{top_volume[0]['name']}** accounts for {concentration:.0f}% of all volume. Watch for price swings.",
+                }
+            )
 
     # Ensure we have at least 3 insights
     if len(insights) < 3:
@@ -223,6 +230,202 @@ def _generate_insights(
     return insights[:3]
 
 
+@dataclass
+class _CardPeriodStats:
+    """Per-card summary assembled from the grouped stats query."""
+
+    card_id: int
+    name: str
+    product_type: str
+    count: int = 0
+    volume: float = 0.0
+    max_price: Optional[float] = None
+    min_price: Optional[float] = None
+    prev_count: int = 0
+    prev_volume: float = 0.0
+    hist_max: Optional[float] = None
+    hist_min: Optional[float] = None
+    # {treatment: [count, volume]} for each period
+    treatments: Optional[Dict[str, List[float]]] = None
+    prev_treatments: Optional[Dict[str, List[float]]] = None
+
+
+def _max_or_none(a: Optional[float], b: Optional[float]) -> Optional[float]:
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return max(a, b)
+
+
+def _min_or_none(a: Optional[float], b: Optional[float]) -> Optional[float]:
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return min(a, b)
+
+
+def _query_card_period_stats(
+    session: Session, prev_start: datetime, start_time: datetime, end_time: datetime
+) -> List[_CardPeriodStats]:
+    """Aggregate current and previous period sales per card/treatment in one grouped query.
+
+    Current and previous period figures are computed side by side with conditional
+    aggregation. Historical min/max (everything before the current period) is only
+    scanned for cards that traded in the current period, so the result size scales
+    with active cards rather than with sales.
+    """
+    sale_date = func.coalesce(MarketPrice.sold_date, MarketPrice.scraped_at)
+    in_current = and_(sale_date >= start_time, sale_date <= end_time)
+    in_prev = and_(sale_date >= prev_start, sale_date < start_time)
+    before_current = sale_date < start_time
+
+    active_card_ids = (
+        select(MarketPrice.card_id).where(MarketPrice.listing_type == "sold").where(in_current).scalar_subquery()
+    )
+
+    rows = session.exec(
+        select(
+            Card.id,
+            Card.name,
+            Card.product_type,
+            MarketPrice.treatment,
+            func.count(case((in_current, MarketPrice.id))),
+            func.sum(case((in_current, MarketPrice.price))),
+            func.max(case((in_current, MarketPrice.price))),
+            func.min(case((in_current, MarketPrice.price))),
+            func.count(case((in_prev, MarketPrice.id))),
+            func.sum(case((in_prev, MarketPrice.price))),
+            func.max(case((before_current, MarketPrice.price))),
+            func.min(case((before_current, MarketPrice.price))),
+        )
+        .join(Card, Card.id == MarketPrice.card_id)
+        .where(MarketPrice.listing_type == "sold")
+        .where(sale_date <= end_time)
+        .where(or_(sale_date >= prev_start, MarketPrice.card_id.in_(active_card_ids)))
+        .group_by(Card.id, Card.name, Card.product_type, MarketPrice.treatment)
+    ).all()
+
+    # Fold treatment groups into per-card summaries (NULL/empty treatment -> Classic Paper)
+    cards: Dict[int, _CardPeriodStats] = {}
+    for (
+        card_id,
+        name,
+        product_type,
+        raw_treatment,
+        count,
+        volume,
+        max_price,
+        min_price,
+        prev_count,
+        prev_volume,
+        hist_max,
+        hist_min,
+    ) in rows:
+        stats = cards.get(card_id)
+        if stats is None:
+            stats = _CardPeriodStats(
+                card_id=card_id,
+                name=name,
+                product_type=product_type or "Single",
+                treatments={},
+                prev_treatments={},
+            )
+            cards[card_id] = stats
+        assert stats.treatments is not None and stats.prev_treatments is not None
+
+        treatment = raw_treatment or "Classic Paper"
+        if count:
+            stats.count += count
+            stats.volume += float(volume or 0)
+            stats.max_price = _max_or_none(stats.max_price, max_price)
+            stats.min_price = _min_or_none(stats.min_price, min_price)
+            bucket = stats.treatments.setdefault(treatment, [0, 0.0])
+            bucket[0] += count
+            bucket[1] += float(volume or 0)
+        if prev_count:
+            stats.prev_count += prev_count
+            stats.prev_volume += float(prev_volume or 0)
+            bucket = stats.prev_treatments.setdefault(treatment, [0, 0.0])
+            bucket[0] += prev_count
+            bucket[1] += float(prev_volume or 0)
+        stats.hist_max = _max_or_none(stats.hist_max, hist_max)
+        stats.hist_min = _min_or_none(stats.hist_min, hist_min)
+
+    return sorted(cards.values(), key=lambda c: c.card_id)
+
+
+def _build_mover(card: _CardPeriodStats) -> Optional[Dict[str, Any]]:
+    """Build a top-mover entry for a card that traded in both periods."""
+    assert card.treatments is not None and card.prev_treatments is not None
+    current_avg = card.volume / card.count
+    prev_avg = card.prev_volume / card.prev_count
+    if prev_avg <= 0:
+        return None
+
+    pct_change = ((current_avg - prev_avg) / prev_avg) * 100
+
+    # Determine reason for price change
+    reason = None
+    confidence = "high"  # high, medium, low
+
+    # Check if treatment mix changed significantly
+    standard = ["Classic Paper", "Paper"]
+    current_premium_count = sum(c for t, (c, _) in card.treatments.items() if t not in standard)
+    prev_premium_count = sum(c for t, (c, _) in card.prev_treatments.items() if t not in standard)
+
+    # Build treatment summary
+    treatment_summary = [
+        {"treatment": t, "count": int(c), "avg": v / c}
+        for t, (c, v) in sorted(card.treatments.items(), key=lambda x: (-x[1][0], x[0]))
+    ]
+
+    def _treatment_pct(treatment: str) -> float:
+        curr_count, curr_volume = card.treatments[treatment]
+        prev_count, prev_volume = card.prev_treatments[treatment]
+        curr_t_avg = curr_volume / curr_count
+        prev_t_avg = prev_volume / prev_count
+        return ((curr_t_avg - prev_t_avg) / prev_t_avg * 100) if prev_t_avg > 0 else 0
+
+    # Determine reason based on data patterns
+    if card.count <= 2:
+        confidence = "low"
+        reason = f"Only {card.count} sale(s) - small sample"
+    elif current_premium_count > 0 and prev_premium_count == 0:
+        reason = f"Premium variants sold ({', '.join(t for t in card.treatments if t not in standard)})"
+        confidence = "medium"
+    elif prev_premium_count > 0 and current_premium_count == 0:
+        reason = "Only standard variants sold this period"
+        confidence = "medium"
+    elif abs(pct_change) > 50 and card.count < 5:
+        confidence = "medium"
+        reason = f"Large swing on {card.count} sales - may normalize"
+    elif pct_change > 20 or pct_change < -20:
+        # Check if there's a consistent treatment to compare
+        common_treatment = treatment_summary[0]["treatment"]
+        if common_treatment in card.prev_treatments:
+            if abs(_treatment_pct(common_treatment) - pct_change) < 10:
+                if pct_change > 20:
+                    reason = f"Consistent demand increase across {common_treatment}"
+                else:
+                    reason = f"Price correction on {common_treatment}"
+                confidence = "high"
+
+    return {
+        "card_id": card.card_id,
+        "name": card.name,
+        "current_price": current_avg,
+        "prev_price": prev_avg,
+        "pct_change": pct_change,
+        "volume": card.count,
+        "prev_volume": card.prev_count,
+        "treatments": treatment_summary,
+        "reason": reason,
+        "confidence": confidence,
+    }
+
+
 def calculate_market_stats(
     period: str = "daily",
     session: Session | None = None,
@@ -231,6 +434,10 @@ def calculate_market_stats(
 ) -> MarketStats:
     """Calculate market statistics for a given period.
 
+    Per-card volume, averages, min/max and period-over-period deltas come from a
+    single grouped query (see ``_query_card_period_stats``); only the summary rows
+    are post-processed in Python.
+
     Args:
         period: The period to calculate stats for ("daily", "weekly")
         session: Optional existing database session
@@ -243,6 +450,9 @@ def calculate_market_stats(
     else:
         start_time, end_time = get_period_bounds(period)
 
+    # Previous period of equal length for comparison
+    prev_start = start_time - (end_time - start_time)
+
     # Use provided session or create a new one
     own_session = session is None
     if own_session:
@@ -250,65 +460,34 @@ def calculate_market_stats(
     assert session is not None  # Type narrowing for type checker
 
     try:
-        # Get all sold listings in period
-        # Use COALESCE(sold_date, scraped_at) to include sales with NULL sold_date
-        sales = session.exec(
-            select(MarketPrice)
-            .where(MarketPrice.listing_type == "sold")
-            .where(func.coalesce(MarketPrice.sold_date, MarketPrice.scraped_at) >= start_time)
-            .where(func.coalesce(MarketPrice.sold_date, MarketPrice.scraped_at) <= end_time)
-        ).all()
+        card_stats = _query_card_period_stats(session, prev_start, start_time, end_time)
+        active_cards = [c for c in card_stats if c.count > 0]
 
-        total_sales = len(sales)
-        total_volume_usd = sum(s.price for s in sales) if sales else 0
-        unique_cards = len(set(s.card_id for s in sales)) if sales else 0
+        total_sales = sum(c.count for c in active_cards)
+        total_volume_usd = sum(c.volume for c in active_cards)
+        unique_cards = len(active_cards)
         avg_price = total_volume_usd / total_sales if total_sales > 0 else 0
 
-        # Calculate product type breakdown (Singles, Boxes, Packs, Lots)
-        product_breakdown = {}
-        for sale in sales:
-            card = session.get(Card, sale.card_id)
-            if card:
-                ptype = card.product_type or "Single"
-                if ptype not in product_breakdown:
-                    product_breakdown[ptype] = {"count": 0, "volume": 0.0}
-                product_breakdown[ptype]["count"] += 1
-                product_breakdown[ptype]["volume"] += sale.price
-
-        # Calculate avg_price for each product type
-        for ptype in product_breakdown:
-            cnt = product_breakdown[ptype]["count"]
-            product_breakdown[ptype]["avg_price"] = product_breakdown[ptype]["volume"] / cnt if cnt > 0 else 0
-
-        # Calculate treatment breakdown (Classic Paper, Foil, Full Art, etc.)
-        treatment_breakdown = {}
-        for sale in sales:
-            treatment = sale.treatment or "Classic Paper"
-            if treatment not in treatment_breakdown:
-                treatment_breakdown[treatment] = {"count": 0, "volume": 0.0}
-            treatment_breakdown[treatment]["count"] += 1
-            treatment_breakdown[treatment]["volume"] += sale.price
-
-        # Calculate avg_price for each treatment
-        for treatment in treatment_breakdown:
-            cnt = treatment_breakdown[treatment]["count"]
-            treatment_breakdown[treatment]["avg_price"] = (
-                treatment_breakdown[treatment]["volume"] / cnt if cnt > 0 else 0
-            )
-
-        # Get previous period for comparison
-        prev_start = start_time - (end_time - start_time)
-
-        # Calculate previous period stats for trends
-        prev_sales = session.exec(
-            select(MarketPrice)
-            .where(MarketPrice.listing_type == "sold")
-            .where(func.coalesce(MarketPrice.sold_date, MarketPrice.scraped_at) >= prev_start)
-            .where(func.coalesce(MarketPrice.sold_date, MarketPrice.scraped_at) < start_time)
-        ).all()
+        prev_total_sales = sum(c.prev_count for c in card_stats)
+        prev_total_volume = sum(c.prev_volume for c in card_stats)
 
-        prev_total_sales = len(prev_sales)
-        prev_total_volume = sum(s.price for s in prev_sales) if prev_sales else 0
+        # Calculate product type breakdown (Singles, Boxes, Packs, Lots)
+        # and treatment breakdown (Classic Paper, Foil, Full Art, etc.)
+        product_breakdown: Dict[str, Dict[str, Any]] = {}
+        treatment_breakdown: Dict[str, Dict[str, Any]] = {}
+        for card in active_cards:
+            assert card.treatments is not None
+            pdata = product_breakdown.setdefault(card.product_type, {"count": 0, "volume": 0.0})
+            pdata["count"] += card.count
+            pdata["volume"] += card.volume
+            for treatment, (count, volume) in card.treatments.items():
+                tdata = treatment_breakdown.setdefault(treatment, {"count": 0, "volume": 0.0})
+                tdata["count"] += int(count)
+                tdata["volume"] += volume
+
+        for breakdown in (product_breakdown, treatment_breakdown):
+            for data in breakdown.values():
+                data["avg_price"] = data["volume"] / data["count"] if data["count"] > 0 else 0
 
         # Calculate trend percentages with meaningful thresholds
         # Only show trends if previous period had enough data to be meaningful
@@ -329,114 +508,12 @@ def calculate_market_stats(
 
         # Calculate top movers (biggest % change) with treatment context
         top_movers = []
-        cards = session.exec(select(Card)).all()
-
-        for card in cards:
-            # Current period sales
-            current_sales = [s for s in sales if s.card_id == card.id]
-            if not current_sales:
+        for card in active_cards:
+            if card.prev_count == 0:
                 continue
-
-            # Previous period sales
-            prev_card_sales = session.exec(
-                select(MarketPrice)
-                .where(MarketPrice.card_id == card.id)
-                .where(MarketPrice.listing_type == "sold")
-                .where(func.coalesce(MarketPrice.sold_date, MarketPrice.scraped_at) >= prev_start)
-                .where(func.coalesce(MarketPrice.sold_date, MarketPrice.scraped_at) < start_time)
-            ).all()
-
-            if not prev_card_sales:
-                continue
-
-            # Calculate treatment breakdown for current period
-            current_treatments: Dict[str, List[float]] = {}
-            for s in current_sales:
-                t = s.treatment or "Classic Paper"
-                if t not in current_treatments:
-                    current_treatments[t] = []
-                current_treatments[t].append(s.price)
-
-            # Calculate treatment breakdown for previous period
-            prev_treatments: Dict[str, List[float]] = {}
-            for s in prev_card_sales:
-                t = s.treatment or "Classic Paper"
-                if t not in prev_treatments:
-                    prev_treatments[t] = []
-                prev_treatments[t].append(s.price)
-
-            # Overall averages
-            current_avg = sum(s.price for s in current_sales) / len(current_sales)
-            prev_avg = sum(s.price for s in prev_card_sales) / len(prev_card_sales)
-
-            if prev_avg <= 0:
-                continue
-
-            pct_change = ((current_avg - prev_avg) / prev_avg) * 100
-
-            # Determine reason for price change
-            reason = None
-            confidence = "high"  # high, medium, low
-
-            # Check if treatment mix changed significantly
-            current_premium_count = sum(
-                len(v) for k, v in current_treatments.items() if k not in ["Classic Paper", "Paper"]
-            )
-            prev_premium_count = sum(len(v) for k, v in prev_treatments.items() if k not in ["Classic Paper", "Paper"])
-
-            # Build treatment summary
-            treatment_summary = []
-            for t, prices in sorted(current_treatments.items(), key=lambda x: -len(x[1])):
-                avg = sum(prices) / len(prices)
-                treatment_summary.append({"treatment": t, "count": len(prices), "avg": avg})
-
-            # Determine reason based on data patterns
-            if len(current_sales) <= 2:
-                confidence = "low"
-                reason = f"Only {len(current_sales)} sale(s) - small sample"
-            elif current_premium_count > 0 and prev_premium_count == 0:
-                reason = f"Premium variants sold ({', '.join(k for k in current_treatments if k not in ['Classic Paper', 'Paper'])})"
-                confidence = "medium"
-            elif prev_premium_count > 0 and current_premium_count == 0:
-                reason = "Only standard variants sold this period"
-                confidence = "medium"
-            elif abs(pct_change) > 50 and len(current_sales) < 5:
-                confidence = "medium"
-                reason = f"Large swing on {len(current_sales)} sales - may normalize"
-            elif pct_change > 20:
-                # Check if there's a consistent treatment to compare
-                common_treatment = max(current_treatments.keys(), key=lambda k: len(current_treatments[k]))
-                if common_treatment in prev_treatments:
-                    curr_t_avg = sum(current_treatments[common_treatment]) / len(current_treatments[common_treatment])
-                    prev_t_avg = sum(prev_treatments[common_treatment]) / len(prev_treatments[common_treatment])
-                    t_pct = ((curr_t_avg - prev_t_avg) / prev_t_avg * 100) if prev_t_avg > 0 else 0
-                    if abs(t_pct - pct_change) < 10:
-                        reason = f"Consistent demand increase across {common_treatment}"
-                        confidence = "high"
-            elif pct_change < -20:
-                common_treatment = max(current_treatments.keys(), key=lambda k: len(current_treatments[k]))
-                if common_treatment in prev_treatments:
-                    curr_t_avg = sum(current_treatments[common_treatment]) / len(current_treatments[common_treatment])
-                    prev_t_avg = sum(prev_treatments[common_treatment]) / len(prev_treatments[common_treatment])
-                    t_pct = ((curr_t_avg - prev_t_avg) / prev_t_avg * 100) if prev_t_avg > 0 else 0
-                    if abs(t_pct - pct_change) < 10:
-                        reason = f"Price correction on {common_treatment}"
-                        confidence = "high"
-
-            top_movers.append(
-                {
-                    "card_id": card.id,
-                    "name": card.name,
-                    "current_price": current_avg,
-                    "prev_price": prev_avg,
-                    "pct_change": pct_change,
-                    "volume": len(current_sales),
-                    "prev_volume": len(prev_card_sales),
-                    "treatments": treatment_summary,
-                    "reason": reason,
-                    "confidence": confidence,
-                }
-            )
+            mover = _build_mover(card)
+            if mover:
+                top_movers.append(mover)
 
         # Sort by absolute change, get top 5 gainers and losers
         top_movers.sort(key=lambda x: x["pct_change"], reverse=True)
@@ -444,81 +521,38 @@ def calculate_market_stats(
         losers = list(reversed(top_movers[-5:])) if len(top_movers) >= 5 else []
 
         # Top volume
-        card_volumes = {}
-        for s in sales:
-            if s.card_id not in card_volumes:
-                card_volumes[s.card_id] = {"count": 0, "total": 0}
-            card_volumes[s.card_id]["count"] += 1
-            card_volumes[s.card_id]["total"] += s.price
-
-        top_volume = []
-        for card_id, data in sorted(card_volumes.items(), key=lambda x: x[1]["count"], reverse=True)[:5]:
-            card = session.get(Card, card_id)
-            if card:
-                top_volume.append(
-                    {
-                        "card_id": card_id,
-                        "name": card.name,
-                        "sales_count": data["count"],
-                        "total_volume": data["total"],
-                        "avg_price": data["total"] / data["count"],
-                    }
-                )
-
-        # New all-time highs
-        new_highs = []
-        for card in cards:
-            current_sales = [s for s in sales if s.card_id == card.id]
-            if not current_sales:
-                continue
-
-            max_current = max(s.price for s in current_sales)
-
-            # Check historical max - use COALESCE for NULL sold_date
-            hist_max = session.exec(
-                select(func.max(MarketPrice.price))
-                .where(MarketPrice.card_id == card.id)
-                .where(MarketPrice.listing_type == "sold")
-                .where(func.coalesce(MarketPrice.sold_date, MarketPrice.scraped_at) < start_time)
-            ).first()
-
-            if hist_max is None or max_current > hist_max:
-                new_highs.append(
-                    {"card_id": card.id, "name": card.name, "price": max_current, "prev_high": hist_max or 0}
-                )
-
+        top_volume = [
+            {
+                "card_id": card.card_id,
+                "name": card.name,
+                "sales_count": card.count,
+                "total_volume": card.volume,
+                "avg_price": card.volume / card.count,
+            }
+            for card in sorted(active_cards, key=lambda c: c.count, reverse=True)[:5]
+        ]
+
+        # New all-time highs / lows vs. everything before the current period
+        new_highs = [
+            {"card_id": card.card_id, "name": card.name, "price": card.max_price, "prev_high": card.hist_max or 0}
+            for card in active_cards
+            if card.hist_max is None or (card.max_price or 0) > card.hist_max
+        ]
         new_highs.sort(key=lambda x: x["price"], reverse=True)
         new_highs = new_highs[:5]
 
-        # New lows (similar logic)
-        new_lows = []
-        for card in cards:
-            current_sales = [s for s in sales if s.card_id == card.id]
-            if not current_sales:
-                continue
-
-            min_current = min(s.price for s in current_sales)
-
-            # Use COALESCE for NULL sold_date
-            hist_min = session.exec(
-                select(func.min(MarketPrice.price))
-                .where(MarketPrice.card_id == card.id)
-                .where(MarketPrice.listing_type == "sold")
-                .where(func.coalesce(MarketPrice.sold_date, MarketPrice.scraped_at) < start_time)
-            ).first()
-
-            if hist_min is None or min_current < hist_min:
-                new_lows.append(
-                    {"card_id": card.id, "name": card.name, "price": min_current, "prev_low": hist_min or 0}
-                )
-
+        new_lows = [
+            {"card_id": card.card_id, "name": card.name, "price": card.min_price, "prev_low": card.hist_min or 0}
+            for card in active_cards
+            if card.hist_min is None or (card.min_price or 0) < card.hist_min
+        ]
         new_lows.sort(key=lambda x: x["price"])
         new_lows = new_lows[:5]
 
         # Generate actionable insights
         insights = _generate_insights(
             session=session,
-            sales=sales,
+            total_volume=total_volume_usd,
             top_movers=gainers + losers,
             top_volume=top_volume,
             new_highs=new_highs,
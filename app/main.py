@@ -23,6 +23,7 @@ from app.api import (
     webhooks,
     watchlist,
     blog,
+    export,
 )
 from app.api.billing import BILLING_AVAILABLE
 from app.middleware.metering import APIMeteringMiddleware, METERING_AVAILABLE
@@ -99,16 +100,36 @@ async def lifespan(app: FastAPI):
 
         memory_task = asyncio.create_task(log_memory())
 
+    price_store_task = None
+    if settings.PRICE_STORE_ENABLED:
+        from app.services.price_store import price_store, start_price_store
+
+        async def maintain_price_store():
+            # Load in the background; pricing services query the database until it's ready
+            try:
+                await asyncio.to_thread(start_price_store)
+            except Exception as e:
+                logger.warning(f"Price store load failed: {e}")
+            while True:
+                await asyncio.sleep(max(5, settings.PRICE_STORE_POLL_SECONDS))
+                try:
+                    await asyncio.to_thread(price_store.refresh)
+                except Exception as e:
+                    logger.warning(f"Price store refresh failed: {e}")
+
+        price_store_task = asyncio.create_task(maintain_price_store())
+
     try:
         yield
     finally:
         # Graceful shutdown
         logger.info("Shutting down gracefully...")
 
-        if memory_task:
-            memory_task.cancel()
-            with suppress(asyncio.CancelledError):
-                await memory_task
+        for task in (memory_task, price_store_task):
+            if task:
+                task.cancel()
+                with suppress(asyncio.CancelledError):
+                    await task
 
         # Stop scheduler first to prevent new jobs
         if settings.RUN_SCHEDULER:
@@ -194,6 +215,7 @@ app.include_router(billing.router, prefix=settings.API_V1_STR, tags=["billing"])
 app.include_router(webhooks.router, prefix=settings.API_V1_STR, tags=["webhooks"])
 app.include_router(watchlist.router, prefix=f"{settings.API_V1_STR}/watchlist", tags=["watchlist"])
 app.include_router(blog.router, prefix=f"{settings.API_V1_STR}/blog", tags=["blog"])
+app.include_router(export.router, prefix=f"{settings.API_V1_STR}/export", tags=["export"])
 
 
 @app.get("/")
@@ -356,12 +378,14 @@ def health_metrics():
     - Success/failure counts
     - DB error counts
     - Success rates
+    - Cache recompute latency, stale serves and coalesced waiters per namespace
     """
-    from app.core.metrics import scraper_metrics
+    from app.core.metrics import cache_metrics, scraper_metrics
 
     return {
         "summary": scraper_metrics.get_summary(),
         "jobs": scraper_metrics.get_all_metrics(),
+        "caches": cache_metrics.get_all_metrics(),
     }
 
 
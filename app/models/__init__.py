@@ -1,10 +1,11 @@
 from .card import Card, Rarity
-from .market import MarketSnapshot, MarketPrice, FMPSnapshot
+from .market import MarketSnapshot, MarketPrice, FMPSnapshot, CardTreatmentStats
 from .user import User
 from .portfolio import PortfolioItem, PortfolioCard, PurchaseSource
 from .analytics import PageView
 from .meta_vote import CardMetaVote, CardMetaVoteReaction
 from .scrape_task import ScrapeTask, TaskStatus
+from .email_outbox import EmailOutbox, EmailStatus
 
 __all__ = [
     "Card",
@@ -12,6 +13,7 @@ __all__ = [
     "MarketSnapshot",
     "MarketPrice",
     "FMPSnapshot",
+    "CardTreatmentStats",
     "User",
     "PortfolioItem",
     "PortfolioCard",
@@ -21,4 +23,6 @@ __all__ = [
     "CardMetaVoteReaction",
     "ScrapeTask",
     "TaskStatus",
+    "EmailOutbox",
+    "EmailStatus",
 ]
@@ -1,4 +1,5 @@
 from typing import Optional
+from sqlalchemy import DDL, Index, event
 from sqlmodel import Field, SQLModel
 from datetime import datetime
 import re
@@ -19,6 +20,14 @@ def generate_slug(name: str) -> str:
     return slug
 
 
+# Trigram GIN indexes (card name, listing title) need pg_trgm; see app.services.search
+event.listen(
+    SQLModel.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+
 class Rarity(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str = Field(index=True, unique=True)
@@ -47,3 +56,13 @@ class Card(SQLModel, table=True):
 
     # Meta tracking (tournament competitiveness)
     is_meta: bool = Field(default=False, index=True)  # Currently played in competitive decks
+
+    __table_args__ = (
+        # Substring/fuzzy name search (PostgreSQL only; SQLite tests scan)
+        Index(
+            "ix_card_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
@@ -0,0 +1,74 @@
+"""
+Email Outbox Model
+
+Marketing and alert emails are queued here and delivered in batches by the
+outbox worker (app.services.email_outbox), so scheduler jobs only insert rows
+instead of making one provider call per user.
+
+Usage:
+    from app.models.email_outbox import EmailOutbox, EmailStatus
+
+    session.add(EmailOutbox(kind="price_alert", to_email=email, user_name=name, payload=alert_data))
+"""
+
+from datetime import datetime
+from enum import Enum
+from typing import Any, Optional
+
+from sqlalchemy import Index
+from sqlmodel import JSON, Column, Field, SQLModel
+
+from app.core.typing import utc_now
+
+
+class EmailStatus(str, Enum):
+    """Delivery status of an outbox email."""
+
+    PENDING = "pending"
+    SENDING = "sending"
+    SENT = "sent"
+    FAILED = "failed"
+
+
+class EmailOutbox(SQLModel, table=True):
+    """
+    One queued email.
+
+    Attributes:
+        kind: Template name ("daily_digest", "weekly_report", "price_alert", "portfolio_summary")
+        to_email / user_name: Recipient
+        payload: Template data, rendered at delivery time
+        dedupe_key: Optional unique key so re-running a job doesn't queue twice
+        status: PENDING until sent; SENDING while a worker holds it
+        attempts: Provider requests made for this email
+        next_attempt_at: When a PENDING email is due, or a SENDING claim expires
+        last_error: Most recent provider error
+        provider_id: Provider message id once sent
+        idempotency_key: Idempotency-Key of the request carrying this email, set
+            before sending so a retry repeats the same request under the same key
+    """
+
+    __tablename__ = "email_outbox"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    kind: str = Field(index=True)
+    to_email: str
+    user_name: str
+    payload: Optional[dict[str, Any]] = Field(default=None, sa_column=Column(JSON))
+    dedupe_key: Optional[str] = Field(default=None, unique=True)
+
+    status: EmailStatus = Field(default=EmailStatus.PENDING)
+    attempts: int = Field(default=0)
+    next_attempt_at: datetime = Field(default_factory=utc_now)
+    last_error: Optional[str] = None
+    provider_id: Optional[str] = None
+    idempotency_key: Optional[str] = None
+
+    created_at: datetime = Field(default_factory=utc_now)
+    sent_at: Optional[datetime] = None
+
+    # Worker claim query: due emails by status
+    __table_args__ = (Index("ix_email_outbox_due", "status", "next_attempt_at"),)
+
+
+__all__ = ["EmailOutbox", "EmailStatus"]
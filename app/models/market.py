@@ -1,6 +1,6 @@
 from typing import Optional, List, Dict, Any
 from sqlmodel import Field, SQLModel
-from sqlalchemy import Index, Column
+from sqlalchemy import Index, Column, text
 from sqlalchemy.types import JSON
 from datetime import datetime, timezone
 
@@ -96,10 +96,29 @@ class MarketPrice(SQLModel, table=True):
         Index("ix_marketprice_card_treatment", "card_id", "treatment"),
         # For listing type + sold_date range scans
         Index("ix_marketprice_listing_sold", "listing_type", "sold_date"),
-        # For listings page default sort (listing_type + scraped_at DESC)
-        Index("ix_marketprice_listing_scraped", "listing_type", "scraped_at"),
+        # For listings page default sort (listing_type + scraped_at DESC), with id for keyset pagination
+        Index("ix_marketprice_listing_scraped_keyset", "listing_type", "scraped_at", "id"),
         # For platform filter on listings page
         Index("ix_marketprice_platform", "platform"),
+        # Keyset pagination: (sort key, id) per listings sort, see app.core.pagination
+        Index("ix_marketprice_listing_listed_keyset", "listing_type", text("COALESCE(listed_at, scraped_at)"), "id"),
+        Index("ix_marketprice_listing_sold_keyset", "listing_type", text("COALESCE(sold_date, scraped_at)"), "id"),
+        Index("ix_marketprice_listing_price_keyset", "listing_type", "price", "id"),
+        # Keyset pagination for /cards/{id}/history
+        Index(
+            "ix_marketprice_card_sold_keyset",
+            "card_id",
+            "listing_type",
+            text("COALESCE(sold_date, scraped_at)"),
+            "id",
+        ),
+        # Listing title search (trigram GIN, PostgreSQL only; see app.services.search)
+        Index(
+            "ix_marketprice_title_trgm",
+            "title",
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
     )
 
 
@@ -173,3 +192,29 @@ class FMPSnapshot(SQLModel, table=True):
         # Per-treatment history
         Index("ix_fmpsnapshot_card_treatment_date", "card_id", "treatment", "snapshot_date"),
     )
+
+
+class CardTreatmentStats(SQLModel, table=True):
+    """
+    Per card/treatment sales summary, rebuilt from marketprice by a scheduled job.
+
+    Lets pricing fallbacks look up which treatments a card sells in, and the
+    observed price ratio between treatments, without scanning marketprice
+    (see app.services.market_patterns.refresh_card_treatment_stats).
+    """
+
+    __tablename__ = "card_treatment_stats"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    card_id: int = Field(foreign_key="card.id", index=True)
+    treatment: str = Field(index=True)
+
+    sales_count: int = Field(default=0)  # Sales in the lookback window
+    floor_price: float  # Avg of the lowest 4 sales
+    # floor_price / the card's base treatment floor (null without enough base treatment sales)
+    multiplier: Optional[float] = Field(default=None)
+
+    lookback_days: int = Field(default=90)
+    updated_at: datetime = Field(default_factory=utc_now)
+
+    __table_args__ = (Index("ix_card_treatment_stats_card_treatment", "card_id", "treatment", unique=True),)
@@ -135,6 +135,34 @@ class CardWithMarket(CardOut):
     market_snapshot: Optional[MarketSnapshotOut] = None
 
 
+class SaleExportOut(BaseModel):
+    """One sale in /export/sales (NDJSON object or CSV row, same fields)"""
+
+    id: int
+    card_id: int
+    card_name: str
+    card_slug: Optional[str] = None
+    set_name: Optional[str] = None
+    product_type: Optional[str] = None
+    platform: str
+    price: float
+    sold_date: datetime  # COALESCE(sold_date, scraped_at), as in /cards/{id}/history ordering
+    treatment: Optional[str] = None
+    product_subtype: Optional[str] = None
+    quantity: int = 1
+    is_bulk_lot: bool = False
+    condition: Optional[str] = None
+    grading: Optional[str] = None
+    listing_format: Optional[str] = None
+    bid_count: Optional[int] = 0
+    shipping_cost: Optional[float] = None
+    seller_name: Optional[str] = None
+    title: str
+    url: Optional[str] = None
+    scraped_at: datetime
+    cursor: str  # Pass as ?cursor= to resume the export after this row
+
+
 # User Schemas
 class UserBase(BaseModel):
     email: str
@@ -4,7 +4,8 @@ from app.db import engine
 from app.scraper.browser import get_page_content
 from app.scraper.utils import build_ebay_url
 from app.scraper.ebay import parse_active_results, parse_total_results
-from app.discord_bot.logger import log_new_listing, check_and_log_deal
+from app.discord_bot.logger import log_new_listing, check_and_log_deals
+from app.core.cache_invalidation import publish_card_updates
 from typing import Tuple, Optional
 
 
@@ -103,6 +104,7 @@ async def scrape_active_data(
                     # Track external_ids we've seen in THIS batch to avoid duplicates within same scrape
                     seen_in_batch = set()
                     duplicate_in_batch = 0
+                    new_items = []
 
                     for item in items:
                         # Skip if this listing already belongs to a DIFFERENT card
@@ -143,34 +145,7 @@ async def scrape_active_data(
                                 session.add(item)
                                 session.flush()  # Force immediate insert to catch constraint violations
                                 new_count += 1
-
-                                # Send webhook notification for NEW listings only
-                                try:
-                                    is_auction = getattr(item, "bid_count", 0) > 0
-                                    treatment = getattr(item, "treatment", None)
-
-                                    # Check for hot deals first (uses smart volatility-based thresholds)
-                                    deal_logged = check_and_log_deal(
-                                        card_id=card_id,
-                                        card_name=card_name,
-                                        price=item.price,
-                                        treatment=treatment,
-                                        url=item.url,
-                                        min_quality="good",  # Only log "good" or "hot" deals
-                                    )
-
-                                    # If not a deal, log as regular listing
-                                    if not deal_logged:
-                                        log_new_listing(
-                                            card_name=card_name,
-                                            price=item.price,
-                                            treatment=treatment,
-                                            url=item.url,
-                                            is_auction=is_auction,
-                                            floor_price=lowest_ask if lowest_ask > 0 else None,
-                                        )
-                                except Exception as webhook_err:
-                                    print(f"Discord webhook failed for {card_name}: {webhook_err}")
+                                new_items.append(item)
                             except Exception as insert_err:
                                 session.rollback()
                                 if "unique" in str(insert_err).lower() or "duplicate" in str(insert_err).lower():
@@ -178,12 +153,47 @@ async def scrape_active_data(
                                 else:
                                     raise  # Re-raise non-duplicate errors
 
+                    # Send webhook notifications for NEW listings only, checking the page for deals at once
+                    if new_items:
+                        try:
+                            # Hot deals first (uses smart volatility-based thresholds)
+                            deals_logged = check_and_log_deals(
+                                card_name=card_name,
+                                listings=[
+                                    {
+                                        "card_id": card_id,
+                                        "price": item.price,
+                                        "treatment": getattr(item, "treatment", None),
+                                        "url": item.url,
+                                    }
+                                    for item in new_items
+                                ],
+                                min_quality="good",  # Only log "good" or "hot" deals
+                            )
+
+                            # Listings that aren't deals are logged as regular listings
+                            for item, deal_logged in zip(new_items, deals_logged):
+                                if not deal_logged:
+                                    log_new_listing(
+                                        card_name=card_name,
+                                        price=item.price,
+                                        treatment=getattr(item, "treatment", None),
+                                        url=item.url,
+                                        is_auction=getattr(item, "bid_count", 0) > 0,
+                                        floor_price=lowest_ask if lowest_ask > 0 else None,
+                                    )
+                        except Exception as webhook_err:
+                            print(f"Discord webhook failed for {card_name}: {webhook_err}")
+
                     session.commit()
                     skip_msg = f", {skipped_count} duplicates skipped" if skipped_count > 0 else ""
                     batch_msg = f", {duplicate_in_batch} batch duplicates" if duplicate_in_batch > 0 else ""
                     print(
                         f"Active listings for {card_name}: {new_count} new, {updated_count} updated, {deleted_count} stale removed{skip_msg}{batch_msg}"
                     )
+                # Asks are current data, so every window that includes "now" is affected
+                if new_count or updated_count or deleted_count:
+                    publish_card_updates([card_id], source="ebay_active")
             except Exception as db_err:
                 print(f"DB save error for {card_name} active listings (stats still valid): {db_err}")
 
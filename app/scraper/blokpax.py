@@ -27,6 +27,7 @@ import random
 
 from sqlmodel import Session, select
 
+from app.core.cache_invalidation import publish_card_updates
 from app.core.config import settings
 
 
@@ -1114,6 +1115,10 @@ async def scrape_preslab_sales(session: Session, max_pages: int = 10, save_to_db
             if not items:
                 break
 
+            # Cards and sale dates written on this page, for cache invalidation after commit
+            page_card_ids = set()
+            page_sold_dates: List[Optional[datetime]] = []
+
             for item in items:
                 listing = item.get("listing", {})
 
@@ -1178,10 +1183,16 @@ async def scrape_preslab_sales(session: Session, max_pages: int = 10, save_to_db
 
                 session.add(mp)
                 sales_saved += 1
+                page_card_ids.add(card_match["id"])
+                page_sold_dates.append(filled_at)
 
             # Commit after each page
             if save_to_db:
                 session.commit()
+                if page_card_ids:
+                    # Undated sales could fall in any window
+                    since = None if None in page_sold_dates else min(page_sold_dates)
+                    publish_card_updates(page_card_ids, since=since, source="blokpax_sales")
 
             # Rate limiting
             await asyncio.sleep(settings.BLOKPAX_ACTIVITY_DELAY)
@@ -1222,6 +1233,7 @@ async def scrape_preslab_listings(session: Session, save_to_db: bool = True) ->
     listings_processed = 0
     listings_matched = 0
     listings_saved = 0
+    touched_card_ids = set()
 
     print("[Blokpax] Scraping preslab listings...")
 
@@ -1276,6 +1288,7 @@ async def scrape_preslab_listings(session: Session, save_to_db: bool = True) ->
                         existing.price = round(listing.price_usd, 2)
                         existing.scraped_at = datetime.now(timezone.utc)
                         session.add(existing)
+                        touched_card_ids.add(existing.card_id)
                     continue
 
                 # Extract traits
@@ -1301,6 +1314,7 @@ async def scrape_preslab_listings(session: Session, save_to_db: bool = True) ->
 
                 session.add(mp)
                 listings_saved += 1
+                touched_card_ids.add(card_match["id"])
 
                 await asyncio.sleep(settings.BLOKPAX_ASSET_DELAY)
 
@@ -1315,6 +1329,7 @@ async def scrape_preslab_listings(session: Session, save_to_db: bool = True) ->
 
     if save_to_db:
         session.commit()
+        publish_card_updates(touched_card_ids, source="blokpax_listings")
 
     print(
         f"[Blokpax] Preslab listings: {listings_processed} processed, "
@@ -12,6 +12,7 @@ from bs4 import BeautifulSoup
 import re
 import os
 from app.services.crypto import get_eth_price
+from app.core.cache_invalidation import publish_card_updates
 
 # OpenSea API Configuration
 OPENSEA_API_KEY = os.environ.get("OPENSEA_API_KEY", "")
@@ -918,6 +919,8 @@ async def scrape_opensea_listings_to_db(
 
     if save_to_db:
         session.commit()
+        if listings_saved:
+            publish_card_updates([card_id], source="opensea")
 
     print(f"[OpenSea] {card_name}: {listings_scraped} scraped, {listings_saved} saved")
     return listings_scraped, listings_saved
@@ -0,0 +1,294 @@
+"""
+AR pricing model feature store.
+
+scripts/train_ar_pricing_model.py trains on every card sale in its window and
+predicts each sale from the ones before it. This module keeps that sale
+history in a local columnar cache and computes the per-series features with
+vectorized array operations instead of per-group Python callbacks.
+
+Sale history cache (SaleHistoryCache):
+- One .npz file of columns: sale id, card, card metadata, variant, price and
+  sale time (microseconds since the epoch).
+- load() reuses the file and only re-reads sales that changed since the
+  PriceWatermark stored with it (new ids, and sales re-scraped since, which
+  covers active listings the scraper converts to sales in place), upserting
+  them by sale id. Rows are then pruned to the requested window, so the file
+  stays bounded by the window rather than growing with the whole history.
+- Deletes, price corrections and rows that stop matching (listing type or
+  bulk flag changed) are only picked up by a full re-read: when the last one
+  is older than max_age, when asking for a longer window than the file
+  covers, or with refresh=True.
+
+Grouped kernels work on rows sorted by group then time, with a group id per
+row:
+    group_lag(values, groups, 1)                             # shift(1)
+    group_rolling(values, groups, 5, 1, "mean")              # shift(1).rolling(5, min_periods=1).mean()
+    group_lowest_mean(values, groups, 4)                     # avg of the 4 lowest per group
+"""
+
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+from sqlalchemy import DateTime, bindparam, text
+from sqlmodel import Session
+
+from app.services.price_watermark import PriceWatermark
+
+logger = logging.getLogger(__name__)
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_FETCH_SIZE = 10_000
+
+# Cached columns: name -> dtype (strings are stored with None as "")
+SALE_COLUMNS = {
+    "sale_id": np.int64,
+    "card_id": np.int64,
+    "card_name": str,
+    "card_number": str,
+    "rarity": str,
+    "treatment": str,
+    "price": np.float64,
+    "sale_time": np.int64,
+    "platform": str,
+}
+
+
+def _micros(d: datetime) -> int:
+    """Microseconds since the epoch; naive datetimes from the database are UTC."""
+    if d.tzinfo is None:
+        d = d.replace(tzinfo=timezone.utc)
+    return (d - _EPOCH) // timedelta(microseconds=1)
+
+
+class SaleHistoryCache:
+    """Card sales for AR model training, cached in a local .npz file."""
+
+    def __init__(self, path: Union[str, Path], max_age: timedelta = timedelta(days=7)):
+        self.path = Path(path)
+        self.max_age = max_age
+
+    def load(self, session: Session, since: datetime, refresh: bool = False) -> dict[str, np.ndarray]:
+        """
+        Sales at or after since, sorted by sale time.
+
+        Returns:
+            Column name -> array (see SALE_COLUMNS); string columns are object
+            arrays with None for missing values
+        """
+        since_us = _micros(since)
+        now_us = _micros(datetime.now(timezone.utc))
+        cached = None if refresh else self._read()
+        # Taken before reading, so rows written during the read are re-read next time
+        watermark = PriceWatermark.current(session.connection())
+
+        if (
+            cached is not None
+            and int(cached["since"]) <= since_us
+            and now_us - int(cached["full_read_at"]) < self.max_age // timedelta(microseconds=1)
+        ):
+            scraped_us = int(cached["watermark"])
+            previous = PriceWatermark(
+                int(cached["last_id"]), _EPOCH + timedelta(microseconds=scraped_us) if scraped_us >= 0 else None
+            )
+            changed_since = previous.scraped_since() or _EPOCH  # No sales at the mark: every sale is new
+            new = self._fetch(session, since, after_id=previous.last_id, changed_since=changed_since)
+            kept = ~np.isin(cached["sale_id"], new["sale_id"])
+            columns = {name: np.concatenate([cached[name][kept], new[name]]) for name in SALE_COLUMNS}
+            watermark = previous.advance(watermark)
+            full_read_at = int(cached["full_read_at"])
+            logger.info(f"  Sale cache: {int(kept.sum()):,} cached + {len(new['sale_id']):,} new or changed sales")
+        else:
+            columns = self._fetch(session, since)
+            full_read_at = now_us
+            logger.info(f"  Sale cache: read {len(columns['sale_id']):,} sales")
+
+        keep = columns["sale_time"] >= since_us
+        order = np.lexsort((columns["sale_id"][keep], columns["sale_time"][keep]))
+        columns = {name: values[keep][order] for name, values in columns.items()}
+        self._write(columns, since_us, watermark, full_read_at)
+
+        return {
+            name: np.where(values == "", None, values.astype(object)) if SALE_COLUMNS[name] is str else values
+            for name, values in columns.items()
+        }
+
+    def _read(self) -> Optional[dict[str, np.ndarray]]:
+        if not self.path.exists():
+            return None
+        try:
+            with np.load(self.path) as data:
+                return {name: data[name] for name in (*SALE_COLUMNS, "since", "last_id", "watermark", "full_read_at")}
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning(f"[SaleHistoryCache] Ignoring unreadable cache {self.path}: {e}")
+            return None
+
+    def _write(
+        self, columns: dict[str, np.ndarray], since_us: int, watermark: PriceWatermark, full_read_at: int
+    ) -> None:
+        scraped_at = watermark.sold_scraped_at
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez_compressed(
+                f,
+                since=np.array(since_us, dtype=np.int64),
+                last_id=np.array(watermark.last_id, dtype=np.int64),
+                watermark=np.array(_micros(scraped_at) if scraped_at is not None else -1, dtype=np.int64),
+                full_read_at=np.array(full_read_at, dtype=np.int64),
+                **columns,
+            )
+        os.replace(tmp, self.path)
+
+    @staticmethod
+    def _fetch(
+        session: Session,
+        since: datetime,
+        after_id: int = 0,
+        changed_since: Optional[datetime] = None,
+    ) -> dict[str, np.ndarray]:
+        """
+        Card sales (no bulk lots, $0.50-$2000, numbered cards) at or after since
+        with id > after_id or scraped_at >= changed_since.
+        """
+        query = (
+            text("""
+            SELECT
+                mp.id as sale_id,
+                mp.card_id,
+                c.name as card_name,
+                c.card_number,
+                r.name as rarity,
+                COALESCE(NULLIF(mp.product_subtype, ''), mp.treatment) as treatment,
+                mp.price,
+                COALESCE(mp.sold_date, mp.scraped_at) as sale_date,
+                mp.platform
+            FROM marketprice mp
+            JOIN card c ON c.id = mp.card_id
+            LEFT JOIN rarity r ON r.id = c.rarity_id
+            WHERE mp.listing_type = 'sold'
+              AND mp.is_bulk_lot = FALSE
+              AND COALESCE(mp.sold_date, mp.scraped_at) >= :since
+              AND (mp.id > :after_id OR mp.scraped_at >= :changed_since)
+              AND mp.price > 0.5
+              AND mp.price < 2000
+              AND c.card_number IS NOT NULL
+        """)
+            .bindparams(bindparam("since", type_=DateTime), bindparam("changed_since", type_=DateTime))
+            .columns(sale_date=DateTime)
+        )
+
+        rows: dict[str, list] = {name: [] for name in SALE_COLUMNS}
+        conn = session.connection().execution_options(stream_results=True, yield_per=_FETCH_SIZE)
+        params = {"since": since, "after_id": after_id, "changed_since": changed_since}
+        for row in conn.execute(query, params):
+            for name in SALE_COLUMNS:
+                if name == "sale_time":
+                    rows[name].append(_micros(row.sale_date))
+                elif SALE_COLUMNS[name] is str:
+                    value = getattr(row, name)
+                    rows[name].append("" if value is None else str(value))
+                else:
+                    rows[name].append(getattr(row, name))
+
+        columns = {
+            name: np.array(values, dtype=dtype) if values else np.array([], dtype=dtype)
+            for (name, values), dtype in zip(rows.items(), SALE_COLUMNS.values())
+        }
+        return columns
+
+
+def group_ids(*keys: np.ndarray) -> np.ndarray:
+    """Integer id per row for rows already sorted by keys (a new id wherever any key changes)."""
+    n = len(keys[0])
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    changed = np.zeros(n, dtype=bool)
+    changed[0] = True
+    for key in keys:
+        changed[1:] |= key[1:] != key[:-1]
+    return np.cumsum(changed) - 1
+
+
+def group_lag(values: np.ndarray, groups: np.ndarray, k: int) -> np.ndarray:
+    """values shifted k rows down within each group (NaN where the group has no earlier row)."""
+    values = np.asarray(values, dtype=float)
+    lagged = np.full(len(values), np.nan)
+    if 0 < k < len(values):
+        same = groups[k:] == groups[:-k]
+        lagged[k:][same] = values[:-k][same]
+    return lagged
+
+
+def group_position(groups: np.ndarray) -> np.ndarray:
+    """0-based position of each row within its group (cumcount)."""
+    n = len(groups)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    return np.arange(n) - np.repeat(starts, np.diff(np.r_[starts, n]))
+
+
+def group_rolling(
+    values: np.ndarray,
+    groups: np.ndarray,
+    window: int,
+    min_periods: int,
+    stat: str,
+) -> np.ndarray:
+    """
+    Rolling stat over the previous `window` rows of each group, excluding the row itself.
+
+    Equivalent to groupby(groups).shift(1).rolling(window, min_periods).<stat>()
+    for stat in "mean", "min", "max", "std" (ddof=1).
+    """
+    lags = np.column_stack([group_lag(values, groups, k) for k in range(1, window + 1)])
+    counts = np.count_nonzero(~np.isnan(lags), axis=1)
+    valid = counts >= max(min_periods, 2 if stat == "std" else 1)
+
+    out = np.full(len(values), np.nan)
+    if valid.any():
+        rows = lags[valid]
+        if stat == "mean":
+            out[valid] = np.nanmean(rows, axis=1)
+        elif stat == "min":
+            out[valid] = np.nanmin(rows, axis=1)
+        elif stat == "max":
+            out[valid] = np.nanmax(rows, axis=1)
+        elif stat == "std":
+            out[valid] = np.nanstd(rows, axis=1, ddof=1)
+        else:
+            raise ValueError(f"Unknown rolling stat: {stat}")
+    return out
+
+
+def group_lowest_mean(values: np.ndarray, groups: np.ndarray, n: int) -> np.ndarray:
+    """
+    Mean of the n lowest values per group, for groups 0..groups.max().
+
+    Rows need not be sorted; groups without rows get NaN.
+    """
+    values = np.asarray(values, dtype=float)
+    size = int(groups.max()) + 1 if len(groups) else 0
+    order = np.lexsort((values, groups))
+    sorted_groups = groups[order]
+    lowest = group_position(sorted_groups) < n
+
+    sums = np.bincount(sorted_groups[lowest], weights=values[order][lowest], minlength=size)
+    counts = np.bincount(sorted_groups[lowest], minlength=size)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+
+__all__ = [
+    "SALE_COLUMNS",
+    "SaleHistoryCache",
+    "group_ids",
+    "group_lag",
+    "group_position",
+    "group_rolling",
+    "group_lowest_mean",
+]
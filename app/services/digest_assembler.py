@@ -0,0 +1,161 @@
+"""
+Digest Assembler
+
+Queues the daily digest and weekly report for every subscriber with one query
+per page of users, instead of loading every EmailPreferences row and looking up
+each user with session.get(User):
+
+1. Per page of DIGEST_PAGE_SIZE subscribers (keyset on user id):
+   User ⋈ EmailPreferences on the digest's subscription flag (one query).
+2. iter_pages() yields each page's UserDigests, so queue_digests() streams
+   them into the email outbox and commits page by page.
+
+Every subscriber gets the same market data payload; digest work for 10k
+subscribers is ten subscriber queries plus the outbox inserts.
+
+Example:
+    queued = queue_digests("daily_digest", market_data, period=digest_period("daily_digest", now))
+    stats = await deliver_outbox()
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Iterator, Optional
+
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+
+from app.core.typing import col
+from app.db import engine
+from app.models.email_outbox import EmailOutbox
+from app.models.user import User
+from app.models.watchlist import EmailPreferences
+from app.services.email_outbox import enqueue_emails
+
+logger = logging.getLogger(__name__)
+
+DIGEST_PAGE_SIZE = 1000
+
+# Subscription flag per digest kind
+DIGEST_PREFERENCES = {
+    "daily_digest": EmailPreferences.daily_digest,
+    "weekly_report": EmailPreferences.weekly_report,
+}
+
+
+@dataclass
+class UserDigest:
+    """One subscriber's digest recipient."""
+
+    user_id: int
+    email: str
+    user_name: str
+
+
+class DigestAssembler:
+    """
+    Set-based lookup of digest subscribers.
+
+    Example:
+        assembler = DigestAssembler(session, "weekly_report")
+        for page in assembler.iter_pages():
+            for digest in page:
+                digest.email, digest.user_name
+    """
+
+    def __init__(self, session: Session, kind: str, page_size: int = DIGEST_PAGE_SIZE):
+        if kind not in DIGEST_PREFERENCES:
+            raise ValueError(f"Unknown digest kind: {kind}")
+        self.session = session
+        self.kind = kind
+        self.page_size = page_size
+
+    def iter_pages(self) -> Iterator[list[UserDigest]]:
+        """Subscribers' digests, one page of users at a time in user id order."""
+        after = 0
+        while True:
+            subscribers = self._subscribers(after)
+            if not subscribers:
+                return
+            after = subscribers[-1][0]
+            yield [
+                UserDigest(user_id=user_id, email=email, user_name=username or email.split("@")[0])
+                for user_id, email, username in subscribers
+                if email
+            ]
+            if len(subscribers) < self.page_size:
+                return
+
+    def _subscribers(self, after: int) -> list[tuple[int, Optional[str], Optional[str]]]:
+        """(user id, email, username) for the next page of subscribers."""
+        return list(
+            self.session.exec(
+                select(User.id, User.email, User.username)
+                .join(EmailPreferences, col(EmailPreferences.user_id) == col(User.id))
+                .where(col(DIGEST_PREFERENCES[self.kind]).is_(True))
+                .where(col(User.id) > after)
+                .order_by(col(User.id))
+                .limit(self.page_size)
+            ).all()
+        )
+
+
+def digest_period(kind: str, now: datetime) -> str:
+    """
+    The period a digest sent at `now` belongs to, for its dedupe key.
+
+    Daily digests are per UTC date ("2026-01-05"), weekly reports per ISO week
+    ("2026-W02"), so a catch-up or manual re-run later in the week doesn't
+    queue a second report.
+    """
+    if kind == "weekly_report":
+        year, week, _ = now.isocalendar()
+        return f"{year}-W{week:02d}"
+    return now.date().isoformat()
+
+
+def queue_digests(
+    kind: str,
+    payload: dict[str, Any],
+    period: str,
+    bind: Optional[Engine] = None,
+    page_size: int = DIGEST_PAGE_SIZE,
+) -> int:
+    """
+    Queue a digest email of `kind` for every subscriber, committing page by page.
+
+    Dedupe keys are "{kind}:{period}:{user_id}", so re-running for the same
+    period doesn't queue twice.
+
+    Returns:
+        Number of emails queued
+    """
+    queued = 0
+    with Session(bind or engine) as session:
+        assembler = DigestAssembler(session, kind, page_size=page_size)
+        for page in assembler.iter_pages():
+            queued += enqueue_emails(
+                session,
+                (
+                    EmailOutbox(
+                        kind=kind,
+                        to_email=digest.email,
+                        user_name=digest.user_name,
+                        payload=payload,
+                        dedupe_key=f"{kind}:{period}:{digest.user_id}",
+                    )
+                    for digest in page
+                ),
+            )
+            session.commit()
+    return queued
+
+
+__all__ = [
+    "DIGEST_PAGE_SIZE",
+    "DigestAssembler",
+    "UserDigest",
+    "digest_period",
+    "queue_digests",
+]
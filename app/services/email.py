@@ -566,9 +566,9 @@ def send_api_key_approved_email(to_email: str, user_name: str, api_key: str) ->
 # ============== MARKETING / DIGEST EMAILS ==============
 
 
-def send_daily_market_digest(to_email: str, user_name: str, market_data: Dict[str, Any]) -> bool:
+def render_daily_market_digest(to_email: str, user_name: str, market_data: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Send daily market digest email with key market stats.
+    Resend params for the daily market digest email with key market stats.
 
     market_data should include:
     - total_sales: int
@@ -578,10 +578,6 @@ def send_daily_market_digest(to_email: str, user_name: str, market_data: Dict[st
     - hot_deals: List[Dict] with name, price, floor_price
     - market_sentiment: str ('bullish', 'bearish', 'neutral')
     """
-    if not settings.RESEND_API_KEY:
-        print("[Email] Skipping daily digest - RESEND_API_KEY not configured")
-        return False
-
     # Build gainers/losers rows
     gainers_html = ""
     for card in market_data.get("top_gainers", [])[:5]:
@@ -627,13 +623,11 @@ def send_daily_market_digest(to_email: str, user_name: str, market_data: Dict[st
     sentiment_color = "#4ade80" if sentiment == "bullish" else "#f87171" if sentiment == "bearish" else "#fbbf24"
     sentiment_icon = "📈" if sentiment == "bullish" else "📉" if sentiment == "bearish" else "➡️"
 
-    try:
-        _send_email(
-            {
-                "from": settings.FROM_EMAIL,
-                "to": [to_email],
-                "subject": f"Daily Market Digest - {market_data.get('total_sales', 0)} Sales Today",
-                "html": f"""
+    return {
+        "from": settings.FROM_EMAIL,
+        "to": [to_email],
+        "subject": f"Daily Market Digest - {market_data.get('total_sales', 0)} Sales Today",
+        "html": f"""
 <!DOCTYPE html>
 <html>
 <head>
@@ -729,9 +723,18 @@ def send_daily_market_digest(to_email: str, user_name: str, market_data: Dict[st
     </div>
 </body>
 </html>
-            """,
-            }
-        )
+        """,
+    }
+
+
+def send_daily_market_digest(to_email: str, user_name: str, market_data: Dict[str, Any]) -> bool:
+    """Send daily market digest email with key market stats (see render_daily_market_digest)."""
+    if not settings.RESEND_API_KEY:
+        print("[Email] Skipping daily digest - RESEND_API_KEY not configured")
+        return False
+
+    try:
+        _send_email(render_daily_market_digest(to_email, user_name, market_data))
         print(f"[Email] Daily digest sent to {to_email}")
         return True
     except Exception as e:
@@ -739,9 +742,9 @@ def send_daily_market_digest(to_email: str, user_name: str, market_data: Dict[st
         return False
 
 
-def send_weekly_market_report(to_email: str, user_name: str, report_data: Dict[str, Any]) -> bool:
+def render_weekly_market_report(to_email: str, user_name: str, report_data: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Send weekly market report email with comprehensive stats.
+    Resend params for the weekly market report email with comprehensive stats.
 
     report_data should include:
     - week_start: str (date)
@@ -755,10 +758,6 @@ def send_weekly_market_report(to_email: str, user_name: str, report_data: Dict[s
     - price_movers: List[Dict] with name, old_price, new_price, change_percent
     - market_health: Dict with unique_buyers, unique_sellers, liquidity_score
     """
-    if not settings.RESEND_API_KEY:
-        print("[Email] Skipping weekly report - RESEND_API_KEY not configured")
-        return False
-
     # Daily breakdown chart (ASCII bars in email)
     daily_html = ""
     max_sales = max([d.get("sales", 0) for d in report_data.get("daily_breakdown", [])] or [1])
@@ -805,13 +804,11 @@ def send_weekly_market_report(to_email: str, user_name: str, report_data: Dict[s
     vol_color = "#4ade80" if volume_change > 0 else "#f87171" if volume_change < 0 else "#a1a1aa"
     vol_arrow = "↑" if volume_change > 0 else "↓" if volume_change < 0 else ""
 
-    try:
-        _send_email(
-            {
-                "from": settings.FROM_EMAIL,
-                "to": [to_email],
-                "subject": f"Weekly Market Report - ${report_data.get('total_volume', 0):,.0f} Volume",
-                "html": f"""
+    return {
+        "from": settings.FROM_EMAIL,
+        "to": [to_email],
+        "subject": f"Weekly Market Report - ${report_data.get('total_volume', 0):,.0f} Volume",
+        "html": f"""
 <!DOCTYPE html>
 <html>
 <head>
@@ -914,9 +911,18 @@ def send_weekly_market_report(to_email: str, user_name: str, report_data: Dict[s
     </div>
 </body>
 </html>
-            """,
-            }
-        )
+        """,
+    }
+
+
+def send_weekly_market_report(to_email: str, user_name: str, report_data: Dict[str, Any]) -> bool:
+    """Send weekly market report email with comprehensive stats (see render_weekly_market_report)."""
+    if not settings.RESEND_API_KEY:
+        print("[Email] Skipping weekly report - RESEND_API_KEY not configured")
+        return False
+
+    try:
+        _send_email(render_weekly_market_report(to_email, user_name, report_data))
         print(f"[Email] Weekly report sent to {to_email}")
         return True
     except Exception as e:
@@ -924,9 +930,9 @@ def send_weekly_market_report(to_email: str, user_name: str, report_data: Dict[s
         return False
 
 
-def send_price_alert(to_email: str, user_name: str, alert_data: Dict[str, Any]) -> bool:
+def render_price_alert(to_email: str, user_name: str, alert_data: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Send price alert email when a watched card hits target price.
+    Resend params for the price alert email when a watched card hits target price.
 
     alert_data should include:
     - card_name: str
@@ -937,10 +943,6 @@ def send_price_alert(to_email: str, user_name: str, alert_data: Dict[str, Any])
     - treatment: str
     - listing_url: str (optional)
     """
-    if not settings.RESEND_API_KEY:
-        print("[Email] Skipping price alert - RESEND_API_KEY not configured")
-        return False
-
     alert_type = alert_data.get("alert_type", "any")
     if alert_type == "above":
         alert_message = f"has risen above your target of ${alert_data.get('target_price', 0):.2f}"
@@ -957,13 +959,11 @@ def send_price_alert(to_email: str, user_name: str, alert_data: Dict[str, Any])
 
     card_url = f"{settings.FRONTEND_URL}/cards/{alert_data.get('card_slug', '')}"
 
-    try:
-        _send_email(
-            {
-                "from": settings.FROM_EMAIL,
-                "to": [to_email],
-                "subject": f"🔔 Price Alert: {alert_data.get('card_name', 'Card')} - ${alert_data.get('current_price', 0):.2f}",
-                "html": f"""
+    return {
+        "from": settings.FROM_EMAIL,
+        "to": [to_email],
+        "subject": f"🔔 Price Alert: {alert_data.get('card_name', 'Card')} - ${alert_data.get('current_price', 0):.2f}",
+        "html": f"""
 <!DOCTYPE html>
 <html>
 <head>
@@ -1016,9 +1016,18 @@ def send_price_alert(to_email: str, user_name: str, alert_data: Dict[str, Any])
     </div>
 </body>
 </html>
-            """,
-            }
-        )
+        """,
+    }
+
+
+def send_price_alert(to_email: str, user_name: str, alert_data: Dict[str, Any]) -> bool:
+    """Send price alert email when a watched card hits target price (see render_price_alert)."""
+    if not settings.RESEND_API_KEY:
+        print("[Email] Skipping price alert - RESEND_API_KEY not configured")
+        return False
+
+    try:
+        _send_email(render_price_alert(to_email, user_name, alert_data))
         print(f"[Email] Price alert sent to {to_email}")
         return True
     except Exception as e:
@@ -1026,9 +1035,9 @@ def send_price_alert(to_email: str, user_name: str, alert_data: Dict[str, Any])
         return False
 
 
-def send_portfolio_summary(to_email: str, user_name: str, portfolio_data: Dict[str, Any]) -> bool:
+def render_portfolio_summary(to_email: str, user_name: str, portfolio_data: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Send portfolio summary email with P&L and holdings.
+    Resend params for the portfolio summary email with P&L and holdings.
 
     portfolio_data should include:
     - total_cards: int
@@ -1040,10 +1049,6 @@ def send_portfolio_summary(to_email: str, user_name: str, portfolio_data: Dict[s
     - worst_performers: List[Dict] with name, profit_loss, profit_loss_percent
     - recent_changes: List[Dict] with name, change_type, amount
     """
-    if not settings.RESEND_API_KEY:
-        print("[Email] Skipping portfolio summary - RESEND_API_KEY not configured")
-        return False
-
     pnl = portfolio_data.get("total_profit_loss", 0)
     pnl_percent = portfolio_data.get("total_profit_loss_percent", 0)
     pnl_color = "#4ade80" if pnl >= 0 else "#f87171"
@@ -1075,13 +1080,11 @@ def send_portfolio_summary(to_email: str, user_name: str, portfolio_data: Dict[s
         </tr>
         """
 
-    try:
-        _send_email(
-            {
-                "from": settings.FROM_EMAIL,
-                "to": [to_email],
-                "subject": f"Portfolio Update: {'📈' if pnl >= 0 else '📉'} {'+' if pnl >= 0 else ''}${pnl:.2f} ({'+' if pnl_percent >= 0 else ''}{pnl_percent:.1f}%)",
-                "html": f"""
+    return {
+        "from": settings.FROM_EMAIL,
+        "to": [to_email],
+        "subject": f"Portfolio Update: {'📈' if pnl >= 0 else '📉'} {'+' if pnl >= 0 else ''}${pnl:.2f} ({'+' if pnl_percent >= 0 else ''}{pnl_percent:.1f}%)",
+        "html": f"""
 <!DOCTYPE html>
 <html>
 <head>
@@ -1167,9 +1170,18 @@ def send_portfolio_summary(to_email: str, user_name: str, portfolio_data: Dict[s
     </div>
 </body>
 </html>
-            """,
-            }
-        )
+        """,
+    }
+
+
+def send_portfolio_summary(to_email: str, user_name: str, portfolio_data: Dict[str, Any]) -> bool:
+    """Send portfolio summary email with P&L and holdings (see render_portfolio_summary)."""
+    if not settings.RESEND_API_KEY:
+        print("[Email] Skipping portfolio summary - RESEND_API_KEY not configured")
+        return False
+
+    try:
+        _send_email(render_portfolio_summary(to_email, user_name, portfolio_data))
         print(f"[Email] Portfolio summary sent to {to_email}")
         return True
     except Exception as e:
@@ -0,0 +1,552 @@
+"""
+Email Outbox Service
+
+Marketing and alert emails (daily digest, weekly report, price alerts,
+portfolio summary) go through the email_outbox table instead of one blocking
+Resend call per user:
+
+1. Producers insert rows with enqueue_emails() - scheduler jobs and the price
+   alert engine, in the same transaction as the state they depend on.
+2. deliver_outbox() claims due rows, renders them in bulk with the templates
+   in app.services.email, and sends them through the Resend batch endpoint
+   (EMAIL_BATCH_SIZE per request) with EMAIL_SEND_CONCURRENCY requests in
+   flight, over async HTTP so the scheduler's event loop keeps running.
+
+Rate limits and retries:
+- Requests are spaced to EMAIL_RATE_LIMIT_PER_SECOND. A 429 pauses every sender
+  for the provider's Retry-After, then the batch is retried.
+- Network errors and 5xx responses reschedule the emails with exponential
+  backoff; after EMAIL_MAX_ATTEMPTS they are marked failed.
+- A rejected batch (4xx) is retried one email at a time so one bad address
+  doesn't fail the rest; emails rejected on their own are marked failed.
+
+Claims are leases: a claimed row's next_attempt_at moves CLAIM_LEASE ahead, and
+a worker that dies mid-send leaves rows that become due again when it expires.
+
+Every request carries an Idempotency-Key ("outbox-<id>" for one email, a hash
+of the outbox ids for a batch), stored on the rows before sending. A retry
+after a timeout, a 5xx or an expired lease resends the same batch under the
+same key, so the provider doesn't deliver emails it already accepted twice.
+Claiming any email of a retried batch claims the rest of it too; if some of
+it can't be claimed (held by another worker, already sent or failed), the
+claimed emails are resent one at a time under their own keys, since the
+batch key with a different body would be rejected.
+
+Example:
+    enqueue_emails(session, [EmailOutbox(kind="price_alert", to_email=..., user_name=..., payload=...)])
+    session.commit()
+    stats = await deliver_outbox()
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Iterable, Optional
+
+import httpx
+from sqlalchemy import and_, delete, func, or_, update
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.typing import col
+from app.db import engine
+from app.models.email_outbox import EmailOutbox, EmailStatus
+from app.services.email import (
+    render_daily_market_digest,
+    render_portfolio_summary,
+    render_price_alert,
+    render_weekly_market_report,
+)
+
+logger = logging.getLogger(__name__)
+
+# Template per outbox kind: (to_email, user_name, payload) -> Resend params
+RENDERERS: dict[str, Callable[[str, str, dict[str, Any]], dict[str, Any]]] = {
+    "daily_digest": render_daily_market_digest,
+    "weekly_report": render_weekly_market_report,
+    "price_alert": render_price_alert,
+    "portfolio_summary": render_portfolio_summary,
+}
+
+CLAIM_LEASE = timedelta(minutes=10)
+RETRY_BASE = timedelta(minutes=1)
+RETRY_MAX = timedelta(hours=1)
+RATE_LIMIT_RETRIES = 3  # In-process retries of a batch after 429s before rescheduling it
+DEFAULT_RETRY_AFTER = 1.0  # Seconds to pause after a 429 without a Retry-After header
+MAX_RETRY_AFTER = 60.0
+
+
+class ProviderError(Exception):
+    """A failed provider request. status is None for network errors."""
+
+    def __init__(self, message: str, status: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+    @property
+    def rate_limited(self) -> bool:
+        return self.status == 429
+
+    @property
+    def retryable(self) -> bool:
+        return self.status is None or self.status == 429 or self.status >= 500
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    """Seconds to wait from Retry-After (seconds or HTTP date) or ratelimit-reset."""
+    value = response.headers.get("retry-after") or response.headers.get("ratelimit-reset")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class ResendClient:
+    """Async client for the Resend email endpoints (single and batch)."""
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        timeout: float = 30.0,
+    ):
+        self._client = httpx.AsyncClient(
+            base_url=(base_url or settings.RESEND_API_URL).rstrip("/"),
+            headers={"Authorization": f"Bearer {api_key or settings.RESEND_API_KEY}"},
+            timeout=timeout,
+        )
+
+    async def send(self, email: dict[str, Any], idempotency_key: Optional[str] = None) -> str:
+        """Send one email. Returns the provider message id."""
+        data = await self._post("/emails", email, idempotency_key)
+        return str(data.get("id", ""))
+
+    async def send_batch(self, emails: list[dict[str, Any]], idempotency_key: Optional[str] = None) -> list[str]:
+        """Send up to 100 emails in one request. Returns provider ids in order."""
+        data = await self._post("/emails/batch", emails, idempotency_key)
+        items = data.get("data", []) if isinstance(data, dict) else data
+        return [str(item.get("id", "")) for item in items]
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def _post(self, path: str, body: Any, idempotency_key: Optional[str] = None) -> Any:
+        headers = {"Idempotency-Key": idempotency_key} if idempotency_key else None
+        try:
+            response = await self._client.post(path, json=body, headers=headers)
+        except httpx.HTTPError as e:
+            raise ProviderError(f"{type(e).__name__}: {e}") from e
+        if response.status_code >= 400:
+            raise ProviderError(
+                f"HTTP {response.status_code}: {response.text[:200]}",
+                status=response.status_code,
+                retry_after=_retry_after(response),
+            )
+        return response.json() if response.content else {}
+
+
+class RateLimiter:
+    """Spaces requests `rate` per second apart; pause() holds every caller back after a 429."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        self._next = max(self._next, time.monotonic() + seconds)
+
+
+@dataclass
+class DeliveryStats:
+    """Outcome counts of a delivery run."""
+
+    sent: int = 0
+    retried: int = 0
+    failed: int = 0
+
+
+@dataclass
+class _Claimed:
+    id: int
+    kind: str
+    to_email: str
+    user_name: str
+    payload: dict[str, Any]
+    attempts: int
+    idempotency_key: Optional[str] = None
+
+
+def _idempotency_key(ids: list[int]) -> str:
+    """Idempotency-Key for a request carrying these outbox ids."""
+    if len(ids) == 1:
+        return f"outbox-{ids[0]}"
+    digest = hashlib.sha256(",".join(str(i) for i in sorted(ids)).encode()).hexdigest()
+    return f"outbox-batch-{digest[:32]}"
+
+
+def enqueue_emails(session: Session, emails: Iterable[EmailOutbox]) -> int:
+    """
+    Add emails to the outbox, skipping dedupe_keys that are already queued or sent.
+
+    Doesn't commit, so producers can queue emails in the same transaction as
+    the state change they announce. Payloads are stored as JSON (values that
+    aren't JSON types are stored as strings).
+
+    Returns:
+        Number of emails added
+    """
+    emails = list(emails)
+    keys = {e.dedupe_key for e in emails if e.dedupe_key}
+    existing: set[str] = set()
+    if keys:
+        existing = set(session.exec(select(EmailOutbox.dedupe_key).where(col(EmailOutbox.dedupe_key).in_(keys))).all())
+
+    added = 0
+    for email in emails:
+        if email.dedupe_key:
+            if email.dedupe_key in existing:
+                continue
+            existing.add(email.dedupe_key)
+        if email.kind not in RENDERERS:
+            raise ValueError(f"Unknown email kind: {email.kind}")
+        email.payload = json.loads(json.dumps(email.payload or {}, default=str))
+        session.add(email)
+        added += 1
+    return added
+
+
+def purge_outbox(session: Session, days_to_keep: int = 30) -> int:
+    """Delete sent and failed emails older than days_to_keep. Returns rows deleted."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days_to_keep)
+    result = session.execute(
+        delete(EmailOutbox)
+        .where(col(EmailOutbox.status).in_([EmailStatus.SENT, EmailStatus.FAILED]))
+        .where(col(EmailOutbox.created_at) < cutoff)
+    )
+    session.commit()
+    return int(getattr(result, "rowcount", 0) or 0)
+
+
+class OutboxWorker:
+    """
+    Claims due outbox emails and delivers them in concurrent provider batches.
+
+    Example:
+        worker = OutboxWorker(ResendClient())
+        stats = await worker.run()
+    """
+
+    def __init__(
+        self,
+        client: ResendClient,
+        bind: Optional[Engine] = None,
+        batch_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        rate_per_second: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+    ):
+        self.client = client
+        self.bind = bind or engine
+        self.batch_size = max(1, min(100, batch_size or settings.EMAIL_BATCH_SIZE))
+        self.concurrency = max(1, concurrency or settings.EMAIL_SEND_CONCURRENCY)
+        self.max_attempts = max_attempts or settings.EMAIL_MAX_ATTEMPTS
+        self.limiter = RateLimiter(
+            rate_per_second if rate_per_second is not None else settings.EMAIL_RATE_LIMIT_PER_SECOND
+        )
+
+    async def run(self, max_rounds: Optional[int] = None) -> DeliveryStats:
+        """Deliver due emails until none are left (or max_rounds claims)."""
+        stats = DeliveryStats()
+        rounds = 0
+        while max_rounds is None or rounds < max_rounds:
+            claimed = await asyncio.to_thread(self._claim, self.batch_size * self.concurrency)
+            if not claimed:
+                break
+            rounds += 1
+
+            outcomes: dict[int, tuple[Optional[str], Optional[ProviderError]]] = {}
+            rendered: list[tuple[_Claimed, dict[str, Any]]] = []
+            for email in claimed:
+                try:
+                    rendered.append((email, RENDERERS[email.kind](email.to_email, email.user_name, email.payload)))
+                except Exception as e:
+                    outcomes[email.id] = (None, ProviderError(f"Render failed: {type(e).__name__}: {e}", status=400))
+
+            chunks, new_keys = self._chunks(rendered)
+            if new_keys:
+                await asyncio.to_thread(self._save_keys, new_keys)
+            keys = {email.id: key for key, chunk in chunks for email, _ in chunk}
+            semaphore = asyncio.Semaphore(self.concurrency)
+
+            async def send_chunk(key: str, chunk: list[tuple[_Claimed, dict[str, Any]]]) -> None:
+                async with semaphore:
+                    chunk_outcomes, fell_back = await self._send_chunk(key, chunk)
+                    outcomes.update(chunk_outcomes)
+                    if fell_back:
+                        keys.update((email.id, _idempotency_key([email.id])) for email, _ in chunk)
+
+            await asyncio.gather(*(send_chunk(key, chunk) for key, chunk in chunks))
+            round_stats = await asyncio.to_thread(self._record, claimed, outcomes, keys)
+            stats.sent += round_stats.sent
+            stats.retried += round_stats.retried
+            stats.failed += round_stats.failed
+        return stats
+
+    def _chunks(
+        self, rendered: list[tuple[_Claimed, dict[str, Any]]]
+    ) -> tuple[list[tuple[str, list[tuple[_Claimed, dict[str, Any]]]]], dict[int, str]]:
+        """
+        Requests to make as (Idempotency-Key, emails), plus the keys of new requests by outbox id.
+
+        Emails retried after an earlier attempt keep that attempt's request and key.
+        """
+        retried: dict[str, list[tuple[_Claimed, dict[str, Any]]]] = {}
+        fresh = []
+        for email, params in rendered:
+            if email.idempotency_key:
+                retried.setdefault(email.idempotency_key, []).append((email, params))
+            else:
+                fresh.append((email, params))
+
+        chunks = list(retried.items())
+        new_keys: dict[int, str] = {}
+        for i in range(0, len(fresh), self.batch_size):
+            chunk = fresh[i : i + self.batch_size]
+            key = _idempotency_key([email.id for email, _ in chunk])
+            chunks.append((key, chunk))
+            new_keys.update((email.id, key) for email, _ in chunk)
+        return chunks, new_keys
+
+    async def _send_chunk(
+        self, key: str, chunk: list[tuple[_Claimed, dict[str, Any]]]
+    ) -> tuple[dict[int, tuple[Optional[str], Optional[ProviderError]]], bool]:
+        """
+        Send one request; fall back to single sends if the provider rejects the batch.
+
+        Returns outcomes by outbox id, and whether the emails were sent one at a time.
+        """
+        if len(chunk) == 1:
+            email, params = chunk[0]
+            try:
+                return {email.id: (await self._request(self.client.send, params, key) or None, None)}, False
+            except ProviderError as e:
+                return {email.id: (None, e)}, False
+        try:
+            ids = await self._request(self.client.send_batch, [params for _, params in chunk], key)
+            return {email.id: (provider_id or None, None) for (email, _), provider_id in zip(chunk, ids)}, False
+        except ProviderError as e:
+            if e.retryable:
+                return {email.id: (None, e) for email, _ in chunk}, False
+
+        outcomes: dict[int, tuple[Optional[str], Optional[ProviderError]]] = {}
+        for email, params in chunk:
+            try:
+                provider_id = await self._request(self.client.send, params, _idempotency_key([email.id]))
+                outcomes[email.id] = (provider_id or None, None)
+            except ProviderError as e:
+                outcomes[email.id] = (None, e)
+        return outcomes, True
+
+    async def _request(self, send: Callable[[Any, str], Any], body: Any, idempotency_key: str) -> Any:
+        """One provider request, paced by the rate limiter and retried after 429s."""
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            await self.limiter.wait()
+            try:
+                return await send(body, idempotency_key)
+            except ProviderError as e:
+                if not e.rate_limited or attempt == RATE_LIMIT_RETRIES:
+                    raise
+                pause = min(MAX_RETRY_AFTER, e.retry_after if e.retry_after is not None else DEFAULT_RETRY_AFTER)
+                logger.info(f"[EmailOutbox] Rate limited, pausing sends for {pause:.1f}s")
+                self.limiter.pause(pause)
+
+    def _claim(self, limit: int) -> list[_Claimed]:
+        """
+        Lease up to limit due emails (pending, or sending with an expired lease).
+
+        Also leases the other emails of retried batches, so they go out as the
+        same request. Emails of a batch that can't be claimed whole get their
+        own per-email Idempotency-Key instead.
+        """
+        now = datetime.now(timezone.utc)
+        with Session(self.bind) as session:
+            rows = list(
+                session.exec(
+                    select(EmailOutbox)
+                    .where(col(EmailOutbox.status).in_([EmailStatus.PENDING, EmailStatus.SENDING]))
+                    .where(col(EmailOutbox.next_attempt_at) <= now)
+                    .order_by(col(EmailOutbox.next_attempt_at), col(EmailOutbox.id))
+                    .limit(limit)
+                    .with_for_update(skip_locked=True)
+                ).all()
+            )
+            partial: set[str] = set()
+            keys = {row.idempotency_key for row in rows if row.idempotency_key}
+            if keys:
+                rows += session.exec(
+                    select(EmailOutbox)
+                    .where(col(EmailOutbox.idempotency_key).in_(keys))
+                    .where(col(EmailOutbox.id).notin_([row.id for row in rows]))
+                    .where(
+                        or_(
+                            col(EmailOutbox.status) == EmailStatus.PENDING,
+                            and_(
+                                col(EmailOutbox.status) == EmailStatus.SENDING, col(EmailOutbox.next_attempt_at) <= now
+                            ),
+                        )
+                    )
+                    .with_for_update(skip_locked=True)
+                ).all()
+                sizes = dict(
+                    session.exec(
+                        select(EmailOutbox.idempotency_key, func.count())
+                        .where(col(EmailOutbox.idempotency_key).in_(keys))
+                        .group_by(col(EmailOutbox.idempotency_key))
+                    ).all()
+                )
+                counts = Counter(row.idempotency_key for row in rows if row.idempotency_key)
+                partial = {key for key, count in counts.items() if count < sizes.get(key, 0)}
+            claimed = [
+                _Claimed(
+                    row.id,
+                    row.kind,
+                    row.to_email,
+                    row.user_name,
+                    row.payload or {},
+                    row.attempts + 1,
+                    _idempotency_key([row.id]) if row.idempotency_key in partial else row.idempotency_key,
+                )
+                for row in rows
+                if row.id is not None
+            ]
+            if claimed:
+                session.execute(
+                    update(EmailOutbox),
+                    [
+                        {
+                            "id": email.id,
+                            "status": EmailStatus.SENDING,
+                            "attempts": email.attempts,
+                            "next_attempt_at": now + CLAIM_LEASE,
+                            "idempotency_key": email.idempotency_key,
+                        }
+                        for email in claimed
+                    ],
+                )
+            session.commit()
+        return claimed
+
+    def _save_keys(self, keys: dict[int, str]) -> None:
+        """Store Idempotency-Keys before sending, so a worker that dies mid-send is retried under them."""
+        with Session(self.bind) as session:
+            session.execute(
+                update(EmailOutbox), [{"id": email_id, "idempotency_key": key} for email_id, key in keys.items()]
+            )
+            session.commit()
+
+    def _record(
+        self,
+        claimed: list[_Claimed],
+        outcomes: dict[int, tuple[Optional[str], Optional[ProviderError]]],
+        keys: dict[int, str],
+    ) -> DeliveryStats:
+        now = datetime.now(timezone.utc)
+        stats = DeliveryStats()
+        params = []
+        for email in claimed:
+            provider_id, error = outcomes.get(email.id, (None, ProviderError("No response for email")))
+            if error is None:
+                stats.sent += 1
+                params.append(
+                    {
+                        "id": email.id,
+                        "status": EmailStatus.SENT,
+                        "provider_id": provider_id,
+                        "sent_at": now,
+                        "last_error": None,
+                    }
+                )
+            elif error.retryable and email.attempts < self.max_attempts:
+                stats.retried += 1
+                delay = min(RETRY_MAX, RETRY_BASE * 2 ** (email.attempts - 1))
+                if error.retry_after is not None:
+                    delay = max(delay, timedelta(seconds=error.retry_after))
+                params.append(
+                    {
+                        "id": email.id,
+                        "status": EmailStatus.PENDING,
+                        "next_attempt_at": now + delay,
+                        "last_error": str(error)[:500],
+                        "idempotency_key": keys.get(email.id),
+                    }
+                )
+            else:
+                stats.failed += 1
+                logger.warning(f"[EmailOutbox] Giving up on email {email.id} ({email.kind}): {error}")
+                params.append({"id": email.id, "status": EmailStatus.FAILED, "last_error": str(error)[:500]})
+
+        with Session(self.bind) as session:
+            # Group by key set: executemany needs the same columns in every row
+            for keys in {tuple(sorted(p)) for p in params}:
+                session.execute(update(EmailOutbox), [p for p in params if tuple(sorted(p)) == keys])
+            session.commit()
+        return stats
+
+
+async def deliver_outbox(
+    bind: Optional[Engine] = None,
+    client: Optional[ResendClient] = None,
+    **options: Any,
+) -> DeliveryStats:
+    """
+    Deliver every due outbox email.
+
+    Without a client, uses Resend with RESEND_API_KEY; emails stay queued when
+    it isn't configured.
+    """
+    if client is None:
+        if not settings.RESEND_API_KEY:
+            logger.info("[EmailOutbox] RESEND_API_KEY not configured, leaving emails queued")
+            return DeliveryStats()
+        client = ResendClient()
+        try:
+            return await OutboxWorker(client, bind=bind, **options).run()
+        finally:
+            await client.aclose()
+    return await OutboxWorker(client, bind=bind, **options).run()
+
+
+__all__ = [
+    "RENDERERS",
+    "DeliveryStats",
+    "OutboxWorker",
+    "ProviderError",
+    "RateLimiter",
+    "ResendClient",
+    "deliver_outbox",
+    "enqueue_emails",
+    "purge_outbox",
+]
@@ -0,0 +1,319 @@
+"""
+Vectorized Sales Floor Engine
+
+The sales floor is the average of the 4 lowest sales in a lookback window,
+computed per card, per card + treatment, or per card + variant, and usually for
+both the default (30 day) and expanded (90 day) windows. Asking SQL for each
+(card, window, filter) combination costs a round trip apiece.
+
+SalesFloorEngine loads every sale for a set of cards once - covering the widest
+window needed - into numpy arrays, and answers all of those questions with array
+operations over the loaded rows:
+
+    engine = SalesFloorEngine.load([1, 2, 3], days=90, session=session)
+    floors = engine.floors([30, 90])                            # {30: {card_id: {...}}, 90: {...}}
+    foil = engine.floors([30, 90], treatment="Classic Foil")
+    variants = engine.floors([30], by_variant=True)             # keys are (card_id, variant)
+    available = engine.treatment_floors(90)                     # {(card_id, treatment): {...}}
+
+Blokpax sales carry no treatment. They count toward card-level floors, every
+treatment-filtered floor and the "Base" variant.
+
+This service is available in both OSS and SaaS modes.
+"""
+
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterable, Optional
+
+import numpy as np
+from sqlalchemy import DateTime, bindparam, text
+from sqlmodel import Session
+
+from app.db import engine
+from app.services.price_store import get_price_store
+
+logger = logging.getLogger(__name__)
+
+NUM_LOWEST_SALES = 4  # Sales averaged into a floor (FloorPriceConfig.MIN_SALES_HIGH_CONFIDENCE)
+BLOKPAX_PLATFORM = "blokpax"
+BASE_VARIANT = "Base"
+
+_SECONDS_PER_DAY = 86400.0
+
+# One row per sale: (card_id, treatment, variant, price, platform, sold_at)
+SaleRecord = tuple[int, Optional[str], Optional[str], float, str, datetime]
+
+
+def _timestamp(d: datetime) -> float:
+    """Epoch seconds, treating naive datetimes from the database as UTC."""
+    return (d if d.tzinfo is not None else d.replace(tzinfo=timezone.utc)).timestamp()
+
+
+def _factorize(*columns: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Assign a group id to each row from the combination of its column values.
+
+    Returns (group_ids, first_row): group id per row (0..n_groups-1) and the
+    index of one row per group, used to read the group's key back.
+    """
+    codes = np.zeros(len(columns[0]), dtype=np.int64)
+    for column in columns:
+        uniques, inverse = np.unique(column, return_inverse=True)
+        codes = codes * max(len(uniques), 1) + inverse
+    _, first_row, group_ids = np.unique(codes, return_index=True, return_inverse=True)
+    return group_ids, first_row
+
+
+class SalesFloorEngine:
+    """
+    In-memory sold prices for a set of cards with vectorized floor calculation.
+
+    Rows are kept as parallel arrays (card id, treatment, variant, price,
+    platform code, sale timestamp). Floors for every group and every window are
+    computed by sorting rows by (group, price) once and ranking the in-window
+    rows of each group with a cumulative sum.
+    """
+
+    def __init__(self, records: Iterable[SaleRecord] = (), now: Optional[datetime] = None):
+        rows = list(records)
+        self.now = _timestamp(now) if now is not None else time.time()
+        self._set_columns(
+            np.array([r[0] for r in rows], dtype=np.int64),
+            np.array([r[1] for r in rows], dtype=object),
+            np.array([r[2] if r[2] else r[1] for r in rows], dtype=object),
+            np.array([r[3] for r in rows], dtype=np.float64),
+            np.array([_timestamp(r[5]) for r in rows], dtype=np.float64),
+            np.array([r[4] for r in rows], dtype=object),
+        )
+
+    def _set_columns(
+        self,
+        card_ids: np.ndarray,
+        treatments: np.ndarray,
+        variants: np.ndarray,
+        prices: np.ndarray,
+        sold_at: np.ndarray,
+        platforms: np.ndarray,
+    ) -> None:
+        self.card_ids = card_ids.astype(np.int64, copy=False)
+        self.treatments = treatments.astype(object, copy=False)
+        self.variants = variants.astype(object, copy=False)
+        self.prices = prices.astype(np.float64, copy=False)
+        self.sold_at = sold_at.astype(np.float64, copy=False)
+        platforms = platforms.astype(object, copy=False)
+        self.platform_names, self.platform_codes = np.unique(platforms, return_inverse=True)
+        self.is_blokpax = platforms == BLOKPAX_PLATFORM
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    @classmethod
+    def load(
+        cls,
+        card_ids: list[int],
+        days: int,
+        include_blokpax: bool = True,
+        session: Optional[Session] = None,
+    ) -> "SalesFloorEngine":
+        """
+        Load sold prices for the given cards over the last `days` days.
+
+        One marketprice query and one blokpaxsale query regardless of how many
+        cards, windows or treatments are asked for afterwards. eBay/OpenSea sales
+        come from the in-memory price store instead when it is loaded and covers
+        the window. Blokpax sales are stored under the "Base" variant.
+        """
+        now = datetime.now(timezone.utc)
+        if not card_ids:
+            return cls(now=now)
+
+        params = {"card_ids": list(card_ids), "cutoff": now - timedelta(days=days)}
+        records: list[SaleRecord] = []
+
+        store_rows = None
+        store = get_price_store()
+        if store is not None and store.covers(days):
+            try:
+                store_rows = store.rows(card_ids, listing_type="sold", since=params["cutoff"])
+            except RuntimeError:
+                store_rows = None  # Unloaded meanwhile (memory budget); use the database
+        if store_rows is None:
+            records.extend(cls._load_marketprice(params, session))
+
+        if include_blokpax:
+            bpx_query = text("""
+                SELECT card_id, price_usd, filled_at
+                FROM blokpaxsale
+                WHERE card_id IN :card_ids
+                  AND filled_at >= :cutoff
+            """).bindparams(bindparam("card_ids", expanding=True))
+
+            try:
+                for row in cls._fetch(bpx_query.columns(filled_at=DateTime), params, session):
+                    if row.price_usd is not None:
+                        records.append(
+                            (row.card_id, None, BASE_VARIANT, float(row.price_usd), BLOKPAX_PLATFORM, row.filled_at)
+                        )
+            except Exception as e:
+                logger.error(f"[FloorEngine] Failed to load blokpax sales for {len(card_ids)} cards: {e}")
+
+        sales_engine = cls(records, now=now)
+        if store_rows is not None:
+            # eBay/OpenSea sales from the in-memory store, Blokpax from the query above
+            sales_engine._set_columns(
+                np.concatenate([store_rows.card_ids, sales_engine.card_ids]),
+                np.concatenate([store_rows.treatments, sales_engine.treatments]),
+                np.concatenate([store_rows.variants, sales_engine.variants]),
+                np.concatenate([store_rows.prices, sales_engine.prices]),
+                np.concatenate([store_rows.timestamps, sales_engine.sold_at]),
+                np.concatenate([store_rows.platforms, sales_engine.platform_names[sales_engine.platform_codes]]),
+            )
+        return sales_engine
+
+    @classmethod
+    def _load_marketprice(cls, params: dict[str, Any], session: Optional[Session]) -> list[SaleRecord]:
+        query = text("""
+            SELECT card_id, treatment, NULLIF(product_subtype, '') AS variant, price, platform,
+                   COALESCE(sold_date, scraped_at) AS sold_at
+            FROM marketprice
+            WHERE card_id IN :card_ids
+              AND listing_type = 'sold'
+              AND COALESCE(sold_date, scraped_at) >= :cutoff
+              AND is_bulk_lot = FALSE
+        """).bindparams(bindparam("card_ids", expanding=True))
+
+        records: list[SaleRecord] = []
+        try:
+            for row in cls._fetch(query.columns(sold_at=DateTime), params, session):
+                if row.price is not None and row.sold_at is not None:
+                    records.append(
+                        (row.card_id, row.treatment, row.variant, float(row.price), row.platform, row.sold_at)
+                    )
+        except Exception as e:
+            logger.error(f"[FloorEngine] Failed to load marketprice sales for {len(params['card_ids'])} cards: {e}")
+        return records
+
+    @staticmethod
+    def _fetch(query: Any, params: dict[str, Any], session: Optional[Session]) -> list[Any]:
+        if session:
+            return list(session.execute(query, params).fetchall())
+        with engine.connect() as conn:
+            return list(conn.execute(query, params).fetchall())
+
+    def floors(
+        self,
+        windows: list[int],
+        treatment: Optional[str] = None,
+        by_variant: bool = False,
+    ) -> dict[int, dict[Any, dict[str, Any]]]:
+        """
+        Sales floors for every card (or card + variant) and every window.
+
+        Args:
+            windows: Lookback windows in days
+            treatment: Only count sales of this treatment (plus Blokpax sales)
+            by_variant: Key results by (card_id, variant) instead of card_id
+
+        Returns:
+            {days: {key: {"price", "count", "total", "platforms"[, "variant"]}}}
+            where count is the number of sales averaged (at most 4) and total the
+            number of sales in the window. Groups without sales are omitted.
+        """
+        rows = np.arange(len(self))
+        if treatment:
+            rows = rows[(self.treatments == treatment) | self.is_blokpax]
+
+        if by_variant:
+            # np.unique can't order None against strings; the keys keep None
+            variants = self.variants[rows]
+            group_ids, first_row = _factorize(self.card_ids[rows], np.where(np.equal(variants, None), "", variants))
+            keys = [(int(self.card_ids[rows[i]]), variants[i]) for i in first_row]
+        else:
+            group_ids, first_row = _factorize(self.card_ids[rows])
+            keys = [int(self.card_ids[rows[i]]) for i in first_row]
+
+        results = self._lowest_sales(rows, group_ids, len(keys), windows)
+        floors: dict[int, dict[Any, dict[str, Any]]] = {}
+        for days, by_group in results.items():
+            floors[days] = {}
+            for group, data in by_group.items():
+                if by_variant:
+                    data["variant"] = keys[group][1]
+                floors[days][keys[group]] = data
+        return floors
+
+    def treatment_floors(self, days: int) -> dict[tuple[int, str], dict[str, Any]]:
+        """
+        Sales floor of every treatment of every card (eBay/OpenSea sales only).
+
+        Returns:
+            {(card_id, treatment): {"floor": avg of 4 lowest, "count": sales in window}}
+        """
+        has_treatment = np.array([t is not None for t in self.treatments], dtype=bool)
+        rows = np.flatnonzero(has_treatment & ~self.is_blokpax)
+        if not len(rows):
+            return {}
+
+        group_ids, first_row = _factorize(self.card_ids[rows], self.treatments[rows])
+        keys = [(int(self.card_ids[rows[i]]), self.treatments[rows[i]]) for i in first_row]
+        by_group = self._lowest_sales(rows, group_ids, len(keys), [days])[days]
+        return {keys[group]: {"floor": data["price"], "count": data["total"]} for group, data in by_group.items()}
+
+    def _lowest_sales(
+        self,
+        rows: np.ndarray,
+        group_ids: np.ndarray,
+        n_groups: int,
+        windows: list[int],
+    ) -> dict[int, dict[int, dict[str, Any]]]:
+        """Average of the NUM_LOWEST_SALES lowest in-window prices per group, for each window."""
+        results: dict[int, dict[int, dict[str, Any]]] = {days: {} for days in windows}
+        if not len(rows):
+            return results
+
+        # Sort by group, then price: each group's rows are contiguous and cheapest first
+        order = np.lexsort((self.prices[rows], group_ids))
+        groups = group_ids[order]
+        prices = self.prices[rows][order]
+        sold_at = self.sold_at[rows][order]
+        platforms = self.platform_codes[rows][order]
+
+        starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+        sizes = np.diff(np.r_[starts, len(groups)])
+        n_platforms = max(len(self.platform_names), 1)
+
+        for days in windows:
+            in_window = sold_at >= self.now - days * _SECONDS_PER_DAY
+            # Rank of each in-window row among its group's in-window rows (1 = cheapest)
+            seen = np.cumsum(in_window)
+            rank = seen - np.repeat(seen[starts] - in_window[starts], sizes)
+            chosen = in_window & (rank <= NUM_LOWEST_SALES)
+
+            counts = np.bincount(groups[chosen], minlength=n_groups)
+            totals = np.bincount(groups[in_window], minlength=n_groups)
+            sums = np.bincount(groups[chosen], weights=prices[chosen], minlength=n_groups)
+            group_platforms = np.unique(groups[chosen] * n_platforms + platforms[chosen])
+
+            by_group = results[days]
+            for group in np.flatnonzero(counts):
+                by_group[int(group)] = {
+                    "price": round(float(sums[group] / counts[group]), 2),
+                    "count": int(counts[group]),
+                    "total": int(totals[group]),
+                    "platforms": [],
+                }
+            for code in group_platforms:
+                group, platform = divmod(int(code), n_platforms)
+                by_group[group]["platforms"].append(str(self.platform_names[platform]))
+
+        return results
+
+
+__all__ = [
+    "SalesFloorEngine",
+    "SaleRecord",
+    "NUM_LOWEST_SALES",
+    "BASE_VARIANT",
+]
@@ -6,59 +6,58 @@ Hybrid floor price estimation using a decision tree:
 2. Fall back to order book floor (OrderBookAnalyzer)
 3. Return null if neither available
 
+Sales floors come from SalesFloorEngine (app/services/floor_engine.py), which
+loads a set of cards' sales once and computes every window in one pass.
+
 This service is available in both OSS and SaaS modes.
 """
 
 import logging
-import threading
 from dataclasses import dataclass
-from datetime import datetime, timedelta, timezone
+from datetime import timedelta
 from enum import Enum
 from typing import Any, Literal, Optional, overload
 
-from sqlalchemy import text
 from sqlmodel import Session
 
-from app.db import engine
+from app.core.cache import get_cache
+from app.core.cache_invalidation import card_tags, tagged_ttl, window_for_days
+from app.services.floor_engine import SalesFloorEngine
 from app.services.order_book import OrderBookAnalyzer
 
 logger = logging.getLogger(__name__)
 
-# Module-level cache for floor price results
-# Key: (card_id, treatment, days) -> (FloorPriceResult, timestamp)
-_floor_cache: dict[tuple, tuple[Any, datetime]] = {}
-_cache_lock = threading.Lock()
+# Floor price result cache (in-process or shared Redis tier, see app.core.cache)
+# Key: (card_id, treatment, days, include_blokpax) -> FloorPriceResult
 _CACHE_TTL = timedelta(minutes=5)
+_floor_cache = get_cache("floor_price", ttl=_CACHE_TTL.total_seconds(), maxsize=1000)
+
+
+def _floor_cache_key(key: tuple) -> str:
+    return ":".join(str(part) for part in key)
 
 
 def _get_cached_floor(key: tuple) -> Optional[Any]:
     """Get cached floor price result if still valid."""
-    with _cache_lock:
-        if key in _floor_cache:
-            result, timestamp = _floor_cache[key]
-            if datetime.now(timezone.utc) - timestamp < _CACHE_TTL:
-                return result
-            # Expired - remove from cache
-            del _floor_cache[key]
-    return None
+    return _floor_cache.get(_floor_cache_key(key))
 
 
 def _set_cached_floor(key: tuple, result: Any) -> None:
-    """Cache a floor price result."""
-    with _cache_lock:
-        _floor_cache[key] = (result, datetime.now(timezone.utc))
-        # Simple cache eviction: remove old entries if cache grows too large
-        if len(_floor_cache) > 1000:
-            now = datetime.now(timezone.utc)
-            expired = [k for k, (_, ts) in _floor_cache.items() if now - ts >= _CACHE_TTL]
-            for k in expired:
-                del _floor_cache[k]
+    """Cache a floor price result, tagged so new sales/listings for the card evict it."""
+    card_id, _treatment, days, _include_blokpax = key
+    # Fallbacks widen the lookback to EXPANDED_LOOKBACK_DAYS, so tag with the wider window
+    window = window_for_days(max(days, FloorPriceConfig.EXPANDED_LOOKBACK_DAYS))
+    _floor_cache.set(
+        _floor_cache_key(key),
+        result,
+        ttl=tagged_ttl(_CACHE_TTL.total_seconds()),
+        tags=card_tags([card_id], window),
+    )
 
 
 def clear_floor_cache() -> None:
     """Clear the floor price cache. Useful for testing."""
-    with _cache_lock:
-        _floor_cache.clear()
+    _floor_cache.clear()
 
 
 class FloorPriceSource(str, Enum):
@@ -169,197 +168,144 @@ class FloorPriceService:
         Returns:
             FloorPriceResult with price, source, and confidence
         """
-        # Check cache first
-        cache_key = (card_id, treatment, days, include_blokpax)
-        cached = _get_cached_floor(cache_key)
-        if cached is not None:
-            logger.debug(f"Floor price cache HIT for card_id={card_id}, treatment={treatment}")
-            return cached
-
-        # Step 1: Try sales floor (primary source)
-        sales_result = self._get_sales_floor(card_id, treatment, days, include_blokpax)
-
-        if sales_result and sales_result["count"] >= self.config.MIN_SALES_HIGH_CONFIDENCE:
-            result = FloorPriceResult(
-                price=sales_result["price"],
-                source=FloorPriceSource.SALES,
-                confidence=ConfidenceLevel.HIGH,
-                confidence_score=1.0,
-                metadata={
-                    "sales_count": sales_result["count"],
-                    "treatment": treatment,
-                    "days": days,
-                    "platforms": sales_result.get("platforms", []),
-                },
-            )
-            _set_cached_floor(cache_key, result)
-            return result
-
-        # Step 2: Try order book floor (fallback)
-        order_book_result = self.order_book_analyzer.estimate_floor(
-            card_id=card_id,
-            treatment=treatment,
-            days=days,
-            allow_sales_fallback=False,  # We handle sales ourselves
-        )
-
-        if order_book_result and order_book_result.confidence > self.config.ORDER_BOOK_MIN_CONFIDENCE:
-            result = FloorPriceResult(
-                price=order_book_result.floor_estimate,
-                source=FloorPriceSource.ORDER_BOOK,
-                confidence=self._map_confidence(order_book_result.confidence),
-                confidence_score=order_book_result.confidence,
-                metadata={
-                    "bucket_depth": order_book_result.deepest_bucket.count,
-                    "total_listings": order_book_result.total_listings,
-                    "outliers_removed": order_book_result.outliers_removed,
-                    "treatment": treatment,
-                },
-            )
-            _set_cached_floor(cache_key, result)
-            return result
-
-        # Step 3: Try sales floor with fewer sales
-        if sales_result and sales_result["count"] >= self.config.MIN_SALES_LOW_CONFIDENCE:
-            confidence_score = sales_result["count"] / self.config.MIN_SALES_HIGH_CONFIDENCE
-            confidence = (
-                ConfidenceLevel.MEDIUM
-                if sales_result["count"] >= self.config.MIN_SALES_MEDIUM_CONFIDENCE
-                else ConfidenceLevel.LOW
-            )
-            result = FloorPriceResult(
-                price=sales_result["price"],
-                source=FloorPriceSource.SALES,
-                confidence=confidence,
-                confidence_score=confidence_score,
-                metadata={
-                    "sales_count": sales_result["count"],
-                    "treatment": treatment,
-                    "days": days,
-                    "platforms": sales_result.get("platforms", []),
-                },
-            )
-            _set_cached_floor(cache_key, result)
-            return result
-
-        # Step 4: Try expanded time window (90 days)
-        # Note: Recursive call will cache its own result
-        if days < self.config.EXPANDED_LOOKBACK_DAYS:
-            return self.get_floor_price(card_id, treatment, self.config.EXPANDED_LOOKBACK_DAYS, include_blokpax)
-
-        # Step 5: Treatment multiplier fallback (when specific treatment has no data)
-        if treatment:
-            multiplier_result = self._estimate_from_treatment_multiplier(card_id, treatment, days)
-            if multiplier_result:
-                _set_cached_floor(cache_key, multiplier_result)
-                return multiplier_result
+        return self.get_floor_prices([card_id], treatment, days, include_blokpax)[card_id]
 
-        # Step 6: No data available
-        result = FloorPriceResult(
-            price=None,
-            source=FloorPriceSource.NONE,
-            confidence=ConfidenceLevel.LOW,
-            confidence_score=0.0,
-            metadata={"reason": "insufficient_data", "days_searched": days},
-        )
-        _set_cached_floor(cache_key, result)
-        return result
-
-    def _get_sales_floor(
+    def get_floor_prices(
         self,
-        card_id: int,
-        treatment: Optional[str],
-        days: int,
+        card_ids: list[int],
+        treatment: Optional[str] = None,
+        days: int = FloorPriceConfig.DEFAULT_LOOKBACK_DAYS,
         include_blokpax: bool = True,
-    ) -> Optional[dict[str, Any]]:
+    ) -> dict[int, FloorPriceResult]:
         """
-        Calculate sales floor as avg of up to 4 lowest sales.
+        Hybrid floor prices for several cards, running the full decision tree.
 
-        Combines eBay/OpenSea (marketprice) and Blokpax (blokpaxsale) data.
+        Same results as get_floor_price() per card, but sales for every card are
+        loaded once over the widest window (see SalesFloorEngine) and the order
+        book fallback runs once per window for all cards still unresolved.
 
-        Returns: {"price": float, "count": int, "platforms": list} or None
+        Returns:
+            dict[card_id, FloorPriceResult] with an entry for every card_id
         """
-        cutoff = datetime.now(timezone.utc) - timedelta(days=days)
-        all_prices: list[tuple[float, str]] = []  # (price, platform)
-
-        # Query marketprice (eBay, OpenSea)
-        treatment_clause = "AND treatment = :treatment" if treatment else ""
-        query = text(f"""
-            SELECT price, platform
-            FROM marketprice
-            WHERE card_id = :card_id
-              AND listing_type = 'sold'
-              AND COALESCE(sold_date, scraped_at) >= :cutoff
-              AND is_bulk_lot = FALSE
-              {treatment_clause}
-            ORDER BY price ASC
-            LIMIT :num_sales
-        """)
-
-        params: dict[str, Any] = {
-            "card_id": card_id,
-            "cutoff": cutoff,
-            "num_sales": self.config.MIN_SALES_HIGH_CONFIDENCE,
-        }
-        if treatment:
-            params["treatment"] = treatment
-
-        try:
-            if self.session:
-                result = self.session.execute(query, params)
+        results: dict[int, FloorPriceResult] = {}
+        pending: list[int] = []
+        for card_id in dict.fromkeys(card_ids):
+            cached = _get_cached_floor((card_id, treatment, days, include_blokpax))
+            if cached is not None:
+                logger.debug(f"Floor price cache HIT for card_id={card_id}, treatment={treatment}")
+                results[card_id] = cached
             else:
-                with engine.connect() as conn:
-                    result = conn.execute(query, params)
-
-            for row in result.fetchall():
-                all_prices.append((float(row[0]), row[1]))
-        except Exception as e:
-            logger.error(f"[FloorPrice] Failed to query marketprice for card {card_id}: {e}")
-
-        # Query blokpaxsale if enabled
-        if include_blokpax:
-            bpx_query = text("""
-                SELECT price_usd
-                FROM blokpaxsale
-                WHERE card_id = :card_id
-                  AND filled_at >= :cutoff
-                ORDER BY price_usd ASC
-                LIMIT :num_sales
-            """)
-
-            try:
-                if self.session:
-                    result = self.session.execute(
-                        bpx_query,
-                        {"card_id": card_id, "cutoff": cutoff, "num_sales": self.config.MIN_SALES_HIGH_CONFIDENCE},
-                    )
-                else:
-                    with engine.connect() as conn:
-                        result = conn.execute(
-                            bpx_query,
-                            {"card_id": card_id, "cutoff": cutoff, "num_sales": self.config.MIN_SALES_HIGH_CONFIDENCE},
+                pending.append(card_id)
+        if not pending:
+            return results
+
+        # Step 4 retries steps 1-3 with the expanded window, so load both at once
+        windows = [days]
+        if days < self.config.EXPANDED_LOOKBACK_DAYS:
+            windows.append(self.config.EXPANDED_LOOKBACK_DAYS)
+        sales_engine = self._load_sales_engine(pending, windows[-1], include_blokpax)
+        sales_floors = sales_engine.floors(windows, treatment=treatment)
+
+        for window in windows:
+            sales = sales_floors[window]
+
+            # Step 1: Sales floor with enough sales (primary source)
+            for card_id in pending:
+                data = sales.get(card_id)
+                if data and data["count"] >= self.config.MIN_SALES_HIGH_CONFIDENCE:
+                    results[card_id] = self._sales_result(data, treatment, window)
+
+            # Step 2: Order book floor (fallback)
+            need_order_book = [cid for cid in pending if cid not in results]
+            if need_order_book:
+                order_books = self.order_book_analyzer.estimate_floors_batch(
+                    need_order_book,
+                    treatment=treatment,
+                    days=window,
+                    allow_sales_fallback=False,  # We handle sales ourselves
+                )
+                for card_id, ob_result in order_books.items():
+                    if ob_result and ob_result.confidence > self.config.ORDER_BOOK_MIN_CONFIDENCE:
+                        results[card_id] = FloorPriceResult(
+                            price=ob_result.floor_estimate,
+                            source=FloorPriceSource.ORDER_BOOK,
+                            confidence=self._map_confidence(ob_result.confidence),
+                            confidence_score=ob_result.confidence,
+                            metadata={
+                                "bucket_depth": ob_result.deepest_bucket.count,
+                                "total_listings": ob_result.total_listings,
+                                "outliers_removed": ob_result.outliers_removed,
+                                "treatment": treatment,
+                            },
                         )
 
-                for row in result.fetchall():
-                    all_prices.append((float(row[0]), "blokpax"))
-            except Exception as e:
-                logger.error(f"[FloorPrice] Failed to query blokpaxsale for card {card_id}: {e}")
+            # Step 3: Sales floor with fewer sales
+            for card_id in pending:
+                data = sales.get(card_id)
+                if card_id not in results and data and data["count"] >= self.config.MIN_SALES_LOW_CONFIDENCE:
+                    results[card_id] = self._sales_result(data, treatment, window)
 
-        if not all_prices:
-            return None
+            # Step 4: Cards still unresolved try the next (expanded) window
+            pending = [cid for cid in pending if cid not in results]
+            if not pending:
+                break
+
+        lookback = windows[-1]
 
-        # Sort all prices and take lowest N
-        all_prices.sort(key=lambda x: x[0])
-        lowest = all_prices[: self.config.MIN_SALES_HIGH_CONFIDENCE]
+        # Step 5: Treatment multiplier fallback (when specific treatment has no data)
+        if treatment and pending:
+            available: dict[int, dict[str, dict[str, Any]]] = {}
+            for (card_id, card_treatment), data in sales_engine.treatment_floors(lookback).items():
+                available.setdefault(card_id, {})[card_treatment] = data
+            # Catalog-wide observed multipliers (card_treatment_stats), loaded once for all cards
+            multipliers = self.market_patterns.get_treatment_multipliers()
+            for card_id in pending:
+                multiplier_result = self._estimate_from_treatment_multiplier(
+                    card_id, treatment, lookback, available.get(card_id, {}), multipliers
+                )
+                if multiplier_result:
+                    results[card_id] = multiplier_result
 
-        avg_price = sum(p[0] for p in lowest) / len(lowest)
-        platforms = list(set(p[1] for p in lowest))
+        # Step 6: No data available
+        for card_id in pending:
+            if card_id not in results:
+                results[card_id] = FloorPriceResult(
+                    price=None,
+                    source=FloorPriceSource.NONE,
+                    confidence=ConfidenceLevel.LOW,
+                    confidence_score=0.0,
+                    metadata={"reason": "insufficient_data", "days_searched": lookback},
+                )
 
-        return {
-            "price": round(avg_price, 2),
-            "count": len(lowest),
-            "platforms": platforms,
-        }
+        for card_id in dict.fromkeys(card_ids):
+            _set_cached_floor((card_id, treatment, days, include_blokpax), results[card_id])
+        return results
+
+    def _sales_result(self, data: dict[str, Any], treatment: Optional[str], days: int) -> FloorPriceResult:
+        """FloorPriceResult for a sales floor, with confidence scaled by the number of sales."""
+        count = data["count"]
+        if count >= self.config.MIN_SALES_HIGH_CONFIDENCE:
+            confidence = ConfidenceLevel.HIGH
+        elif count >= self.config.MIN_SALES_MEDIUM_CONFIDENCE:
+            confidence = ConfidenceLevel.MEDIUM
+        else:
+            confidence = ConfidenceLevel.LOW
+        return FloorPriceResult(
+            price=data["price"],
+            source=FloorPriceSource.SALES,
+            confidence=confidence,
+            confidence_score=min(1.0, count / self.config.MIN_SALES_HIGH_CONFIDENCE),
+            metadata={
+                "sales_count": count,
+                "treatment": treatment,
+                "days": days,
+                "platforms": data.get("platforms", []),
+            },
+        )
+
+    def _load_sales_engine(self, card_ids: list[int], days: int, include_blokpax: bool = True) -> SalesFloorEngine:
+        """Load sold prices for the cards over the last `days` days (one query per source)."""
+        return SalesFloorEngine.load(card_ids, days, include_blokpax, session=self.session)
 
     def _map_confidence(self, score: float) -> ConfidenceLevel:
         """Map raw confidence score to ConfidenceLevel enum."""
@@ -375,6 +321,8 @@ class FloorPriceService:
         card_id: int,
         target_treatment: str,
         days: int,
+        available: dict[str, dict[str, Any]],
+        multipliers: Optional[dict[str, float]] = None,
     ) -> Optional[FloorPriceResult]:
         """
         Estimate floor price for a treatment using multipliers from another treatment.
@@ -384,14 +332,17 @@ class FloorPriceService:
         2. Uses the treatment with the most reliable data (most sales)
         3. Applies the multiplier to estimate the target treatment's floor
 
+        Args:
+            available: The card's treatments with sales, {treatment: {"floor", "count"}}
+                (SalesFloorEngine.treatment_floors)
+            multipliers: Treatment multipliers to apply (default TREATMENT_MULTIPLIERS)
+
         Returns:
             FloorPriceResult with estimated price, or None if no base treatment found
         """
         from app.services.market_patterns import TREATMENT_MULTIPLIERS
 
-        # Get available treatments with their floor prices
-        available = self.market_patterns.get_available_treatments_for_card(card_id, days)
-
+        multipliers = TREATMENT_MULTIPLIERS if multipliers is None else multipliers
         if not available:
             return None
 
@@ -404,7 +355,7 @@ class FloorPriceService:
         best_count = 0
 
         for treatment, data in available.items():
-            if treatment in TREATMENT_MULTIPLIERS and data["count"] > best_count:
+            if treatment in multipliers and data["count"] > best_count:
                 best_base = treatment
                 best_count = data["count"]
 
@@ -412,7 +363,7 @@ class FloorPriceService:
             return None
 
         # Check if target treatment has a known multiplier
-        if target_treatment not in TREATMENT_MULTIPLIERS:
+        if target_treatment not in multipliers:
             return None
 
         # Calculate estimated floor
@@ -421,6 +372,7 @@ class FloorPriceService:
             known_price=base_floor,
             known_treatment=best_base,
             target_treatment=target_treatment,
+            multipliers=multipliers,
         )
 
         if not estimated_price:
@@ -476,8 +428,8 @@ class FloorPriceService:
         """
         Batch floor price calculation for multiple cards.
 
-        Uses bulk SQL queries for sales data. Optionally falls back to order book
-        for cards without sufficient sales data.
+        Sales floors for every card come from one SalesFloorEngine load. Optionally
+        falls back to order book for cards without sufficient sales data.
 
         Args:
             card_ids: List of card database IDs
@@ -534,9 +486,10 @@ class FloorPriceService:
         if include_order_book_fallback:
             missing_card_ids = [cid for cid in card_ids if cid not in cards_with_results]
             if missing_card_ids:
-                for card_id in missing_card_ids:
-                    ob_result = self.order_book_analyzer.estimate_floor(card_id=card_id, treatment=None, days=days)
-                    if ob_result and ob_result.confidence > self.config.ORDER_BOOK_MIN_CONFIDENCE:
+                # One set of queries for all missing cards instead of estimate_floor() per card
+                ob_results = self.order_book_analyzer.estimate_floors_batch(missing_card_ids, treatment=None, days=days)
+                for card_id, ob_result in ob_results.items():
+                    if ob_result.confidence > self.config.ORDER_BOOK_MIN_CONFIDENCE:
                         floor_result = FloorPriceResult(
                             price=round(ob_result.floor_estimate, 2),
                             source=FloorPriceSource.ORDER_BOOK,
@@ -565,164 +518,16 @@ class FloorPriceService:
         """
         Batch calculate sales floors for multiple cards.
 
-        Uses window functions to get lowest N sales per card efficiently.
+        Loads the cards' sales once and averages the lowest N per card (or per
+        card + variant) with SalesFloorEngine. Blokpax sales join the card's
+        floor, or the "Base" variant, as ordinary sales.
 
         Returns:
             If by_variant=False: dict[card_id, {"price": float, "count": int, "platforms": list}]
             If by_variant=True: dict[(card_id, variant), {"price": float, "count": int, ...}]
         """
-        cutoff = datetime.now(timezone.utc) - timedelta(days=days)
-        results: dict[Any, dict[str, Any]] = {}
-
-        # Build variant column expression
-        variant_col = "COALESCE(NULLIF(product_subtype, ''), treatment)" if by_variant else "NULL"
-        group_cols = "card_id, variant" if by_variant else "card_id"
-
-        # Query marketprice (eBay, OpenSea) with window function
-        query = text(f"""
-            WITH ranked_sales AS (
-                SELECT
-                    card_id,
-                    {variant_col} as variant,
-                    price,
-                    platform,
-                    ROW_NUMBER() OVER (
-                        PARTITION BY card_id{', ' + variant_col if by_variant else ''}
-                        ORDER BY price ASC
-                    ) as rn
-                FROM marketprice
-                WHERE card_id = ANY(:card_ids)
-                  AND listing_type = 'sold'
-                  AND COALESCE(sold_date, scraped_at) >= :cutoff
-                  AND is_bulk_lot = FALSE
-            )
-            SELECT
-                {group_cols},
-                ROUND(AVG(price)::numeric, 2) as avg_price,
-                COUNT(*) as sale_count,
-                ARRAY_AGG(DISTINCT platform) as platforms
-            FROM ranked_sales
-            WHERE rn <= :num_sales
-            GROUP BY {group_cols}
-        """)
-
-        try:
-            if self.session:
-                result = self.session.execute(
-                    query,
-                    {"card_ids": card_ids, "cutoff": cutoff, "num_sales": self.config.MIN_SALES_HIGH_CONFIDENCE},
-                )
-            else:
-                with engine.connect() as conn:
-                    result = conn.execute(
-                        query,
-                        {"card_ids": card_ids, "cutoff": cutoff, "num_sales": self.config.MIN_SALES_HIGH_CONFIDENCE},
-                    )
-
-            for row in result.fetchall():
-                if by_variant:
-                    key = (row[0], row[1])  # (card_id, variant)
-                    results[key] = {
-                        "price": float(row[2]),
-                        "count": int(row[3]),
-                        "platforms": list(row[4]) if row[4] else [],
-                        "variant": row[1],
-                    }
-                else:
-                    key = row[0]  # card_id
-                    results[key] = {
-                        "price": float(row[1]),
-                        "count": int(row[2]),
-                        "platforms": list(row[3]) if row[3] else [],
-                    }
-        except Exception as e:
-            logger.error(f"[FloorPrice] Batch marketprice query failed: {e}")
-
-        # Query blokpaxsale if enabled (no variant support - Blokpax doesn't track treatment)
-        if include_blokpax:
-            bpx_query = text("""
-                WITH ranked_bpx AS (
-                    SELECT
-                        card_id,
-                        price_usd as price,
-                        ROW_NUMBER() OVER (PARTITION BY card_id ORDER BY price_usd ASC) as rn
-                    FROM blokpaxsale
-                    WHERE card_id = ANY(:card_ids)
-                      AND filled_at >= :cutoff
-                )
-                SELECT
-                    card_id,
-                    ROUND(AVG(price)::numeric, 2) as avg_price,
-                    COUNT(*) as sale_count
-                FROM ranked_bpx
-                WHERE rn <= :num_sales
-                GROUP BY card_id
-            """)
-
-            try:
-                if self.session:
-                    bpx_result = self.session.execute(
-                        bpx_query,
-                        {"card_ids": card_ids, "cutoff": cutoff, "num_sales": self.config.MIN_SALES_HIGH_CONFIDENCE},
-                    )
-                else:
-                    with engine.connect() as conn:
-                        bpx_result = conn.execute(
-                            bpx_query,
-                            {
-                                "card_ids": card_ids,
-                                "cutoff": cutoff,
-                                "num_sales": self.config.MIN_SALES_HIGH_CONFIDENCE,
-                            },
-                        )
-
-                for row in bpx_result.fetchall():
-                    card_id = row[0]
-                    bpx_price = float(row[1])
-                    bpx_count = int(row[2])
-
-                    if by_variant:
-                        # For by_variant mode, add Blokpax to "Base" variant
-                        key = (card_id, "Base")
-                        if key in results:
-                            # Merge with existing - recalculate avg
-                            existing = results[key]
-                            total_count = existing["count"] + bpx_count
-                            merged_price = (existing["price"] * existing["count"] + bpx_price * bpx_count) / total_count
-                            results[key] = {
-                                "price": round(merged_price, 2),
-                                "count": min(total_count, self.config.MIN_SALES_HIGH_CONFIDENCE),
-                                "platforms": existing["platforms"] + ["blokpax"],
-                                "variant": "Base",
-                            }
-                        else:
-                            results[key] = {
-                                "price": bpx_price,
-                                "count": bpx_count,
-                                "platforms": ["blokpax"],
-                                "variant": "Base",
-                            }
-                    else:
-                        # For card-level, merge with marketprice results
-                        if card_id in results:
-                            existing = results[card_id]
-                            total_count = existing["count"] + bpx_count
-                            merged_price = (existing["price"] * existing["count"] + bpx_price * bpx_count) / total_count
-                            results[card_id] = {
-                                "price": round(merged_price, 2),
-                                "count": min(total_count, self.config.MIN_SALES_HIGH_CONFIDENCE),
-                                "platforms": existing["platforms"] + ["blokpax"],
-                            }
-                        else:
-                            results[card_id] = {
-                                "price": bpx_price,
-                                "count": bpx_count,
-                                "platforms": ["blokpax"],
-                            }
-            except Exception as e:
-                logger.error(f"[FloorPrice] Batch blokpaxsale query failed: {e}")
-
-        return results
+        sales_engine = self._load_sales_engine(card_ids, days, include_blokpax)
+        return sales_engine.floors([days], by_variant=by_variant)[days]
 
 
 def get_floor_price_service(session: Optional[Session] = None) -> FloorPriceService:
@@ -0,0 +1,302 @@
+"""
+FMP Snapshot Engine
+
+Builds the daily FMPSnapshot history (floor price, average sale price and
+sales count over a trailing window, per card in aggregate and per variant)
+from one streaming pass over sold listings.
+
+Each card's sales are loaded once, sorted by time, and every snapshot date is
+evaluated with array operations: searchsorted finds each date's window, and a
+dates x sales price matrix masked to the window gives the lowest-4 floor and
+the mean for all dates at once. This replaces one floor query per card, date
+and variant.
+
+Snapshot values match the historical definition used by
+scripts/backfill_fmp_snapshots.py:
+- window: sales in [snapshot - lookback_days, snapshot), snapshot at 23:59:59 UTC
+- floor_price: avg of the 4 lowest sales in the window
+- vwap: avg sale price in the window
+- variant: COALESCE(NULLIF(product_subtype, ''), treatment)
+- fmp: None (the FMP formula needs the SaaS pricing service)
+
+Usage:
+    counts = build_fmp_snapshots(session, date(2025, 6, 1), date(2025, 6, 30))
+    capture_daily_fmp_snapshots()  # scheduler: only the days since the last snapshot
+"""
+
+import logging
+from collections import Counter
+from datetime import date, datetime, time, timedelta, timezone
+from itertools import groupby
+from typing import Any, Iterator, Optional
+
+import numpy as np
+from sqlalchemy import DateTime, bindparam, func, insert, text
+from sqlmodel import Session, select
+
+from app.core.typing import col
+from app.db import engine
+from app.models.market import FMPSnapshot
+from app.services.floor_engine import NUM_LOWEST_SALES
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_LOOKBACK_DAYS = 30
+SNAPSHOT_TIME = time(23, 59, 59)  # Snapshots represent the end of their day
+
+_FETCH_SIZE = 5000  # Rows per server-side cursor fetch
+_MAX_CELLS = 2_000_000  # Dates x sales evaluated per chunk (bounds the masked price matrix)
+
+
+def _timestamp(d: datetime) -> float:
+    """Seconds since the epoch; naive datetimes from the database are UTC."""
+    return (d if d.tzinfo is not None else d.replace(tzinfo=timezone.utc)).timestamp()
+
+
+def snapshot_time(day: date) -> datetime:
+    """The snapshot_date stored for a calendar day."""
+    return datetime.combine(day, SNAPSHOT_TIME, tzinfo=timezone.utc)
+
+
+def window_stats(
+    times: np.ndarray,
+    prices: np.ndarray,
+    snapshot_times: np.ndarray,
+    lookback_days: int = SNAPSHOT_LOOKBACK_DAYS,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Trailing-window floor, mean and count at every snapshot time.
+
+    Args:
+        times: Sale timestamps (epoch seconds), sorted ascending
+        prices: Sale prices aligned with times
+        snapshot_times: Snapshot timestamps (epoch seconds)
+
+    Returns:
+        (floors, means, counts); floors and means are NaN where count is 0
+    """
+    ends = np.asarray(snapshot_times, dtype=float)
+    lo = np.searchsorted(times, ends - lookback_days * 86400.0, side="left")
+    hi = np.searchsorted(times, ends, side="left")
+    counts = hi - lo
+
+    floors = np.full(len(ends), np.nan)
+    means = np.full(len(ends), np.nan)
+    rows = np.flatnonzero(counts > 0)
+
+    start = 0
+    while start < len(rows):
+        # Grow the chunk while the masked matrix stays under _MAX_CELLS
+        stop = start + 1
+        while stop < len(rows) and (stop - start + 1) * (hi[rows[stop]] - lo[rows[start]]) <= _MAX_CELLS:
+            stop += 1
+        chunk = rows[start:stop]
+        first, last = lo[chunk].min(), hi[chunk].max()
+
+        index = np.arange(first, last)
+        in_window = (index >= lo[chunk, None]) & (index < hi[chunk, None])
+        window_prices = prices[first:last]
+
+        means[chunk] = np.where(in_window, window_prices, 0.0).sum(axis=1) / counts[chunk]
+
+        k = min(NUM_LOWEST_SALES, last - first)
+        masked = np.where(in_window, window_prices, np.inf)
+        lowest = np.partition(masked, k - 1, axis=1)[:, :k] if k < masked.shape[1] else masked
+        lowest = np.where(np.isfinite(lowest), lowest, 0.0)
+        floors[chunk] = lowest.sum(axis=1) / np.minimum(counts[chunk], NUM_LOWEST_SALES)
+
+        start = stop
+
+    return floors, means, counts
+
+
+def compute_card_snapshots(
+    card_id: int,
+    variants: list[Optional[str]],
+    prices: list[float],
+    sold_at: list[datetime],
+    days: list[date],
+    lookback_days: int = SNAPSHOT_LOOKBACK_DAYS,
+) -> list[dict[str, Any]]:
+    """
+    FMPSnapshot rows for one card on each day: the aggregate (treatment=None)
+    plus one per variant, wherever the window has at least one sale.
+    """
+    if not prices or not days:
+        return []
+
+    times = np.array([_timestamp(d) for d in sold_at])
+    order = np.argsort(times, kind="stable")
+    times = times[order]
+    price_array = np.asarray(prices, dtype=float)[order]
+    variant_array = np.array(variants, dtype=object)[order]
+    snapshot_dates = [snapshot_time(day) for day in days]
+    snapshot_times = np.array([d.timestamp() for d in snapshot_dates])
+
+    groups: list[tuple[Optional[str], np.ndarray]] = [(None, np.ones(len(times), dtype=bool))]
+    for variant in sorted({v for v in variant_array if v}):
+        groups.append((variant, variant_array == variant))
+
+    created_at = datetime.now(timezone.utc)
+    snapshots = []
+    for treatment, mask in groups:
+        floors, means, counts = window_stats(times[mask], price_array[mask], snapshot_times, lookback_days)
+        for i in np.flatnonzero(counts > 0):
+            snapshots.append(
+                {
+                    "card_id": card_id,
+                    "treatment": treatment,
+                    "fmp": None,
+                    "floor_price": round(float(floors[i]), 2),
+                    "vwap": round(float(means[i]), 2),
+                    "sales_count": int(counts[i]),
+                    "lookback_days": lookback_days,
+                    "snapshot_date": snapshot_dates[i],
+                    "created_at": created_at,
+                }
+            )
+    return snapshots
+
+
+def iter_card_sales(
+    session: Session,
+    since: datetime,
+    until: datetime,
+    card_ids: Optional[list[int]] = None,
+) -> Iterator[tuple[int, list[Optional[str]], list[float], list[datetime]]]:
+    """
+    Stream sold listings in [since, until) grouped by card.
+
+    Yields:
+        (card_id, variants, prices, sold_at) per card, in card_id order
+    """
+    card_clause = "AND card_id IN :card_ids" if card_ids is not None else ""
+    query = text(f"""
+        SELECT
+            card_id,
+            COALESCE(NULLIF(product_subtype, ''), treatment) as variant,
+            price,
+            COALESCE(sold_date, scraped_at) as sold_at
+        FROM marketprice
+        WHERE listing_type = 'sold'
+          AND is_bulk_lot = FALSE
+          AND COALESCE(sold_date, scraped_at) >= :since
+          AND COALESCE(sold_date, scraped_at) < :until
+          {card_clause}
+        ORDER BY card_id
+    """).columns(sold_at=DateTime)
+    params: dict[str, Any] = {"since": since, "until": until}
+    query = query.bindparams(bindparam("since", type_=DateTime), bindparam("until", type_=DateTime))
+    if card_ids is not None:
+        query = query.bindparams(bindparam("card_ids", expanding=True))
+        params["card_ids"] = card_ids
+
+    conn = session.connection().execution_options(stream_results=True, yield_per=_FETCH_SIZE)
+    result = conn.execute(query, params)
+    for card_id, rows in groupby(result, key=lambda row: row.card_id):
+        variants, prices, sold_at = [], [], []
+        for row in rows:
+            if row.price is None or row.sold_at is None:
+                continue
+            variants.append(row.variant)
+            prices.append(row.price)
+            sold_at.append(row.sold_at)
+        yield card_id, variants, prices, sold_at
+
+
+def existing_snapshot_days(session: Session, start: date, end: date) -> set[date]:
+    """Days in [start, end] that already have snapshots."""
+    dates = session.exec(
+        select(FMPSnapshot.snapshot_date)
+        .where(
+            col(FMPSnapshot.snapshot_date) >= datetime.combine(start, time.min, tzinfo=timezone.utc),
+            col(FMPSnapshot.snapshot_date) <= snapshot_time(end),
+        )
+        .distinct()
+    ).all()
+    return {d.date() for d in dates}
+
+
+def build_fmp_snapshots(
+    session: Session,
+    start: date,
+    end: date,
+    lookback_days: int = SNAPSHOT_LOOKBACK_DAYS,
+    card_ids: Optional[list[int]] = None,
+    skip_existing: bool = True,
+    execute: bool = True,
+) -> Counter:
+    """
+    Compute (and with execute=True, insert) snapshots for every day in [start, end].
+
+    One streaming query covers all cards and days; days that already have
+    snapshots are skipped when skip_existing is set.
+
+    Returns:
+        Counter of snapshots per day
+    """
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    if skip_existing:
+        existing = existing_snapshot_days(session, start, end)
+        days = [day for day in days if day not in existing]
+
+    per_day: Counter = Counter()
+    if not days:
+        return per_day
+
+    since = snapshot_time(days[0]) - timedelta(days=lookback_days)
+    until = snapshot_time(days[-1])
+
+    pending: list[dict[str, Any]] = []
+    for card_id, variants, prices, sold_at in iter_card_sales(session, since, until, card_ids):
+        snapshots = compute_card_snapshots(card_id, variants, prices, sold_at, days, lookback_days)
+        per_day.update(s["snapshot_date"].date() for s in snapshots)
+        if execute:
+            pending.extend(snapshots)
+            if len(pending) >= _FETCH_SIZE:
+                session.execute(insert(FMPSnapshot), pending)
+                pending = []
+    if execute:
+        if pending:
+            session.execute(insert(FMPSnapshot), pending)
+        session.commit()
+
+    return per_day
+
+
+def capture_daily_fmp_snapshots(session: Optional[Session] = None, now: Optional[datetime] = None) -> int:
+    """
+    Snapshot the completed days since the latest FMPSnapshot (normally just yesterday).
+
+    Only sales from the trailing window of those days are read. With no
+    snapshot history yet, only yesterday is captured (backfill older days with
+    scripts/backfill_fmp_snapshots.py).
+
+    Returns:
+        Number of snapshots written
+    """
+    if session is None:
+        with Session(engine) as own_session:
+            return capture_daily_fmp_snapshots(own_session, now)
+
+    last_day = ((now or datetime.now(timezone.utc)) - timedelta(days=1)).date()
+    latest = session.exec(select(func.max(FMPSnapshot.snapshot_date))).one()
+    first_day = latest.date() + timedelta(days=1) if latest else last_day
+    if first_day > last_day:
+        return 0
+
+    per_day = build_fmp_snapshots(session, first_day, last_day)
+    total = sum(per_day.values())
+    logger.info(f"[FMPSnapshots] Captured {total} snapshots for {first_day} to {last_day}")
+    return total
+
+
+__all__ = [
+    "SNAPSHOT_LOOKBACK_DAYS",
+    "snapshot_time",
+    "window_stats",
+    "compute_card_snapshots",
+    "iter_card_sales",
+    "build_fmp_snapshots",
+    "capture_daily_fmp_snapshots",
+]
@@ -11,15 +11,18 @@ Multipliers are derived from historical analysis (see scripts/discover_market_pa
 """
 
 import logging
+import statistics
 import threading
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from typing import Any, Optional
 
-from sqlalchemy import text
-from sqlmodel import Session
+from sqlalchemy import bindparam, delete, insert, text
+from sqlmodel import Session, select
 
+from app.core.typing import col
 from app.db import engine
+from app.models.market import CardTreatmentStats
 
 logger = logging.getLogger(__name__)
 
@@ -61,6 +64,18 @@ def clear_volatility_cache() -> None:
         _volatility_cache.clear()
 
 
+# Observed treatment multipliers read from card_treatment_stats -> (multipliers, timestamp)
+_multiplier_cache: Optional[tuple[dict[str, float], datetime]] = None
+_MULTIPLIER_CACHE_TTL = timedelta(hours=1)
+
+
+def clear_treatment_multiplier_cache() -> None:
+    """Drop the cached observed multipliers (after refresh_card_treatment_stats, or in tests)."""
+    global _multiplier_cache
+    with _cache_lock:
+        _multiplier_cache = None
+
+
 # Treatment multipliers derived from market analysis
 # Relative to Classic Paper = 1.0
 TREATMENT_MULTIPLIERS: dict[str, float] = {
@@ -86,6 +101,12 @@ RARITY_MULTIPLIERS: dict[str, float] = {
     "Secret Mythic": 20.0,  # Estimated
 }
 
+# card_treatment_stats settings (see refresh_card_treatment_stats)
+TREATMENT_STATS_DAYS = 90  # Sales window summarized per card/treatment
+BASE_TREATMENT = "Classic Paper"  # Observed multipliers are relative to this treatment
+MIN_MULTIPLIER_SALES = 2  # Sales needed on both treatments for a card's observed multiplier
+MIN_MULTIPLIER_CARDS = 3  # Cards needed before an observed multiplier replaces TREATMENT_MULTIPLIERS
+
 # Default volatility (CV) when no data available
 DEFAULT_VOLATILITY = 0.5
 
@@ -132,6 +153,36 @@ class CardVolatility:
             return 0.25
 
 
+def _volatility_from_stats(card_id: int, treatment: Optional[str], row: Any) -> CardVolatility:
+    """Build CardVolatility from a (mean, stddev, min, max, count) sales stats row."""
+    if row and row[0] and row[4] >= 3:  # Need at least 3 sales for CV
+        mean_price = float(row[0])
+        std_price = float(row[1]) if row[1] else 0.0
+        min_price = float(row[2])
+        max_price = float(row[3])
+        sales_count = int(row[4])
+
+        cv = std_price / mean_price if mean_price > 0 else DEFAULT_VOLATILITY
+        range_pct = ((max_price - min_price) / min_price * 100) if min_price > 0 else 0
+
+        return CardVolatility(
+            card_id=card_id,
+            treatment=treatment,
+            coefficient_of_variation=round(cv, 3),
+            price_range_pct=round(range_pct, 1),
+            sales_count=sales_count,
+        )
+
+    # Not enough data - return default
+    return CardVolatility(
+        card_id=card_id,
+        treatment=treatment,
+        coefficient_of_variation=DEFAULT_VOLATILITY,
+        price_range_pct=0.0,
+        sales_count=int(row[4]) if row and row[4] else 0,
+    )
+
+
 class MarketPatternsService:
     """
     Service for market pattern lookups and calculations.
@@ -150,16 +201,21 @@ class MarketPatternsService:
         self,
         treatment: str,
         base_treatment: str = "Classic Paper",
+        multipliers: Optional[dict[str, float]] = None,
     ) -> float:
         """
         Get price multiplier for a treatment relative to base.
 
+        Uses TREATMENT_MULTIPLIERS unless another table is passed (e.g. from
+        get_treatment_multipliers()).
+
         Example:
             multiplier = service.get_treatment_multiplier("Formless Foil")
             # Returns 6.72 (Formless Foil is ~6.72x Classic Paper)
         """
-        target = TREATMENT_MULTIPLIERS.get(treatment, 1.0)
-        base = TREATMENT_MULTIPLIERS.get(base_treatment, 1.0)
+        multipliers = TREATMENT_MULTIPLIERS if multipliers is None else multipliers
+        target = multipliers.get(treatment, 1.0)
+        base = multipliers.get(base_treatment, 1.0)
         return round(target / base, 2)
 
     def get_rarity_multiplier(
@@ -183,6 +239,7 @@ class MarketPatternsService:
         known_price: float,
         known_treatment: str,
         target_treatment: str,
+        multipliers: Optional[dict[str, float]] = None,
     ) -> Optional[float]:
         """
         Estimate price for a treatment based on another treatment's known price.
@@ -192,14 +249,68 @@ class MarketPatternsService:
             estimated = service.estimate_from_treatment_multiplier(10.0, "Classic Paper", "Formless Foil")
             # Returns 67.20 ($10 * 6.72)
         """
-        if known_treatment not in TREATMENT_MULTIPLIERS:
+        multipliers = TREATMENT_MULTIPLIERS if multipliers is None else multipliers
+        if known_treatment not in multipliers:
             return None
-        if target_treatment not in TREATMENT_MULTIPLIERS:
+        if target_treatment not in multipliers:
             return None
 
-        multiplier = self.get_treatment_multiplier(target_treatment, known_treatment)
+        multiplier = self.get_treatment_multiplier(target_treatment, known_treatment, multipliers)
         return round(known_price * multiplier, 2)
 
+    def get_treatment_multipliers(self) -> dict[str, float]:
+        """
+        Treatment multipliers observed across the catalog.
+
+        Each treatment seen on at least MIN_MULTIPLIER_CARDS cards in
+        card_treatment_stats gets the median of those cards' multipliers;
+        other treatments keep their TREATMENT_MULTIPLIERS value. Cached for an
+        hour (one query per process per refresh).
+
+        Returns:
+            dict[treatment, multiplier relative to BASE_TREATMENT]
+        """
+        global _multiplier_cache
+        with _cache_lock:
+            if (
+                _multiplier_cache is not None
+                and datetime.now(timezone.utc) - _multiplier_cache[1] < _MULTIPLIER_CACHE_TTL
+            ):
+                return dict(_multiplier_cache[0])
+
+        query = select(CardTreatmentStats.treatment, CardTreatmentStats.multiplier).where(
+            col(CardTreatmentStats.multiplier).is_not(None)
+        )
+        try:
+            if self.session:
+                rows = self.session.exec(query).all()
+            else:
+                with Session(engine) as session:
+                    rows = session.exec(query).all()
+        except Exception as e:
+            logger.error(f"[MarketPatterns] Failed to load observed treatment multipliers: {e}")
+            # Rollback session to clear invalid transaction state (e.g. table not migrated yet)
+            if self.session:
+                try:
+                    self.session.rollback()
+                except Exception:
+                    pass  # Session may already be closed
+            return dict(TREATMENT_MULTIPLIERS)
+
+        by_treatment: dict[str, list[float]] = {}
+        for treatment, multiplier in rows:
+            by_treatment.setdefault(treatment, []).append(multiplier)
+
+        multipliers = dict(TREATMENT_MULTIPLIERS)
+        for treatment, values in by_treatment.items():
+            if len(values) >= MIN_MULTIPLIER_CARDS:
+                multipliers[treatment] = round(statistics.median(values), 2)
+        multipliers[BASE_TREATMENT] = 1.0
+
+        with _cache_lock:
+            _multiplier_cache = (multipliers, datetime.now(timezone.utc))
+        return dict(multipliers)
+
     def get_card_volatility(
         self,
         card_id: int,
@@ -254,33 +365,7 @@ class MarketPatternsService:
                     result = conn.execute(query, params)
 
             row = result.fetchone()
-
-            if row and row[0] and row[4] >= 3:  # Need at least 3 sales for CV
-                mean_price = float(row[0])
-                std_price = float(row[1]) if row[1] else 0.0
-                min_price = float(row[2])
-                max_price = float(row[3])
-                sales_count = int(row[4])
-
-                cv = std_price / mean_price if mean_price > 0 else DEFAULT_VOLATILITY
-                range_pct = ((max_price - min_price) / min_price * 100) if min_price > 0 else 0
-
-                volatility = CardVolatility(
-                    card_id=card_id,
-                    treatment=treatment,
-                    coefficient_of_variation=round(cv, 3),
-                    price_range_pct=round(range_pct, 1),
-                    sales_count=sales_count,
-                )
-            else:
-                # Not enough data - return default
-                volatility = CardVolatility(
-                    card_id=card_id,
-                    treatment=treatment,
-                    coefficient_of_variation=DEFAULT_VOLATILITY,
-                    price_range_pct=0.0,
-                    sales_count=int(row[4]) if row and row[4] else 0,
-                )
+            volatility = _volatility_from_stats(card_id, treatment, row)
 
             _set_cached_volatility(cache_key, volatility)
             return volatility
@@ -295,6 +380,174 @@ class MarketPatternsService:
                 sales_count=0,
             )
 
+    def get_card_volatilities_batch(
+        self,
+        card_ids: list[int],
+        treatment: Optional[str] = None,
+        days: int = 90,
+    ) -> dict[int, CardVolatility]:
+        """
+        Volatility metrics for many cards with one grouped query.
+
+        Same results and cache as get_card_volatility(); only cards missing from
+        the cache are queried.
+
+        Returns:
+            dict[card_id, CardVolatility] with an entry for every requested card
+        """
+        results: dict[int, CardVolatility] = {}
+        missing: list[int] = []
+        for card_id in dict.fromkeys(card_ids):
+            cached = _get_cached_volatility((card_id, treatment, days))
+            if cached is not None:
+                results[card_id] = cached
+            else:
+                missing.append(card_id)
+
+        if not missing:
+            return results
+
+        cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+
+        treatment_clause = "AND treatment = :treatment" if treatment else ""
+        query = text(f"""
+            SELECT
+                card_id,
+                AVG(price) as mean_price,
+                STDDEV(price) as std_price,
+                MIN(price) as min_price,
+                MAX(price) as max_price,
+                COUNT(*) as sales_count
+            FROM marketprice
+            WHERE card_id IN :card_ids
+              AND listing_type = 'sold'
+              AND COALESCE(sold_date, scraped_at) >= :cutoff
+              AND is_bulk_lot = FALSE
+              {treatment_clause}
+            GROUP BY card_id
+        """).bindparams(bindparam("card_ids", expanding=True))
+
+        params: dict = {"card_ids": missing, "cutoff": cutoff}
+        if treatment:
+            params["treatment"] = treatment
+
+        try:
+            if self.session:
+                rows = self.session.execute(query, params).fetchall()
+            else:
+                with engine.connect() as conn:
+                    rows = conn.execute(query, params).fetchall()
+        except Exception as e:
+            logger.error(f"[MarketPatterns] Batch volatility query failed for {len(missing)} cards: {e}")
+            for card_id in missing:
+                results[card_id] = _volatility_from_stats(card_id, treatment, None)
+            return results
+
+        stats_by_card = {row[0]: row[1:] for row in rows}
+        for card_id in missing:
+            volatility = _volatility_from_stats(card_id, treatment, stats_by_card.get(card_id))
+            _set_cached_volatility((card_id, treatment, days), volatility)
+            results[card_id] = volatility
+        return results
+
+    def get_treatment_volatilities(
+        self,
+        card_id: int,
+        treatments: list[Optional[str]],
+        days: int = 90,
+    ) -> dict[Optional[str], CardVolatility]:
+        """
+        Volatility metrics for several treatments of one card.
+
+        See get_volatilities_batch(); a None treatment is all treatments combined.
+
+        Returns:
+            dict[treatment, CardVolatility] with an entry for every requested treatment
+        """
+        volatilities = self.get_volatilities_batch([(card_id, treatment) for treatment in treatments], days)
+        return {treatment: volatility for (_, treatment), volatility in volatilities.items()}
+
+    def get_volatilities_batch(
+        self,
+        pairs: list[tuple[int, Optional[str]]],
+        days: int = 90,
+    ) -> dict[tuple[int, Optional[str]], CardVolatility]:
+        """
+        Volatility metrics for many (card_id, treatment) pairs with at most two queries.
+
+        Same results and cache as get_card_volatility(). Pairs with a treatment
+        share one query grouped by card and treatment; pairs without one go
+        through get_card_volatilities_batch().
+
+        Returns:
+            dict[(card_id, treatment), CardVolatility] with an entry for every pair
+        """
+        results: dict[tuple[int, Optional[str]], CardVolatility] = {}
+        untreated: list[int] = []
+        missing: list[tuple[int, str]] = []
+        for card_id, treatment in dict.fromkeys(pairs):
+            if treatment is None:
+                untreated.append(card_id)
+                continue
+            cached = _get_cached_volatility((card_id, treatment, days))
+            if cached is not None:
+                results[(card_id, treatment)] = cached
+            else:
+                missing.append((card_id, treatment))
+
+        if untreated:
+            for card_id, volatility in self.get_card_volatilities_batch(untreated, None, days).items():
+                results[(card_id, None)] = volatility
+
+        if not missing:
+            return results
+
+        cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+
+        # Card and treatment lists select a superset of the pairs; unrequested groups are dropped below
+        query = text("""
+            SELECT
+                card_id,
+                treatment,
+                AVG(price) as mean_price,
+                STDDEV(price) as std_price,
+                MIN(price) as min_price,
+                MAX(price) as max_price,
+                COUNT(*) as sales_count
+            FROM marketprice
+            WHERE card_id IN :card_ids
+              AND treatment IN :treatments
+              AND listing_type = 'sold'
+              AND COALESCE(sold_date, scraped_at) >= :cutoff
+              AND is_bulk_lot = FALSE
+            GROUP BY card_id, treatment
+        """).bindparams(bindparam("card_ids", expanding=True), bindparam("treatments", expanding=True))
+
+        params = {
+            "card_ids": list(dict.fromkeys(card_id for card_id, _ in missing)),
+            "treatments": list(dict.fromkeys(treatment for _, treatment in missing)),
+            "cutoff": cutoff,
+        }
+
+        try:
+            if self.session:
+                rows = self.session.execute(query, params).fetchall()
+            else:
+                with engine.connect() as conn:
+                    rows = conn.execute(query, params).fetchall()
+        except Exception as e:
+            logger.error(f"[MarketPatterns] Batch volatility query failed for {len(missing)} card/treatment pairs: {e}")
+            for card_id, treatment in missing:
+                results[(card_id, treatment)] = _volatility_from_stats(card_id, treatment, None)
+            return results
+
+        stats_by_pair = {(row[0], row[1]): row[2:] for row in rows}
+        for card_id, treatment in missing:
+            volatility = _volatility_from_stats(card_id, treatment, stats_by_pair.get((card_id, treatment)))
+            _set_cached_volatility((card_id, treatment, days), volatility)
+            results[(card_id, treatment)] = volatility
+        return results
+
     def is_deal(
         self,
         card_id: int,
@@ -320,14 +573,23 @@ class MarketPatternsService:
     def get_available_treatments_for_card(
         self,
         card_id: int,
-        days: int = 90,
+        days: int = TREATMENT_STATS_DAYS,
     ) -> dict[str, dict]:
         """
         Get all treatments with sales data for a card.
 
+        Reads card_treatment_stats for the default window; other windows are
+        computed from marketprice.
+
         Returns:
             dict[treatment, {"floor": float, "count": int}]
         """
+        if days == TREATMENT_STATS_DAYS:
+            return {
+                treatment: {"floor": stats["floor"], "count": stats["count"]}
+                for treatment, stats in self.get_available_treatments([card_id]).get(card_id, {}).items()
+            }
+
         cutoff = datetime.now(timezone.utc) - timedelta(days=days)
 
         query = text("""
@@ -365,6 +627,43 @@ class MarketPatternsService:
             logger.error(f"[MarketPatterns] Failed to get treatments for card {card_id}: {e}")
             return {}
 
+    def get_available_treatments(self, card_ids: list[int]) -> dict[int, dict[str, dict]]:
+        """
+        Treatments with sales for many cards, from card_treatment_stats in one query.
+
+        Returns:
+            dict[card_id, dict[treatment, {"floor": float, "count": int, "multiplier": float | None}]];
+            cards without stats are omitted
+        """
+        if not card_ids:
+            return {}
+
+        query = select(CardTreatmentStats).where(col(CardTreatmentStats.card_id).in_(list(dict.fromkeys(card_ids))))
+        try:
+            if self.session:
+                rows = self.session.exec(query).all()
+            else:
+                with Session(engine) as session:
+                    rows = session.exec(query).all()
+        except Exception as e:
+            logger.error(f"[MarketPatterns] Failed to read treatment stats for {len(card_ids)} cards: {e}")
+            # Rollback session to clear invalid transaction state (e.g. table not migrated yet)
+            if self.session:
+                try:
+                    self.session.rollback()
+                except Exception:
+                    pass  # Session may already be closed
+            return {}
+
+        available: dict[int, dict[str, dict]] = {}
+        for row in rows:
+            available.setdefault(row.card_id, {})[row.treatment] = {
+                "floor": row.floor_price,
+                "count": row.sales_count,
+                "multiplier": row.multiplier,
+            }
+        return available
+
 
 @dataclass
 class DealResult:
@@ -446,6 +745,73 @@ class DealDetector:
             floor_price = floor_result.price if floor_result.price else 0.0
 
         if floor_price <= 0 or price <= 0:
+            return self._deal_result(card_id, price, treatment, floor_price, None)
+
+        # Get volatility for threshold calculation
+        volatility = self._market_patterns.get_card_volatility(card_id, treatment)
+        return self._deal_result(card_id, price, treatment, floor_price, volatility)
+
+    def check_deals(self, listings: list[dict]) -> list[DealResult]:
+        """
+        check_deal() for a page of listings with a fixed number of queries.
+
+        Floors missing from the listings are resolved with one
+        FloorPriceService.get_floor_prices() call per distinct treatment, and
+        volatilities for every (card_id, treatment) pair with
+        MarketPatternsService.get_volatilities_batch().
+
+        Args:
+            listings: List of dicts with card_id, price, treatment (optional), floor_price (optional)
+
+        Returns:
+            One DealResult per listing, in input order
+        """
+        missing_floors: dict[Optional[str], list[int]] = {}
+        for listing in listings:
+            if listing.get("floor_price") is None:
+                missing_floors.setdefault(listing.get("treatment"), []).append(listing["card_id"])
+
+        resolved: dict[tuple[int, Optional[str]], float] = {}
+        for treatment, card_ids in missing_floors.items():
+            for card_id, floor_result in self.floor_service.get_floor_prices(card_ids, treatment).items():
+                resolved[(card_id, treatment)] = floor_result.price if floor_result.price else 0.0
+
+        floors: list[float] = []
+        for listing in listings:
+            floor_price = listing.get("floor_price")
+            if floor_price is None:
+                floor_price = resolved.get((listing["card_id"], listing.get("treatment")), 0.0)
+            floors.append(floor_price)
+
+        # Only listings that can be deals need a volatility
+        pairs = [
+            (listing["card_id"], listing.get("treatment"))
+            for listing, floor_price in zip(listings, floors)
+            if floor_price > 0 and listing["price"] > 0
+        ]
+        volatilities = self._market_patterns.get_volatilities_batch(pairs) if pairs else {}
+
+        return [
+            self._deal_result(
+                listing["card_id"],
+                listing["price"],
+                listing.get("treatment"),
+                floor_price,
+                volatilities.get((listing["card_id"], listing.get("treatment"))),
+            )
+            for listing, floor_price in zip(listings, floors)
+        ]
+
+    def _deal_result(
+        self,
+        card_id: int,
+        price: float,
+        treatment: Optional[str],
+        floor_price: float,
+        volatility: Optional[CardVolatility],
+    ) -> DealResult:
+        """Classify a price against its floor using the card's volatility-based threshold."""
+        if floor_price <= 0 or price <= 0 or volatility is None:
             return DealResult(
                 is_deal=False,
                 card_id=card_id,
@@ -458,8 +824,6 @@ class DealDetector:
                 deal_quality="not_a_deal",
             )
 
-        # Get volatility for threshold calculation
-        volatility = self._market_patterns.get_card_volatility(card_id, treatment)
         threshold = volatility.deal_threshold
         threshold_pct = threshold * 100
 
@@ -508,23 +872,92 @@ class DealDetector:
         quality_order = {"not_a_deal": 0, "marginal": 1, "good": 2, "hot": 3}
         min_quality_level = quality_order.get(min_quality, 1)
 
-        deals = []
-        for listing in listings:
-            result = self.check_deal(
-                card_id=listing["card_id"],
-                price=listing["price"],
-                treatment=listing.get("treatment"),
-                floor_price=listing.get("floor_price"),
-            )
-
-            if quality_order.get(result.deal_quality, 0) >= min_quality_level:
-                deals.append(result)
+        deals = [
+            result
+            for result in self.check_deals(listings)
+            if quality_order.get(result.deal_quality, 0) >= min_quality_level
+        ]
 
         # Sort by discount (best deals first)
         deals.sort(key=lambda d: d.discount_pct, reverse=True)
         return deals
 
 
+def refresh_card_treatment_stats(session: Optional[Session] = None, days: int = TREATMENT_STATS_DAYS) -> int:
+    """
+    Rebuild card_treatment_stats from marketprice with one grouped query.
+
+    For every card/treatment with sold listings in the last `days` days, stores
+    the sales count, the floor (avg of the lowest 4 sales) and the multiplier
+    against the card's BASE_TREATMENT floor. The table is replaced in one
+    transaction, so readers see either the old or the new snapshot.
+
+    Returns:
+        Number of card/treatment rows written
+    """
+    if session is None:
+        with Session(engine) as own_session:
+            return refresh_card_treatment_stats(own_session, days)
+
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    query = text("""
+        WITH ranked AS (
+            SELECT
+                card_id,
+                treatment,
+                price,
+                ROW_NUMBER() OVER (PARTITION BY card_id, treatment ORDER BY price ASC) as rn,
+                COUNT(*) OVER (PARTITION BY card_id, treatment) as treatment_count
+            FROM marketprice
+            WHERE listing_type = 'sold'
+              AND COALESCE(sold_date, scraped_at) >= :cutoff
+              AND is_bulk_lot = FALSE
+              AND treatment IS NOT NULL
+        )
+        SELECT
+            card_id,
+            treatment,
+            AVG(price) as floor_price,
+            MAX(treatment_count) as sales_count
+        FROM ranked
+        WHERE rn <= 4
+        GROUP BY card_id, treatment
+    """)
+    rows = session.execute(query, {"cutoff": cutoff}).fetchall()
+
+    base_floors = {
+        card_id: float(floor)
+        for card_id, treatment, floor, count in rows
+        if treatment == BASE_TREATMENT and count >= MIN_MULTIPLIER_SALES and floor
+    }
+    now = datetime.now(timezone.utc)
+    stats = []
+    for card_id, treatment, floor, count in rows:
+        base_floor = base_floors.get(card_id)
+        multiplier = None
+        if base_floor and count >= MIN_MULTIPLIER_SALES:
+            multiplier = round(float(floor) / base_floor, 3)
+        stats.append(
+            {
+                "card_id": card_id,
+                "treatment": treatment,
+                "sales_count": int(count),
+                "floor_price": round(float(floor), 2),
+                "multiplier": multiplier,
+                "lookback_days": days,
+                "updated_at": now,
+            }
+        )
+
+    session.execute(delete(CardTreatmentStats))
+    if stats:
+        session.execute(insert(CardTreatmentStats), stats)
+    session.commit()
+
+    clear_treatment_multiplier_cache()
+    return len(stats)
+
+
 def get_market_patterns_service(session: Optional[Session] = None) -> MarketPatternsService:
     """Factory function to create MarketPatternsService."""
     return MarketPatternsService(session)
@@ -545,4 +978,7 @@ __all__ = [
     "get_market_patterns_service",
     "get_deal_detector",
     "clear_volatility_cache",
+    "clear_treatment_multiplier_cache",
+    "refresh_card_treatment_stats",
+    "TREATMENT_STATS_DAYS",
 ]
@@ -12,18 +12,34 @@ import logging
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from math import sqrt
-from typing import Optional
+from typing import TYPE_CHECKING, Any, Optional
 
 import numpy as np
-from sqlalchemy import text
+from sqlalchemy import DateTime, bindparam, text
 from sqlmodel import Session
 
 from app.db import engine
 from app.services.confidence import calculate_orderbook_confidence
 
+if TYPE_CHECKING:
+    from app.services.market_patterns import CardVolatility
+
 logger = logging.getLogger(__name__)
 
 
+def _as_utc(d: datetime) -> datetime:
+    """Treat naive datetimes from the database as UTC."""
+    return d if d.tzinfo is not None else d.replace(tzinfo=timezone.utc)
+
+
+def _split_by_treatment(rows: list[dict], treatments: list[Optional[str]]) -> dict[Optional[str], list[dict]]:
+    """Rows matching each treatment, in their original order (None matches every row)."""
+    return {
+        treatment: [row for row in rows if treatment is None or row["treatment"] == treatment]
+        for treatment in treatments
+    }
+
+
 # Configuration constants
 class OrderBookConfig:
     """Configuration constants for order book floor price estimation."""
@@ -167,9 +183,137 @@ class OrderBookAnalyzer:
                 return self._estimate_from_sales(card_id, treatment, days)
             return None
 
-        prices = [row["price"] for row in listings]
-        scraped_dates = [row["scraped_at"] for row in listings]
+        volatility = self.market_patterns.get_card_volatility(card_id, treatment)
+        return self._result_from_active(
+            prices=[row["price"] for row in listings],
+            scraped_dates=[row["scraped_at"] for row in listings],
+            volatility_cv=volatility.coefficient_of_variation,
+        )
+
+    def estimate_floors_batch(
+        self,
+        card_ids: list[int],
+        treatment: Optional[str] = None,
+        days: int = OrderBookConfig.DEFAULT_LOOKBACK_DAYS,
+        allow_sales_fallback: bool = True,
+    ) -> dict[int, OrderBookResult]:
+        """
+        estimate_floor() for many cards with a fixed number of queries.
+
+        Active listings, sold listings (for the sales fallback, including its
+        90-day and all-time window expansion) and volatility are each fetched
+        with one query for all cards, then every card goes through the same
+        per-card analysis as estimate_floor().
+
+        Returns:
+            dict[card_id, OrderBookResult]; cards without enough data are omitted
+        """
+        card_ids = list(dict.fromkeys(card_ids))
+        if not card_ids:
+            return {}
+
+        active_by_card = self._fetch_active_listings_batch(card_ids, treatment, days)
+
+        sold_by_card: dict[int, list[dict]] = {}
+        if allow_sales_fallback:
+            fallback_ids = [cid for cid in card_ids if len(active_by_card.get(cid, [])) < self.config.MIN_LISTINGS]
+            if fallback_ids:
+                # One fetch covering the widest window, narrowed per card below
+                fetched = self._fetch_sold_listings_batch(fallback_ids, treatment, max(days, 365))
+                for card_id, rows in fetched.items():
+                    rows = self._expand_sales_window(rows, days)
+                    if rows:
+                        sold_by_card[card_id] = rows
+
+        ids_with_data = [
+            cid
+            for cid in card_ids
+            if len(active_by_card.get(cid, [])) >= self.config.MIN_LISTINGS or cid in sold_by_card
+        ]
+        if not ids_with_data:
+            return {}
+        volatilities = self.market_patterns.get_card_volatilities_batch(ids_with_data, treatment)
+        return self._results_from_groups(ids_with_data, active_by_card, sold_by_card, volatilities)
+
+    def estimate_floors_by_treatment(
+        self,
+        card_id: int,
+        treatments: list[str],
+        days: int = OrderBookConfig.DEFAULT_LOOKBACK_DAYS,
+        allow_sales_fallback: bool = True,
+    ) -> dict[Optional[str], OrderBookResult]:
+        """
+        estimate_floor() for several treatments of one card, plus all treatments combined.
+
+        The card's active and sold listings are each fetched once and split by
+        treatment; volatilities come from get_treatment_volatilities().
 
+        Returns:
+            dict[treatment, OrderBookResult], with the combined estimate under
+            None; treatments without enough data are omitted
+        """
+        keys: list[Optional[str]] = [None, *dict.fromkeys(treatments)]
+
+        active = self._fetch_active_listings_batch([card_id], None, days).get(card_id, [])
+        active_by_treatment = _split_by_treatment(active, keys)
+
+        sold_by_treatment: dict[Optional[str], list[dict]] = {}
+        if allow_sales_fallback:
+            fallback_keys = [key for key in keys if len(active_by_treatment[key]) < self.config.MIN_LISTINGS]
+            if fallback_keys:
+                sold = self._fetch_sold_listings_batch([card_id], None, max(days, 365)).get(card_id, [])
+                for key, rows in _split_by_treatment(sold, fallback_keys).items():
+                    rows = self._expand_sales_window(rows, days)
+                    if rows:
+                        sold_by_treatment[key] = rows
+
+        keys_with_data = [
+            key for key in keys if len(active_by_treatment[key]) >= self.config.MIN_LISTINGS or key in sold_by_treatment
+        ]
+        if not keys_with_data:
+            return {}
+        volatilities = self.market_patterns.get_treatment_volatilities(card_id, keys_with_data)
+        return self._results_from_groups(keys_with_data, active_by_treatment, sold_by_treatment, volatilities)
+
+    def _results_from_groups(
+        self,
+        keys: list[Any],
+        active_by_key: dict[Any, list[dict]],
+        sold_by_key: dict[Any, list[dict]],
+        volatilities: dict[Any, "CardVolatility"],
+    ) -> dict[Any, OrderBookResult]:
+        """Analyze each group's active listings, or its sold listings when it has too few."""
+        results: dict[Any, OrderBookResult] = {}
+        for key in keys:
+            volatility_cv = volatilities[key].coefficient_of_variation
+            listings = active_by_key.get(key, [])
+            if len(listings) >= self.config.MIN_LISTINGS:
+                results[key] = self._result_from_active(
+                    prices=[row["price"] for row in listings],
+                    scraped_dates=[row["scraped_at"] for row in listings],
+                    volatility_cv=volatility_cv,
+                )
+            else:
+                sold = sold_by_key[key]
+                results[key] = self._result_from_sales(
+                    prices=[row["price"] for row in sold],
+                    sold_dates=[row["sold_date"] for row in sold],
+                    volatility_cv=volatility_cv,
+                )
+        return results
+
+    def _count_stale(self, dates: list[datetime]) -> int:
+        """Number of dates older than STALE_DAYS (naive dates are UTC)."""
+        stale_cutoff = datetime.now(timezone.utc) - timedelta(days=self.config.STALE_DAYS)
+        return sum(1 for d in dates if _as_utc(d) < stale_cutoff)
+
+    def _result_from_active(
+        self,
+        prices: list[float],
+        scraped_dates: list[datetime],
+        volatility_cv: float,
+    ) -> OrderBookResult:
+        """Order book analysis of one card's active listings (estimate_floor steps 2-8)."""
         # 2. Calculate key metrics BEFORE filtering (we want true lowest ask)
         lowest_ask = min(prices)
 
@@ -190,19 +334,9 @@ class OrderBookAnalyzer:
             spread_pct = 0.0
 
         # 6. Calculate staleness
-        stale_cutoff = datetime.now(timezone.utc) - timedelta(days=self.config.STALE_DAYS)
-        stale_count = 0
-        for d in scraped_dates:
-            if d.tzinfo is None:
-                d = d.replace(tzinfo=timezone.utc)
-            if d < stale_cutoff:
-                stale_count += 1
-
-        # 7. Get card volatility for confidence adjustment
-        volatility = self.market_patterns.get_card_volatility(card_id, treatment)
-        volatility_cv = volatility.coefficient_of_variation
+        stale_count = self._count_stale(scraped_dates)
 
-        # 8. Calculate NEW confidence score (with volatility)
+        # 7-8. Calculate NEW confidence score (with card volatility)
         confidence = self._calculate_confidence_v2(
             total_listings=len(filtered_prices),
             spread_pct=spread_pct,
@@ -258,6 +392,29 @@ class OrderBookAnalyzer:
                     pass  # Session may already be closed
             return []
 
+    def _fetch_active_listings_batch(
+        self, card_ids: list[int], treatment: Optional[str], days: int
+    ) -> dict[int, list[dict]]:
+        """_fetch_active_listings() for many cards in one query, grouped by card_id."""
+        cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+
+        query = text("""
+            SELECT card_id, price, scraped_at, treatment, title
+            FROM marketprice
+            WHERE card_id IN :card_ids
+              AND listing_type = 'active'
+              AND scraped_at >= :cutoff
+              AND is_bulk_lot = FALSE
+              AND (:treatment IS NULL OR treatment = :treatment)
+            ORDER BY card_id, price ASC
+        """).bindparams(bindparam("card_ids", expanding=True))
+
+        return self._fetch_grouped(
+            query.columns(scraped_at=DateTime),
+            {"card_ids": card_ids, "cutoff": cutoff, "treatment": treatment},
+            "active listings",
+        )
+
     def _filter_outliers(self, prices: list[float]) -> tuple[list[float], int]:
         """
         Filter outliers based on local price gaps.
@@ -268,26 +425,18 @@ class OrderBookAnalyzer:
         if len(prices) < 3:
             return prices, 0
 
-        sorted_prices = sorted(prices)
-
-        # Calculate gaps between consecutive prices
-        gaps = [sorted_prices[i + 1] - sorted_prices[i] for i in range(len(sorted_prices) - 1)]
-
-        if not gaps:
-            return prices, 0
+        sorted_prices = np.sort(np.asarray(prices, dtype=float))
 
+        # Gaps between consecutive prices
+        gaps = np.diff(sorted_prices)
         mean_gap = float(np.mean(gaps))
         std_gap = float(np.std(gaps))
         threshold = mean_gap + self.config.OUTLIER_SIGMA_THRESHOLD * std_gap
 
-        # Keep prices that have at least one close neighbor
-        filtered = []
-        for i, price in enumerate(sorted_prices):
-            gap_before = sorted_prices[i] - sorted_prices[i - 1] if i > 0 else 0
-            gap_after = sorted_prices[i + 1] - sorted_prices[i] if i < len(sorted_prices) - 1 else 0
-
-            if gap_before <= threshold or gap_after <= threshold:
-                filtered.append(price)
+        # Keep prices that have at least one close neighbor (the ends count their missing side as 0)
+        gap_before = np.concatenate(([0.0], gaps))
+        gap_after = np.concatenate((gaps, [0.0]))
+        filtered = sorted_prices[(gap_before <= threshold) | (gap_after <= threshold)].tolist()
 
         return filtered, len(prices) - len(filtered)
 
@@ -313,26 +462,27 @@ class OrderBookAnalyzer:
             min(self.config.MAX_BUCKET_WIDTH, price_range / sqrt(len(prices))),
         )
 
-        # Create buckets
-        buckets = []
-        bucket_start = min_price
+        # Bucket edges min, min+w, (min+w)+w, ... accumulated one addition at a
+        # time (cumsum is sequential), up to the first edge reaching max_price
+        num_steps = int(price_range // bucket_width) + 2
+        edges = np.cumsum(np.concatenate(([min_price], np.full(num_steps, bucket_width))))
+        while edges[-1] < max_price:
+            edges = np.append(edges, edges[-1] + bucket_width)
+        num_buckets = int(np.argmax(edges[1:] >= max_price)) + 1
 
-        while bucket_start < max_price:
-            bucket_end = bucket_start + bucket_width
+        starts = edges[:num_buckets].tolist()
+        ends = edges[1 : num_buckets + 1].tolist()
+        starts[0] = min_price
+        ends[-1] = max_price  # Include max_price in last bucket
 
-            # Include max_price in last bucket
-            if bucket_end >= max_price:
-                count = sum(1 for p in prices if bucket_start <= p <= max_price)
-                bucket_end = max_price
-            else:
-                count = sum(1 for p in prices if bucket_start <= p < bucket_end)
-
-            if count > 0:
-                buckets.append(BucketInfo(bucket_start, bucket_end, count))
-
-            bucket_start = bucket_end
+        # [start, end) counts from the sorted prices; the last bucket is closed
+        sorted_prices = np.sort(np.asarray(prices, dtype=float))
+        below_start = np.searchsorted(sorted_prices, starts, side="left")
+        below_end = np.searchsorted(sorted_prices, ends, side="left")
+        below_end[-1] = len(sorted_prices)
+        counts = (below_end - below_start).tolist()
 
-        return buckets
+        return [BucketInfo(start, end, count) for start, end, count in zip(starts, ends, counts) if count > 0]
 
     def _find_deepest_bucket(self, buckets: list[BucketInfo]) -> BucketInfo:
         """
@@ -413,6 +563,53 @@ class OrderBookAnalyzer:
                     pass  # Session may already be closed
             return []
 
+    def _fetch_sold_listings_batch(
+        self, card_ids: list[int], treatment: Optional[str], days: int
+    ) -> dict[int, list[dict]]:
+        """_fetch_sold_listings() for many cards in one query, grouped by card_id."""
+        cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+
+        query = text("""
+            SELECT card_id, price, COALESCE(sold_date, scraped_at) as sold_date, treatment, title
+            FROM marketprice
+            WHERE card_id IN :card_ids
+              AND listing_type = 'sold'
+              AND COALESCE(sold_date, scraped_at) >= :cutoff
+              AND is_bulk_lot = FALSE
+              AND (:treatment IS NULL OR treatment = :treatment)
+            ORDER BY card_id, price ASC
+        """).bindparams(bindparam("card_ids", expanding=True))
+
+        return self._fetch_grouped(
+            query.columns(sold_date=DateTime),
+            {"card_ids": card_ids, "cutoff": cutoff, "treatment": treatment},
+            "sold listings",
+        )
+
+    def _fetch_grouped(self, query: Any, params: dict, label: str) -> dict[int, list[dict]]:
+        """Run a listings query whose first column is card_id and group the rows by it."""
+        try:
+            if self.session:
+                rows = self.session.execute(query, params).fetchall()
+            else:
+                with engine.connect() as conn:
+                    rows = conn.execute(query, params).fetchall()
+        except Exception as e:
+            logger.error(f"[OrderBook] Failed to fetch {label} for {len(params['card_ids'])} cards: {e}")
+            # Rollback session to clear invalid transaction state
+            if self.session:
+                try:
+                    self.session.rollback()
+                except Exception:
+                    pass  # Session may already be closed
+            return {}
+
+        grouped: dict[int, list[dict]] = {}
+        for row in rows:
+            mapping = dict(row._mapping)
+            grouped.setdefault(mapping.pop("card_id"), []).append(mapping)
+        return grouped
+
     def _estimate_from_sales(
         self,
         card_id: int,
@@ -440,9 +637,36 @@ class OrderBookAnalyzer:
         if len(listings) == 0:
             return None
 
-        prices = [row["price"] for row in listings]
-        sold_dates = [row["sold_date"] for row in listings]
+        volatility = self.market_patterns.get_card_volatility(card_id, treatment)
+        return self._result_from_sales(
+            prices=[row["price"] for row in listings],
+            sold_dates=[row["sold_date"] for row in listings],
+            volatility_cv=volatility.coefficient_of_variation,
+        )
+
+    def _expand_sales_window(self, sold_rows: list[dict], days: int) -> list[dict]:
+        """
+        Apply _estimate_from_sales' window expansion to pre-fetched sold rows.
 
+        Rows must cover max(days, 365) days; returns those within `days`, else
+        within 90 days (when days < 90), else within 365 days.
+        """
+        now = datetime.now(timezone.utc)
+        windows = [days] + ([90] if days < 90 else []) + [365]
+        for window in windows:
+            cutoff = now - timedelta(days=window)
+            rows = [row for row in sold_rows if _as_utc(row["sold_date"]) >= cutoff]
+            if rows:
+                return rows
+        return []
+
+    def _result_from_sales(
+        self,
+        prices: list[float],
+        sold_dates: list[datetime],
+        volatility_cv: float,
+    ) -> OrderBookResult:
+        """Sales fallback analysis of one card's sold listings."""
         # Use avg of 4 lowest sales as floor (matches floor_price service)
         sorted_prices = sorted(prices)
         floor_sample = sorted_prices[:4]
@@ -465,17 +689,7 @@ class OrderBookAnalyzer:
             spread_pct = 0.0
 
         # Calculate staleness
-        stale_cutoff = datetime.now(timezone.utc) - timedelta(days=self.config.STALE_DAYS)
-        stale_count = 0
-        for d in sold_dates:
-            if d.tzinfo is None:
-                d = d.replace(tzinfo=timezone.utc)
-            if d < stale_cutoff:
-                stale_count += 1
-
-        # Get card volatility for confidence adjustment
-        volatility = self.market_patterns.get_card_volatility(card_id, treatment)
-        volatility_cv = volatility.coefficient_of_variation
+        stale_count = self._count_stale(sold_dates)
 
         # Calculate confidence with sales fallback penalty
         base_confidence = self._calculate_confidence_v2(
@@ -0,0 +1,416 @@
+"""
+Order Book Replay Engine
+
+In-memory backtesting of the order book floor estimate against subsequent
+sales (scripts/backtest_orderbook.py).
+
+The sold and active listings a backtest can touch are read once into a
+ReplaySnapshot: flat numpy columns sorted by card and time, which can be
+saved to / loaded from an .npz file so repeated tuning runs never hit the
+database. Each evaluation point is then answered from point-in-time views of
+those columns - searchsorted gives the listings inside [t - lookback, t) -
+instead of two queries per point. Cards are replayed in parallel across a
+process pool.
+
+Estimate (v2 algorithm):
+- active listings in the lookback window: floor = lowest ask
+- otherwise sales in the window: floor = avg of the 4 lowest, confidence x 0.5
+
+Usage:
+    snapshot = ReplaySnapshot.from_database(session, since=now - timedelta(days=120))
+    snapshot.save("data/orderbook_replay.npz")
+    results = replay_backtest(ReplaySnapshot.load("data/orderbook_replay.npz"), days=90, workers=8)
+"""
+
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+from sqlalchemy import DateTime, bindparam, text
+from sqlmodel import Session
+
+from app.services.confidence import calculate_orderbook_confidence
+
+logger = logging.getLogger(__name__)
+
+LOOKBACK_DAYS = 30  # Window of listings/sales visible to each prediction
+MIN_TIMELINE_SALES = 5  # Card/treatment timelines shorter than this are skipped
+SALES_FALLBACK_PENALTY = 0.5
+
+# Confidence weights used by the backtest simulation (no stale count, default volatility)
+CONFIDENCE_WEIGHTS = {
+    "listing_count_weight": 0.4,
+    "spread_weight": 0.3,
+    "recency_weight": 0.15,
+    "volatility_weight": 0.15,
+}
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_FETCH_SIZE = 10_000
+_NO_VARIANT = -1
+
+
+def _micros(d: datetime) -> int:
+    """Microseconds since the epoch; naive datetimes from the database are UTC."""
+    if d.tzinfo is None:
+        d = d.replace(tzinfo=timezone.utc)
+    return (d - _EPOCH) // timedelta(microseconds=1)
+
+
+def _datetime(micros: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=int(micros))
+
+
+@dataclass
+class BacktestResult:
+    """Single backtest observation."""
+
+    card_id: int
+    card_name: str
+    treatment: Optional[str]
+    prediction_date: datetime
+    predicted_floor: float
+    confidence: float
+    source: str  # "order_book" or "sales_fallback"
+    total_listings: int
+    next_sale_date: datetime
+    next_sale_price: float
+    error: float  # predicted - actual
+    absolute_error: float
+    percentage_error: float
+    days_to_sale: int
+
+
+@dataclass
+class ListingColumns:
+    """Listings of one kind as columns sorted by (card_id, time)."""
+
+    card_id: np.ndarray  # int64
+    variant: np.ndarray  # int32 index into ReplaySnapshot.variants, -1 for none
+    time: np.ndarray  # int64 microseconds since the epoch
+    price: np.ndarray  # float64
+
+    def card(self, card_id: int) -> "ListingColumns":
+        """Rows for one card (a view, no copy)."""
+        lo, hi = np.searchsorted(self.card_id, [card_id, card_id + 1])
+        return ListingColumns(self.card_id[lo:hi], self.variant[lo:hi], self.time[lo:hi], self.price[lo:hi])
+
+    def treatment(self, code: Optional[int]) -> "ListingColumns":
+        """Rows of one variant code; None keeps every row."""
+        if code is None:
+            return self
+        mask = self.variant == code
+        return ListingColumns(self.card_id[mask], self.variant[mask], self.time[mask], self.price[mask])
+
+    def window(self, start: int, end: int) -> np.ndarray:
+        """Prices with start <= time < end."""
+        lo, hi = np.searchsorted(self.time, [start, end])
+        return self.price[lo:hi]
+
+
+class ReplaySnapshot:
+    """
+    Point-in-time replay data: sold and active listings plus per-card sale counts.
+
+    as_of is when the data was read; replays end there by default, so a saved
+    snapshot gives the same backtest on every run.
+    """
+
+    def __init__(
+        self,
+        as_of: datetime,
+        card_ids: np.ndarray,
+        card_names: list[str],
+        card_sales: np.ndarray,
+        variants: list[str],
+        sold: ListingColumns,
+        active: ListingColumns,
+    ):
+        self.as_of = as_of
+        self.card_ids = card_ids
+        self.card_names = card_names
+        self.card_sales = card_sales
+        self.variants = variants
+        self.sold = sold
+        self.active = active
+
+    @classmethod
+    def from_database(cls, session: Session, since: Optional[datetime] = None) -> "ReplaySnapshot":
+        """
+        Read non-bulk sold and active listings (optionally only those at or after since).
+
+        Per-card sale counts always cover the full history, as the card
+        eligibility filter (min sales) did when it queried per run.
+        """
+        as_of = datetime.now(timezone.utc)
+        cards = session.execute(
+            text("""
+                SELECT c.id, c.name, COUNT(*) as sale_count
+                FROM card c
+                JOIN marketprice mp ON mp.card_id = c.id
+                WHERE mp.listing_type = 'sold'
+                  AND mp.is_bulk_lot = FALSE
+                GROUP BY c.id, c.name
+                ORDER BY c.id
+            """)
+        ).all()
+
+        variant_codes: dict[str, int] = {}
+        sold = cls._read_listings(session, "sold", "COALESCE(sold_date, scraped_at)", since, variant_codes)
+        active = cls._read_listings(session, "active", "scraped_at", since, variant_codes)
+
+        return cls(
+            as_of=as_of,
+            card_ids=np.array([row.id for row in cards], dtype=np.int64),
+            card_names=[row.name for row in cards],
+            card_sales=np.array([row.sale_count for row in cards], dtype=np.int64),
+            variants=list(variant_codes),
+            sold=sold,
+            active=active,
+        )
+
+    @staticmethod
+    def _read_listings(
+        session: Session,
+        listing_type: str,
+        time_column: str,
+        since: Optional[datetime],
+        variant_codes: dict[str, int],
+    ) -> ListingColumns:
+        since_clause = f"AND {time_column} >= :since" if since is not None else ""
+        query = text(f"""
+            SELECT
+                card_id,
+                COALESCE(NULLIF(product_subtype, ''), treatment) as variant,
+                {time_column} as at,
+                price
+            FROM marketprice
+            WHERE listing_type = :listing_type
+              AND is_bulk_lot = FALSE
+              AND {time_column} IS NOT NULL
+              AND price IS NOT NULL
+              {since_clause}
+            ORDER BY card_id, {time_column}, id
+        """).columns(at=DateTime)
+        params: dict = {"listing_type": listing_type}
+        if since is not None:
+            query = query.bindparams(bindparam("since", type_=DateTime))
+            params["since"] = since
+
+        card_ids, variants, times, prices = [], [], [], []
+        conn = session.connection().execution_options(stream_results=True, yield_per=_FETCH_SIZE)
+        for row in conn.execute(query, params):
+            card_ids.append(row.card_id)
+            variants.append(variant_codes.setdefault(row.variant, len(variant_codes)) if row.variant else _NO_VARIANT)
+            times.append(_micros(row.at))
+            prices.append(row.price)
+
+        return ListingColumns(
+            card_id=np.array(card_ids, dtype=np.int64),
+            variant=np.array(variants, dtype=np.int32),
+            time=np.array(times, dtype=np.int64),
+            price=np.array(prices, dtype=np.float64),
+        )
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Write the snapshot to an .npz file."""
+        arrays = {
+            "as_of": np.array(_micros(self.as_of), dtype=np.int64),
+            "card_ids": self.card_ids,
+            "card_names": np.array(self.card_names, dtype=str),
+            "card_sales": self.card_sales,
+            "variants": np.array(self.variants, dtype=str),
+        }
+        for kind, columns in (("sold", self.sold), ("active", self.active)):
+            for field in ("card_id", "variant", "time", "price"):
+                arrays[f"{kind}_{field}"] = getattr(columns, field)
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "ReplaySnapshot":
+        """Read a snapshot written by save()."""
+        with np.load(path) as data:
+
+            def columns(kind: str) -> ListingColumns:
+                return ListingColumns(*(data[f"{kind}_{field}"] for field in ("card_id", "variant", "time", "price")))
+
+            return cls(
+                as_of=_datetime(data["as_of"]),
+                card_ids=data["card_ids"],
+                card_names=data["card_names"].tolist(),
+                card_sales=data["card_sales"],
+                variants=data["variants"].tolist(),
+                sold=columns("sold"),
+                active=columns("active"),
+            )
+
+    def eligible_cards(self, min_sales: int) -> list[tuple[int, str]]:
+        """Cards with at least min_sales sales, most sales first."""
+        order = sorted(
+            (i for i in range(len(self.card_ids)) if self.card_sales[i] >= min_sales),
+            key=lambda i: (-int(self.card_sales[i]), int(self.card_ids[i])),
+        )
+        return [(int(self.card_ids[i]), self.card_names[i]) for i in order]
+
+
+def estimate_at(active_prices: np.ndarray, sold_prices: np.ndarray) -> Optional[dict]:
+    """
+    The v2 floor estimate from the listings visible at one point in time.
+
+    Uses the lowest active ask; with no active listings, the average of the
+    4 lowest recent sales at half confidence; with neither, None.
+    """
+    prices = active_prices if len(active_prices) else sold_prices
+    if not len(prices):
+        return None
+
+    low, high = float(prices.min()), float(prices.max())
+    spread_pct = ((high - low) / low) * 100 if len(prices) > 1 else 0.0
+    confidence = calculate_orderbook_confidence(
+        total_listings=len(prices),
+        spread_pct=spread_pct,
+        stale_count=0,  # Assume all fresh for simulation
+        volatility_cv=0.5,  # Default volatility
+        **CONFIDENCE_WEIGHTS,
+    )
+
+    if len(active_prices):
+        return {
+            "floor_estimate": round(low, 2),
+            "confidence": confidence,
+            "source": "order_book",
+            "total_listings": len(prices),
+        }
+
+    floor_sample = [float(p) for p in np.sort(prices)[:4]]
+    return {
+        "floor_estimate": round(sum(floor_sample) / len(floor_sample), 2),
+        "confidence": round(confidence * SALES_FALLBACK_PENALTY, 3),
+        "source": "sales_fallback",
+        "total_listings": len(prices),
+    }
+
+
+def replay_card(
+    snapshot: ReplaySnapshot,
+    card_id: int,
+    card_name: str,
+    days: int,
+    now: datetime,
+    lookback_days: int = LOOKBACK_DAYS,
+) -> list[BacktestResult]:
+    """Backtest observations for one card, each treatment sampled about 10 times."""
+    sold = snapshot.sold.card(card_id)
+    active = snapshot.active.card(card_id)
+    lookback = lookback_days * 86_400_000_000
+    cutoff = _micros(now - timedelta(days=days))
+
+    codes = sorted({int(code) for code in sold.variant if code != _NO_VARIANT}, key=lambda c: snapshot.variants[c])
+    treatments: list[Optional[int]] = list(codes) or [None]
+
+    results = []
+    for code in treatments:
+        treatment = snapshot.variants[code] if code is not None else None
+        sold_view = sold.treatment(code)
+        active_view = active.treatment(code)
+
+        start = np.searchsorted(sold_view.time, cutoff)
+        times, prices = sold_view.time[start:], sold_view.price[start:]
+        if len(times) < MIN_TIMELINE_SALES:
+            continue
+
+        for i in range(0, len(times) - 1, max(1, len(times) // 10)):
+            at = int(times[i])
+            prediction = estimate_at(active_view.window(at - lookback, at), sold_view.window(at - lookback, at))
+            if not prediction:
+                continue
+
+            prediction_date, next_sale_date = _datetime(at), _datetime(times[i + 1])
+            next_sale_price = float(prices[i + 1])
+            predicted_floor = prediction["floor_estimate"]
+            error = predicted_floor - next_sale_price
+            abs_error = abs(error)
+
+            results.append(
+                BacktestResult(
+                    card_id=card_id,
+                    card_name=card_name,
+                    treatment=treatment,
+                    prediction_date=prediction_date,
+                    predicted_floor=predicted_floor,
+                    confidence=prediction["confidence"],
+                    source=prediction["source"],
+                    total_listings=prediction["total_listings"],
+                    next_sale_date=next_sale_date,
+                    next_sale_price=next_sale_price,
+                    error=error,
+                    absolute_error=abs_error,
+                    percentage_error=(abs_error / next_sale_price * 100) if next_sale_price > 0 else 0,
+                    days_to_sale=(next_sale_date - prediction_date).days,
+                )
+            )
+    return results
+
+
+# Snapshot shared with pool workers (set once per process by the initializer)
+_worker_snapshot: Optional[ReplaySnapshot] = None
+
+
+def _init_worker(snapshot: ReplaySnapshot) -> None:
+    global _worker_snapshot
+    _worker_snapshot = snapshot
+
+
+def _replay_card_worker(args: tuple) -> list[BacktestResult]:
+    assert _worker_snapshot is not None
+    return replay_card(_worker_snapshot, *args)
+
+
+def replay_backtest(
+    snapshot: ReplaySnapshot,
+    days: int = 90,
+    min_sales_per_card: int = 10,
+    now: Optional[datetime] = None,
+    lookback_days: int = LOOKBACK_DAYS,
+    workers: int = 1,
+) -> list[BacktestResult]:
+    """
+    Replay the backtest over every eligible card.
+
+    Args:
+        days: Sales timeline per card/treatment (ending at now, default snapshot.as_of)
+        min_sales_per_card: Minimum sales required to include a card
+        lookback_days: Listings visible to each prediction
+        workers: Processes to replay cards across (1 = in this process)
+
+    Returns:
+        Observations in card order (most sales first), identical for any worker count
+    """
+    now = now or snapshot.as_of
+    cards = snapshot.eligible_cards(min_sales_per_card)
+    logger.info(f"Found {len(cards)} cards with >= {min_sales_per_card} sales")
+    tasks = [(card_id, card_name, days, now, lookback_days) for card_id, card_name in cards]
+
+    if workers <= 1 or len(tasks) <= 1:
+        per_card = [replay_card(snapshot, *task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(snapshot,)) as pool:
+            per_card = list(pool.map(_replay_card_worker, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+
+    return [result for results in per_card for result in results]
+
+
+__all__ = [
+    "LOOKBACK_DAYS",
+    "BacktestResult",
+    "ListingColumns",
+    "ReplaySnapshot",
+    "estimate_at",
+    "replay_card",
+    "replay_backtest",
+]
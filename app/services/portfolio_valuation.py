@@ -0,0 +1,367 @@
+"""
+Portfolio Valuation Service
+
+Prices a whole portfolio with a fixed number of queries, however many
+holdings it has. Each price tier is one query over every holding that still
+needs a price:
+
+Treatment prices (PortfolioCard holdings), keyed by (card_id, treatment):
+1. Recent VWAP: avg sold price over the last 30 days
+2. Last sale of that treatment (any time)
+3. Card-level price (below)
+
+Card-level prices (legacy PortfolioItem holdings and tier 3), keyed by card_id:
+1. Last sale (any treatment)
+2. Lowest active ask
+3. Latest MarketSnapshot avg_price
+4. 0.0
+
+Card and rarity details for every holding are one joined query.
+
+Value history (value_history) is a (card, treatment) x day price matrix: each
+day takes the latest daily average sale on or before it (found with
+searchsorted over the sorted sale days), else the current treatment price.
+Holdings index into the matrix and are masked by purchase date, so a year of
+history for hundreds of cards is a few array operations. Responses are cached
+per user (cached_value_history) and evicted when the user's holdings change
+(invalidate_portfolio_history) or new sales are published for a held card.
+
+Example:
+    service = PortfolioValuationService(session)
+    prices = service.treatment_prices([(card.card_id, card.treatment) for card in cards])
+    details = service.card_details({card.card_id for card in cards})
+"""
+
+import logging
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Iterable, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from app.core.cache import get_cache, invalidate_tags
+from app.core.cache_invalidation import card_tags, tagged_ttl
+from app.core.typing import col
+from app.models.card import Card, Rarity
+from app.models.market import MarketPrice, MarketSnapshot
+from app.models.portfolio import PortfolioCard
+
+logger = logging.getLogger(__name__)
+
+RECENT_VWAP_DAYS = 30
+
+CardDetails = tuple[Card, Optional[Rarity]]
+
+# Value history responses, keyed by user, range and end date. Tagged with the
+# held cards (any window: the current-price fallback can use sales of any age)
+# and the user's portfolio tag.
+_HISTORY_CACHE_TTL = 300
+_history_cache = get_cache("portfolio_history", ttl=_HISTORY_CACHE_TTL, maxsize=1000)
+
+
+def portfolio_tag(user_id: int) -> str:
+    return f"portfolio:{user_id}"
+
+
+class PortfolioValuationService:
+    """
+    Batched current-value lookups for portfolio holdings.
+
+    Example:
+        service = PortfolioValuationService(session)
+        prices = service.treatment_prices([(1, "Classic Paper"), (2, "Classic Foil")])
+        prices[(1, "Classic Paper")]  # -> 2.0
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def card_details(self, card_ids: Iterable[int]) -> dict[int, CardDetails]:
+        """Card and rarity for each card id (one query)."""
+        card_ids = set(card_ids)
+        if not card_ids:
+            return {}
+        rows = self.session.exec(
+            select(Card, Rarity)
+            .join(Rarity, col(Card.rarity_id) == col(Rarity.id), isouter=True)
+            .where(col(Card.id).in_(card_ids))
+        ).all()
+        return {card.id: (card, rarity) for card, rarity in rows}
+
+    def treatment_prices(self, pairs: Iterable[tuple[int, str]]) -> dict[tuple[int, str], float]:
+        """
+        Market price for each (card_id, treatment).
+
+        Tiers: recent VWAP, last sale of the treatment, then the card-level
+        price. Every requested pair gets a value (0.0 when nothing is known).
+        """
+        pairs = set(pairs)
+        if not pairs:
+            return {}
+
+        prices = self._recent_vwaps(pairs)
+
+        missing = pairs - prices.keys()
+        if missing:
+            prices.update(self._last_treatment_sales(missing))
+
+        missing = pairs - prices.keys()
+        if missing:
+            card_prices = self.card_prices({card_id for card_id, _ in missing})
+            for card_id, treatment in missing:
+                prices[(card_id, treatment)] = card_prices[card_id]
+
+        return prices
+
+    def card_prices(self, card_ids: Iterable[int]) -> dict[int, float]:
+        """
+        Card-level market price for each card id.
+
+        Tiers: last sale (any treatment), lowest active ask, latest snapshot
+        avg_price, else 0.0.
+        """
+        card_ids = set(card_ids)
+        if not card_ids:
+            return {}
+
+        prices = self._last_card_sales(card_ids)
+
+        missing = card_ids - prices.keys()
+        if missing:
+            prices.update(self._lowest_asks(missing))
+
+        missing = card_ids - prices.keys()
+        if missing:
+            prices.update(self._snapshot_prices(missing))
+
+        for card_id in card_ids - prices.keys():
+            prices[card_id] = 0.0
+        return prices
+
+    def value_history(
+        self, cards: Sequence[PortfolioCard], start_date: date, end_date: date
+    ) -> tuple[list[date], np.ndarray, np.ndarray]:
+        """
+        Daily market value and cost basis of cards from start_date to end_date.
+
+        A holding counts from its purchase date (always, if it has none). Its
+        value on a day is the latest daily average sale of its (card, treatment)
+        on or before that day, else the current treatment price.
+
+        Returns:
+            (days, values, cost_basis) with one entry per day
+        """
+        n_days = (end_date - start_date).days + 1
+        days = [start_date + timedelta(days=i) for i in range(n_days)]
+        if not cards or n_days <= 0:
+            return days, np.zeros(max(n_days, 0)), np.zeros(max(n_days, 0))
+
+        pairs = sorted({(c.card_id, c.treatment) for c in cards})
+        pair_index = {pair: i for i, pair in enumerate(pairs)}
+
+        # Daily averages as sorted composite keys: pair index * n_days + day offset
+        sale_pairs, sale_days, sale_prices = self._daily_sale_prices(pairs, pair_index, start_date)
+        keep = (sale_days >= 0) & (sale_days < n_days)
+        keys = sale_pairs[keep] * n_days + sale_days[keep]
+        sale_pairs, sale_prices = sale_pairs[keep], sale_prices[keep]
+        order = np.argsort(keys, kind="stable")
+        keys, sale_pairs, sale_prices = keys[order], sale_pairs[order], sale_prices[order]
+
+        # Forward fill: the last key at or before each (pair, day) cell, if it is the same pair
+        cell_pairs = np.repeat(np.arange(len(pairs)), n_days)
+        cells = cell_pairs * n_days + np.tile(np.arange(n_days), len(pairs))
+        latest = np.searchsorted(keys, cells, side="right") - 1
+        found = latest >= 0
+        found[found] = sale_pairs[latest[found]] == cell_pairs[found]
+
+        current = self.treatment_prices(pairs)
+        matrix = np.array([current[pair] for pair in pairs], dtype=float)[cell_pairs]
+        matrix[found] = sale_prices[latest[found]]
+        matrix = matrix.reshape(len(pairs), n_days)
+
+        # Holdings x days ownership mask from purchase dates
+        holding_pairs = np.array([pair_index[(c.card_id, c.treatment)] for c in cards])
+        purchased = np.array([(c.purchase_date - start_date).days if c.purchase_date else -1 for c in cards])
+        owned = purchased[:, None] <= np.arange(n_days)[None, :]
+
+        values = np.where(owned, matrix[holding_pairs], 0.0).sum(axis=0)
+        cost_basis = np.array([c.purchase_price for c in cards], dtype=float) @ owned
+        return days, values, cost_basis
+
+    def _daily_sale_prices(
+        self, pairs: list[tuple[int, str]], pair_index: dict[tuple[int, str], int], start_date: date
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(pair index, day offset from start_date, avg price) per pair and sale day."""
+        sale_date = func.date(func.coalesce(MarketPrice.sold_date, MarketPrice.scraped_at))
+        since = datetime.combine(start_date, time.min, tzinfo=timezone.utc)
+        rows = self.session.exec(
+            select(MarketPrice.card_id, MarketPrice.treatment, sale_date, func.avg(MarketPrice.price))
+            .where(col(MarketPrice.card_id).in_({card_id for card_id, _ in pairs}))
+            .where(col(MarketPrice.treatment).in_({treatment for _, treatment in pairs}))
+            .where(MarketPrice.listing_type == "sold")
+            .where(func.coalesce(MarketPrice.sold_date, MarketPrice.scraped_at) >= since)
+            .group_by(col(MarketPrice.card_id), col(MarketPrice.treatment), sale_date)
+        ).all()
+
+        indices, offsets, prices = [], [], []
+        for card_id, treatment, day, avg in rows:
+            index = pair_index.get((card_id, treatment))
+            if index is None or avg is None:
+                continue
+            # SQLite returns date() as a string
+            if isinstance(day, str):
+                day = date.fromisoformat(day)
+            indices.append(index)
+            offsets.append((day - start_date).days)
+            prices.append(float(avg))
+        return (
+            np.array(indices, dtype=np.int64),
+            np.array(offsets, dtype=np.int64),
+            np.array(prices, dtype=float),
+        )
+
+    def _recent_vwaps(self, pairs: set[tuple[int, str]]) -> dict[tuple[int, str], float]:
+        cutoff = datetime.now(timezone.utc) - timedelta(days=RECENT_VWAP_DAYS)
+        rows = self.session.exec(
+            select(MarketPrice.card_id, MarketPrice.treatment, func.avg(MarketPrice.price))
+            .where(col(MarketPrice.card_id).in_({card_id for card_id, _ in pairs}))
+            .where(col(MarketPrice.treatment).in_({treatment for _, treatment in pairs}))
+            .where(MarketPrice.listing_type == "sold")
+            .where(func.coalesce(MarketPrice.sold_date, MarketPrice.scraped_at) >= cutoff)
+            .group_by(col(MarketPrice.card_id), col(MarketPrice.treatment))
+        ).all()
+        return {(card_id, treatment): float(avg) for card_id, treatment, avg in rows if (card_id, treatment) in pairs}
+
+    def _last_treatment_sales(self, pairs: set[tuple[int, str]]) -> dict[tuple[int, str], float]:
+        ranked = (
+            select(
+                MarketPrice.card_id,
+                MarketPrice.treatment,
+                MarketPrice.price,
+                func.row_number()
+                .over(
+                    partition_by=(col(MarketPrice.card_id), col(MarketPrice.treatment)),
+                    order_by=(col(MarketPrice.sold_date).desc().nulls_last(), col(MarketPrice.id).desc()),
+                )
+                .label("rank"),
+            )
+            .where(col(MarketPrice.card_id).in_({card_id for card_id, _ in pairs}))
+            .where(col(MarketPrice.treatment).in_({treatment for _, treatment in pairs}))
+            .where(MarketPrice.listing_type == "sold")
+            .subquery()
+        )
+        rows = self.session.exec(
+            select(ranked.c.card_id, ranked.c.treatment, ranked.c.price).where(ranked.c.rank == 1)
+        ).all()
+        return {
+            (card_id, treatment): float(price) for card_id, treatment, price in rows if (card_id, treatment) in pairs
+        }
+
+    def _last_card_sales(self, card_ids: set[int]) -> dict[int, float]:
+        ranked = (
+            select(
+                MarketPrice.card_id,
+                MarketPrice.price,
+                func.row_number()
+                .over(
+                    partition_by=col(MarketPrice.card_id),
+                    order_by=(col(MarketPrice.sold_date).desc().nulls_last(), col(MarketPrice.id).desc()),
+                )
+                .label("rank"),
+            )
+            .where(col(MarketPrice.card_id).in_(card_ids))
+            .where(MarketPrice.listing_type == "sold")
+            .subquery()
+        )
+        rows = self.session.exec(select(ranked.c.card_id, ranked.c.price).where(ranked.c.rank == 1)).all()
+        return {card_id: float(price) for card_id, price in rows if price}
+
+    def _lowest_asks(self, card_ids: set[int]) -> dict[int, float]:
+        rows = self.session.exec(
+            select(MarketPrice.card_id, func.min(MarketPrice.price))
+            .where(col(MarketPrice.card_id).in_(card_ids))
+            .where(MarketPrice.listing_type == "active")
+            .group_by(col(MarketPrice.card_id))
+        ).all()
+        return {card_id: float(price) for card_id, price in rows if price}
+
+    def _snapshot_prices(self, card_ids: set[int]) -> dict[int, float]:
+        ranked = (
+            select(
+                MarketSnapshot.card_id,
+                MarketSnapshot.avg_price,
+                func.row_number()
+                .over(
+                    partition_by=col(MarketSnapshot.card_id),
+                    order_by=(col(MarketSnapshot.timestamp).desc(), col(MarketSnapshot.id).desc()),
+                )
+                .label("rank"),
+            )
+            .where(col(MarketSnapshot.card_id).in_(card_ids))
+            .subquery()
+        )
+        rows = self.session.exec(select(ranked.c.card_id, ranked.c.avg_price).where(ranked.c.rank == 1)).all()
+        return {card_id: float(price) for card_id, price in rows if price}
+
+
+def cached_value_history(
+    session: Session, user_id: int, cards: Sequence[PortfolioCard], days: int, end_date: Optional[date] = None
+) -> dict[str, Any]:
+    """
+    The portfolio value history response for a user's cards over the last `days` days.
+
+    Cached per user until their holdings change or a held card gets new sales.
+    """
+    end_date = end_date or datetime.now(timezone.utc).date()
+    key = f"{user_id}:{days}:{end_date.isoformat()}"
+    cached = _history_cache.get(key)
+    if cached is not None:
+        return cached
+
+    if not cards:
+        response: dict[str, Any] = {"history": [], "cost_basis_history": []}
+    else:
+        dates, values, cost_basis = PortfolioValuationService(session).value_history(
+            cards, end_date - timedelta(days=days), end_date
+        )
+        response = {
+            "history": [{"date": d.isoformat(), "value": round(float(v), 2)} for d, v in zip(dates, values)],
+            "cost_basis_history": [
+                {"date": d.isoformat(), "value": round(float(v), 2)} for d, v in zip(dates, cost_basis)
+            ],
+        }
+
+    _history_cache.set(
+        key,
+        response,
+        ttl=tagged_ttl(_HISTORY_CACHE_TTL),
+        tags=card_tags({c.card_id for c in cards}) + [portfolio_tag(user_id)],
+    )
+    return response
+
+
+def invalidate_portfolio_history(user_id: int) -> int:
+    """Evict a user's cached value history; call after committing changes to their holdings."""
+    return invalidate_tags([portfolio_tag(user_id)])
+
+
+def clear_portfolio_history_cache() -> None:
+    """Clear the value history cache. Useful for testing."""
+    _history_cache.clear()
+
+
+def get_portfolio_valuation_service(session: Session) -> PortfolioValuationService:
+    """Factory function to create PortfolioValuationService."""
+    return PortfolioValuationService(session)
+
+
+__all__ = [
+    "RECENT_VWAP_DAYS",
+    "PortfolioValuationService",
+    "cached_value_history",
+    "clear_portfolio_history_cache",
+    "get_portfolio_valuation_service",
+    "invalidate_portfolio_history",
+    "portfolio_tag",
+]
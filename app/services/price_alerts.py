@@ -0,0 +1,349 @@
+"""
+Price Alert Engine
+
+Evaluates watchlist price alerts as a set instead of polling every alert:
+
+1. Changed cards: the cards whose prices moved since the last check - card ids
+   published by in-process writers (cache_invalidation.subscribe) plus cards
+   with MarketPrice rows above the last seen id or sold rows scraped after the
+   last seen sold scraped_at, which covers writers in other processes (task
+   queue workers). The scraped_at watermark catches active listings converted
+   to sales in place, which keep their id but get a new scraped_at. The first
+   check after startup evaluates every alert, so nothing written while the
+   process was down is missed, and so does one check every FULL_SWEEP_INTERVAL
+   as a backstop (also for rows committed after a later id or scraped_at was
+   already seen). Changed cards are acknowledged only after their evaluation
+   succeeds, and cards whose alerts were held back by the cooldown are carried
+   into the next check.
+2. One query joins the active email alerts on those cards with their user,
+   card and email preferences.
+3. Current floors come from FloorPriceService.get_floor_prices_batch() - card
+   floors for alerts on any treatment, variant floors for treatment alerts.
+4. Triggered alerts are claimed (last_alerted_at / last_alerted_price set) and
+   queued in the email outbox in the same transaction; the outbox worker
+   delivers them (app.services.email_outbox).
+
+Trigger rules match the old poller: "below" fires at or under the target,
+"above" at or over it, "any" on every new price; never twice at the same price
+or within ALERT_COOLDOWN of the last alert.
+
+Example:
+    start_price_alerts()              # once per process, subscribes to card updates
+    check_price_alerts()              # scheduler, then deliver_outbox()
+"""
+
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import or_, update
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+
+from app.core.cache_invalidation import CardUpdateEvent, subscribe
+from app.core.typing import col
+from app.db import engine
+from app.models.card import Card
+from app.models.email_outbox import EmailOutbox
+from app.models.market import MarketPrice
+from app.models.user import User
+from app.models.watchlist import EmailPreferences, Watchlist
+from app.services.email_outbox import enqueue_emails
+from app.services.floor_price import FloorPriceService
+from app.services.price_watermark import PriceWatermark
+
+logger = logging.getLogger(__name__)
+
+ALERT_COOLDOWN = timedelta(hours=1)
+# Backstop: evaluate every alert at least this often, whatever changed
+FULL_SWEEP_INTERVAL = timedelta(hours=1)
+# Prices within this of the last alerted price count as unchanged
+PRICE_TOLERANCE = 0.01
+
+
+@dataclass
+class TriggeredAlert:
+    """An alert that fired and was queued for delivery."""
+
+    watchlist_id: int
+    email: str
+    user_name: str
+    alert_data: dict[str, Any]
+
+
+@dataclass
+class PendingCards:
+    """
+    Cards a check should evaluate (None: every alert), from ChangedCards.pending().
+
+    Pass it back to ChangedCards.acknowledge() once the evaluation succeeded.
+    """
+
+    card_ids: Optional[set[int]]
+    seq: int
+    watermark: PriceWatermark
+
+
+class ChangedCards:
+    """
+    Card ids whose prices changed since the last acknowledged check, plus the
+    MarketPrice watermark.
+
+    pending() doesn't consume anything: cards stay pending and the watermark
+    stays put until acknowledge(), so a check that fails re-evaluates the
+    same cards next time.
+    """
+
+    def __init__(self, full_sweep_interval: timedelta = FULL_SWEEP_INTERVAL) -> None:
+        # card id -> sequence number of its latest update
+        self._card_ids: dict[int, int] = {}
+        self._seq = 0
+        self._watermark: Optional[PriceWatermark] = None
+        self._last_full_sweep: Optional[datetime] = None
+        self.full_sweep_interval = full_sweep_interval
+        self._lock = threading.Lock()
+
+    def on_card_update(self, event: CardUpdateEvent) -> None:
+        """cache_invalidation subscriber: remember cards written in this process."""
+        self.add(event.card_ids)
+
+    def add(self, card_ids: Iterable[int]) -> None:
+        """Evaluate card_ids on the next check."""
+        with self._lock:
+            self._seq += 1
+            for card_id in card_ids:
+                self._card_ids[card_id] = self._seq
+
+    def pending(self, session: Session, now: Optional[datetime] = None) -> PendingCards:
+        """
+        Cards changed since the last acknowledged check.
+
+        card_ids is None (evaluate every alert) on the first check and once
+        full_sweep_interval has passed since the last full sweep.
+        """
+        now = now or datetime.now(timezone.utc)
+        watermark = PriceWatermark.current(session.connection())
+        with self._lock:
+            seq = self._seq
+            card_ids = set(self._card_ids)
+            last = self._watermark
+            sweep_due = (
+                last is None or self._last_full_sweep is None or now - self._last_full_sweep >= self.full_sweep_interval
+            )
+        if sweep_due:
+            return PendingCards(None, seq, watermark)
+        changed = last.changed_until(watermark)
+        if changed is not None:
+            rows = session.exec(select(MarketPrice.card_id).where(changed).distinct()).all()
+            card_ids.update(rows)
+        return PendingCards(card_ids, seq, watermark)
+
+    def acknowledge(self, pending: PendingCards, now: Optional[datetime] = None) -> None:
+        """Mark pending's cards as evaluated and move the watermark past them."""
+        with self._lock:
+            # Cards updated again during the evaluation stay pending
+            self._card_ids = {card_id: seq for card_id, seq in self._card_ids.items() if seq > pending.seq}
+            self._watermark = (self._watermark or PriceWatermark()).advance(pending.watermark)
+            if pending.card_ids is None:
+                self._last_full_sweep = now or datetime.now(timezone.utc)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._card_ids = {}
+            self._watermark = None
+            self._last_full_sweep = None
+
+
+changed_cards = ChangedCards()
+
+
+def should_trigger(
+    alert_type: str,
+    target_price: float,
+    current_price: float,
+    last_alerted_price: Optional[float],
+    last_alerted_at: Optional[datetime],
+    now: datetime,
+) -> bool:
+    """Whether an alert fires at current_price."""
+    if last_alerted_price is not None and abs(current_price - last_alerted_price) < PRICE_TOLERANCE:
+        return False
+    if last_alerted_at is not None:
+        if last_alerted_at.tzinfo is None:
+            last_alerted_at = last_alerted_at.replace(tzinfo=timezone.utc)
+        if now - last_alerted_at < ALERT_COOLDOWN:
+            return False
+    if alert_type == "below":
+        return current_price <= target_price
+    if alert_type == "above":
+        return current_price >= target_price
+    return alert_type == "any"
+
+
+class PriceAlertEngine:
+    """
+    Set-based evaluation of watchlist price alerts.
+
+    Example:
+        engine = PriceAlertEngine(session)
+        triggered = engine.evaluate({12, 34})   # claims and returns alerts that fire
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+        # Cards with alerts that would have fired but for ALERT_COOLDOWN
+        self.deferred_card_ids: set[int] = set()
+
+    def evaluate(
+        self, card_ids: Optional[Iterable[int]] = None, now: Optional[datetime] = None
+    ) -> list[TriggeredAlert]:
+        """
+        Claim, queue and return the alerts on card_ids (every card if None) that fire at current floors.
+
+        Claims and outbox emails are committed together before returning, so
+        a concurrent check can't queue the same alert twice.
+        """
+        now = now or datetime.now(timezone.utc)
+        alerts = self._active_alerts(card_ids)
+        if not alerts:
+            return []
+
+        floors = self._floor_prices(alerts)
+        triggered: list[TriggeredAlert] = []
+        for alert, user, card in alerts:
+            price = floors.get((alert.card_id, alert.treatment or None))
+            if price is None:
+                continue
+            target = float(alert.target_price or 0)
+            if not should_trigger(
+                alert.alert_type, target, price, alert.last_alerted_price, alert.last_alerted_at, now
+            ):
+                if alert.last_alerted_at is not None and should_trigger(
+                    alert.alert_type, target, price, alert.last_alerted_price, None, now
+                ):
+                    self.deferred_card_ids.add(alert.card_id)
+                continue
+            triggered.append(
+                TriggeredAlert(
+                    watchlist_id=alert.id,
+                    email=user.email,
+                    user_name=user.username or user.email.split("@")[0],
+                    alert_data={
+                        "card_name": card.name,
+                        "card_slug": card.slug,
+                        "alert_type": alert.alert_type,
+                        "target_price": alert.target_price,
+                        "current_price": price,
+                        "treatment": alert.treatment or "Any Treatment",
+                    },
+                )
+            )
+
+        if triggered:
+            self.session.execute(
+                update(Watchlist),
+                [
+                    {
+                        "id": t.watchlist_id,
+                        "last_alerted_at": now,
+                        "last_alerted_price": t.alert_data["current_price"],
+                    }
+                    for t in triggered
+                ],
+            )
+            enqueue_emails(
+                self.session,
+                (
+                    EmailOutbox(kind="price_alert", to_email=t.email, user_name=t.user_name, payload=t.alert_data)
+                    for t in triggered
+                ),
+            )
+            self.session.commit()
+        return triggered
+
+    def _active_alerts(self, card_ids: Optional[Iterable[int]]) -> list[tuple[Watchlist, User, Card]]:
+        """Enabled email alerts with a target, for active users who haven't opted out (one query)."""
+        query = (
+            select(Watchlist, User, Card)
+            .join(User, col(User.id) == col(Watchlist.user_id))
+            .join(Card, col(Card.id) == col(Watchlist.card_id))
+            .join(EmailPreferences, col(EmailPreferences.user_id) == col(Watchlist.user_id), isouter=True)
+            .where(col(Watchlist.alert_enabled).is_(True))
+            .where(col(Watchlist.notify_email).is_(True))
+            .where(col(Watchlist.target_price).isnot(None))
+            .where(col(User.is_active).is_(True))
+            .where(or_(col(EmailPreferences.price_alerts).is_(None), col(EmailPreferences.price_alerts).is_(True)))
+        )
+        if card_ids is not None:
+            card_ids = set(card_ids)
+            if not card_ids:
+                return []
+            query = query.where(col(Watchlist.card_id).in_(card_ids))
+        return list(self.session.exec(query).all())
+
+    def _floor_prices(self, alerts: list[tuple[Watchlist, User, Card]]) -> dict[tuple[int, Optional[str]], float]:
+        """Current floor per (card_id, treatment), treatment None for card-level floors."""
+        service = FloorPriceService(self.session)
+        floors: dict[tuple[int, Optional[str]], float] = {}
+
+        card_ids = sorted({alert.card_id for alert, _, _ in alerts if not alert.treatment})
+        if card_ids:
+            for card_id, result in service.get_floor_prices_batch(card_ids, include_order_book_fallback=True).items():
+                if result.price is not None:
+                    floors[(card_id, None)] = float(result.price)
+
+        variant_card_ids = sorted({alert.card_id for alert, _, _ in alerts if alert.treatment})
+        if variant_card_ids:
+            for key, result in service.get_floor_prices_batch(variant_card_ids, by_variant=True).items():
+                if result.price is not None:
+                    floors[key] = float(result.price)
+        return floors
+
+
+def check_price_alerts(bind: Optional[Engine] = None) -> tuple[int, int]:
+    """
+    Evaluate alerts on cards changed since the last check and queue the ones that fire.
+
+    Changed cards are only acknowledged once the evaluation succeeds; cards
+    with alerts held back by ALERT_COOLDOWN are evaluated again next check.
+
+    Returns:
+        (changed cards evaluated, -1 for a full sweep; alerts queued)
+    """
+    with Session(bind or engine) as session:
+        pending = changed_cards.pending(session)
+        if pending.card_ids is not None and not pending.card_ids:
+            changed_cards.acknowledge(pending)
+            return 0, 0
+        alert_engine = PriceAlertEngine(session)
+        triggered = alert_engine.evaluate(pending.card_ids)
+    changed_cards.acknowledge(pending)
+    changed_cards.add(alert_engine.deferred_card_ids)
+    return (-1 if pending.card_ids is None else len(pending.card_ids)), len(triggered)
+
+
+_subscribed = False
+
+
+def start_price_alerts() -> None:
+    """Subscribe the changed-card tracker to card update events (once per process)."""
+    global _subscribed
+    if not _subscribed:
+        subscribe(changed_cards.on_card_update)
+        _subscribed = True
+
+
+__all__ = [
+    "ALERT_COOLDOWN",
+    "FULL_SWEEP_INTERVAL",
+    "ChangedCards",
+    "PendingCards",
+    "PriceAlertEngine",
+    "TriggeredAlert",
+    "changed_cards",
+    "check_price_alerts",
+    "should_trigger",
+    "start_price_alerts",
+]
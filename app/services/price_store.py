@@ -0,0 +1,430 @@
+"""
+Process-resident columnar MarketPrice store.
+
+Pricing services mostly ask the same small questions of MarketPrice - "sold
+prices for these cards in the last N days", "active asks for this card" - and
+each one costs a database round trip. When PRICE_STORE_ENABLED is set, every
+row from the last PRICE_STORE_DAYS days is held in memory as numpy columns
+sorted by (card_id, id), and those lookups become array slices:
+
+    store = get_price_store()           # None unless enabled and loaded
+    if store is not None and store.covers(days):
+        rows = store.rows(card_ids, listing_type="sold", since=cutoff)
+        rows.prices, rows.timestamps, rows.treatments, ...
+
+Columns: id, card_id, price, effective timestamp (COALESCE(sold_date,
+scraped_at)), dictionary-encoded treatment / product_subtype / platform /
+listing_type, and a flag bitmask (bulk lot, graded, auction).
+
+Keeping it current:
+- load() reads the window once (at startup, in a background task).
+- refresh() re-reads the rows that changed since the last read's
+  PriceWatermark (new ids, and sales re-scraped since, which covers active
+  listings the scraper converts to sales in place) and upserts them by id; the
+  API polls it every PRICE_STORE_POLL_SECONDS, and every
+  PRICE_STORE_RELOAD_SECONDS it reloads the window instead, which picks up
+  other in-place updates and deletes and drops rows that aged out.
+- Writers in the same process already publish_card_updates() after commit; the
+  store subscribes and reloads just those cards.
+
+Updates build new arrays and swap them in under a lock, so readers never see a
+half-applied change. If the window would exceed PRICE_STORE_MAX_MB the store
+stays (or becomes) unavailable and callers keep querying the database.
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterable, Optional
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+
+from app.core.cache_invalidation import CardUpdateEvent, subscribe
+from app.core.config import settings
+from app.core.typing import col
+from app.db import engine
+from app.models.market import MarketPrice
+from app.services.price_watermark import PriceWatermark
+
+logger = logging.getLogger(__name__)
+
+# Flag bits
+FLAG_BULK_LOT = 1
+FLAG_GRADED = 2
+FLAG_AUCTION = 4
+
+_ID_BITS = 40  # (card_id << _ID_BITS) | id orders rows by card, then id
+_ROW_BYTES = 5 * 8 + 4 * 2 + 1  # keys/ids/card_ids/prices/timestamps, four int16 codes, flags
+_FETCH_SIZE = 5000  # Rows per server-side cursor fetch while loading
+
+_effective_at = func.coalesce(MarketPrice.sold_date, MarketPrice.scraped_at)
+
+_LOAD_COLUMNS = (
+    col(MarketPrice.id),
+    col(MarketPrice.card_id),
+    col(MarketPrice.price),
+    _effective_at.label("effective_at"),
+    col(MarketPrice.listing_type),
+    col(MarketPrice.treatment),
+    col(MarketPrice.product_subtype),
+    col(MarketPrice.platform),
+    col(MarketPrice.is_bulk_lot),
+    col(MarketPrice.grading),
+    col(MarketPrice.listing_format),
+)
+
+
+def _timestamp(d: datetime) -> float:
+    """Epoch seconds, treating naive datetimes from the database as UTC."""
+    return (d if d.tzinfo is not None else d.replace(tzinfo=timezone.utc)).timestamp()
+
+
+class _Codes:
+    """Append-only string dictionary. Codes stay stable across snapshots; None is -1."""
+
+    def __init__(self) -> None:
+        self._codes: dict[str, int] = {}
+        self._values: list[Optional[str]] = [None]  # decode table; index -1 -> None
+
+    def encode(self, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self._codes)
+            self._values.insert(code, value)
+        return code
+
+    def code(self, value: str) -> Optional[int]:
+        return self._codes.get(value)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return np.array(self._values, dtype=object)[codes]
+
+
+@dataclass(frozen=True)
+class PriceColumns:
+    """One immutable snapshot of the store, rows sorted by (card_id, id)."""
+
+    keys: np.ndarray  # int64 (card_id << 40) | id
+    ids: np.ndarray  # int64
+    card_ids: np.ndarray  # int64
+    prices: np.ndarray  # float64
+    timestamps: np.ndarray  # float64 epoch seconds, COALESCE(sold_date, scraped_at)
+    listing_types: np.ndarray  # int16 codes
+    treatments: np.ndarray  # int16 codes
+    subtypes: np.ndarray  # int16 codes
+    platforms: np.ndarray  # int16 codes
+    flags: np.ndarray  # uint8 bitmask
+
+    FIELDS = (
+        "keys", "ids", "card_ids", "prices", "timestamps",
+        "listing_types", "treatments", "subtypes", "platforms", "flags",
+    )  # fmt: skip
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in self.FIELDS)
+
+    def take(self, index: np.ndarray) -> "PriceColumns":
+        return PriceColumns(*(getattr(self, name)[index] for name in self.FIELDS))
+
+    def merge(self, other: "PriceColumns") -> "PriceColumns":
+        """Insert `other` (sorted) into this snapshot, keeping (card_id, id) order."""
+        if not len(other):
+            return self
+        at = np.searchsorted(self.keys, other.keys)
+        return PriceColumns(*(np.insert(getattr(self, name), at, getattr(other, name)) for name in self.FIELDS))
+
+    @classmethod
+    def _build(cls, ids, card_ids, prices, timestamps, listing_types, treatments, subtypes, platforms, flags):
+        ids = np.asarray(ids, dtype=np.int64)
+        card_ids = np.asarray(card_ids, dtype=np.int64)
+        keys = (card_ids << _ID_BITS) | ids
+        order = np.argsort(keys, kind="stable")
+        return cls(
+            keys=keys[order],
+            ids=ids[order],
+            card_ids=card_ids[order],
+            prices=np.asarray(prices, dtype=np.float64)[order],
+            timestamps=np.asarray(timestamps, dtype=np.float64)[order],
+            listing_types=np.asarray(listing_types, dtype=np.int16)[order],
+            treatments=np.asarray(treatments, dtype=np.int16)[order],
+            subtypes=np.asarray(subtypes, dtype=np.int16)[order],
+            platforms=np.asarray(platforms, dtype=np.int16)[order],
+            flags=np.asarray(flags, dtype=np.uint8)[order],
+        )
+
+
+@dataclass
+class PriceRows:
+    """Result of PriceStore.rows(): parallel arrays, strings decoded."""
+
+    ids: np.ndarray
+    card_ids: np.ndarray
+    prices: np.ndarray
+    timestamps: np.ndarray  # epoch seconds
+    treatments: np.ndarray  # object (str or None)
+    variants: np.ndarray  # object: product_subtype if set, else treatment
+    platforms: np.ndarray  # object
+    flags: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+class PriceStore:
+    """
+    In-memory columnar copy of recent MarketPrice rows.
+
+    Thread-safe: writers (load/refresh/reload_cards) serialize on a lock and
+    swap in a new PriceColumns snapshot; readers use whatever snapshot is
+    current when they start.
+    """
+
+    def __init__(self, days: Optional[int] = None, max_mb: Optional[int] = None):
+        self.days = days if days is not None else settings.PRICE_STORE_DAYS
+        self.max_bytes = (max_mb if max_mb is not None else settings.PRICE_STORE_MAX_MB) * 1024 * 1024
+        self._columns: Optional[PriceColumns] = None
+        self._watermark = PriceWatermark()
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._listing_types = _Codes()
+        self._treatments = _Codes()
+        self._subtypes = _Codes()
+        self._platforms = _Codes()
+
+    @property
+    def ready(self) -> bool:
+        return self._columns is not None
+
+    def covers(self, days: int) -> bool:
+        """True if the store is loaded and holds every row of a `days`-day lookback."""
+        return self._columns is not None and days <= self.days
+
+    def stats(self) -> dict[str, Any]:
+        columns = self._columns
+        return {
+            "ready": columns is not None,
+            "rows": len(columns) if columns is not None else 0,
+            "bytes": columns.nbytes if columns is not None else 0,
+            "max_bytes": self.max_bytes,
+            "days": self.days,
+            "max_id": self._watermark.last_id,
+            "loaded_at": self._loaded_at,
+        }
+
+    # ----- loading -----
+
+    def load(self, bind: Optional[Engine] = None) -> bool:
+        """(Re)load every row of the window. Returns False if it would exceed the memory budget."""
+        started = time.perf_counter()
+        cutoff = datetime.now(timezone.utc) - timedelta(days=self.days)
+        with self._lock:
+            with (bind or engine).connect() as conn:
+                count = conn.execute(select(func.count()).select_from(MarketPrice).where(_effective_at >= cutoff))
+                expected = int(count.scalar() or 0)
+                if expected * _ROW_BYTES > self.max_bytes:
+                    logger.warning(
+                        f"[PriceStore] {expected} rows over {self.days}d exceed "
+                        f"PRICE_STORE_MAX_MB={self.max_bytes // (1024 * 1024)}; store disabled"
+                    )
+                    self._columns = None
+                    return False
+                # Taken before reading, so rows written during the read are re-read by refresh()
+                watermark = PriceWatermark.current(conn)
+                columns = self._read(conn, _effective_at >= cutoff)
+
+            self._columns = columns
+            self._watermark = self._watermark.advance(watermark)
+            self._loaded_at = time.time()
+
+        elapsed = time.perf_counter() - started
+        logger.info(f"[PriceStore] Loaded {len(columns)} rows ({columns.nbytes / 1e6:.1f} MB) in {elapsed:.2f}s")
+        return True
+
+    def refresh(self, bind: Optional[Engine] = None) -> int:
+        """
+        Bring the store up to date.
+
+        Upserts rows changed since the last read's watermark, or reloads the
+        whole window if PRICE_STORE_RELOAD_SECONDS have passed since the last
+        load.
+
+        Returns:
+            Number of rows added (re-read rows replace their old copy and aren't counted)
+        """
+        current = self._columns
+        if current is None or time.time() - self._loaded_at >= settings.PRICE_STORE_RELOAD_SECONDS:
+            before = len(current) if current is not None else 0
+            if not self.load(bind) or self._columns is None:
+                return 0
+            return max(0, len(self._columns) - before)
+
+        added = 0
+        cutoff = datetime.now(timezone.utc) - timedelta(days=self.days)
+        with self._lock:
+            with (bind or engine).connect() as conn:
+                watermark = PriceWatermark.current(conn)
+                changed = self._read(conn, self._watermark.changed(), _effective_at >= cutoff)
+            current = self._columns
+            if len(changed) and current is not None:
+                added = int((~np.isin(changed.ids, current.ids)).sum())
+                self._install(current.take(~np.isin(current.ids, changed.ids)).merge(changed))
+            self._watermark = self._watermark.advance(watermark)
+        return added
+
+    def reload_cards(self, card_ids: Iterable[int], bind: Optional[Engine] = None) -> int:
+        """Replace the rows of `card_ids` with their current database rows. Returns rows loaded."""
+        ids = sorted({int(cid) for cid in card_ids})
+        if not ids or self._columns is None:
+            return 0
+        cutoff = datetime.now(timezone.utc) - timedelta(days=self.days)
+
+        with self._lock:
+            with (bind or engine).connect() as conn:
+                fresh = self._read(conn, col(MarketPrice.card_id).in_(ids), _effective_at >= cutoff)
+            current = self._columns
+            kept = current.take(~np.isin(current.card_ids, ids))
+            self._install(kept.merge(fresh))
+        return len(fresh)
+
+    def on_card_update(self, event: CardUpdateEvent) -> None:
+        """cache_invalidation subscriber: reload cards written in this process."""
+        if self._columns is not None:
+            self.reload_cards(event.card_ids)
+
+    def _install(self, columns: PriceColumns) -> None:
+        if columns.nbytes > self.max_bytes:
+            logger.warning("[PriceStore] Memory budget exceeded after update; store disabled until next reload")
+            self._columns = None
+            return
+        self._columns = columns
+
+    def _read(self, conn: Any, *where: Any) -> PriceColumns:
+        """Stream matching MarketPrice rows into a sorted PriceColumns."""
+        statement = select(*_LOAD_COLUMNS).where(*where)
+        result = conn.execution_options(stream_results=True, yield_per=_FETCH_SIZE).execute(statement)
+
+        ids, card_ids, prices, timestamps = [], [], [], []
+        listing_types, treatments, subtypes, platforms, flags = [], [], [], [], []
+        for row in result:
+            if row.price is None or row.effective_at is None:
+                continue
+            ids.append(row.id)
+            card_ids.append(row.card_id)
+            prices.append(row.price)
+            timestamps.append(_timestamp(row.effective_at))
+            listing_types.append(self._listing_types.encode(row.listing_type))
+            treatments.append(self._treatments.encode(row.treatment))
+            subtypes.append(self._subtypes.encode(row.product_subtype or None))
+            platforms.append(self._platforms.encode(row.platform))
+            flags.append(
+                (FLAG_BULK_LOT if row.is_bulk_lot else 0)
+                | (FLAG_GRADED if row.grading else 0)
+                | (FLAG_AUCTION if row.listing_format == "auction" else 0)
+            )
+        return PriceColumns._build(
+            ids, card_ids, prices, timestamps, listing_types, treatments, subtypes, platforms, flags
+        )
+
+    # ----- queries -----
+
+    def rows(
+        self,
+        card_ids: Optional[Iterable[int]] = None,
+        listing_type: Optional[str] = "sold",
+        since: Optional[datetime] = None,
+        treatment: Optional[str] = None,
+        include_bulk_lots: bool = False,
+    ) -> PriceRows:
+        """
+        Rows for the given cards (all cards if None), newest snapshot.
+
+        Args:
+            card_ids: Cards to return
+            listing_type: 'sold', 'active' or None for both
+            since: Only rows whose effective timestamp is at or after this
+            treatment: Only rows of this treatment
+            include_bulk_lots: Include rows flagged as bulk lots
+
+        Raises:
+            RuntimeError: if the store isn't loaded (check ready/covers() first)
+        """
+        columns = self._columns
+        if columns is None:
+            raise RuntimeError("PriceStore is not loaded")
+
+        if card_ids is None:
+            index = np.arange(len(columns))
+        else:
+            wanted = np.unique(np.fromiter((int(cid) for cid in card_ids), dtype=np.int64))
+            starts = np.searchsorted(columns.card_ids, wanted, side="left")
+            ends = np.searchsorted(columns.card_ids, wanted, side="right")
+            index = np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)] or [np.arange(0)])
+
+        mask = np.ones(len(index), dtype=bool)
+        if listing_type is not None:
+            code = self._listing_types.code(listing_type)
+            mask &= columns.listing_types[index] == (code if code is not None else -2)
+        if since is not None:
+            mask &= columns.timestamps[index] >= _timestamp(since)
+        if treatment is not None:
+            code = self._treatments.code(treatment)
+            mask &= columns.treatments[index] == (code if code is not None else -2)
+        if not include_bulk_lots:
+            mask &= (columns.flags[index] & FLAG_BULK_LOT) == 0
+        index = index[mask]
+
+        treatments = self._treatments.decode(columns.treatments[index])
+        subtype_codes = columns.subtypes[index]
+        return PriceRows(
+            ids=columns.ids[index],
+            card_ids=columns.card_ids[index],
+            prices=columns.prices[index],
+            timestamps=columns.timestamps[index],
+            treatments=treatments,
+            variants=np.where(subtype_codes >= 0, self._subtypes.decode(subtype_codes), treatments),
+            platforms=self._platforms.decode(columns.platforms[index]),
+            flags=columns.flags[index],
+        )
+
+
+price_store = PriceStore()
+_subscribed = False
+
+
+def get_price_store() -> Optional[PriceStore]:
+    """The process's price store if PRICE_STORE_ENABLED and loaded, else None."""
+    if settings.PRICE_STORE_ENABLED and price_store.ready:
+        return price_store
+    return None
+
+
+def start_price_store(bind: Optional[Engine] = None) -> bool:
+    """Load the store and subscribe it to card update events. Call from a background thread."""
+    global _subscribed
+    if not _subscribed:
+        subscribe(price_store.on_card_update)
+        _subscribed = True
+    return price_store.load(bind)
+
+
+__all__ = [
+    "PriceStore",
+    "PriceColumns",
+    "PriceRows",
+    "FLAG_BULK_LOT",
+    "FLAG_GRADED",
+    "FLAG_AUCTION",
+    "price_store",
+    "get_price_store",
+    "start_price_store",
+]
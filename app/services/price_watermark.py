@@ -0,0 +1,100 @@
+"""
+MarketPrice change watermarks.
+
+Readers that keep a copy of MarketPrice up to date incrementally (PriceStore,
+the AR model's SaleHistoryCache, price alert ChangedCards) can't follow the id
+alone: scripts/scrape_card.py converts a tracked active listing into a sale in
+place, so the row keeps its id and only gets a new scraped_at. A
+PriceWatermark is the highest id and the highest sold scraped_at seen:
+
+    watermark = PriceWatermark.current(conn)     # before reading
+    ... read everything ...
+    rows = conn.execute(select(...).where(previous.changed()))  # later: new or re-scraped rows
+
+changed() re-reads WATERMARK_MARGIN before the scraped_at mark, for writers
+whose transaction commits after a later scraped_at was already read; callers
+upsert the rows it returns by id. changed_until() is the exact range between
+two watermarks, for callers that must not see a row twice. Deletes and
+updates that leave scraped_at alone still need a periodic full re-read.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.core.typing import col
+from app.models.market import MarketPrice
+
+# How far before the scraped_at mark changed() re-reads
+WATERMARK_MARGIN = timedelta(hours=1)
+
+
+@dataclass(frozen=True)
+class PriceWatermark:
+    """Highest MarketPrice id and highest scraped_at of a sold row seen so far."""
+
+    last_id: int = 0
+    sold_scraped_at: Optional[datetime] = None
+
+    @classmethod
+    def current(cls, conn: Any, now: Optional[datetime] = None) -> "PriceWatermark":
+        """
+        The table's current maxima (two index lookups).
+
+        sold_scraped_at is UTC (naive database values are taken as UTC) and
+        capped at now, so a writer with a fast clock can't push the mark past
+        rows written after it.
+        """
+        max_id, max_scraped_at = conn.execute(
+            select(
+                select(func.max(MarketPrice.id)).scalar_subquery(),
+                select(func.max(MarketPrice.scraped_at)).where(MarketPrice.listing_type == "sold").scalar_subquery(),
+            )
+        ).one()
+        if max_scraped_at is not None:
+            if max_scraped_at.tzinfo is None:
+                max_scraped_at = max_scraped_at.replace(tzinfo=timezone.utc)
+            max_scraped_at = min(max_scraped_at, now or datetime.now(timezone.utc))
+        return cls(max_id or 0, max_scraped_at)
+
+    def scraped_since(self, margin: timedelta = WATERMARK_MARGIN) -> Optional[datetime]:
+        """Sold rows scraped at or after this are re-read by changed() (None: every sold row)."""
+        return self.sold_scraped_at - margin if self.sold_scraped_at is not None else None
+
+    def changed(self, margin: timedelta = WATERMARK_MARGIN) -> ColumnElement:
+        """Rows inserted after this watermark, or sold rows re-scraped since margin before it."""
+        sold = MarketPrice.listing_type == "sold"
+        since = self.scraped_since(margin)
+        if since is not None:
+            sold = and_(sold, col(MarketPrice.scraped_at) >= since)
+        return or_(col(MarketPrice.id) > self.last_id, sold)
+
+    def changed_until(self, upto: "PriceWatermark") -> Optional[ColumnElement]:
+        """Rows between this watermark and a later one, each range exclusive below (None if nothing)."""
+        conditions = []
+        if upto.last_id > self.last_id:
+            conditions.append(and_(col(MarketPrice.id) > self.last_id, col(MarketPrice.id) <= upto.last_id))
+        if upto.sold_scraped_at is not None and (
+            self.sold_scraped_at is None or upto.sold_scraped_at > self.sold_scraped_at
+        ):
+            scraped = [MarketPrice.listing_type == "sold", col(MarketPrice.scraped_at) <= upto.sold_scraped_at]
+            if self.sold_scraped_at is not None:
+                scraped.append(col(MarketPrice.scraped_at) > self.sold_scraped_at)
+            conditions.append(and_(*scraped))
+        return or_(*conditions) if conditions else None
+
+    def advance(self, other: "PriceWatermark") -> "PriceWatermark":
+        """The later of the two marks, field by field."""
+        scraped_at = self.sold_scraped_at
+        if other.sold_scraped_at is not None and (scraped_at is None or other.sold_scraped_at > scraped_at):
+            scraped_at = other.sold_scraped_at
+        return PriceWatermark(max(self.last_id, other.last_id), scraped_at)
+
+
+__all__ = [
+    "WATERMARK_MARGIN",
+    "PriceWatermark",
+]
@@ -0,0 +1,210 @@
+"""
+Bulk sale history export.
+
+API consumers syncing full sale history used to walk /cards/{id}/history card by
+card with OFFSET pagination. This module streams every matching sale in one
+response instead:
+
+- One query over MarketPrice joined to Card, read through a server-side cursor
+  (stream_results + yield_per) so memory stays constant however many rows match.
+- Rows are ordered by (scraped_at, id) and every row carries a keyset cursor, so
+  an interrupted export resumes with ?cursor=<last cursor received>. Keying on
+  scraped_at rather than id alone picks up active listings converted to sales
+  in place after the cursor was issued: they keep their old id but get a new
+  scraped_at. Rows updated that way are exported again (consumers upsert by
+  id). A row committed after a later scraped_at was already exported (a long
+  scrape transaction) is only picked up by a full re-export.
+- Cursors issued before the scraped_at ordering ("id:asc") still resume, by id.
+- Output is NDJSON (one SaleExportOut object per line) or CSV with the same
+  columns, written a fetch batch at a time.
+
+    statement = build_sales_export_query(start=start, platform="ebay")
+    return StreamingResponse(stream_sales_export(engine, statement, "ndjson"), media_type=...)
+"""
+
+import csv
+import io
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql import Select
+
+from app.core.config import settings
+from app.core.fast_json import dumps, json_datetime, schema_encoder
+from app.core.pagination import InvalidCursorError, decode_cursor, encode_cursor, keyset_after
+from app.core.typing import col
+from app.models.card import Card
+from app.models.market import MarketPrice
+from app.schemas import SaleExportOut
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("ndjson", "csv")
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# Sort identity embedded in export cursors
+EXPORT_CURSOR_SORT = "scraped_at:asc"
+# Cursors issued when exports were ordered by id alone
+LEGACY_EXPORT_CURSOR_SORT = "id:asc"
+
+# Columns selected per field of SaleExportOut (except cursor, added per row)
+_EXPORT_COLUMNS = {
+    "id": MarketPrice.id,
+    "card_id": MarketPrice.card_id,
+    "card_name": Card.name,
+    "card_slug": Card.slug,
+    "set_name": Card.set_name,
+    "product_type": Card.product_type,
+    "platform": MarketPrice.platform,
+    "price": MarketPrice.price,
+    "sold_date": func.coalesce(MarketPrice.sold_date, MarketPrice.scraped_at),
+    "treatment": MarketPrice.treatment,
+    "product_subtype": MarketPrice.product_subtype,
+    "quantity": MarketPrice.quantity,
+    "is_bulk_lot": MarketPrice.is_bulk_lot,
+    "condition": MarketPrice.condition,
+    "grading": MarketPrice.grading,
+    "listing_format": MarketPrice.listing_format,
+    "bid_count": MarketPrice.bid_count,
+    "shipping_cost": MarketPrice.shipping_cost,
+    "seller_name": MarketPrice.seller_name,
+    "title": MarketPrice.title,
+    "url": MarketPrice.url,
+    "scraped_at": MarketPrice.scraped_at,
+}
+
+EXPORT_FIELDS: List[str] = list(SaleExportOut.model_fields)
+
+
+def build_sales_export_query(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    platform: Optional[str] = None,
+    product_type: Optional[str] = None,
+    after: Optional[Tuple[datetime, int]] = None,
+    after_id: Optional[int] = None,
+) -> Select:
+    """
+    Sold listings matching the filters, oldest scraped_at (then id) first.
+
+    Args:
+        start: Include sales on/after this time (COALESCE(sold_date, scraped_at))
+        end: Include sales before this time
+        platform: MarketPrice.platform ('ebay', 'opensea', ...)
+        product_type: Card.product_type ('Single', 'Box', ...)
+        after: Resume after this (scraped_at, id) (from decode_export_cursor())
+        after_id: Resume after this MarketPrice.id (from a legacy cursor)
+    """
+    sale_date = _EXPORT_COLUMNS["sold_date"]
+    statement = (
+        select(*[column.label(name) for name, column in _EXPORT_COLUMNS.items()])
+        .join(Card, col(Card.id) == col(MarketPrice.card_id))
+        .where(MarketPrice.listing_type == "sold")
+        .order_by(col(MarketPrice.scraped_at), col(MarketPrice.id))
+    )
+    if start is not None:
+        statement = statement.where(sale_date >= start)
+    if end is not None:
+        statement = statement.where(sale_date < end)
+    if platform:
+        statement = statement.where(MarketPrice.platform == platform)
+    if product_type:
+        statement = statement.where(Card.product_type == product_type)
+    if after is not None:
+        statement = statement.where(
+            keyset_after(col(MarketPrice.scraped_at), col(MarketPrice.id), *after, descending=False)
+        )
+    if after_id is not None:
+        statement = statement.where(col(MarketPrice.id) > after_id)
+    return statement
+
+
+def decode_export_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    build_sales_export_query() arguments that resume after the row a cursor came from.
+
+    Raises:
+        InvalidCursorError: if the cursor is malformed or wasn't issued by an export
+    """
+    try:
+        scraped_at, row_id = decode_cursor(cursor, EXPORT_CURSOR_SORT)
+    except InvalidCursorError as e:
+        try:
+            _, row_id = decode_cursor(cursor, LEGACY_EXPORT_CURSOR_SORT)
+        except InvalidCursorError:
+            raise e from None
+        return {"after_id": row_id}
+    if not isinstance(scraped_at, datetime):
+        raise InvalidCursorError("Invalid pagination cursor")
+    return {"after": (scraped_at, row_id)}
+
+
+def _cursor(row: Any) -> str:
+    return encode_cursor(EXPORT_CURSOR_SORT, row.scraped_at, row.id)
+
+
+def _ndjson_chunk(rows: List[Any]) -> bytes:
+    encode = schema_encoder(SaleExportOut)
+    lines = []
+    for row in rows:
+        values = dict(row._mapping)
+        values["cursor"] = _cursor(row)
+        lines.append(dumps(encode(values)))
+    lines.append(b"")
+    return b"\n".join(lines)
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return json_datetime(value)
+    return "" if value is None else value
+
+
+def _csv_chunk(rows: List[Any], header: bool = False) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if header:
+        writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        values = dict(row._mapping)
+        values["cursor"] = _cursor(row)
+        writer.writerow([_csv_value(values.get(name)) for name in EXPORT_FIELDS])
+    return buffer.getvalue().encode("utf-8")
+
+
+def stream_sales_export(bind: Engine, statement: Select, fmt: str = "ndjson") -> Iterator[bytes]:
+    """
+    Run an export query on its own connection and yield encoded chunks.
+
+    The connection is held (and the server-side cursor open) only while the
+    iterator is consumed; it is released when the response finishes or the
+    client disconnects. Each chunk holds up to EXPORT_FETCH_SIZE rows.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+    if fmt == "csv":
+        yield _csv_chunk([], header=True)
+
+    rows_sent = 0
+    with bind.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=settings.EXPORT_FETCH_SIZE).execute(statement)
+        for partition in result.partitions():
+            rows_sent += len(partition)
+            yield _ndjson_chunk(partition) if fmt == "ndjson" else _csv_chunk(partition)
+    logger.info(f"[Export] Streamed {rows_sent} sales ({fmt})")
+
+
+__all__ = [
+    "EXPORT_FORMATS",
+    "MEDIA_TYPES",
+    "EXPORT_CURSOR_SORT",
+    "LEGACY_EXPORT_CURSOR_SORT",
+    "EXPORT_FIELDS",
+    "build_sales_export_query",
+    "decode_export_cursor",
+    "stream_sales_export",
+]
@@ -0,0 +1,118 @@
+"""
+Trigram text search for cards and listings.
+
+Card names and listing titles are searched by substring (ILIKE '%term%'), which a
+B-tree index can't serve. On PostgreSQL, pg_trgm GIN indexes
+(ix_card_name_trgm, ix_marketprice_title_trgm) serve both the substring match
+and the fuzzy `%` similarity operator, and similarity() ranks results:
+
+    query = select(Card).where(matches(Card.name, term)).order_by(*ranked(Card.name, term), Card.id)
+
+SQLite (unit tests) has no pg_trgm, so this module registers a Python
+similarity() implementing the same trigram algorithm on every SQLite
+connection, and matches() compiles to `similarity(...) >= threshold` there.
+"""
+
+import re
+import sqlite3
+from typing import Any, List, Set
+
+from sqlalchemy import Float, event, func, or_
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.elements import ColumnElement
+from sqlalchemy.sql.expression import FunctionElement, desc
+from sqlalchemy.types import Boolean
+
+# pg_trgm's default pg_trgm.similarity_threshold, used by the `%` operator
+SIMILARITY_THRESHOLD = 0.3
+
+# Terms shorter than one trigram can't use the GIN indexes
+MIN_TRIGRAM_LENGTH = 3
+
+_WORD_RE = re.compile(r"[^\W_]+")
+
+
+def trigrams(text: str) -> Set[str]:
+    """
+    Trigram set of a string, as pg_trgm's show_trgm() computes it.
+
+    Each alphanumeric word is lowercased and padded with two spaces in front and
+    one behind, then split into every 3-character window.
+    """
+    result: Set[str] = set()
+    for word in _WORD_RE.findall(text.lower()):
+        padded = f"  {word} "
+        result.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+def trigram_similarity(a: Any, b: Any) -> float:
+    """pg_trgm similarity(): shared trigrams over all distinct trigrams of both strings."""
+    if a is None or b is None:
+        return 0.0
+    ta, tb = trigrams(str(a)), trigrams(str(b))
+    if not ta or not tb:
+        return 0.0
+    return len(ta & tb) / len(ta | tb)
+
+
+@event.listens_for(Engine, "connect")
+def register_sqlite_similarity(dbapi_connection, connection_record):
+    """Provide similarity() on SQLite connections (PostgreSQL gets it from pg_trgm)."""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.create_function("similarity", 2, trigram_similarity, deterministic=True)
+
+
+def like_pattern(term: str) -> str:
+    """'%term%' with LIKE wildcards in the term escaped (use with escape='\\\\')."""
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+class _TrigramSimilar(FunctionElement):
+    """`column % term`: similarity above SIMILARITY_THRESHOLD, GIN-indexable on PostgreSQL."""
+
+    type = Boolean()
+    inherit_cache = True
+    name = "trigram_similar"
+
+
+@compiles(_TrigramSimilar)
+def _compile_trigram_similar(element, compiler, **kw):
+    column, term = list(element.clauses)
+    return compiler.process(func.similarity(column, term) >= SIMILARITY_THRESHOLD, **kw)
+
+
+@compiles(_TrigramSimilar, "postgresql")
+def _compile_trigram_similar_pg(element, compiler, **kw):
+    column, term = list(element.clauses)
+    # Custom ops get their "%" escaped for the driver's paramstyle
+    return compiler.process(column.op("%", is_comparison=True)(term), **kw)
+
+
+def contains(column: Any, term: str) -> ColumnElement:
+    """Case-insensitive substring match (served by the trigram GIN index on PostgreSQL)."""
+    return column.ilike(like_pattern(term), escape="\\")
+
+
+def matches(column: Any, term: str) -> ColumnElement:
+    """Substring match, or close enough by trigram similarity to tolerate typos."""
+    return or_(contains(column, term), _TrigramSimilar(column, term))
+
+
+def ranked(column: Any, term: str) -> List[Any]:
+    """ORDER BY terms putting the most similar values first, then alphabetical."""
+    return [desc(func.similarity(column, term, type_=Float)), column]
+
+
+__all__ = [
+    "SIMILARITY_THRESHOLD",
+    "MIN_TRIGRAM_LENGTH",
+    "trigrams",
+    "trigram_similarity",
+    "like_pattern",
+    "contains",
+    "matches",
+    "ranked",
+]
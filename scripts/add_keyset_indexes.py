@@ -0,0 +1,91 @@
+"""
+Add composite (sort key, id) indexes for keyset pagination.
+
+/market/listings and /cards/{id}/history page with opaque cursors (see
+app/core/pagination.py). Each cursor page is an index seek on
+(filter columns, sort expression, id), so these indexes make page 500 cost the
+same as page 1. New databases get them from the MarketPrice model; this script
+adds them to existing ones.
+
+Indexes are built CONCURRENTLY so the marketprice table stays writable.
+
+Run: PYTHONPATH=. poetry run python scripts/add_keyset_indexes.py
+"""
+
+from sqlalchemy import text
+from app.db import engine
+
+
+def add_keyset_indexes():
+    """Create keyset pagination indexes and drop the one they supersede."""
+
+    indexes = [
+        # /market/listings?listing_type=active (default sort: listed_at)
+        (
+            "ix_marketprice_listing_listed_keyset",
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_marketprice_listing_listed_keyset
+            ON marketprice (listing_type, COALESCE(listed_at, scraped_at), id)
+            """,
+        ),
+        # /market/listings?sort_by=sold_date
+        (
+            "ix_marketprice_listing_sold_keyset",
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_marketprice_listing_sold_keyset
+            ON marketprice (listing_type, COALESCE(sold_date, scraped_at), id)
+            """,
+        ),
+        # /market/listings?sort_by=scraped_at (replaces ix_marketprice_listing_scraped)
+        (
+            "ix_marketprice_listing_scraped_keyset",
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_marketprice_listing_scraped_keyset
+            ON marketprice (listing_type, scraped_at, id)
+            """,
+        ),
+        # /market/listings?sort_by=price
+        (
+            "ix_marketprice_listing_price_keyset",
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_marketprice_listing_price_keyset
+            ON marketprice (listing_type, price, id)
+            """,
+        ),
+        # /cards/{id}/history
+        (
+            "ix_marketprice_card_sold_keyset",
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_marketprice_card_sold_keyset
+            ON marketprice (card_id, listing_type, COALESCE(sold_date, scraped_at), id)
+            """,
+        ),
+    ]
+
+    print("Adding keyset pagination indexes to marketprice table...")
+    print("=" * 60)
+
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for name, sql in indexes:
+            try:
+                print(f"\n Creating: {name}")
+                conn.execute(text(sql))
+                print(f" ✓ {name} created successfully")
+            except Exception as e:
+                print(f" ✗ Error creating {name}: {e}")
+                print("\nStopping: superseded index left in place.")
+                return
+
+        # (listing_type, scraped_at) is a prefix of ix_marketprice_listing_scraped_keyset
+        print("\n Dropping: ix_marketprice_listing_scraped (superseded)")
+        conn.execute(text("DROP INDEX CONCURRENTLY IF EXISTS ix_marketprice_listing_scraped"))
+        print(" ✓ ix_marketprice_listing_scraped dropped")
+
+    print("\n" + "=" * 60)
+    print("Index creation complete!")
+    print("\nRun EXPLAIN ANALYZE on /market/listings?cursor=... queries to verify index seeks.")
+
+
+if __name__ == "__main__":
+    add_keyset_indexes()
@@ -0,0 +1,68 @@
+"""
+Enable pg_trgm and add trigram GIN indexes for card and listing search.
+
+/cards?search= and /market/listings?search= match card names and listing titles
+by substring (ILIKE '%term%') and, for cards, by trigram similarity (see
+app/services/search.py). Without these indexes every search scans the table.
+New databases get them from the Card/MarketPrice models; this script adds them
+to existing ones.
+
+Indexes are built CONCURRENTLY so the tables stay writable.
+
+Run: PYTHONPATH=. poetry run python scripts/add_trigram_indexes.py
+"""
+
+from sqlalchemy import text
+from app.db import engine
+
+
+def add_trigram_indexes():
+    """Create the pg_trgm extension and the trigram GIN indexes."""
+
+    statements = [
+        # similarity(), the % operator and gin_trgm_ops
+        (
+            "pg_trgm extension",
+            "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        ),
+        # /cards?search= (ILIKE and % on card.name)
+        (
+            "ix_card_name_trgm",
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_card_name_trgm
+            ON card USING gin (name gin_trgm_ops)
+            """,
+        ),
+        # /market/listings?search= (ILIKE on marketprice.title)
+        (
+            "ix_marketprice_title_trgm",
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_marketprice_title_trgm
+            ON marketprice USING gin (title gin_trgm_ops)
+            """,
+        ),
+    ]
+
+    print("Adding trigram search indexes...")
+    print("=" * 60)
+
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for name, sql in statements:
+            try:
+                print(f"\n Creating: {name}")
+                conn.execute(text(sql))
+                print(f" ✓ {name} created successfully")
+            except Exception as e:
+                print(f" ✗ Error creating {name}: {e}")
+                if name == "pg_trgm extension":
+                    print("\nStopping: pg_trgm is required (needs a role allowed to CREATE EXTENSION).")
+                    return
+
+    print("\n" + "=" * 60)
+    print("Index creation complete!")
+    print("\nRun scripts/benchmark_search.py to compare search latency with and without the indexes.")
+
+
+if __name__ == "__main__":
+    add_trigram_indexes()
@@ -10,355 +10,47 @@ For each historical point in time, we:
 
 Outputs CSV data for analysis in Jupyter notebook.
 
+Predictions are replayed in memory (app.services.order_book_replay): the
+listings are read once, optionally kept in a snapshot file for repeated
+tuning runs, and cards are replayed across a process pool.
+
 Usage:
     python scripts/backtest_orderbook.py --days 90 --output data/orderbook_backtest.csv
     python scripts/backtest_orderbook.py --dry-run  # Preview without saving
+    python scripts/backtest_orderbook.py --snapshot data/orderbook_replay.npz --workers 8  # Reuse data across runs
 """
 
 import argparse
 import csv
 import logging
-from dataclasses import dataclass
+import os
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Optional
 
-from sqlalchemy import text
 from sqlmodel import Session
 
 from app.db import engine
-from app.services.confidence import calculate_orderbook_confidence
+from app.services.order_book_replay import LOOKBACK_DAYS, BacktestResult, ReplaySnapshot, replay_backtest
 
 logging.basicConfig(level=logging.INFO, format="%(message)s")
 logger = logging.getLogger(__name__)
 
 
-@dataclass
-class BacktestResult:
-    """Single backtest observation."""
-
-    card_id: int
-    card_name: str
-    treatment: Optional[str]
-    prediction_date: datetime
-    predicted_floor: float
-    confidence: float
-    source: str  # "order_book" or "sales_fallback"
-    total_listings: int
-    next_sale_date: datetime
-    next_sale_price: float
-    error: float  # predicted - actual
-    absolute_error: float
-    percentage_error: float
-    days_to_sale: int
-
-
-def get_cards_with_sales(session: Session, min_sales: int = 10) -> list[dict]:
-    """Get cards that have sufficient sales data for backtesting."""
-    query = text("""
-        SELECT
-            c.id,
-            c.name,
-            COUNT(*) as sale_count
-        FROM card c
-        JOIN marketprice mp ON mp.card_id = c.id
-        WHERE mp.listing_type = 'sold'
-          AND mp.is_bulk_lot = FALSE
-        GROUP BY c.id, c.name
-        HAVING COUNT(*) >= :min_sales
-        ORDER BY sale_count DESC
-    """)
-    result = session.execute(query, {"min_sales": min_sales})
-    return [dict(row._mapping) for row in result.fetchall()]
-
-
-def get_treatments_for_card(session: Session, card_id: int) -> list[str]:
-    """Get distinct treatments with sales for a card."""
-    query = text("""
-        SELECT DISTINCT
-            COALESCE(NULLIF(product_subtype, ''), treatment) as variant
-        FROM marketprice
-        WHERE card_id = :card_id
-          AND listing_type = 'sold'
-          AND is_bulk_lot = FALSE
-          AND COALESCE(NULLIF(product_subtype, ''), treatment) IS NOT NULL
-        ORDER BY variant
-    """)
-    result = session.execute(query, {"card_id": card_id})
-    return [row[0] for row in result.fetchall() if row[0]]
-
-
-def get_sales_timeline(session: Session, card_id: int, treatment: Optional[str], days: int) -> list[dict]:
-    """Get chronological sales for a card/treatment."""
-    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
-
-    query = text("""
-        SELECT
-            id,
-            price,
-            COALESCE(sold_date, scraped_at) as sale_date
-        FROM marketprice
-        WHERE card_id = :card_id
-          AND listing_type = 'sold'
-          AND is_bulk_lot = FALSE
-          AND COALESCE(sold_date, scraped_at) >= :cutoff
-          AND (:treatment IS NULL OR
-               COALESCE(NULLIF(product_subtype, ''), treatment) = :treatment)
-        ORDER BY COALESCE(sold_date, scraped_at) ASC
-    """)
-    result = session.execute(query, {"card_id": card_id, "cutoff": cutoff, "treatment": treatment})
-    return [dict(row._mapping) for row in result.fetchall()]
-
-
-def simulate_orderbook_at_date(
-    session: Session,
-    card_id: int,
-    treatment: Optional[str],
-    as_of_date: datetime,
-    lookback_days: int = 30,
-) -> Optional[dict]:
-    """
-    Simulate what OrderBook would have predicted at a specific date.
-
-    Algorithm v2: Uses LOWEST ASK as floor estimate (not bucket midpoint).
-    Confidence based on listing count, spread, and recency.
-    """
-    cutoff = as_of_date - timedelta(days=lookback_days)
-
-    # Get active listings that existed at that time
-    query = text("""
-        SELECT
-            price,
-            scraped_at
-        FROM marketprice
-        WHERE card_id = :card_id
-          AND listing_type = 'active'
-          AND is_bulk_lot = FALSE
-          AND scraped_at >= :cutoff
-          AND scraped_at < :as_of_date
-          AND (:treatment IS NULL OR
-               COALESCE(NULLIF(product_subtype, ''), treatment) = :treatment)
-        ORDER BY price ASC
-    """)
-    result = session.execute(
-        query,
-        {
-            "card_id": card_id,
-            "cutoff": cutoff,
-            "as_of_date": as_of_date,
-            "treatment": treatment,
-        },
-    )
-    listings = [dict(row._mapping) for row in result.fetchall()]
-
-    # v2: Accept even 1 listing (lowered from 3)
-    if len(listings) < 1:
-        # Fall back to recent sales
-        return simulate_sales_fallback_at_date(session, card_id, treatment, as_of_date, lookback_days)
-
-    prices = [row["price"] for row in listings]
-    lowest_ask = min(prices)  # v2: Use lowest ask as floor!
-
-    # Calculate spread
-    if len(prices) > 1:
-        spread_pct = ((max(prices) - min(prices)) / min(prices)) * 100
-    else:
-        spread_pct = 0.0
-
-    # Use shared confidence calculation
-    # For backtest simulation: no stale count, default volatility
-    # Use simplified weights that match original backtest behavior
-    confidence = calculate_orderbook_confidence(
-        total_listings=len(prices),
-        spread_pct=spread_pct,
-        stale_count=0,  # Assume all fresh for simulation
-        volatility_cv=0.5,  # Default volatility
-        listing_count_weight=0.4,
-        spread_weight=0.3,
-        recency_weight=0.15,
-        volatility_weight=0.15,
-    )
+def load_snapshot(days: int, snapshot_path: str | None, refresh: bool = False) -> ReplaySnapshot:
+    """Read replay data from the snapshot file if present, else from the database (saving it if a path is given)."""
+    if snapshot_path and Path(snapshot_path).exists() and not refresh:
+        logger.info(f"Loading replay snapshot from {snapshot_path}")
+        return ReplaySnapshot.load(snapshot_path)
 
-    return {
-        "floor_estimate": round(lowest_ask, 2),
-        "confidence": confidence,
-        "source": "order_book",
-        "total_listings": len(prices),
-    }
-
-
-def simulate_sales_fallback_at_date(
-    session: Session,
-    card_id: int,
-    treatment: Optional[str],
-    as_of_date: datetime,
-    lookback_days: int = 30,
-) -> Optional[dict]:
-    """Simulate sales fallback prediction at a specific date (v2 algorithm)."""
-    cutoff = as_of_date - timedelta(days=lookback_days)
-
-    query = text("""
-        SELECT
-            price
-        FROM marketprice
-        WHERE card_id = :card_id
-          AND listing_type = 'sold'
-          AND is_bulk_lot = FALSE
-          AND COALESCE(sold_date, scraped_at) >= :cutoff
-          AND COALESCE(sold_date, scraped_at) < :as_of_date
-          AND (:treatment IS NULL OR
-               COALESCE(NULLIF(product_subtype, ''), treatment) = :treatment)
-        ORDER BY price ASC
-    """)
-    result = session.execute(
-        query,
-        {
-            "card_id": card_id,
-            "cutoff": cutoff,
-            "as_of_date": as_of_date,
-            "treatment": treatment,
-        },
-    )
-    prices = [row[0] for row in result.fetchall()]
-
-    if not prices:
-        return None
-
-    # Use avg of 4 lowest as floor (matches floor_price service)
-    sorted_prices = sorted(prices)
-    floor_sample = sorted_prices[:4]
-    floor_estimate = sum(floor_sample) / len(floor_sample)
-
-    # Calculate spread
-    if len(prices) > 1:
-        spread_pct = ((max(prices) - min(prices)) / min(prices)) * 100
-    else:
-        spread_pct = 0.0
-
-    # Use shared confidence calculation with sales fallback penalty (0.5x)
-    # For backtest simulation: no stale count, default volatility
-    base_confidence = calculate_orderbook_confidence(
-        total_listings=len(prices),
-        spread_pct=spread_pct,
-        stale_count=0,  # Assume recent for simulation
-        volatility_cv=0.5,  # Default volatility
-        listing_count_weight=0.4,
-        spread_weight=0.3,
-        recency_weight=0.15,
-        volatility_weight=0.15,
-    )
-    confidence = round(base_confidence * 0.5, 3)  # Sales fallback penalty
-
-    return {
-        "floor_estimate": round(floor_estimate, 2),
-        "confidence": confidence,
-        "source": "sales_fallback",
-        "total_listings": len(prices),
-    }
-
-
-def run_backtest(
-    session: Session,
-    days: int = 90,
-    sample_interval_days: int = 7,
-    min_sales_per_card: int = 10,
-) -> list[BacktestResult]:
-    """
-    Run full backtest across all cards with sufficient data.
-
-    Args:
-        days: How far back to look for test data
-        sample_interval_days: How often to sample predictions
-        min_sales_per_card: Minimum sales required to include a card
-
-    Returns:
-        List of BacktestResult observations
-    """
-    results = []
-
-    # Get eligible cards
-    cards = get_cards_with_sales(session, min_sales_per_card)
-    logger.info(f"Found {len(cards)} cards with >= {min_sales_per_card} sales")
-
-    for card in cards:
-        card_id = card["id"]
-        card_name = card["name"]
-
-        # Get treatments for this card
-        treatments = get_treatments_for_card(session, card_id)
-        if not treatments:
-            treatments = [None]  # No treatment filter
-
-        for treatment in treatments:
-            # Get sales timeline
-            sales = get_sales_timeline(session, card_id, treatment, days)
-
-            if len(sales) < 5:
-                continue
-
-            # Sample prediction points (every N sales)
-            for i in range(0, len(sales) - 1, max(1, len(sales) // 10)):
-                sale = sales[i]
-                prediction_date = sale["sale_date"]
-
-                # Skip if prediction_date is None
-                if prediction_date is None:
-                    continue
-
-                # Ensure timezone aware
-                if prediction_date.tzinfo is None:
-                    prediction_date = prediction_date.replace(tzinfo=timezone.utc)
-
-                # Get prediction at this point in time
-                prediction = simulate_orderbook_at_date(session, card_id, treatment, prediction_date)
-
-                if not prediction:
-                    continue
-
-                # Find next sale after prediction
-                next_sale = None
-                for future_sale in sales[i + 1 :]:
-                    next_sale = future_sale
-                    break
-
-                if not next_sale:
-                    continue
-
-                next_sale_date = next_sale["sale_date"]
-                if next_sale_date is None:
-                    continue
-
-                if next_sale_date.tzinfo is None:
-                    next_sale_date = next_sale_date.replace(tzinfo=timezone.utc)
-
-                next_sale_price = next_sale["price"]
-                predicted_floor = prediction["floor_estimate"]
-
-                error = predicted_floor - next_sale_price
-                abs_error = abs(error)
-                pct_error = (abs_error / next_sale_price * 100) if next_sale_price > 0 else 0
-                days_to_sale = (next_sale_date - prediction_date).days
-
-                results.append(
-                    BacktestResult(
-                        card_id=card_id,
-                        card_name=card_name,
-                        treatment=treatment,
-                        prediction_date=prediction_date,
-                        predicted_floor=predicted_floor,
-                        confidence=prediction["confidence"],
-                        source=prediction["source"],
-                        total_listings=prediction["total_listings"],
-                        next_sale_date=next_sale_date,
-                        next_sale_price=next_sale_price,
-                        error=error,
-                        absolute_error=abs_error,
-                        percentage_error=pct_error,
-                        days_to_sale=days_to_sale,
-                    )
-                )
-
-    return results
+    since = datetime.now(timezone.utc) - timedelta(days=days + LOOKBACK_DAYS)
+    with Session(engine) as session:
+        snapshot = ReplaySnapshot.from_database(session, since=since)
+    logger.info(f"Read {len(snapshot.sold.price)} sold and {len(snapshot.active.price)} active listings")
+
+    if snapshot_path:
+        snapshot.save(snapshot_path)
+        logger.info(f"Saved replay snapshot to {snapshot_path}")
+    return snapshot
 
 
 def write_results_csv(results: list[BacktestResult], output_path: Path) -> None:
@@ -496,6 +188,23 @@ def main():
         default="data/orderbook_backtest.csv",
         help="Output CSV path (default: data/orderbook_backtest.csv)",
     )
+    parser.add_argument(
+        "--snapshot",
+        type=str,
+        default=None,
+        help="Replay snapshot (.npz): reused if it exists, otherwise written after reading the database",
+    )
+    parser.add_argument(
+        "--refresh-snapshot",
+        action="store_true",
+        help="Re-read the database even if --snapshot exists",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Processes to replay cards across (default: CPU count)",
+    )
     parser.add_argument(
         "--dry-run",
         action="store_true",
@@ -508,21 +217,23 @@ def main():
     logger.info(f"  Days: {args.days}")
     logger.info(f"  Min sales per card: {args.min_sales}")
     logger.info(f"  Output: {args.output}")
+    logger.info(f"  Workers: {args.workers}")
     logger.info("")
 
-    with Session(engine) as session:
-        results = run_backtest(
-            session,
-            days=args.days,
-            min_sales_per_card=args.min_sales,
-        )
+    snapshot = load_snapshot(args.days, args.snapshot, refresh=args.refresh_snapshot)
+    results = replay_backtest(
+        snapshot,
+        days=args.days,
+        min_sales_per_card=args.min_sales,
+        workers=args.workers,
+    )
 
-        print_summary(results)
+    print_summary(results)
 
-        if not args.dry_run and results:
-            output_path = Path(args.output)
-            write_results_csv(results, output_path)
-            logger.info(f"\nResults saved to: {output_path}")
+    if not args.dry_run and results:
+        output_path = Path(args.output)
+        write_results_csv(results, output_path)
+        logger.info(f"\nResults saved to: {output_path}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+JSON Serialization Benchmark
+
+Compares the per-row cost of the two ways list endpoints can serialize rows:
+1. pydantic: Schema.model_validate(row) -> model_dump(mode="json") -> JSONResponse
+2. fast:     schema_encoder(Schema)(row) -> FastJSONResponse (orjson when installed)
+
+Rows are synthetic MarketPriceOut/CardListItem values, so no database is needed.
+
+Usage:
+    python scripts/benchmark_json.py
+    python scripts/benchmark_json.py --rows 5000 --repeat 10
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List
+
+from fastapi.responses import JSONResponse
+
+from app.core.fast_json import ORJSON_AVAILABLE, FastJSONResponse, schema_encoder
+from app.schemas import CardListItem, MarketPriceOut
+
+
+def market_price_rows(n: int) -> List[Dict[str, Any]]:
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "id": i,
+            "card_id": i % 400,
+            "price": 10 + (i % 97) * 0.37,
+            "title": f"Wonders of the First Card {i} - Classic Foil",
+            "sold_date": start + timedelta(minutes=i),
+            "listing_type": "sold",
+            "treatment": "Classic Foil",
+            "bid_count": i % 5,
+            "url": f"https://www.ebay.com/itm/{100000 + i}",
+            "image_url": None,
+            "seller_name": f"seller{i % 50}",
+            "seller_feedback_score": 1200,
+            "seller_feedback_percent": 99.8,
+            "condition": "Near Mint",
+            "shipping_cost": 4.99,
+            "product_subtype": None,
+            "quantity": 1,
+            "scraped_at": start + timedelta(minutes=i, seconds=30),
+        }
+        for i in range(n)
+    ]
+
+
+def card_rows(n: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "id": i,
+            "name": f"Card {i}",
+            "slug": f"card-{i}",
+            "set_name": "Existence",
+            "rarity_name": "Rare",
+            "product_type": "Single",
+            "floor_price": 5.0 + i % 13,
+            "latest_price": 6.0 + i % 11,
+            "lowest_ask": 7.5,
+            "max_price": 40.0,
+            "volume": i % 30,
+            "inventory": i % 12,
+            "price_delta": -1.5,
+            "last_treatment": "Classic Paper",
+            "image_url": f"https://cdn.example.com/cards/{i}.webp",
+            "orbital": "Heliosynth",
+            "orbital_color": "#a07cfe",
+        }
+        for i in range(n)
+    ]
+
+
+def best_of(fn: Callable[[], Any], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def benchmark(name: str, schema: Any, rows: List[Dict[str, Any]], repeat: int) -> None:
+    encode = schema_encoder(schema)
+
+    def pydantic_path():
+        return JSONResponse(content=[schema.model_validate(row).model_dump(mode="json") for row in rows]).body
+
+    def fast_path():
+        return FastJSONResponse(content=[encode(row) for row in rows]).body
+
+    slow = best_of(pydantic_path, repeat)
+    fast = best_of(fast_path, repeat)
+    per_1k = 1000 / len(rows) * 1000
+    print(
+        f"{name:<16} pydantic {slow * per_1k:8.2f} ms/1k rows   "
+        f"fast {fast * per_1k:8.2f} ms/1k rows   speedup {slow / fast:5.1f}x"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark list endpoint JSON serialization")
+    parser.add_argument("--rows", type=int, default=2000, help="Rows per payload")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per path (best is reported)")
+    args = parser.parse_args()
+
+    print(f"orjson: {'installed' if ORJSON_AVAILABLE else 'not installed (stdlib json fallback)'}")
+    benchmark("MarketPriceOut", MarketPriceOut, market_price_rows(args.rows), args.repeat)
+    benchmark("CardListItem", CardListItem, card_rows(args.rows), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
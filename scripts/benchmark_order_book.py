@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Order Book Bucketing Benchmark
+
+Times the two per-card stages of OrderBookAnalyzer that scale with listing
+count - outlier filtering and adaptive bucketing - two ways:
+1. loop:       the original per-bucket rescans and Python gap loops
+2. vectorized: OrderBookAnalyzer._filter_outliers() / _create_buckets()
+
+for synthetic price lists from a handful of singles up to sealed boxes with
+thousands of active listings, and checks both produce identical output.
+
+Usage:
+    python scripts/benchmark_order_book.py
+    python scripts/benchmark_order_book.py --sizes 100 1000 10000 --repeats 50
+"""
+
+import argparse
+import random
+import statistics
+import time
+from math import sqrt
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from app.services.order_book import BucketInfo, OrderBookAnalyzer, OrderBookConfig
+
+
+def loop_filter_outliers(prices: List[float]) -> tuple:
+    if len(prices) < 3:
+        return prices, 0
+    sorted_prices = sorted(prices)
+    gaps = [sorted_prices[i + 1] - sorted_prices[i] for i in range(len(sorted_prices) - 1)]
+    threshold = float(np.mean(gaps)) + OrderBookConfig.OUTLIER_SIGMA_THRESHOLD * float(np.std(gaps))
+    filtered = []
+    for i, price in enumerate(sorted_prices):
+        gap_before = sorted_prices[i] - sorted_prices[i - 1] if i > 0 else 0
+        gap_after = sorted_prices[i + 1] - sorted_prices[i] if i < len(sorted_prices) - 1 else 0
+        if gap_before <= threshold or gap_after <= threshold:
+            filtered.append(price)
+    return filtered, len(prices) - len(filtered)
+
+
+def loop_create_buckets(prices: List[float]) -> List[BucketInfo]:
+    if not prices:
+        return []
+    min_price, max_price = min(prices), max(prices)
+    price_range = max_price - min_price
+    if price_range == 0:
+        return [BucketInfo(min_price, max_price, len(prices))]
+    width = max(
+        OrderBookConfig.MIN_BUCKET_WIDTH, min(OrderBookConfig.MAX_BUCKET_WIDTH, price_range / sqrt(len(prices)))
+    )
+    buckets = []
+    start = min_price
+    while start < max_price:
+        end = start + width
+        if end >= max_price:
+            count = sum(1 for p in prices if start <= p <= max_price)
+            end = max_price
+        else:
+            count = sum(1 for p in prices if start <= p < end)
+        if count > 0:
+            buckets.append(BucketInfo(start, end, count))
+        start = end
+    return buckets
+
+
+def synthetic_prices(rng: random.Random, size: int) -> List[float]:
+    """Sealed-box style asks: a tight cluster plus a long tail of high asks."""
+    base = rng.uniform(50, 300)
+    return [round(base * rng.lognormvariate(0, 0.6), 2) for _ in range(size)]
+
+
+def time_stage(stage: Callable[[List[float]], object], lists: List[List[float]]) -> Dict[str, float]:
+    timings = []
+    for prices in lists:
+        started = time.perf_counter()
+        stage(prices)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "p50": statistics.median(timings),
+        "p95": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+    }
+
+
+def report(label: str, stats: Dict[str, float]) -> None:
+    print(f"  {label:<28} p50 {stats['p50']:9.3f} ms   p95 {stats['p95']:9.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark order book outlier filtering and bucketing")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1_000, 5_000], help="Listings per card")
+    parser.add_argument("--repeats", type=int, default=20, help="Price lists per size")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    analyzer = OrderBookAnalyzer()
+    rng = random.Random(args.seed)
+    for size in args.sizes:
+        lists = [synthetic_prices(rng, size) for _ in range(args.repeats)]
+        for prices in lists:
+            assert analyzer._filter_outliers(prices) == loop_filter_outliers(prices)
+            assert analyzer._create_buckets(prices) == loop_create_buckets(prices)
+
+        buckets = statistics.median(len(loop_create_buckets(prices)) for prices in lists)
+        print(f"{size:,} listings per card (~{buckets:.0f} buckets), outputs identical:")
+        report("loop filter_outliers", time_stage(loop_filter_outliers, lists))
+        report("vectorized filter_outliers", time_stage(analyzer._filter_outliers, lists))
+        report("loop create_buckets", time_stage(loop_create_buckets, lists))
+        report("vectorized create_buckets", time_stage(analyzer._create_buckets, lists))
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Price Store Benchmark
+
+Times the hot pricing lookup - "sold prices for these cards in the last 90
+days", as SalesFloorEngine.load() issues it - two ways:
+1. database: one marketprice query per lookup
+2. store:    PriceStore.rows() slices of the in-memory columns
+
+and reports how long the store takes to load and how much memory it uses
+(the figure PRICE_STORE_MAX_MB is compared against).
+
+By default a synthetic marketprice table is built in an in-memory SQLite
+database. With --database-url the existing marketprice table is read instead
+(read-only).
+
+Usage:
+    python scripts/benchmark_price_store.py --rows 500000
+    python scripts/benchmark_price_store.py --database-url postgresql+psycopg://localhost/wonder
+"""
+
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, SQLModel, select
+
+from app.models.market import MarketPrice
+from app.services.floor_engine import SalesFloorEngine
+from app.services.price_store import PriceStore
+
+TREATMENTS = ["Classic Paper", "Classic Foil", "Formless Foil", "OCM Serialized", "Stonefoil", "Prerelease"]
+PLATFORMS = ["ebay", "ebay", "ebay", "opensea"]
+
+
+def populate(engine: Engine, row_count: int, card_count: int, seed: int) -> None:
+    rng = random.Random(seed)
+    SQLModel.metadata.create_all(engine, tables=[MarketPrice.__table__])  # type: ignore[attr-defined]
+    now = datetime.now(timezone.utc)
+    batch = 20_000
+    with engine.begin() as conn:
+        for start in range(0, row_count, batch):
+            rows = []
+            for i in range(start, min(row_count, start + batch)):
+                sold = rng.random() < 0.8
+                at = now - timedelta(days=rng.uniform(0, 400))
+                rows.append(
+                    {
+                        "id": i + 1,
+                        "card_id": rng.randint(1, card_count),
+                        "price": round(rng.lognormvariate(2.5, 1.0), 2),
+                        "title": f"Card {i}",
+                        "listing_type": "sold" if sold else "active",
+                        "treatment": rng.choice(TREATMENTS),
+                        "platform": rng.choice(PLATFORMS),
+                        "sold_date": at if sold else None,
+                        "scraped_at": at,
+                        "is_bulk_lot": rng.random() < 0.01,
+                        "bid_count": 0,
+                        "quantity": 1,
+                    }
+                )
+            conn.execute(MarketPrice.__table__.insert(), rows)  # type: ignore[attr-defined]
+
+
+def card_ids_in(engine: Engine) -> List[int]:
+    with Session(engine) as session:
+        return sorted(set(session.exec(select(MarketPrice.card_id).distinct()).all()))
+
+
+def time_lookups(lookup: Callable[[List[int]], object], batches: List[List[int]]) -> Dict[str, float]:
+    timings = []
+    for batch in batches:
+        started = time.perf_counter()
+        lookup(batch)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "p50": statistics.median(timings),
+        "p95": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+    }
+
+
+def report(label: str, stats: Dict[str, float]) -> None:
+    print(f"  {label:<28} p50 {stats['p50']:9.3f} ms   p95 {stats['p95']:9.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PriceStore lookups against marketprice queries")
+    parser.add_argument("--rows", type=int, default=500_000, help="Synthetic marketprice rows")
+    parser.add_argument("--cards", type=int, default=2_000, help="Synthetic cards")
+    parser.add_argument("--days", type=int, default=365, help="Store window (PRICE_STORE_DAYS)")
+    parser.add_argument("--lookups", type=int, default=200, help="Lookups per batch size")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database-url", default=None, help="Read an existing database instead of synthetic rows")
+    args = parser.parse_args()
+
+    if args.database_url:
+        engine = create_engine(args.database_url)
+    else:
+        engine = create_engine("sqlite://")
+        print(f"Populating {args.rows:,} synthetic rows over {args.cards:,} cards...")
+        started = time.perf_counter()
+        populate(engine, args.rows, args.cards, args.seed)
+        print(f"  done in {time.perf_counter() - started:.1f}s\n")
+
+    store = PriceStore(days=args.days, max_mb=1 << 20)
+    started = time.perf_counter()
+    store.load(engine)
+    stats = store.stats()
+    print(f"Store load: {time.perf_counter() - started:.2f}s, {stats['rows']:,} rows, {stats['bytes'] / 1e6:.1f} MB\n")
+
+    rng = random.Random(args.seed)
+    cards = card_ids_in(engine)
+    cutoff = datetime.now(timezone.utc) - timedelta(days=90)
+    for size in (1, 50):
+        batches = [rng.sample(cards, min(size, len(cards))) for _ in range(args.lookups)]
+
+        with Session(engine) as session:
+
+            def query(ids: List[int]) -> object:
+                return SalesFloorEngine._load_marketprice({"card_ids": ids, "cutoff": cutoff}, session)
+
+            print(f"{size} card(s) per lookup, 90 day sold prices:")
+            report("database query", time_lookups(query, batches))
+            report("store rows()", time_lookups(lambda ids: store.rows(ids, since=cutoff), batches))
+        print()
+
+
+if __name__ == "__main__":
+    main()
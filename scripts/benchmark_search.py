@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Search Latency Benchmark
+
+Builds a large synthetic listing table and times the search expressions from
+app/services/search.py against it:
+1. Listing title substring search (/market/listings?search=)
+2. Card name fuzzy search ranked by similarity (/cards?search=)
+
+On PostgreSQL each query runs before and after creating the trigram GIN
+indexes, so the numbers show what ix_marketprice_title_trgm/ix_card_name_trgm
+buy. Tables are TEMPORARY: nothing is written to the real schema.
+With --sqlite the same queries run on an in-memory SQLite database through the
+Python similarity() fallback used by the unit tests (no index).
+
+Usage:
+    python scripts/benchmark_search.py --rows 500000
+    python scripts/benchmark_search.py --database-url postgresql+psycopg://localhost/wonder
+    python scripts/benchmark_search.py --sqlite --rows 50000
+"""
+
+import argparse
+import random
+import statistics
+import time
+from typing import Any, Callable, Dict, List
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, select, text
+from sqlalchemy.engine import Connection
+
+from app.services.search import contains, matches, ranked
+
+# Card-name vocabulary shaped like the real catalogue
+NAME_WORDS = [
+    "Ember", "Flame", "Tide", "Caller", "Stone", "Warden", "Shadow", "Veil", "Solar", "Drake",
+    "Thal", "Wind", "Petra", "Umbra", "Helio", "Synth", "Frost", "Bloom", "Iron", "Oracle",
+]  # fmt: skip
+TREATMENTS = ["Classic Paper", "Classic Foil", "Formless Foil", "OCM Serialized", "Stonefoil", "Prerelease"]
+FILLER = ["WOTF", "Wonders of the First", "Existence", "NM", "Mint", "Genesis", "1st Edition", "TCG", "Card"]
+
+LISTING_TERMS = ["ember", "tide caller", "formless", "stonefoil", "oracle", "serialized"]
+CARD_TERMS = ["ember", "embr flame", "tidecaller", "shadw veil", "oracle", "frost bloom"]
+
+metadata = MetaData()
+bench_card = Table(
+    "bench_card",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    prefixes=["TEMPORARY"],
+)
+bench_listing = Table(
+    "bench_listing",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("card_id", Integer, nullable=False),
+    Column("title", String, nullable=False),
+    prefixes=["TEMPORARY"],
+)
+
+
+def synthetic_cards(n: int, rng: random.Random) -> List[Dict[str, Any]]:
+    return [{"id": i, "name": f"{rng.choice(NAME_WORDS)} {rng.choice(NAME_WORDS)} {i}"} for i in range(1, n + 1)]
+
+
+def synthetic_listings(n: int, cards: List[Dict[str, Any]], rng: random.Random) -> List[Dict[str, Any]]:
+    rows = []
+    for i in range(1, n + 1):
+        card = rng.choice(cards)
+        title = " ".join([rng.choice(FILLER), card["name"], rng.choice(TREATMENTS), rng.choice(FILLER)])
+        rows.append({"id": i, "card_id": card["id"], "title": title})
+    return rows
+
+
+def populate(conn: Connection, card_count: int, listing_count: int, seed: int) -> None:
+    rng = random.Random(seed)
+    metadata.create_all(conn)
+    cards = synthetic_cards(card_count, rng)
+    conn.execute(bench_card.insert(), cards)
+    batch = 20_000
+    for start in range(0, listing_count, batch):
+        size = min(batch, listing_count - start)
+        rows = synthetic_listings(size, cards, rng)
+        for offset, row in enumerate(rows):
+            row["id"] = start + offset + 1
+        conn.execute(bench_listing.insert(), rows)
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("ANALYZE bench_card"))
+        conn.execute(text("ANALYZE bench_listing"))
+
+
+def time_queries(conn: Connection, build: Callable[[str], Any], terms: List[str], repeat: int) -> Dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        for term in terms:
+            started = time.perf_counter()
+            conn.execute(build(term)).all()
+            timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "p50": statistics.median(timings),
+        "p95": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+    }
+
+
+def listing_search(term: str) -> Any:
+    return select(bench_listing.c.id).where(contains(bench_listing.c.title, term)).limit(100)
+
+
+def card_search(term: str) -> Any:
+    return (
+        select(bench_card.c.id)
+        .where(matches(bench_card.c.name, term))
+        .order_by(*ranked(bench_card.c.name, term), bench_card.c.id)
+        .limit(50)
+    )
+
+
+def report(label: str, stats: Dict[str, float]) -> None:
+    print(f"  {label:<34} p50 {stats['p50']:9.2f} ms   p95 {stats['p95']:9.2f} ms")
+
+
+def run(conn: Connection, repeat: int) -> None:
+    report("listing title search", time_queries(conn, listing_search, LISTING_TERMS, repeat))
+    report("card name fuzzy search (ranked)", time_queries(conn, card_search, CARD_TERMS, repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark trigram search on a synthetic listing table")
+    parser.add_argument("--rows", type=int, default=500_000, help="Synthetic listings")
+    parser.add_argument("--cards", type=int, default=5_000, help="Synthetic cards")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per search term")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database-url", default=None, help="PostgreSQL URL (default: settings.DATABASE_URL)")
+    parser.add_argument("--sqlite", action="store_true", help="Use in-memory SQLite and the Python fallback")
+    args = parser.parse_args()
+
+    if args.sqlite:
+        # Importing app.services.search registered similarity() for SQLite connections
+        engine = create_engine("sqlite://")
+    else:
+        from app.core.config import settings
+
+        engine = create_engine(args.database_url or settings.DATABASE_URL)
+
+    with engine.connect() as conn:
+        print(f"Populating {args.rows:,} listings / {args.cards:,} cards on {conn.dialect.name}...")
+        started = time.perf_counter()
+        populate(conn, args.cards, args.rows, args.seed)
+        print(f"  done in {time.perf_counter() - started:.1f}s\n")
+
+        if conn.dialect.name != "postgresql":
+            print("Without index (Python similarity fallback):")
+            run(conn, args.repeat)
+            return
+
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        print("Without trigram indexes (sequential scan):")
+        run(conn, args.repeat)
+
+        conn.execute(text("CREATE INDEX ON bench_listing USING gin (title gin_trgm_ops)"))
+        conn.execute(text("CREATE INDEX ON bench_card USING gin (name gin_trgm_ops)"))
+        conn.execute(text("ANALYZE bench_card"))
+        conn.execute(text("ANALYZE bench_listing"))
+        print("\nWith trigram GIN indexes:")
+        run(conn, args.repeat)
+        conn.rollback()
+
+
+if __name__ == "__main__":
+    main()
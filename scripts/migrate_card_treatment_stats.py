@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Database migration for the card_treatment_stats table.
+
+Creates the per card/treatment sales summary maintained by the
+job_refresh_card_treatment_stats scheduler job, then fills it once.
+
+Usage:
+    python scripts/migrate_card_treatment_stats.py
+"""
+
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.db import engine
+from app.services.market_patterns import refresh_card_treatment_stats
+
+load_dotenv()
+
+
+MIGRATIONS = [
+    # Create the card_treatment_stats table
+    """
+    CREATE TABLE IF NOT EXISTS card_treatment_stats (
+        id SERIAL PRIMARY KEY,
+        card_id INTEGER NOT NULL REFERENCES card(id),
+        treatment VARCHAR NOT NULL,
+        sales_count INTEGER NOT NULL DEFAULT 0,
+        floor_price FLOAT NOT NULL,
+        multiplier FLOAT,
+        lookback_days INTEGER NOT NULL DEFAULT 90,
+        updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+    );
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_card_treatment_stats_card_id ON card_treatment_stats(card_id);
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_card_treatment_stats_treatment ON card_treatment_stats(treatment);
+    """,
+    # One row per card/treatment
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS ix_card_treatment_stats_card_treatment
+        ON card_treatment_stats(card_id, treatment);
+    """,
+]
+
+
+def run_migrations():
+    """Run all migrations, then populate the table."""
+    print("Running card_treatment_stats table migration...")
+    print()
+
+    with Session(engine) as session:
+        for i, migration in enumerate(MIGRATIONS, 1):
+            migration_name = migration.strip().split("\n")[0].strip()
+            print(f"[{i}/{len(MIGRATIONS)}] {migration_name[:60]}...")
+
+            try:
+                session.exec(text(migration))
+                session.commit()
+                print("  OK")
+            except Exception as e:
+                if "already exists" in str(e).lower() or "duplicate" in str(e).lower():
+                    print("  SKIP (already exists)")
+                else:
+                    print(f"  ERROR: {e}")
+                    raise
+
+        print()
+        print("Populating card_treatment_stats...")
+        rows = refresh_card_treatment_stats(session)
+        print(f"  {rows} card/treatment rows")
+
+    print()
+    print("Migration complete!")
+
+
+if __name__ == "__main__":
+    run_migrations()
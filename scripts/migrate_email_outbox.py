@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Database migration for the email_outbox table.
+
+Creates the queue of marketing/alert emails delivered in batches by the
+email outbox worker (app.services.email_outbox).
+
+Usage:
+    python scripts/migrate_email_outbox.py
+"""
+
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.db import engine
+
+load_dotenv()
+
+
+MIGRATIONS = [
+    # Create the email_outbox table
+    """
+    CREATE TABLE IF NOT EXISTS email_outbox (
+        id SERIAL PRIMARY KEY,
+        kind VARCHAR NOT NULL,
+        to_email VARCHAR NOT NULL,
+        user_name VARCHAR NOT NULL,
+        payload JSON,
+        dedupe_key VARCHAR UNIQUE,
+        status VARCHAR NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        next_attempt_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+        last_error TEXT,
+        provider_id VARCHAR,
+        idempotency_key VARCHAR,
+        created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+        sent_at TIMESTAMP WITH TIME ZONE
+    );
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_email_outbox_kind ON email_outbox(kind);
+    """,
+    # Tables created before idempotency keys
+    """
+    ALTER TABLE email_outbox ADD COLUMN IF NOT EXISTS idempotency_key VARCHAR;
+    """,
+    # Worker claim query: due emails by status
+    """
+    CREATE INDEX IF NOT EXISTS ix_email_outbox_due ON email_outbox(status, next_attempt_at);
+    """,
+]
+
+
+def run_migrations():
+    """Run all migrations."""
+    print("Running email_outbox table migration...")
+    print()
+
+    with Session(engine) as session:
+        for i, migration in enumerate(MIGRATIONS, 1):
+            migration_name = migration.strip().split("\n")[0].strip()
+            print(f"[{i}/{len(MIGRATIONS)}] {migration_name[:60]}...")
+
+            try:
+                session.exec(text(migration))
+                session.commit()
+                print("  OK")
+            except Exception as e:
+                if "already exists" in str(e).lower() or "duplicate" in str(e).lower():
+                    print("  SKIP (already exists)")
+                else:
+                    print(f"  ERROR: {e}")
+                    raise
+
+    print()
+    print("Migration complete!")
+
+
+if __name__ == "__main__":
+    run_migrations()
@@ -13,6 +13,7 @@ from app.services.math import calculate_stats
 from app.scraper.browser import BrowserManager
 from app.scraper.active import scrape_active_data
 from app.discord_bot.logger import log_new_sale
+from app.core.cache_invalidation import publish_card_updates
 
 
 async def scrape_card(
@@ -310,6 +311,7 @@ async def scrape_card(
 
     # 5. Save to DB
     if card_id > 0:
+        wrote_rows = False
         with Session(engine) as session:
             # Save only NEW listings to database
             # Check if sold listings match existing active listings (for active->sold tracking)
@@ -369,6 +371,7 @@ async def scrape_card(
                 converted_msg = f", {converted_count} active->sold converted" if converted_count > 0 else ""
                 skipped_msg = f", {skipped_count} duplicates skipped" if skipped_count > 0 else ""
                 print(f"Saved {saved_count} new listings to database{converted_msg}{skipped_msg}")
+                wrote_rows = saved_count > 0 or converted_count > 0
 
                 # Notify Discord about new sales (only sold listings, limit to 3 to avoid spam)
                 for sale in discord_notifications[:3]:
@@ -409,6 +412,12 @@ async def scrape_card(
                 session.commit()
                 session.refresh(snapshot)
                 print(f"Saved Snapshot ID: {snapshot.id}")
+                wrote_rows = True
+
+        # Evict cached data for this card now that the rows are committed.
+        # A fresh snapshot changes "latest" values in every window, so don't narrow by date.
+        if wrote_rows:
+            publish_card_updates([card_id], source="ebay")
 
 
 async def main():
@@ -14,9 +14,14 @@ KEY DESIGN DECISIONS:
 3. Learn treatment multipliers from card-level data
 4. Target = next sale price (true AR prediction)
 
+Sales are cached in data/ar_sales_history.npz and only new sales are read on
+later runs; lag/rolling features use the grouped kernels in
+app.services.ar_features.
+
 Usage:
     poetry run python scripts/train_ar_pricing_model.py
     poetry run python scripts/train_ar_pricing_model.py --days 180
+    poetry run python scripts/train_ar_pricing_model.py --refresh-cache  # Re-read all sales
 """
 
 import argparse
@@ -30,6 +35,14 @@ from sqlalchemy import text
 from sqlmodel import Session
 
 from app.db import engine
+from app.services.ar_features import (
+    SaleHistoryCache,
+    group_ids,
+    group_lag,
+    group_lowest_mean,
+    group_position,
+    group_rolling,
+)
 
 logging.basicConfig(level=logging.INFO, format="%(message)s")
 logger = logging.getLogger(__name__)
@@ -39,6 +52,9 @@ logger = logging.getLogger(__name__)
 # DATA COLLECTION
 # =============================================================================
 
+# Local sale history cache (new sales are appended on each run)
+DEFAULT_CACHE = "data/ar_sales_history.npz"
+
 # Exclude sealed product - these aren't "cards"
 EXCLUDED_TREATMENTS = {
     "Box",
@@ -68,62 +84,25 @@ CORE_TREATMENTS = {
 }
 
 
-def fetch_sales_data(days: int = 180) -> pd.DataFrame:
-    """Fetch card sales only (no sealed product)."""
+def fetch_sales_data(days: int = 180, cache_path: str = DEFAULT_CACHE, refresh: bool = False) -> pd.DataFrame:
+    """Fetch card sales only (no sealed product), appending new sales to the local cache."""
     logger.info(f"Fetching sales data ({days} days)...")
     cutoff = datetime.now(timezone.utc) - timedelta(days=days)
 
-    query = text("""
-        SELECT
-            mp.id as sale_id,
-            mp.card_id,
-            c.name as card_name,
-            c.card_number,
-            r.name as rarity,
-            COALESCE(NULLIF(mp.product_subtype, ''), mp.treatment) as treatment,
-            mp.price,
-            COALESCE(mp.sold_date, mp.scraped_at) as sale_date,
-            mp.platform
-        FROM marketprice mp
-        JOIN card c ON c.id = mp.card_id
-        LEFT JOIN rarity r ON r.id = c.rarity_id
-        WHERE mp.listing_type = 'sold'
-          AND mp.is_bulk_lot = FALSE
-          AND COALESCE(mp.sold_date, mp.scraped_at) >= :cutoff
-          AND mp.price > 0.5
-          AND mp.price < 2000
-          AND c.card_number IS NOT NULL
-        ORDER BY mp.card_id, COALESCE(mp.sold_date, mp.scraped_at)
-    """)
-
     with Session(engine) as session:
-        result = session.execute(query, {"cutoff": cutoff})
-        rows = result.fetchall()
+        columns = SaleHistoryCache(cache_path).load(session, cutoff, refresh=refresh)
 
-    df = pd.DataFrame(
-        rows,
-        columns=[
-            "sale_id",
-            "card_id",
-            "card_name",
-            "card_number",
-            "rarity",
-            "treatment",
-            "price",
-            "sale_date",
-            "platform",
-        ],
-    )
-
-    df["sale_date"] = pd.to_datetime(df["sale_date"], utc=True)
+    df = pd.DataFrame(columns)
+    df["sale_date"] = pd.to_datetime(df.pop("sale_time"), unit="us", utc=True)
+    df = df.sort_values(["card_id", "sale_date"], kind="stable").reset_index(drop=True)
     df["treatment"] = df["treatment"].fillna("Classic Paper")
     df["rarity"] = df["rarity"].fillna("Common")
 
     # Filter out sealed product
     df = df[~df["treatment"].isin(EXCLUDED_TREATMENTS)]
 
-    # Normalize treatment names
-    df["treatment"] = df["treatment"].apply(normalize_treatment)
+    # Normalize treatment names (once per distinct name)
+    df["treatment"] = df["treatment"].map({t: normalize_treatment(t) for t in df["treatment"].unique()})
 
     logger.info(f"  Loaded {len(df):,} card sales from {df['card_id'].nunique()} cards")
     logger.info(f"  Treatments: {df['treatment'].value_counts().to_dict()}")
@@ -193,11 +172,12 @@ def compute_card_base_prices(df: pd.DataFrame) -> pd.DataFrame:
     # Get Classic Paper floor for each card (avg of 4 lowest)
     paper_df = df[df["treatment"] == "Classic Paper"].copy()
 
-    def floor_4(prices):
-        sorted_p = sorted(prices)[:4]
-        return np.mean(sorted_p) if sorted_p else np.nan
-
-    card_base = paper_df.groupby("card_id")["price"].apply(floor_4).rename("card_base_price")
+    card_codes, card_ids = pd.factorize(paper_df["card_id"])
+    card_base = pd.Series(
+        group_lowest_mean(paper_df["price"].to_numpy(), card_codes, 4),
+        index=pd.Index(card_ids, name="card_id"),
+        name="card_base_price",
+    )
 
     # For cards without Classic Paper sales, use overall card median
     all_card_median = df.groupby("card_id")["price"].median().rename("card_median_price")
@@ -241,29 +221,25 @@ def add_ar_features(df: pd.DataFrame) -> pd.DataFrame:
     """Add auto-regressive features (relative to card base)."""
     logger.info("Adding AR features...")
     df = df.sort_values(["card_id", "treatment", "sale_date"]).copy()
-    group_cols = ["card_id", "treatment"]
+    groups = group_ids(df["card_id"].to_numpy(), df["treatment"].to_numpy())
+    relative = df["price_relative"].to_numpy(dtype=float)
+    price = df["price"].to_numpy(dtype=float)
 
     # Lag features (relative prices)
-    df["rel_lag1"] = df.groupby(group_cols)["price_relative"].shift(1)
-    df["rel_lag2"] = df.groupby(group_cols)["price_relative"].shift(2)
+    df["rel_lag1"] = group_lag(relative, groups, 1)
+    df["rel_lag2"] = group_lag(relative, groups, 2)
 
-    # Rolling stats on relative prices
-    df["rel_roll_mean"] = df.groupby(group_cols)["price_relative"].transform(
-        lambda x: x.shift(1).rolling(5, min_periods=1).mean()
-    )
-    df["rel_roll_min"] = df.groupby(group_cols)["price_relative"].transform(
-        lambda x: x.shift(1).rolling(4, min_periods=1).min()
-    )
-    df["rel_roll_std"] = df.groupby(group_cols)["price_relative"].transform(
-        lambda x: x.shift(1).rolling(5, min_periods=2).std()
-    )
+    # Rolling stats on relative prices (previous sales only)
+    df["rel_roll_mean"] = group_rolling(relative, groups, 5, 1, "mean")
+    df["rel_roll_min"] = group_rolling(relative, groups, 4, 1, "min")
+    df["rel_roll_std"] = group_rolling(relative, groups, 5, 2, "std")
 
     # Absolute price features (for context)
-    df["price_lag1"] = df.groupby(group_cols)["price"].shift(1)
-    df["floor_4"] = df.groupby(group_cols)["price"].transform(lambda x: x.shift(1).rolling(4, min_periods=1).min())
+    df["price_lag1"] = group_lag(price, groups, 1)
+    df["floor_4"] = group_rolling(price, groups, 4, 1, "min")
 
     # Sale sequence
-    df["sale_seq"] = df.groupby(group_cols).cumcount()
+    df["sale_seq"] = group_position(groups)
 
     return df
 
@@ -529,6 +505,8 @@ def main():
     parser = argparse.ArgumentParser(description="Train AR pricing model v2")
     parser.add_argument("--days", type=int, default=180, help="Days of history")
     parser.add_argument("--output", type=str, default="models", help="Output directory")
+    parser.add_argument("--cache", type=str, default=DEFAULT_CACHE, help="Sale history cache file")
+    parser.add_argument("--refresh-cache", action="store_true", help="Re-read the whole window from the database")
     args = parser.parse_args()
 
     print("=" * 70)
@@ -538,7 +516,7 @@ def main():
     print()
 
     # Fetch data
-    sales_df = fetch_sales_data(days=args.days)
+    sales_df = fetch_sales_data(days=args.days, cache_path=args.cache, refresh=args.refresh_cache)
     listings_df = fetch_active_listings()
 
     if len(sales_df) < 100:
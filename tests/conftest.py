@@ -5,15 +5,18 @@ Provides database session fixtures and mock data generators.
 """
 
 import pytest
+from contextlib import contextmanager
 from datetime import datetime, timedelta, timezone
 from typing import Generator, List
 from sqlmodel import Session, SQLModel, create_engine
+from sqlalchemy import event
 from sqlalchemy.pool import StaticPool
 
 from app.models.card import Card, Rarity
 from app.models.market import MarketPrice
 from app.models.user import User
 from app.core import security
+from app.core.circuit_breaker import CircuitBreakerRegistry
 
 
 # Check if SaaS module is available
@@ -94,6 +97,63 @@ def test_session(test_engine) -> Generator[Session, None, None]:
         yield session
 
 
+@pytest.fixture
+def count_queries(test_engine):
+    """
+    Record the SQL statements run against the test engine.
+
+    Usage:
+        with count_queries() as statements:
+            ...
+        assert len(statements) == 4
+    """
+
+    @contextmanager
+    def counter():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(test_engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(test_engine, "before_cursor_execute", before_cursor_execute)
+
+    return counter
+
+
+@pytest.fixture
+def reset_redis_breaker():
+    """Start and end the test with a closed Redis cache circuit breaker."""
+    CircuitBreakerRegistry._breakers.pop("redis_cache", None)
+    yield
+    CircuitBreakerRegistry._breakers.pop("redis_cache", None)
+
+
+@pytest.fixture
+def floor_sale():
+    """
+    Build SalesFloorEngine sale records dated relative to floor_sale.now.
+
+    Blokpax sales carry no treatment and the "Base" variant, as
+    SalesFloorEngine.load() reads them.
+
+    Usage:
+        engine = SalesFloorEngine([floor_sale(1, 10.0, days_ago=5)], now=floor_sale.now)
+    """
+    now = datetime.now(timezone.utc)
+
+    def make(card_id, price, days_ago=1, platform="ebay", treatment="Classic Paper", subtype=None):
+        if platform == "blokpax":
+            treatment, subtype = None, "Base"
+        return (card_id, treatment, subtype, price, platform, now - timedelta(days=days_ago))
+
+    make.now = now
+    return make
+
+
 @pytest.fixture(scope="function")
 def integration_session() -> Generator[Session, None, None]:
     """Provide a session to the real database for integration tests."""
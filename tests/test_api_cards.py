@@ -6,6 +6,7 @@ Tests cover:
 - Card detail endpoint with floor price
 - Floor price consistency between list and detail views
 - Sales history endpoint with COALESCE ordering
+- Batch card detail endpoint
 """
 
 import pytest
@@ -136,6 +137,44 @@ class TestCardDetailEndpoint:
         assert response.status_code == 200
 
 
+class TestCardBatchEndpoint:
+    """Tests for GET /api/v1/cards/batch endpoint."""
+
+    def test_batch_matches_detail(self, client):
+        """Batch entries carry the same detail fields as /{card_id}, in request order."""
+        list_response = client.get("/api/v1/cards/?limit=3")
+        cards = list_response.json()
+        if not cards:
+            pytest.skip("No cards in database")
+
+        ids = [card["id"] for card in reversed(cards)]
+        response = client.get(f"/api/v1/cards/batch?ids={','.join(map(str, ids))}")
+        assert response.status_code == 200
+
+        data = response.json()
+        assert [entry["card"]["id"] for entry in data["cards"]] == ids
+        assert data["missing"] == []
+
+        detail = client.get(f"/api/v1/cards/{ids[0]}").json()
+        batch_card = data["cards"][0]["card"]
+        for field in ("name", "latest_price", "lowest_ask", "inventory", "floor_price", "volume_30d"):
+            assert batch_card[field] == detail[field], field
+        assert "floor" in data["cards"][0]
+        assert "order_book" in data["cards"][0]
+
+    def test_batch_reports_missing_ids(self, client):
+        """Unknown IDs are listed instead of failing the request."""
+        response = client.get("/api/v1/cards/batch?ids=999999999")
+        assert response.status_code == 200
+        assert response.json() == {"cards": [], "missing": [999999999]}
+
+    def test_batch_rejects_invalid_ids(self, client):
+        """Non-integer or too many IDs return 400."""
+        assert client.get("/api/v1/cards/batch?ids=1,abc").status_code == 400
+        too_many = ",".join(str(i) for i in range(1, 100))
+        assert client.get(f"/api/v1/cards/batch?ids={too_many}").status_code == 400
+
+
 class TestFloorPriceConsistency:
     """Tests for floor price consistency between endpoints."""
 
@@ -334,3 +373,14 @@ class TestCacheHeaders:
         # Second request might be cached (depends on timing)
         # Just verify headers exist
         assert "X-Cache" in response2.headers
+
+    def test_cards_list_etag_revalidation(self, client):
+        """Matching If-None-Match returns 304 with no body."""
+        response = client.get("/api/v1/cards/?limit=5")
+        assert response.status_code == 200
+        etag = response.headers["ETag"]
+
+        revalidated = client.get("/api/v1/cards/?limit=5", headers={"If-None-Match": etag})
+        assert revalidated.status_code == 304
+        assert revalidated.content == b""
+        assert revalidated.headers["ETag"] == etag
@@ -0,0 +1,236 @@
+"""
+Tests for the AR pricing model feature store.
+
+Tests cover:
+- group_lag / group_rolling / group_position against per-group loops
+  (the pandas shift / rolling / cumcount semantics the training script used)
+- group_lowest_mean (avg of the n lowest per group)
+- SaleHistoryCache: first read, incremental append of new sales, active
+  listings converted to sales in place, window pruning, full re-read for a
+  longer window or a stale file
+"""
+
+import math
+import random
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from app.models.market import MarketPrice
+from app.services.ar_features import (
+    SaleHistoryCache,
+    group_ids,
+    group_lag,
+    group_lowest_mean,
+    group_position,
+    group_rolling,
+)
+
+
+def reference_rolling(values, groups, window, min_periods, stat):
+    """shift(1).rolling(window, min_periods).<stat>() per group, as loops."""
+    out = []
+    for i in range(len(values)):
+        previous = [values[j] for j in range(max(0, i - window), i) if groups[j] == groups[i]]
+        previous = [v for v in previous if not math.isnan(v)]
+        needed = max(min_periods, 2 if stat == "std" else 1)
+        if len(previous) < needed:
+            out.append(math.nan)
+        elif stat == "mean":
+            out.append(sum(previous) / len(previous))
+        elif stat == "min":
+            out.append(min(previous))
+        else:
+            mean = sum(previous) / len(previous)
+            out.append(math.sqrt(sum((v - mean) ** 2 for v in previous) / (len(previous) - 1)))
+    return np.array(out)
+
+
+@pytest.fixture
+def series():
+    rng = random.Random(3)
+    keys = sorted((rng.randint(1, 6), rng.choice(["Classic Paper", "Classic Foil"])) for _ in range(400))
+    cards = np.array([k[0] for k in keys])
+    treatments = np.array([k[1] for k in keys], dtype=object)
+    values = np.array([rng.uniform(0.5, 3.0) for _ in keys])
+    values[rng.sample(range(len(values)), 10)] = np.nan
+    return group_ids(cards, treatments), values
+
+
+class TestGroupKernels:
+    """Vectorized grouped features against loops."""
+
+    def test_group_ids(self):
+        groups = group_ids(np.array([1, 1, 1, 2, 2]), np.array(["a", "a", "b", "b", "b"], dtype=object))
+        assert groups.tolist() == [0, 0, 1, 2, 2]
+
+    def test_lag(self, series):
+        groups, values = series
+        for k in (1, 2):
+            expected = [
+                values[i - k] if i >= k and groups[i - k] == groups[i] else math.nan for i in range(len(values))
+            ]
+            np.testing.assert_array_equal(group_lag(values, groups, k), expected)
+
+    @pytest.mark.parametrize(
+        "window,min_periods,stat",
+        [(5, 1, "mean"), (4, 1, "min"), (5, 2, "std")],
+    )
+    def test_rolling(self, series, window, min_periods, stat):
+        groups, values = series
+        np.testing.assert_allclose(
+            group_rolling(values, groups, window, min_periods, stat),
+            reference_rolling(values, groups, window, min_periods, stat),
+            equal_nan=True,
+        )
+
+    def test_unknown_stat(self, series):
+        groups, values = series
+        with pytest.raises(ValueError):
+            group_rolling(values, groups, 3, 1, "median")
+
+    def test_position(self):
+        assert group_position(np.array([0, 0, 0, 1, 2, 2])).tolist() == [0, 1, 2, 0, 0, 1]
+
+    def test_lowest_mean(self):
+        groups = np.array([1, 0, 1, 1, 1, 1, 0])
+        values = np.array([9.0, 4.0, 1.0, 3.0, 2.0, 4.0, 2.0])
+        np.testing.assert_allclose(group_lowest_mean(values, groups, 4), [3.0, 2.5])
+
+    def test_empty(self):
+        empty = np.array([], dtype=float)
+        assert len(group_ids(empty)) == 0
+        assert len(group_rolling(empty, np.array([], dtype=int), 3, 1, "mean")) == 0
+
+
+class TestSaleHistoryCache:
+    """Local sale history cache with incremental appends."""
+
+    @pytest.fixture
+    def numbered_cards(self, test_session, sample_cards):
+        for card in sample_cards[:3]:
+            card.card_number = str(card.id)
+            test_session.add(card)
+        test_session.commit()
+        return sample_cards[:3]
+
+    def _add_sales(self, session, cards, count, start, seed):
+        rng = random.Random(seed)
+        for i in range(count):
+            at = start + timedelta(hours=rng.randint(0, 24 * 20))
+            session.add(
+                MarketPrice(
+                    card_id=rng.choice(cards).id,
+                    price=round(rng.uniform(1, 50), 2),
+                    title=f"Sale {seed}-{i}",
+                    treatment="Classic Foil",
+                    product_subtype="Preslab TAG 10" if i % 7 == 0 else None,
+                    listing_type="sold",
+                    sold_date=at,
+                    scraped_at=at,
+                    platform="ebay",
+                )
+            )
+        session.commit()
+
+    def test_first_load_reads_window(self, test_session, numbered_cards, tmp_path):
+        now = datetime.now(timezone.utc)
+        self._add_sales(test_session, numbered_cards, 30, now - timedelta(days=20), seed=1)
+
+        cache = SaleHistoryCache(tmp_path / "sales.npz")
+        columns = cache.load(test_session, now - timedelta(days=30))
+
+        assert len(columns["sale_id"]) == 30
+        assert (tmp_path / "sales.npz").exists()
+        assert np.all(np.diff(columns["sale_time"]) >= 0)
+        assert set(columns["card_number"]) <= {"1", "2", "3"}
+        assert set(columns["treatment"]) == {"Classic Foil", "Preslab TAG 10"}
+
+    def test_appends_only_new_sales(self, test_session, numbered_cards, tmp_path):
+        now = datetime.now(timezone.utc)
+        since = now - timedelta(days=30)
+        self._add_sales(test_session, numbered_cards, 30, now - timedelta(days=20), seed=1)
+        cache = SaleHistoryCache(tmp_path / "sales.npz")
+        first = cache.load(test_session, since)
+
+        self._add_sales(test_session, numbered_cards, 10, now - timedelta(days=20), seed=2)
+        with pytest.MonkeyPatch.context() as mp:
+            fetched = []
+            original = SaleHistoryCache._fetch
+
+            def spy(session, since, after_id=0, changed_since=None):
+                fetched.append(after_id)
+                return original(session, since, after_id, changed_since)
+
+            mp.setattr(SaleHistoryCache, "_fetch", staticmethod(spy))
+            second = cache.load(test_session, since)
+
+        assert fetched == [int(first["sale_id"].max())]
+        assert len(second["sale_id"]) == 40
+        assert sorted(second["sale_id"]) == sorted(
+            SaleHistoryCache(tmp_path / "fresh.npz").load(test_session, since)["sale_id"]
+        )
+
+    def test_shorter_window_prunes_and_longer_rereads(self, test_session, numbered_cards, tmp_path):
+        now = datetime.now(timezone.utc)
+        self._add_sales(test_session, numbered_cards, 20, now - timedelta(days=60), seed=1)
+        self._add_sales(test_session, numbered_cards, 20, now - timedelta(days=20), seed=2)
+        cache = SaleHistoryCache(tmp_path / "sales.npz")
+
+        recent = cache.load(test_session, now - timedelta(days=25))
+        assert len(recent["sale_id"]) == 20
+
+        full = cache.load(test_session, now - timedelta(days=90))
+        assert len(full["sale_id"]) == 40
+
+    def test_picks_up_active_listing_converted_to_sale(self, test_session, numbered_cards, tmp_path):
+        now = datetime.now(timezone.utc)
+        since = now - timedelta(days=30)
+        listed = now - timedelta(days=5)
+        active = MarketPrice(
+            card_id=numbered_cards[0].id,
+            price=10.0,
+            title="Tracked listing",
+            listing_type="active",
+            listed_at=listed,
+            scraped_at=listed,
+            platform="ebay",
+        )
+        test_session.add(active)
+        test_session.commit()
+        self._add_sales(test_session, numbered_cards, 1, now - timedelta(days=25), seed=1)
+        cache = SaleHistoryCache(tmp_path / "sales.npz")
+        assert len(cache.load(test_session, since)["sale_id"]) == 1
+
+        # scripts/scrape_card.py converts in place: same id, new scraped_at
+        active.listing_type = "sold"
+        active.sold_date = now - timedelta(days=1)
+        active.scraped_at = now
+        test_session.add(active)
+        test_session.commit()
+
+        cached = cache.load(test_session, since)
+        fresh = SaleHistoryCache(tmp_path / "fresh.npz").load(test_session, since)
+        assert cached["sale_id"].tolist() == fresh["sale_id"].tolist()
+        assert active.id in cached["sale_id"]
+
+        # Re-reading the same row again upserts it rather than duplicating it
+        assert cache.load(test_session, since)["sale_id"].tolist() == fresh["sale_id"].tolist()
+
+    def test_stale_file_is_fully_reread(self, test_session, numbered_cards, tmp_path):
+        now = datetime.now(timezone.utc)
+        since = now - timedelta(days=30)
+        self._add_sales(test_session, numbered_cards, 10, now - timedelta(days=20), seed=1)
+        removed_id = int(SaleHistoryCache(tmp_path / "sales.npz").load(test_session, since)["sale_id"][0])
+
+        # Re-flagging as a bulk lot leaves scraped_at alone, so only a full re-read drops it
+        removed = test_session.get(MarketPrice, removed_id)
+        removed.is_bulk_lot = True
+        test_session.add(removed)
+        test_session.commit()
+
+        assert removed_id in SaleHistoryCache(tmp_path / "sales.npz").load(test_session, since)["sale_id"]
+        reread = SaleHistoryCache(tmp_path / "sales.npz", max_age=timedelta(0)).load(test_session, since)
+        assert removed_id not in reread["sale_id"]
+        assert len(reread["sale_id"]) == 9
@@ -0,0 +1,331 @@
+"""
+Tests for the pluggable cache tier in app.core.cache.
+
+Tests cover:
+- In-process backend TTL expiry and LRU bound
+- Namespace isolation and clearing
+- Redis backend round-trips (via fakeredis)
+- Graceful degradation when Redis is unavailable
+- Swapping the shared backend for registered namespaces
+- Single-flight and stale-while-revalidate in Cache.get_or_compute
+- Values whose tags were invalidated mid-compute get the short TTL
+"""
+
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.core.cache import (
+    Cache,
+    MemoryCacheBackend,
+    RedisCacheBackend,
+    get_cache,
+    invalidate_tags,
+    set_cache_backend,
+)
+from app.core.metrics import cache_metrics
+from app.services.floor_price import ConfidenceLevel, FloorPriceResult, FloorPriceSource
+
+
+# Each test starts with a closed Redis circuit breaker
+pytestmark = pytest.mark.usefixtures("reset_redis_breaker")
+
+
+@pytest.fixture
+def fake_redis():
+    fakeredis = pytest.importorskip("fakeredis")
+    return fakeredis.FakeRedis()
+
+
+class TestMemoryCacheBackend:
+    """Tests for the in-process backend."""
+
+    def test_set_and_get(self):
+        backend = MemoryCacheBackend()
+        backend.set("a", {"x": 1}, ttl=60)
+        assert backend.get("a") == {"x": 1}
+
+    def test_miss_returns_none(self):
+        assert MemoryCacheBackend().get("missing") is None
+
+    def test_entry_expires(self):
+        backend = MemoryCacheBackend()
+        backend.set("a", 1, ttl=0.01)
+        time.sleep(0.02)
+        assert backend.get("a") is None
+        assert len(backend) == 0
+
+    def test_lru_eviction(self):
+        backend = MemoryCacheBackend(maxsize=2)
+        backend.set("a", 1, ttl=60)
+        backend.set("b", 2, ttl=60)
+        backend.get("a")  # a is now most recently used
+        backend.set("c", 3, ttl=60)
+
+        assert backend.get("a") == 1
+        assert backend.get("b") is None
+        assert backend.get("c") == 3
+
+    def test_clear_prefix(self):
+        backend = MemoryCacheBackend()
+        backend.set("wt:cards:1", 1, ttl=60)
+        backend.set("wt:market:1", 2, ttl=60)
+        backend.clear("wt:cards:")
+
+        assert backend.get("wt:cards:1") is None
+        assert backend.get("wt:market:1") == 2
+
+
+class TestCacheNamespace:
+    """Tests for namespaced caches sharing a backend."""
+
+    def test_namespaces_do_not_collide(self):
+        backend = MemoryCacheBackend()
+        cards = Cache("cards", backend, ttl=60)
+        market = Cache("market", backend, ttl=60)
+
+        cards.set("k", "cards-value")
+        market.set("k", "market-value")
+
+        assert cards.get("k") == "cards-value"
+        assert market.get("k") == "market-value"
+
+    def test_clear_only_affects_namespace(self):
+        backend = MemoryCacheBackend()
+        cards = Cache("cards", backend, ttl=60)
+        market = Cache("market", backend, ttl=60)
+        cards.set("k", 1)
+        market.set("k", 2)
+
+        cards.clear()
+
+        assert cards.get("k") is None
+        assert market.get("k") == 2
+
+    def test_get_cache_returns_same_instance(self):
+        assert get_cache("test_registry", ttl=60) is get_cache("test_registry", ttl=60)
+
+
+class TestRedisCacheBackend:
+    """Tests for the Redis backend against fakeredis."""
+
+    def test_round_trip(self, fake_redis):
+        backend = RedisCacheBackend(fake_redis)
+        backend.set("wt:cards:abc", [{"id": 1, "name": "Test"}], ttl=60)
+        assert backend.get("wt:cards:abc") == [{"id": 1, "name": "Test"}]
+
+    def test_ttl_is_applied(self, fake_redis):
+        backend = RedisCacheBackend(fake_redis)
+        backend.set("k", 1, ttl=30)
+        assert 0 < fake_redis.pttl("k") <= 30_000
+
+    def test_stores_floor_price_results(self, fake_redis):
+        backend = RedisCacheBackend(fake_redis)
+        result = FloorPriceResult(
+            price=12.5,
+            source=FloorPriceSource.SALES,
+            confidence=ConfidenceLevel.HIGH,
+            confidence_score=1.0,
+            metadata={"sales_count": 4},
+        )
+        backend.set("floor", result, ttl=60)
+
+        cached = backend.get("floor")
+        assert cached == result
+        assert cached.source is FloorPriceSource.SALES
+
+    def test_clear_prefix(self, fake_redis):
+        backend = RedisCacheBackend(fake_redis)
+        for i in range(5):
+            backend.set(f"wt:cards:{i}", i, ttl=60)
+        backend.set("wt:market:0", "keep", ttl=60)
+
+        backend.clear("wt:cards:")
+
+        assert fake_redis.keys("wt:cards:*") == []
+        assert backend.get("wt:market:0") == "keep"
+
+    def test_shared_between_processes(self, fake_redis):
+        """Two backends on the same server see each other's writes (one computation per fleet)."""
+        worker_a = Cache("cards", RedisCacheBackend(fake_redis), ttl=60)
+        worker_b = Cache("cards", RedisCacheBackend(fake_redis), ttl=60)
+
+        worker_a.set("overview", {"total": 42})
+        assert worker_b.get("overview") == {"total": 42}
+
+    def test_errors_degrade_to_miss(self):
+        client = MagicMock()
+        client.get.side_effect = ConnectionError("redis down")
+        client.set.side_effect = ConnectionError("redis down")
+        backend = RedisCacheBackend(client)
+
+        backend.set("k", 1, ttl=60)
+        assert backend.get("k") is None
+
+    def test_circuit_opens_after_repeated_failures(self):
+        client = MagicMock()
+        client.get.side_effect = ConnectionError("redis down")
+        backend = RedisCacheBackend(client)
+
+        for _ in range(5):
+            backend.get("k")
+
+        # Breaker opened after 3 failures, so later calls never reached the client
+        assert client.get.call_count == 3
+
+
+class TestSetCacheBackend:
+    """Tests for swapping the shared backend at runtime."""
+
+    def test_swaps_registered_namespaces(self, fake_redis):
+        cache = get_cache("test_swap", ttl=60, maxsize=10)
+        redis_backend = RedisCacheBackend(fake_redis)
+        try:
+            set_cache_backend(redis_backend)
+            assert cache.backend is redis_backend
+            cache.set("k", "v")
+            assert fake_redis.get("wt:test_swap:k") is not None
+        finally:
+            set_cache_backend(None)
+
+        assert isinstance(cache.backend, MemoryCacheBackend)
+        assert cache.backend.maxsize == 10
+
+
+class TestGetOrCompute:
+    """Tests for single-flight recompute and stale-while-revalidate."""
+
+    @pytest.fixture(autouse=True)
+    def reset_metrics(self):
+        cache_metrics.reset()
+        yield
+        cache_metrics.reset()
+
+    def test_miss_then_hit(self):
+        cache = Cache("swr", MemoryCacheBackend(), ttl=60)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return {"total": 1}
+
+        assert cache.get_or_compute("k", compute) == ({"total": 1}, "MISS")
+        assert cache.get_or_compute("k", compute) == ({"total": 1}, "HIT")
+        assert len(calls) == 1
+
+    def test_concurrent_misses_share_one_computation(self):
+        cache = Cache("swr_flight", MemoryCacheBackend(), ttl=60)
+        release = threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            release.wait(timeout=5)
+            return "value"
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.get_or_compute("k", compute))) for _ in range(5)
+        ]
+        for t in threads:
+            t.start()
+        # Let every thread reach the flight before the leader finishes
+        deadline = time.monotonic() + 5
+        while cache_metrics.get_all_metrics().get("swr_flight", {}).get("coalesced_waiters", 0) < 4:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        release.set()
+        for t in threads:
+            t.join(timeout=5)
+
+        assert len(calls) == 1
+        assert [value for value, _ in results] == ["value"] * 5
+        metrics = cache_metrics.get_all_metrics()["swr_flight"]
+        assert metrics["refreshes"] == 1
+        assert metrics["coalesced_waiters"] == 4
+
+    def test_waiters_see_leader_error(self):
+        cache = Cache("swr_error", MemoryCacheBackend(), ttl=60)
+
+        def compute():
+            raise RuntimeError("db down")
+
+        with pytest.raises(RuntimeError):
+            cache.get_or_compute("k", compute)
+        assert cache_metrics.get_all_metrics()["swr_error"]["failures"] == 1
+        # Failures are not cached
+        assert cache.get_or_compute("k", lambda: "ok") == ("ok", "MISS")
+
+    def test_serves_stale_while_refreshing(self):
+        cache = Cache("swr_stale", MemoryCacheBackend(), ttl=0.05)
+        cache.get_or_compute("k", lambda: "old", stale_ttl=60)
+        time.sleep(0.06)
+
+        refreshed = threading.Event()
+
+        def refresh():
+            refreshed.set()
+            return "new"
+
+        assert cache.get_or_compute("k", lambda: "unused", stale_ttl=60, refresh=refresh) == ("old", "STALE")
+        assert refreshed.wait(timeout=5)
+        deadline = time.monotonic() + 5
+        while cache.get_or_compute("k", lambda: "unused", stale_ttl=60)[0] != "new":
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+
+        metrics = cache_metrics.get_all_metrics()["swr_stale"]
+        assert metrics["background_refreshes"] == 1
+        assert metrics["stale_served"] >= 1
+
+    def test_no_stale_ttl_recomputes_inline(self):
+        cache = Cache("swr_inline", MemoryCacheBackend(), ttl=0.01)
+        cache.get_or_compute("k", lambda: "old")
+        time.sleep(0.02)
+
+        assert cache.get_or_compute("k", lambda: "new") == ("new", "MISS")
+
+    def test_tags_derived_from_value(self):
+        backend = MemoryCacheBackend()
+        cache = Cache("swr_tags", backend, ttl=60)
+        cache.get_or_compute("k", lambda: [{"id": 7}], tags=lambda items: [f"card:{i['id']}" for i in items])
+
+        assert backend.keys_for_tags(["card:7"]) == {"wt:swr_tags:k"}
+
+    def test_invalidated_during_compute_gets_short_ttl(self):
+        cache = get_cache("swr_race", ttl=0.05)
+
+        def compute():
+            # A scrape commits and publishes while this read is in flight
+            invalidate_tags(["card:7"])
+            return "before write"
+
+        cache.get_or_compute("k", compute, ttl=60, stale_ttl=60, tags=["card:7", "window:7d"])
+        time.sleep(0.06)
+
+        assert cache.get_or_compute("k", lambda: "after write", ttl=60, tags=["card:7"]) == ("after write", "MISS")
+
+    def test_unrelated_invalidation_keeps_long_ttl(self):
+        cache = Cache("swr_unrelated", MemoryCacheBackend(), ttl=0.05)
+
+        def compute():
+            cache.backend.mark_invalidated(["card:8"])
+            return "value"
+
+        cache.get_or_compute("k", compute, ttl=60, tags=["card:7"])
+        time.sleep(0.06)
+
+        assert cache.get_or_compute("k", lambda: "unused", ttl=60, tags=["card:7"]) == ("value", "HIT")
+
+    def test_redis_invalidation_generations(self, fake_redis):
+        backend = RedisCacheBackend(fake_redis)
+        seq = backend.invalidation_seq()
+
+        backend.mark_invalidated(["card:7"])
+
+        assert backend.invalidation_seq() == seq + 1
+        assert backend.invalidated_since(["card:7", "window:7d"], seq)
+        assert not backend.invalidated_since(["card:7"], seq + 1)
+        assert not backend.invalidated_since(["card:8"], seq)
@@ -0,0 +1,194 @@
+"""
+Tests for write-driven cache invalidation.
+
+Tests cover:
+- Tag indexing and eviction in both cache backends
+- Window selection from the oldest written timestamp
+- publish_card_updates evicting only affected cards/windows
+- Subscriber notification
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.core.cache import MemoryCacheBackend, RedisCacheBackend, get_cache, invalidate_tags, set_cache_backend
+from app.core.cache_invalidation import (
+    CardUpdateEvent,
+    card_tags,
+    market_tags,
+    publish_card_updates,
+    subscribe,
+    unsubscribe,
+    window_for_days,
+    windows_covering,
+)
+
+
+# Each test starts with a closed Redis circuit breaker
+pytestmark = pytest.mark.usefixtures("reset_redis_breaker")
+
+
+@pytest.fixture
+def cache():
+    cache = get_cache("test_invalidation", ttl=60)
+    cache.clear()
+    yield cache
+    cache.clear()
+
+
+class TestBackendTags:
+    """Tag index behaviour shared by both backends."""
+
+    @pytest.fixture(params=["memory", "redis"])
+    def backend(self, request):
+        if request.param == "memory":
+            return MemoryCacheBackend()
+        fakeredis = pytest.importorskip("fakeredis")
+        return RedisCacheBackend(fakeredis.FakeRedis())
+
+    def test_keys_for_tags_is_a_union(self, backend):
+        backend.set("a", 1, ttl=60)
+        backend.set("b", 2, ttl=60)
+        backend.set("c", 3, ttl=60)
+        backend.tag("a", ["card:1"])
+        backend.tag("b", ["card:2"])
+        backend.tag("c", ["card:3"])
+
+        assert backend.keys_for_tags(["card:1", "card:2"]) == {"a", "b"}
+
+    def test_delete_many(self, backend):
+        backend.set("a", 1, ttl=60)
+        backend.set("b", 2, ttl=60)
+
+        assert backend.delete_many(["a", "b", "missing"]) == 2
+        assert backend.get("a") is None
+        assert backend.get("b") is None
+
+
+class TestMemoryTagIndex:
+    """The in-process tag index must not outlive its entries."""
+
+    def test_lru_eviction_drops_tags(self):
+        backend = MemoryCacheBackend(maxsize=1)
+        backend.set("a", 1, ttl=60)
+        backend.tag("a", ["card:1"])
+        backend.set("b", 2, ttl=60)
+
+        assert backend.keys_for_tags(["card:1"]) == set()
+
+    def test_overwrite_resets_tags(self):
+        backend = MemoryCacheBackend()
+        backend.set("a", 1, ttl=60)
+        backend.tag("a", ["card:1"])
+        backend.set("a", 2, ttl=60)
+
+        assert backend.keys_for_tags(["card:1"]) == set()
+
+
+class TestWindows:
+    def test_recent_write_covers_every_window(self):
+        now = datetime.now(timezone.utc)
+        assert windows_covering(now - timedelta(minutes=5), now=now) == ["1h", "24h", "7d", "30d", "90d", "all"]
+
+    def test_old_write_skips_short_windows(self):
+        now = datetime.now(timezone.utc)
+        assert windows_covering(now - timedelta(days=20), now=now) == ["30d", "90d", "all"]
+
+    def test_naive_timestamps_treated_as_utc(self):
+        now = datetime.now(timezone.utc)
+        since = (now - timedelta(days=3)).replace(tzinfo=None)
+        assert windows_covering(since, now=now) == ["7d", "30d", "90d", "all"]
+
+    def test_unknown_since_covers_every_window(self):
+        assert "1h" in windows_covering(None)
+
+    def test_window_for_days(self):
+        assert window_for_days(7) == "7d"
+        assert window_for_days(14) == "30d"
+        assert window_for_days(90) == "90d"
+        assert window_for_days(365) == "all"
+
+
+class TestPublishCardUpdates:
+    """publish_card_updates evicts only entries the write can change."""
+
+    def test_evicts_only_touched_cards(self, cache):
+        cache.set("card-1", "one", tags=card_tags([1]))
+        cache.set("card-2", "two", tags=card_tags([2]))
+        cache.set("untagged", "keep")
+
+        publish_card_updates([1])
+
+        assert cache.get("card-1") is None
+        assert cache.get("card-2") == "two"
+        assert cache.get("untagged") == "keep"
+
+    def test_old_sale_keeps_short_windows(self, cache):
+        cache.set("7d", "short", tags=card_tags([1], "7d"))
+        cache.set("90d", "long", tags=card_tags([1], "90d"))
+
+        publish_card_updates([1], since=datetime.now(timezone.utc) - timedelta(days=20))
+
+        assert cache.get("7d") == "short"
+        assert cache.get("90d") is None
+
+    def test_market_aggregates_evicted_for_any_card(self, cache):
+        cache.set("overview_7d", {"cards": []}, tags=market_tags("7d"))
+
+        publish_card_updates([99])
+
+        assert cache.get("overview_7d") is None
+
+    def test_empty_publish_is_noop(self, cache):
+        cache.set("overview", {"cards": []}, tags=market_tags())
+        assert publish_card_updates([]) == 0
+        assert publish_card_updates([None, 0]) == 0
+        assert cache.get("overview") == {"cards": []}
+
+    def test_evicts_from_shared_backend(self, cache):
+        fakeredis = pytest.importorskip("fakeredis")
+        server = fakeredis.FakeServer()
+        try:
+            set_cache_backend(RedisCacheBackend(fakeredis.FakeRedis(server=server)))
+            cache.set("card-1", "one", tags=card_tags([1], "30d"))
+
+            # Another process (e.g. the scrape worker) publishes through its own client
+            other_process = RedisCacheBackend(fakeredis.FakeRedis(server=server))
+            assert other_process.keys_for_tags(["card:1"])
+
+            publish_card_updates([1])
+            assert cache.get("card-1") is None
+        finally:
+            set_cache_backend(None)
+
+    def test_subscribers_receive_events(self):
+        events = []
+
+        def on_update(event: CardUpdateEvent):
+            events.append(event)
+
+        subscribe(on_update)
+        try:
+            publish_card_updates([3, 4], source="test")
+        finally:
+            unsubscribe(on_update)
+
+        assert events == [CardUpdateEvent(card_ids=frozenset({3, 4}), since=None, source="test")]
+
+    def test_failing_subscriber_does_not_raise(self):
+        def broken(event):
+            raise RuntimeError("boom")
+
+        subscribe(broken)
+        try:
+            publish_card_updates([1])
+        finally:
+            unsubscribe(broken)
+
+    def test_invalidate_tags_within(self, cache):
+        cache.set("a", 1, tags=["card:1", "window:7d"])
+        cache.set("b", 2, tags=["card:1", "window:all"])
+
+        assert invalidate_tags(["card:1"], within=["window:all"]) == 1
+        assert cache.get("a") == 1
@@ -0,0 +1,125 @@
+"""
+Tests for post-scrape cache prewarming.
+
+Tests cover:
+- Request popularity tracking, bounding and decay
+- Warming the most requested variants through registered warmers
+- Cache.warm swapping entries in without evicting first
+"""
+
+import threading
+
+import pytest
+
+from app.core import cache_prewarm
+from app.core.cache import Cache, MemoryCacheBackend
+from app.core.cache_prewarm import RequestTracker, popular_requests, prewarm_popular_caches, register_warmer
+
+
+@pytest.fixture(autouse=True)
+def isolated_prewarm(monkeypatch):
+    """Fresh tracker, warmer registry and shared popular list for each test."""
+    monkeypatch.setattr(cache_prewarm, "request_tracker", RequestTracker())
+    monkeypatch.setattr(cache_prewarm, "_warmers", {})
+    cache_prewarm._popular_cache.clear()
+    yield
+    cache_prewarm._popular_cache.clear()
+
+
+class TestRequestTracker:
+    def test_most_common_orders_by_count(self):
+        tracker = RequestTracker()
+        for _ in range(3):
+            tracker.record("cards", {"time_period": "7d"})
+        tracker.record("cards", {"time_period": "30d"})
+
+        assert tracker.most_common(2) == [("cards", {"time_period": "7d"}), ("cards", {"time_period": "30d"})]
+
+    def test_param_order_does_not_matter(self):
+        tracker = RequestTracker()
+        tracker.record("cards", {"a": 1, "b": 2})
+        tracker.record("cards", {"b": 2, "a": 1})
+
+        assert len(tracker.most_common(10)) == 1
+
+    def test_bounded(self):
+        tracker = RequestTracker(maxsize=10)
+        for i in range(25):
+            tracker.record("cards", {"skip": i})
+
+        assert len(tracker.most_common(100)) <= 10
+
+    def test_decay_drops_one_off_requests(self):
+        tracker = RequestTracker()
+        tracker.record("cards", {"time_period": "7d"})
+        tracker.record("cards", {"time_period": "30d"})
+        tracker.record("cards", {"time_period": "30d"})
+
+        tracker.decay()
+
+        assert tracker.most_common(10) == [("cards", {"time_period": "30d"})]
+
+
+class TestPrewarm:
+    def test_warms_most_requested_variants(self):
+        warmed = []
+        register_warmer("cards", lambda params: warmed.append(params))
+        for _ in range(3):
+            cache_prewarm.record_request("cards", {"time_period": "7d"})
+        cache_prewarm.record_request("cards", {"time_period": "30d"})
+
+        assert prewarm_popular_caches(limit=1) == 1
+        assert warmed == [{"time_period": "7d"}]
+
+    def test_failing_warmer_does_not_stop_others(self):
+        warmed = []
+
+        def broken(params):
+            raise RuntimeError("db down")
+
+        register_warmer("cards", broken)
+        register_warmer("market_overview", lambda params: warmed.append(params))
+        cache_prewarm.record_request("cards", {"time_period": "7d"})
+        cache_prewarm.record_request("market_overview", {"time_period": "30d"})
+
+        assert prewarm_popular_caches(limit=10) == 1
+        assert warmed == [{"time_period": "30d"}]
+
+    def test_unregistered_endpoints_skipped(self):
+        cache_prewarm.record_request("unknown", {})
+        assert prewarm_popular_caches(limit=10) == 0
+
+    def test_uses_published_list_from_other_processes(self):
+        """A scheduler worker with no traffic of its own warms what web processes published."""
+        cache_prewarm._popular_cache.set(cache_prewarm._POPULAR_KEY, [["cards", {"time_period": "90d"}]])
+
+        assert popular_requests(5) == [("cards", {"time_period": "90d"})]
+
+    def test_publishes_top_list(self, monkeypatch):
+        monkeypatch.setattr(cache_prewarm, "PUBLISH_EVERY", 2)
+        cache_prewarm.record_request("cards", {"time_period": "7d"})
+        cache_prewarm.record_request("cards", {"time_period": "7d"})
+
+        assert cache_prewarm._popular_cache.get(cache_prewarm._POPULAR_KEY) == [["cards", {"time_period": "7d"}]]
+
+
+class TestCacheWarm:
+    def test_readers_see_old_entry_until_swap(self):
+        cache = Cache("prewarm_swap", MemoryCacheBackend(), ttl=60)
+        cache.get_or_compute("k", lambda: "old")
+        computing = threading.Event()
+        release = threading.Event()
+
+        def compute():
+            computing.set()
+            release.wait(timeout=5)
+            return "new"
+
+        warmer = threading.Thread(target=lambda: cache.warm("k", compute))
+        warmer.start()
+        assert computing.wait(timeout=5)
+
+        assert cache.get_or_compute("k", lambda: "unused") == ("old", "HIT")
+        release.set()
+        warmer.join(timeout=5)
+        assert cache.get_or_compute("k", lambda: "unused") == ("new", "HIT")
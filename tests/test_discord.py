@@ -859,3 +859,87 @@ class TestEmbedFormatting:
         if call_args.get("fields"):
             for field in call_args["fields"]:
                 assert len(field["value"]) <= 1024
+
+
+class TestMarketStatsCalculation:
+    """Tests for the grouped-query market stats in app.discord_bot.stats."""
+
+    def _add_sale(self, session, card_id, price, days_ago, treatment="Classic Paper"):
+        from datetime import timedelta
+        from app.models.market import MarketPrice
+
+        sold_at = datetime.now(timezone.utc) - timedelta(days=days_ago)
+        session.add(
+            MarketPrice(
+                card_id=card_id,
+                price=price,
+                title=f"Card {card_id} - {treatment}",
+                treatment=treatment,
+                listing_type="sold",
+                sold_date=sold_at,
+                scraped_at=sold_at,
+                platform="ebay",
+            )
+        )
+
+    def test_current_and_previous_period_aggregates(self, test_session, sample_cards):
+        """Totals, breakdowns and movers are computed from the grouped query."""
+        from app.discord_bot.stats import calculate_market_stats
+
+        # Card 1: current period 10 + 20 (Paper) and 30 (Foil); previous period 10 + 10
+        self._add_sale(test_session, 1, 10.0, 0.2)
+        self._add_sale(test_session, 1, 20.0, 0.3)
+        self._add_sale(test_session, 1, 30.0, 0.4, treatment="Classic Foil")
+        self._add_sale(test_session, 1, 10.0, 1.5)
+        self._add_sale(test_session, 1, 10.0, 1.6)
+        # Card 1: older history that sets the all-time high/low baseline
+        self._add_sale(test_session, 1, 50.0, 10)
+        self._add_sale(test_session, 1, 5.0, 12)
+        # Card 2: previous period only (counts toward prev totals, not movers)
+        self._add_sale(test_session, 2, 100.0, 1.5)
+        # Box: current period only, with no earlier history -> new high and new low
+        self._add_sale(test_session, 4, 80.0, 0.5, treatment="Sealed")
+        test_session.commit()
+
+        stats = calculate_market_stats("daily", session=test_session)
+
+        assert stats.total_sales == 4
+        assert stats.total_volume_usd == 140.0
+        assert stats.unique_cards_traded == 2
+        assert stats.avg_sale_price == 35.0
+        assert stats.prev_total_sales == 3
+        assert stats.prev_total_volume_usd == 120.0
+
+        assert stats.product_breakdown["Single"] == {"count": 3, "volume": 60.0, "avg_price": 20.0}
+        assert stats.product_breakdown["Box"] == {"count": 1, "volume": 80.0, "avg_price": 80.0}
+        assert stats.treatment_breakdown["Classic Paper"]["count"] == 2
+        assert stats.treatment_breakdown["Classic Foil"]["volume"] == 30.0
+
+        assert len(stats.top_movers) == 1
+        mover = stats.top_movers[0]
+        assert mover["card_id"] == 1
+        assert mover["current_price"] == 20.0
+        assert mover["prev_price"] == 10.0
+        assert mover["pct_change"] == 100.0
+        assert mover["volume"] == 3
+        assert mover["prev_volume"] == 2
+        assert mover["treatments"][0] == {"treatment": "Classic Paper", "count": 2, "avg": 15.0}
+        assert mover["reason"] == "Premium variants sold (Classic Foil)"
+
+        assert stats.top_volume[0]["card_id"] == 1
+        assert stats.top_volume[0]["sales_count"] == 3
+
+        # Card 1's current range (10-30) stays within its 5-50 history
+        assert [h["card_id"] for h in stats.new_highs] == [4]
+        assert [low["card_id"] for low in stats.new_lows] == [4]
+
+    def test_no_sales(self, test_session, sample_cards):
+        """An empty period yields zeroed stats."""
+        from app.discord_bot.stats import calculate_market_stats
+
+        stats = calculate_market_stats("weekly", session=test_session)
+
+        assert stats.total_sales == 0
+        assert stats.total_volume_usd == 0
+        assert stats.top_movers == []
+        assert stats.product_breakdown == {}
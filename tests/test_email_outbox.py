@@ -0,0 +1,324 @@
+"""
+Tests for the email outbox.
+
+Tests cover:
+- enqueue_emails(): dedupe keys, unknown kinds, JSON payloads
+- OutboxWorker.run(): batch requests of batch_size, provider ids recorded
+- 429: pause for Retry-After and retry the batch
+- 5xx: reschedule with attempts, failed after max_attempts
+- rejected batch: fall back to single sends, failing only the bad email
+- expired claims are delivered again
+- Idempotency-Keys: one per request, reused when the request is retried
+- retried batches are claimed whole, or resent per email when they can't be
+- purge_outbox()
+
+Delivery runs against a local HTTP stub of the Resend endpoints.
+"""
+
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from sqlmodel import select
+
+from app.models.email_outbox import EmailOutbox, EmailStatus
+from app.services.email_outbox import OutboxWorker, ResendClient, enqueue_emails, purge_outbox
+
+
+class StubResend:
+    """Records requests; `responses` is a queue of (status, headers) to return before succeeding."""
+
+    def __init__(self):
+        self.requests: list[tuple[str, object]] = []
+        self.keys: list[str] = []
+        self.responses: list[tuple[int, dict]] = []
+        self.reject: set[str] = set()
+        self.lock = threading.Lock()
+
+    def handle(self, path: str, body, key: str):
+        with self.lock:
+            self.requests.append((path, body))
+            self.keys.append(key)
+            if self.responses:
+                return self.responses.pop(0) + ({"message": "error"},)
+        emails = body if isinstance(body, list) else [body]
+        if any(email["to"][0] in self.reject for email in emails):
+            return 422, {}, {"message": "invalid recipient"}
+        ids = [{"id": f"msg-{email['to'][0]}"} for email in emails]
+        return 200, {}, {"data": ids} if path.endswith("/batch") else ids[0]
+
+
+@pytest.fixture
+def stub():
+    resend = StubResend()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            status, headers, payload = resend.handle(self.path, body, self.headers.get("Idempotency-Key"))
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    resend.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield resend
+    server.shutdown()
+    server.server_close()
+
+
+def alert(n: int, **fields) -> EmailOutbox:
+    return EmailOutbox(
+        kind="price_alert",
+        to_email=f"user{n}@example.com",
+        user_name=f"user{n}",
+        payload={
+            "card_name": f"Card {n}",
+            "card_slug": f"card-{n}",
+            "alert_type": "below",
+            "target_price": 10.0,
+            "current_price": 9.0,
+            "treatment": "Classic Paper",
+        },
+        **fields,
+    )
+
+
+@pytest.fixture
+def queued(test_session):
+    enqueue_emails(test_session, [alert(n) for n in range(5)])
+    test_session.commit()
+
+
+async def deliver(stub, test_engine, **options):
+    client = ResendClient(api_key="test", base_url=stub.url)
+    try:
+        worker = OutboxWorker(client, bind=test_engine, rate_per_second=0, **options)
+        return await worker.run()
+    finally:
+        await client.aclose()
+
+
+def outbox(test_session) -> dict[str, EmailOutbox]:
+    test_session.expire_all()
+    return {e.to_email: e for e in test_session.exec(select(EmailOutbox)).all()}
+
+
+class TestEnqueue:
+    """Queueing emails."""
+
+    def test_dedupe_keys(self, test_session):
+        assert enqueue_emails(test_session, [alert(1, dedupe_key="a"), alert(2, dedupe_key="a"), alert(3)]) == 2
+        test_session.commit()
+        assert enqueue_emails(test_session, [alert(4, dedupe_key="a"), alert(5, dedupe_key="b")]) == 1
+        test_session.commit()
+        assert set(outbox(test_session)) == {"user1@example.com", "user3@example.com", "user5@example.com"}
+
+    def test_unknown_kind(self, test_session):
+        with pytest.raises(ValueError):
+            enqueue_emails(test_session, [EmailOutbox(kind="nope", to_email="x@example.com", user_name="x")])
+
+    def test_payload_stored_as_json(self, test_session):
+        email = alert(1)
+        email.payload["when"] = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        enqueue_emails(test_session, [email])
+        test_session.commit()
+        assert outbox(test_session)["user1@example.com"].payload["when"] == "2026-01-01 00:00:00+00:00"
+
+
+class TestDelivery:
+    """Batch sends against the provider stub."""
+
+    @pytest.mark.asyncio
+    async def test_batches(self, stub, test_engine, test_session, queued):
+        stats = await deliver(stub, test_engine, batch_size=2, concurrency=2)
+
+        assert (stats.sent, stats.retried, stats.failed) == (5, 0, 0)
+        assert sorted((path, len(body) if path.endswith("/batch") else 1) for path, body in stub.requests) == [
+            ("/emails", 1),
+            ("/emails/batch", 2),
+            ("/emails/batch", 2),
+        ]
+        assert len(set(stub.keys)) == 3
+        sent = outbox(test_session)["user3@example.com"]
+        assert sent.status == EmailStatus.SENT
+        assert sent.provider_id == "msg-user3@example.com"
+        assert sent.attempts == 1
+        assert sent.sent_at is not None
+
+    @pytest.mark.asyncio
+    async def test_rate_limited_batch_is_retried(self, stub, test_engine, test_session, queued):
+        stub.responses = [(429, {"Retry-After": "0.05"})]
+
+        stats = await deliver(stub, test_engine)
+
+        assert stats.sent == 5
+        assert [len(body) for _, body in stub.requests] == [5, 5]
+        assert {e.attempts for e in outbox(test_session).values()} == {1}
+
+    @pytest.mark.asyncio
+    async def test_server_errors_reschedule_then_fail(self, stub, test_engine, test_session, queued):
+        stub.responses = [(500, {})] * 2
+
+        stats = await deliver(stub, test_engine, max_attempts=2)
+        assert (stats.sent, stats.retried) == (0, 5)
+        rescheduled = outbox(test_session)["user1@example.com"]
+        assert rescheduled.status == EmailStatus.PENDING
+        assert rescheduled.attempts == 1
+        assert "HTTP 500" in rescheduled.last_error
+        # Not due yet: nothing is claimed
+        assert (await deliver(stub, test_engine)).sent == 0
+
+        with test_engine.begin() as conn:
+            conn.execute(EmailOutbox.__table__.update().values(next_attempt_at=datetime.now(timezone.utc)))
+        stats = await deliver(stub, test_engine, max_attempts=2)
+        assert stats.failed == 5
+        failed = outbox(test_session)["user1@example.com"]
+        assert (failed.status, failed.attempts) == (EmailStatus.FAILED, 2)
+
+    @pytest.mark.asyncio
+    async def test_rejected_batch_falls_back_to_single_sends(self, stub, test_engine, test_session, queued):
+        stub.reject = {"user2@example.com"}
+
+        stats = await deliver(stub, test_engine)
+
+        assert (stats.sent, stats.failed) == (4, 1)
+        assert [path for path, _ in stub.requests] == ["/emails/batch"] + ["/emails"] * 5
+        emails = outbox(test_session)
+        assert emails["user2@example.com"].status == EmailStatus.FAILED
+        assert emails["user1@example.com"].provider_id == "msg-user1@example.com"
+
+    @pytest.mark.asyncio
+    async def test_expired_claims_are_delivered(self, stub, test_engine, test_session):
+        now = datetime.now(timezone.utc)
+        enqueue_emails(
+            test_session,
+            [
+                alert(1, status=EmailStatus.SENDING, attempts=1, next_attempt_at=now - timedelta(minutes=1)),
+                alert(2, status=EmailStatus.SENDING, attempts=1, next_attempt_at=now + timedelta(minutes=5)),
+            ],
+        )
+        test_session.commit()
+
+        stats = await deliver(stub, test_engine)
+
+        assert stats.sent == 1
+        emails = outbox(test_session)
+        assert (emails["user1@example.com"].status, emails["user1@example.com"].attempts) == (EmailStatus.SENT, 2)
+        assert emails["user2@example.com"].status == EmailStatus.SENDING
+
+
+class TestPurge:
+    """Removing old delivered and failed emails."""
+
+    def test_purge(self, test_session):
+        old = datetime.now(timezone.utc) - timedelta(days=40)
+        enqueue_emails(
+            test_session,
+            [
+                alert(1, status=EmailStatus.SENT, created_at=old),
+                alert(2, status=EmailStatus.FAILED, created_at=old),
+                alert(3, status=EmailStatus.PENDING, created_at=old),
+                alert(4, status=EmailStatus.SENT),
+            ],
+        )
+        test_session.commit()
+
+        assert purge_outbox(test_session, days_to_keep=30) == 2
+        assert set(outbox(test_session)) == {"user3@example.com", "user4@example.com"}
+
+
+class TestIdempotency:
+    """Retries repeat the same request under the same Idempotency-Key."""
+
+    @pytest.mark.asyncio
+    async def test_retry_reuses_batch_and_key(self, stub, test_engine, test_session, queued):
+        stub.responses = [(500, {})]
+        await deliver(stub, test_engine, batch_size=5)
+        first_key = stub.keys[0]
+        assert first_key.startswith("outbox-batch-")
+        assert {e.idempotency_key for e in outbox(test_session).values()} == {first_key}
+
+        # Due again, claimed alongside a new email: the retried batch is resent as it was
+        enqueue_emails(test_session, [alert(9)])
+        test_session.commit()
+        with test_engine.begin() as conn:
+            conn.execute(EmailOutbox.__table__.update().values(next_attempt_at=datetime.now(timezone.utc)))
+        stats = await deliver(stub, test_engine, batch_size=5)
+
+        assert stats.sent == 6
+        new_id = outbox(test_session)["user9@example.com"].id
+        resent = sorted((path, key) for (path, _), key in zip(stub.requests[1:], stub.keys[1:]))
+        assert resent == [("/emails", f"outbox-{new_id}"), ("/emails/batch", first_key)]
+        assert [len(body) for path, body in stub.requests[1:] if path == "/emails/batch"] == [5]
+
+    @pytest.mark.asyncio
+    async def test_expired_claim_keeps_key(self, stub, test_engine, test_session):
+        now = datetime.now(timezone.utc)
+        enqueue_emails(
+            test_session,
+            [
+                alert(n, status=EmailStatus.SENDING, attempts=1, next_attempt_at=now, idempotency_key="outbox-batch-x")
+                for n in (1, 2)
+            ],
+        )
+        test_session.commit()
+
+        assert (await deliver(stub, test_engine)).sent == 2
+        assert stub.keys == ["outbox-batch-x"]
+
+    @pytest.mark.asyncio
+    async def test_claim_takes_whole_retried_batch(self, stub, test_engine, test_session):
+        now = datetime.now(timezone.utc)
+        enqueue_emails(
+            test_session,
+            [alert(n, attempts=1, next_attempt_at=now, idempotency_key="outbox-batch-x") for n in (0, 1, 2)],
+        )
+        test_session.commit()
+
+        # Claims two rows at a time, but the batch was three emails
+        assert (await deliver(stub, test_engine, batch_size=2, concurrency=1)).sent == 3
+        assert stub.keys == ["outbox-batch-x"]
+        assert [len(body) for _, body in stub.requests] == [3]
+
+    @pytest.mark.asyncio
+    async def test_partially_claimed_batch_uses_email_keys(self, stub, test_engine, test_session):
+        now = datetime.now(timezone.utc)
+        due = [alert(n, attempts=1, next_attempt_at=now, idempotency_key="outbox-batch-x") for n in (0, 1)]
+        # The batch's third email is leased by another worker
+        held = alert(
+            2, status=EmailStatus.SENDING, attempts=1, next_attempt_at=now + timedelta(minutes=5),
+            idempotency_key="outbox-batch-x",
+        )  # fmt: skip
+        enqueue_emails(test_session, [*due, held])
+        test_session.commit()
+
+        assert (await deliver(stub, test_engine)).sent == 2
+
+        emails = outbox(test_session)
+        ids = [emails[f"user{n}@example.com"].id for n in (0, 1)]
+        assert all(path == "/emails" for path, _ in stub.requests)
+        assert sorted(stub.keys) == sorted(f"outbox-{i}" for i in ids)
+        assert [emails[f"user{n}@example.com"].idempotency_key for n in (0, 1)] == [f"outbox-{i}" for i in ids]
+        assert emails["user2@example.com"].status == EmailStatus.SENDING
+
+    @pytest.mark.asyncio
+    async def test_single_sends_use_email_keys(self, stub, test_engine, test_session, queued):
+        stub.reject = {"user2@example.com"}
+
+        await deliver(stub, test_engine)
+
+        ids = {email: e.id for email, e in outbox(test_session).items()}
+        assert stub.keys[1:] == [f"outbox-{i}" for i in sorted(ids.values())]
@@ -0,0 +1,153 @@
+"""
+Tests for the fast JSON encoding path in app.core.fast_json.
+
+Tests cover:
+- schema_encoder output matching model_dump(mode="json") for list schemas
+- Datetime formatting (UTC "Z", naive, other offsets) and int-to-float coercion
+- dumps()/FastJSONResponse decoding to the same JSON as JSONResponse
+- schema_columns selecting the columns backing each schema field
+"""
+
+import json
+from datetime import datetime, timedelta, timezone
+
+from fastapi.responses import JSONResponse
+
+from app.api.blokpax import BlokpaxSaleOut, BlokpaxSnapshotOut, BlokpaxStorefrontOut
+from app.core.fast_json import FastJSONResponse, dumps, json_datetime, schema_columns, schema_encoder
+from app.models.market import MarketPrice
+from app.schemas import CardListItem, CardOut, MarketPriceOut
+
+
+def market_price_row(**overrides) -> dict:
+    row = {
+        "id": 7,
+        "card_id": 3,
+        "price": 12,  # int from the DB, pydantic coerces to float
+        "title": "Card Name - Formless Foil",
+        "sold_date": datetime(2025, 1, 2, 3, 4, 5, 678000, tzinfo=timezone.utc),
+        "listing_type": "sold",
+        "treatment": "Formless Foil",
+        "bid_count": 2,
+        "url": "https://example.com/itm/1",
+        "image_url": None,
+        "seller_name": "seller",
+        "seller_feedback_score": 100,
+        "seller_feedback_percent": 99,
+        "condition": None,
+        "shipping_cost": None,
+        "product_subtype": None,
+        "quantity": 1,
+        "scraped_at": datetime(2025, 1, 2, 4, 0, 0),
+    }
+    row.update(overrides)
+    return row
+
+
+class TestSchemaEncoder:
+    def test_market_price_matches_model_dump(self):
+        row = market_price_row()
+        expected = MarketPriceOut(**row).model_dump(mode="json")
+        assert schema_encoder(MarketPriceOut)(row) == expected
+        assert isinstance(schema_encoder(MarketPriceOut)(row)["price"], float)
+
+    def test_missing_values_take_field_defaults(self):
+        row = market_price_row()
+        del row["treatment"], row["bid_count"]
+        expected = MarketPriceOut(**row).model_dump(mode="json")
+        encoded = schema_encoder(MarketPriceOut)(row)
+        assert encoded == expected
+        assert encoded["treatment"] == "Classic Paper"
+
+    def test_card_schemas_match_model_dump(self):
+        values = {
+            "id": 1,
+            "name": "Test Card",
+            "set_name": "Existence",
+            "rarity_id": 2,
+            "rarity_name": "Rare",
+            "floor_price": 10,
+            "floor_by_variant": {"Classic Paper": 10.0},
+            "volume": 5,
+            "last_updated": datetime(2025, 1, 1, tzinfo=timezone.utc),
+        }
+        for schema in (CardOut, CardListItem):
+            fields = {k: v for k, v in values.items() if k in schema.model_fields}
+            assert schema_encoder(schema)(fields) == schema(**fields).model_dump(mode="json")
+
+    def test_blokpax_schemas_match_model_dump(self):
+        now = datetime(2025, 6, 1, 12, 30, tzinfo=timezone.utc)
+        storefront = {
+            "id": 1,
+            "slug": "wotf-art-proofs",
+            "name": "Art Proofs",
+            "network_id": 1,
+            "floor_price_usd": 25,
+            "total_tokens": 100,
+            "listed_count": 4,
+            "updated_at": now,
+        }
+        snapshot = {
+            "id": 2,
+            "storefront_slug": "wotf-art-proofs",
+            "floor_price_bpx": None,
+            "bpx_price_usd": 0.002,
+            "listed_count": 4,
+            "total_tokens": 100,
+            "timestamp": now,
+        }
+        sale = {
+            "id": 3,
+            "listing_id": "L1",
+            "asset_id": "A1",
+            "asset_name": "Proof",
+            "price_bpx": 1000,
+            "price_usd": 2,
+            "quantity": 1,
+            "seller_address": "0xa",
+            "buyer_address": "0xb",
+            "filled_at": now,
+        }
+        for schema, values in (
+            (BlokpaxStorefrontOut, storefront),
+            (BlokpaxSnapshotOut, snapshot),
+            (BlokpaxSaleOut, sale),
+        ):
+            assert schema_encoder(schema)(values) == schema(**values).model_dump(mode="json")
+
+    def test_encoder_is_cached_per_schema(self):
+        assert schema_encoder(MarketPriceOut) is schema_encoder(MarketPriceOut)
+
+
+class TestJsonDatetime:
+    def test_formats_like_pydantic(self):
+        for value in (
+            datetime(2025, 1, 1, tzinfo=timezone.utc),
+            datetime(2025, 1, 1, 8, 0, 0, 123456),
+            datetime(2025, 1, 1, tzinfo=timezone(timedelta(hours=-5))),
+        ):
+            expected = MarketPriceOut(**market_price_row(sold_date=value)).model_dump(mode="json")["sold_date"]
+            assert json_datetime(value) == expected
+
+    def test_none(self):
+        assert json_datetime(None) is None
+
+
+class TestDumps:
+    def test_decodes_like_json_response(self):
+        payload = {"items": [schema_encoder(MarketPriceOut)(market_price_row())], "hasMore": True, "total": None}
+        assert json.loads(dumps(payload)) == json.loads(JSONResponse(content=payload).body)
+
+    def test_fast_json_response(self):
+        response = FastJSONResponse(content=[{"name": "Café", "price": 1.5}])
+        assert response.media_type == "application/json"
+        assert json.loads(response.body) == [{"name": "Café", "price": 1.5}]
+
+    def test_int_keys(self):
+        assert json.loads(dumps({1: "a"})) == {"1": "a"}
+
+
+class TestSchemaColumns:
+    def test_columns_follow_schema_fields(self):
+        columns = schema_columns(MarketPrice, MarketPriceOut)
+        assert [c.key for c in columns] == list(MarketPriceOut.model_fields)
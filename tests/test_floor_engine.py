@@ -0,0 +1,174 @@
+"""
+Tests for the vectorized sales floor engine (app/services/floor_engine.py).
+
+Tests cover:
+- Lowest-4 average, count and platforms per card across several windows
+- Treatment filter (Blokpax sales always included) and variant grouping
+- Per-treatment floors used by the treatment multiplier fallback
+- Agreement with a straightforward per-group reference implementation
+- Loading sales from the database (marketprice + blokpaxsale)
+"""
+
+import random
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from sqlmodel import Session
+
+from app.models.blokpax import BlokpaxSale
+from app.models.market import MarketPrice
+from app.services.floor_engine import NUM_LOWEST_SALES, SalesFloorEngine
+
+
+class TestFloors:
+    """Tests for SalesFloorEngine.floors()."""
+
+    def test_lowest_four_per_window(self, floor_sale):
+        engine = SalesFloorEngine(
+            [
+                floor_sale(1, 10.0, days_ago=5),
+                floor_sale(1, 12.0, days_ago=10),
+                floor_sale(1, 2.0, days_ago=60),  # only in the 90 day window
+                floor_sale(1, 14.0, days_ago=20, platform="opensea"),
+                floor_sale(1, 16.0, days_ago=25),
+                floor_sale(1, 100.0, days_ago=1),
+                floor_sale(2, 5.0, days_ago=100),  # outside both windows
+            ],
+            now=floor_sale.now,
+        )
+
+        floors = engine.floors([30, 90])
+
+        assert floors[30][1] == {"price": 13.0, "count": 4, "total": 5, "platforms": ["ebay", "opensea"]}
+        assert floors[90][1]["price"] == 9.5  # 2, 10, 12, 14
+        assert floors[90][1]["total"] == 6
+        assert 2 not in floors[30] and 2 not in floors[90]
+
+    def test_treatment_filter_keeps_blokpax(self, floor_sale):
+        engine = SalesFloorEngine(
+            [
+                floor_sale(1, 1.0),
+                floor_sale(1, 8.0, treatment="Classic Foil"),
+                floor_sale(1, 10.0, platform="blokpax"),
+            ],
+            now=floor_sale.now,
+        )
+
+        foil = engine.floors([30], treatment="Classic Foil")[30][1]
+
+        assert foil["price"] == 9.0
+        assert sorted(foil["platforms"]) == ["blokpax", "ebay"]
+
+    def test_by_variant(self, floor_sale):
+        engine = SalesFloorEngine(
+            [
+                floor_sale(1, 10.0, treatment="Classic Foil"),
+                floor_sale(1, 20.0, treatment="Classic Foil", subtype="Collector Booster Box"),
+                floor_sale(1, 30.0, platform="blokpax"),
+                floor_sale(1, 40.0, treatment="Base"),
+            ],
+            now=floor_sale.now,
+        )
+
+        variants = engine.floors([30], by_variant=True)[30]
+
+        assert set(variants) == {(1, "Classic Foil"), (1, "Collector Booster Box"), (1, "Base")}
+        assert variants[(1, "Base")]["price"] == 35.0
+        assert variants[(1, "Base")]["variant"] == "Base"
+
+    def test_missing_variant_keyed_by_none(self, floor_sale):
+        engine = SalesFloorEngine(
+            [floor_sale(1, 10.0, treatment=None), floor_sale(1, 20.0, treatment="Classic Foil")], now=floor_sale.now
+        )
+
+        variants = engine.floors([30], by_variant=True)[30]
+
+        assert set(variants) == {(1, None), (1, "Classic Foil")}
+        assert variants[(1, None)]["variant"] is None
+        assert variants[(1, None)]["price"] == 10.0
+
+    def test_empty(self, floor_sale):
+        engine = SalesFloorEngine(now=floor_sale.now)
+        assert engine.floors([30, 90]) == {30: {}, 90: {}}
+        assert engine.floors([30], by_variant=True) == {30: {}}
+        assert engine.treatment_floors(90) == {}
+
+    def test_matches_reference(self, floor_sale):
+        """Vectorized floors equal sorting each group's in-window prices."""
+        rng = random.Random(7)
+        records = [
+            floor_sale(
+                rng.randint(1, 20),
+                round(rng.uniform(1, 200), 2),
+                days_ago=rng.uniform(0, 120),
+                platform=rng.choice(["ebay", "ebay", "opensea", "blokpax"]),
+                treatment=rng.choice(["Classic Paper", "Classic Foil"]),
+            )
+            for _ in range(2000)
+        ]
+        engine = SalesFloorEngine(records, now=floor_sale.now)
+
+        floors = engine.floors([7, 30, 90])
+        for days, by_card in floors.items():
+            cutoff = floor_sale.now - timedelta(days=days)
+            for card_id in range(1, 21):
+                prices = sorted(r[3] for r in records if r[0] == card_id and r[5] >= cutoff)
+                if not prices:
+                    assert card_id not in by_card
+                    continue
+                lowest = prices[:NUM_LOWEST_SALES]
+                assert by_card[card_id]["price"] == round(sum(lowest) / len(lowest), 2)
+                assert by_card[card_id]["count"] == len(lowest)
+                assert by_card[card_id]["total"] == len(prices)
+
+
+class TestTreatmentFloors:
+    """Tests for SalesFloorEngine.treatment_floors()."""
+
+    def test_per_treatment_floor_and_total(self, floor_sale):
+        engine = SalesFloorEngine(
+            [
+                *(floor_sale(1, float(p)) for p in (1, 2, 3, 4, 5, 6)),
+                floor_sale(1, 9.0, treatment="Classic Foil"),
+                floor_sale(1, 5.0, platform="blokpax"),  # no treatment: excluded
+                floor_sale(2, 50.0, treatment="Promo", days_ago=100),  # outside window
+            ],
+            now=floor_sale.now,
+        )
+
+        assert engine.treatment_floors(90) == {
+            (1, "Classic Paper"): {"floor": 2.5, "count": 6},
+            (1, "Classic Foil"): {"floor": 9.0, "count": 1},
+        }
+
+
+class TestLoad:
+    """Tests for SalesFloorEngine.load()."""
+
+    def test_loads_marketprice_and_blokpax(self, test_session: Session, sample_market_prices: List[MarketPrice]):
+        test_session.add(
+            BlokpaxSale(
+                listing_id="bpx-1",
+                asset_id="asset-1",
+                asset_name="Test Card Common",
+                price_bpx=1.0,
+                price_usd=0.5,
+                quantity=1,
+                seller_address="0xseller",
+                buyer_address="0xbuyer",
+                filled_at=datetime.now(timezone.utc) - timedelta(days=2),
+                card_id=1,
+            )
+        )
+        test_session.commit()
+
+        engine = SalesFloorEngine.load([1, 2], days=30, session=test_session)
+        floors = engine.floors([30])[30]
+
+        assert floors[1]["price"] == 1.25  # 0.50 (blokpax), 1.00, 1.50, 2.00
+        assert sorted(floors[1]["platforms"]) == ["blokpax", "ebay"]
+        assert floors[2]["price"] == 13.75
+        assert engine.floors([30], treatment="Classic Foil")[30][1]["price"] == round((0.5 + 5 + 6 + 7) / 4, 2)
+
+        without_blokpax = SalesFloorEngine.load([1], days=30, include_blokpax=False, session=test_session)
+        assert without_blokpax.floors([30])[30][1]["price"] == 1.75
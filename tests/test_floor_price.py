@@ -22,6 +22,7 @@ from app.services.floor_price import (
     get_floor_price_service,
     clear_floor_cache,
 )
+from app.services.floor_engine import SalesFloorEngine
 from app.services.order_book import OrderBookAnalyzer, OrderBookResult, BucketInfo
 
 
@@ -33,6 +34,16 @@ def clear_cache():
     clear_floor_cache()
 
 
+@pytest.fixture
+def engine_with(floor_sale):
+    """SalesFloorEngine over the given floor_sale records."""
+
+    def make(*sales):
+        return SalesFloorEngine(sales, now=floor_sale.now)
+
+    return make
+
+
 class TestFloorPriceService:
     """Tests for FloorPriceService class."""
 
@@ -42,13 +53,16 @@ class TestFloorPriceService:
         return FloorPriceService()
 
     @pytest.fixture
-    def mock_sales_result(self):
-        """Mock sales result with 4+ sales."""
-        return {
-            "price": 25.00,
-            "count": 6,
-            "platforms": ["ebay", "opensea"],
-        }
+    def mock_sales_engine(self, engine_with, floor_sale):
+        """Sales engine with 6 sales; the 4 lowest average $25."""
+        return engine_with(
+            floor_sale(123, 20.0),
+            floor_sale(123, 24.0),
+            floor_sale(123, 26.0, platform="opensea"),
+            floor_sale(123, 30.0),
+            floor_sale(123, 40.0),
+            floor_sale(123, 50.0),
+        )
 
     @pytest.fixture
     def mock_order_book_result(self):
@@ -69,21 +83,22 @@ class TestFloorPriceService:
 class TestSalesFloorHighConfidence(TestFloorPriceService):
     """Tests for sales floor with high confidence (>=4 sales)."""
 
-    def test_returns_sales_floor_with_4_plus_sales(self, service, mock_sales_result):
+    def test_returns_sales_floor_with_4_plus_sales(self, service, mock_sales_engine):
         """Should return SALES source with HIGH confidence when >=4 sales."""
-        with patch.object(service, "_get_sales_floor", return_value=mock_sales_result):
+        with patch.object(service, "_load_sales_engine", return_value=mock_sales_engine):
             result = service.get_floor_price(card_id=123)
 
         assert result.price == 25.00
         assert result.source == FloorPriceSource.SALES
         assert result.confidence == ConfidenceLevel.HIGH
         assert result.confidence_score == 1.0
-        assert result.metadata["sales_count"] == 6
+        assert result.metadata["sales_count"] == 4
+        assert sorted(result.metadata["platforms"]) == ["ebay", "opensea"]
 
-    def test_does_not_check_order_book_when_sales_sufficient(self, service, mock_sales_result):
+    def test_does_not_check_order_book_when_sales_sufficient(self, service, mock_sales_engine):
         """Should not query order book when sales are sufficient."""
-        with patch.object(service, "_get_sales_floor", return_value=mock_sales_result):
-            with patch.object(OrderBookAnalyzer, "estimate_floor") as mock_estimate:
+        with patch.object(service, "_load_sales_engine", return_value=mock_sales_engine):
+            with patch.object(OrderBookAnalyzer, "estimate_floors_batch") as mock_estimate:
                 result = service.get_floor_price(card_id=123)
                 mock_estimate.assert_not_called()
 
@@ -93,13 +108,13 @@ class TestSalesFloorHighConfidence(TestFloorPriceService):
 class TestOrderBookFallback(TestFloorPriceService):
     """Tests for order book fallback when sales insufficient."""
 
-    def test_falls_back_to_order_book_when_no_sales(self, service, mock_order_book_result):
+    def test_falls_back_to_order_book_when_no_sales(self, service, mock_order_book_result, engine_with):
         """Should use order book when no sales data available."""
-        with patch.object(service, "_get_sales_floor", return_value=None):
+        with patch.object(service, "_load_sales_engine", return_value=engine_with()):
             with patch.object(
                 service.order_book_analyzer,
-                "estimate_floor",
-                return_value=mock_order_book_result,
+                "estimate_floors_batch",
+                return_value={123: mock_order_book_result},
             ):
                 result = service.get_floor_price(card_id=123)
 
@@ -108,22 +123,20 @@ class TestOrderBookFallback(TestFloorPriceService):
         assert result.confidence == ConfidenceLevel.HIGH
         assert result.confidence_score == 0.85
 
-    def test_falls_back_to_order_book_when_few_sales(self, service, mock_order_book_result):
+    def test_falls_back_to_order_book_when_few_sales(self, service, mock_order_book_result, engine_with, floor_sale):
         """Should use order book when only 1 sale (below threshold)."""
-        sparse_sales = {"price": 20.00, "count": 1, "platforms": ["ebay"]}
-
-        with patch.object(service, "_get_sales_floor", return_value=sparse_sales):
+        with patch.object(service, "_load_sales_engine", return_value=engine_with(floor_sale(123, 20.0))):
             with patch.object(
                 service.order_book_analyzer,
-                "estimate_floor",
-                return_value=mock_order_book_result,
+                "estimate_floors_batch",
+                return_value={123: mock_order_book_result},
             ):
                 result = service.get_floor_price(card_id=123)
 
         assert result.source == FloorPriceSource.ORDER_BOOK
         assert result.price == 28.50
 
-    def test_order_book_confidence_mapping_high(self, service):
+    def test_order_book_confidence_mapping_high(self, service, engine_with):
         """Should map OB confidence >0.7 to HIGH."""
         ob_result = OrderBookResult(
             floor_estimate=30.0,
@@ -135,13 +148,13 @@ class TestOrderBookFallback(TestFloorPriceService):
             buckets=[],
         )
 
-        with patch.object(service, "_get_sales_floor", return_value=None):
-            with patch.object(service.order_book_analyzer, "estimate_floor", return_value=ob_result):
+        with patch.object(service, "_load_sales_engine", return_value=engine_with()):
+            with patch.object(service.order_book_analyzer, "estimate_floors_batch", return_value={123: ob_result}):
                 result = service.get_floor_price(card_id=123)
 
         assert result.confidence == ConfidenceLevel.HIGH
 
-    def test_order_book_confidence_mapping_medium(self, service):
+    def test_order_book_confidence_mapping_medium(self, service, engine_with):
         """Should map OB confidence 0.4-0.7 to MEDIUM."""
         ob_result = OrderBookResult(
             floor_estimate=30.0,
@@ -153,13 +166,13 @@ class TestOrderBookFallback(TestFloorPriceService):
             buckets=[],
         )
 
-        with patch.object(service, "_get_sales_floor", return_value=None):
-            with patch.object(service.order_book_analyzer, "estimate_floor", return_value=ob_result):
+        with patch.object(service, "_load_sales_engine", return_value=engine_with()):
+            with patch.object(service.order_book_analyzer, "estimate_floors_batch", return_value={123: ob_result}):
                 result = service.get_floor_price(card_id=123)
 
         assert result.confidence == ConfidenceLevel.MEDIUM
 
-    def test_order_book_confidence_mapping_low(self, service):
+    def test_order_book_confidence_mapping_low(self, service, engine_with):
         """Should map OB confidence <0.4 to LOW."""
         ob_result = OrderBookResult(
             floor_estimate=30.0,
@@ -171,8 +184,8 @@ class TestOrderBookFallback(TestFloorPriceService):
             buckets=[],
         )
 
-        with patch.object(service, "_get_sales_floor", return_value=None):
-            with patch.object(service.order_book_analyzer, "estimate_floor", return_value=ob_result):
+        with patch.object(service, "_load_sales_engine", return_value=engine_with()):
+            with patch.object(service.order_book_analyzer, "estimate_floors_batch", return_value={123: ob_result}):
                 result = service.get_floor_price(card_id=123)
 
         assert result.confidence == ConfidenceLevel.LOW
@@ -181,9 +194,8 @@ class TestOrderBookFallback(TestFloorPriceService):
 class TestLowConfidenceSales(TestFloorPriceService):
     """Tests for sales floor with low confidence (2-3 sales)."""
 
-    def test_uses_sales_with_2_sales_low_confidence(self, service):
+    def test_uses_sales_with_2_sales_low_confidence(self, service, engine_with, floor_sale):
         """Should use SALES with LOW confidence when 2 sales and OB fails."""
-        sparse_sales = {"price": 22.00, "count": 2, "platforms": ["ebay"]}
         low_ob_result = OrderBookResult(
             floor_estimate=25.0,
             confidence=0.2,  # Below threshold
@@ -194,8 +206,10 @@ class TestLowConfidenceSales(TestFloorPriceService):
             buckets=[],
         )
 
-        with patch.object(service, "_get_sales_floor", return_value=sparse_sales):
-            with patch.object(service.order_book_analyzer, "estimate_floor", return_value=low_ob_result):
+        with patch.object(
+            service, "_load_sales_engine", return_value=engine_with(floor_sale(123, 20.0), floor_sale(123, 24.0))
+        ):
+            with patch.object(service.order_book_analyzer, "estimate_floors_batch", return_value={123: low_ob_result}):
                 result = service.get_floor_price(card_id=123)
 
         assert result.price == 22.00
@@ -203,12 +217,12 @@ class TestLowConfidenceSales(TestFloorPriceService):
         assert result.confidence == ConfidenceLevel.LOW
         assert result.confidence_score == 0.5  # 2/4
 
-    def test_uses_sales_with_3_sales_medium_confidence(self, service):
+    def test_uses_sales_with_3_sales_medium_confidence(self, service, engine_with, floor_sale):
         """Should use SALES with MEDIUM confidence when 3 sales and OB fails."""
-        sparse_sales = {"price": 23.00, "count": 3, "platforms": ["opensea"]}
+        sales = engine_with(*(floor_sale(123, price, platform="opensea") for price in (22.0, 23.0, 24.0)))
 
-        with patch.object(service, "_get_sales_floor", return_value=sparse_sales):
-            with patch.object(service.order_book_analyzer, "estimate_floor", return_value=None):
+        with patch.object(service, "_load_sales_engine", return_value=sales):
+            with patch.object(service.order_book_analyzer, "estimate_floors_batch", return_value={}):
                 result = service.get_floor_price(card_id=123)
 
         assert result.price == 23.00
@@ -220,51 +234,49 @@ class TestLowConfidenceSales(TestFloorPriceService):
 class TestTimeWindowExpansion(TestFloorPriceService):
     """Tests for time window expansion (30d -> 90d)."""
 
-    def test_expands_to_90_days_when_no_data(self, service):
+    def test_expands_to_90_days_when_no_data(self, service, engine_with, floor_sale):
         """Should expand to 90 days when no data in 30 days."""
-        call_count = 0
-
-        def mock_get_sales(card_id, treatment, days, include_blokpax):
-            nonlocal call_count
-            call_count += 1
-            if days == 30:
-                return None  # No data in 30 days
-            elif days == 90:
-                return {"price": 30.00, "count": 5, "platforms": ["ebay"]}
-            return None
-
-        with patch.object(service, "_get_sales_floor", side_effect=mock_get_sales):
-            with patch.object(service.order_book_analyzer, "estimate_floor", return_value=None):
+        old_sales = engine_with(*(floor_sale(123, price, days_ago=45) for price in (28.0, 29.0, 31.0, 32.0, 40.0)))
+
+        with patch.object(service, "_load_sales_engine", return_value=old_sales) as mock_load:
+            with patch.object(service.order_book_analyzer, "estimate_floors_batch", return_value={}) as mock_ob:
                 result = service.get_floor_price(card_id=123)
 
         assert result.price == 30.00
         assert result.source == FloorPriceSource.SALES
-        assert call_count == 2  # Called twice (30d, then 90d)
+        assert result.metadata["days"] == 90
+        # Sales loaded once covering both windows; order book only tried at 30d (90d has 4+ sales)
+        mock_load.assert_called_once()
+        assert mock_load.call_args[0][1] == 90
+        assert [c.kwargs["days"] for c in mock_ob.call_args_list] == [30]
 
-    def test_returns_none_when_no_data_in_90_days(self, service):
+    def test_returns_none_when_no_data_in_90_days(self, service, engine_with, floor_sale):
         """Should return NONE source when no data even in 90 days."""
-        with patch.object(service, "_get_sales_floor", return_value=None):
-            with patch.object(service.order_book_analyzer, "estimate_floor", return_value=None):
+        with patch.object(service, "_load_sales_engine", return_value=engine_with(floor_sale(123, 10.0, days_ago=120))):
+            with patch.object(service.order_book_analyzer, "estimate_floors_batch", return_value={}):
                 result = service.get_floor_price(card_id=123)
 
         assert result.price is None
         assert result.source == FloorPriceSource.NONE
         assert result.confidence == ConfidenceLevel.LOW
         assert result.metadata["reason"] == "insufficient_data"
+        assert result.metadata["days_searched"] == 90
 
 
 class TestMultiPlatformAggregation(TestFloorPriceService):
     """Tests for multi-platform sales aggregation."""
 
-    def test_combines_ebay_opensea_blokpax(self, service):
+    def test_combines_ebay_opensea_blokpax(self, service, engine_with, floor_sale):
         """Should combine sales from all platforms."""
-        combined_sales = {
-            "price": 24.50,
-            "count": 4,
-            "platforms": ["ebay", "opensea", "blokpax"],
-        }
+        combined_sales = engine_with(
+            floor_sale(123, 20.0),
+            floor_sale(123, 24.0, platform="opensea"),
+            floor_sale(123, 26.0, platform="blokpax"),
+            floor_sale(123, 28.0),
+            floor_sale(123, 90.0),
+        )
 
-        with patch.object(service, "_get_sales_floor", return_value=combined_sales):
+        with patch.object(service, "_load_sales_engine", return_value=combined_sales):
             result = service.get_floor_price(card_id=123)
 
         assert result.price == 24.50
@@ -272,33 +284,93 @@ class TestMultiPlatformAggregation(TestFloorPriceService):
         assert "opensea" in result.metadata["platforms"]
         assert "blokpax" in result.metadata["platforms"]
 
-    def test_exclude_blokpax_when_disabled(self, service):
+    def test_exclude_blokpax_when_disabled(self, service, engine_with, floor_sale):
         """Should exclude Blokpax when include_blokpax=False."""
         # This tests the parameter is passed through
-        with patch.object(service, "_get_sales_floor") as mock_sales:
-            mock_sales.return_value = {"price": 25.0, "count": 4, "platforms": ["ebay"]}
+        with patch.object(service, "_load_sales_engine") as mock_load:
+            mock_load.return_value = engine_with(*(floor_sale(123, 25.0) for _ in range(4)))
             service.get_floor_price(card_id=123, include_blokpax=False)
 
             # Check include_blokpax was passed as False
-            mock_sales.assert_called_once()
-            call_args = mock_sales.call_args
-            assert call_args[0][3] is False  # include_blokpax argument
+            mock_load.assert_called_once()
+            call_args = mock_load.call_args
+            assert call_args[0][2] is False  # include_blokpax argument
 
 
 class TestTreatmentFilter(TestFloorPriceService):
     """Tests for treatment filtering."""
 
-    def test_passes_treatment_to_queries(self, service):
-        """Should pass treatment filter to sales query."""
-        with patch.object(service, "_get_sales_floor") as mock_sales:
-            mock_sales.return_value = {"price": 50.0, "count": 4, "platforms": ["ebay"]}
-            result = service.get_floor_price(card_id=123, treatment="Classic Foil")
+    def test_filters_sales_by_treatment(self, service, engine_with, floor_sale):
+        """Should only average sales of the requested treatment (plus Blokpax)."""
+        sales = engine_with(
+            *(floor_sale(123, 10.0) for _ in range(4)),
+            *(floor_sale(123, price, treatment="Classic Foil") for price in (48.0, 50.0, 52.0)),
+            floor_sale(123, 50.0, platform="blokpax"),
+        )
 
-            # Check treatment was passed
-            call_args = mock_sales.call_args
-            assert call_args[0][1] == "Classic Foil"
+        with patch.object(service, "_load_sales_engine", return_value=sales):
+            result = service.get_floor_price(card_id=123, treatment="Classic Foil")
 
+        assert result.price == 50.0
         assert result.metadata["treatment"] == "Classic Foil"
+        assert result.metadata["sales_count"] == 4
+
+    def test_treatment_multiplier_fallback(self, service, engine_with, floor_sale):
+        """Should estimate from another treatment when the requested one has no data."""
+        paper = engine_with(*(floor_sale(123, 10.0, days_ago=60) for _ in range(5)))
+
+        with patch.object(service, "_load_sales_engine", return_value=paper):
+            with patch.object(service.order_book_analyzer, "estimate_floors_batch", return_value={}):
+                result = service.get_floor_price(card_id=123, treatment="Classic Foil")
+
+        assert result.source == FloorPriceSource.TREATMENT_MULTIPLIER
+        assert result.price == 15.5  # $10 Classic Paper * 1.55
+        assert result.metadata["base_treatment"] == "Classic Paper"
+        assert result.metadata["base_sales_count"] == 5
+
+    def test_treatment_multiplier_fallback_uses_observed_multipliers(self, service, engine_with, floor_sale):
+        """Multipliers observed in card_treatment_stats replace the static table."""
+        paper = engine_with(*(floor_sale(123, 10.0, days_ago=60) for _ in range(5)))
+        observed = {"Classic Paper": 1.0, "Classic Foil": 2.0}
+
+        with patch.object(service, "_load_sales_engine", return_value=paper):
+            with patch.object(service.order_book_analyzer, "estimate_floors_batch", return_value={}):
+                with patch.object(service.market_patterns, "get_treatment_multipliers", return_value=observed) as mock:
+                    results = service.get_floor_prices([123, 456], treatment="Classic Foil")
+
+        mock.assert_called_once()
+        assert results[123].price == 20.0
+        assert results[456].source == FloorPriceSource.NONE
+
+
+class TestFloorPricesMany(TestFloorPriceService):
+    """Tests for get_floor_prices() across several cards."""
+
+    def test_matches_per_card_results(self, service, mock_order_book_result, engine_with, floor_sale):
+        """Every card goes through the same decision tree as get_floor_price()."""
+        sales = engine_with(
+            *(floor_sale(1, price) for price in (10.0, 11.0, 12.0, 13.0)),
+            floor_sale(2, 20.0),
+            floor_sale(3, 30.0, days_ago=60),
+        )
+        order_books = {2: mock_order_book_result}
+
+        with patch.object(service, "_load_sales_engine", return_value=sales) as mock_load:
+            with patch.object(service.order_book_analyzer, "estimate_floors_batch", return_value=order_books):
+                results = service.get_floor_prices([1, 2, 3, 4])
+
+        mock_load.assert_called_once()
+        assert results[1].source == FloorPriceSource.SALES
+        assert results[1].price == 11.5
+        assert results[2].source == FloorPriceSource.ORDER_BOOK
+        assert results[3].source == FloorPriceSource.SALES
+        assert results[3].metadata["days"] == 90
+        assert results[4].source == FloorPriceSource.NONE
+
+        # Cached per card for get_floor_price()
+        with patch.object(service, "_load_sales_engine") as mock_load:
+            assert service.get_floor_price(card_id=1) == results[1]
+            mock_load.assert_not_called()
 
 
 class TestFloorPriceResult:
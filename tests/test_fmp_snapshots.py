@@ -0,0 +1,210 @@
+"""
+Tests for the FMP snapshot engine.
+
+Tests cover:
+- window_stats() against a per-date recomputation, including chunked evaluation
+- build_fmp_snapshots() matching the per-card, per-date, per-variant definition
+- skipping days that already have snapshots
+- capture_daily_fmp_snapshots() computing only the days since the last capture
+"""
+
+import random
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from sqlmodel import select
+
+from app.models.market import FMPSnapshot, MarketPrice
+from app.services import fmp_snapshots
+from app.services.fmp_snapshots import (
+    build_fmp_snapshots,
+    capture_daily_fmp_snapshots,
+    snapshot_time,
+    window_stats,
+)
+
+VARIANTS = ["Classic Paper", "Classic Foil", "OCM Serialized"]
+
+
+def reference_snapshots(sales, days, lookback_days=30):
+    """Per-date, per-variant recomputation (the original backfill definition)."""
+    expected = {}
+    for day in days:
+        end = snapshot_time(day)
+        start = end - timedelta(days=lookback_days)
+        by_card = {}
+        for card_id, variant, price, sold_at in sales:
+            if start <= sold_at < end:
+                by_card.setdefault(card_id, []).append((variant, price))
+        for card_id, window in by_card.items():
+            groups = {None: [price for _, price in window]}
+            for variant, price in window:
+                if variant:
+                    groups.setdefault(variant, []).append(price)
+            for treatment, prices in groups.items():
+                lowest = sorted(prices)[:4]
+                expected[(card_id, treatment, day)] = (
+                    round(sum(lowest) / len(lowest), 2),
+                    round(sum(prices) / len(prices), 2),
+                    len(prices),
+                )
+    return expected
+
+
+@pytest.fixture
+def history(test_session, sample_cards):
+    """Two months of random sold listings for the sample cards."""
+    rng = random.Random(7)
+    base = datetime(2025, 3, 1, tzinfo=timezone.utc)
+    sales = []
+    for i in range(300):
+        card_id = rng.choice([card.id for card in sample_cards])
+        variant = rng.choice(VARIANTS)
+        subtype = "Preslab TAG 10" if rng.random() < 0.1 else None
+        price = round(rng.uniform(1, 100), 2)
+        sold_at = base + timedelta(minutes=rng.randint(0, 60 * 24 * 60))
+        test_session.add(
+            MarketPrice(
+                card_id=card_id,
+                price=price,
+                title=f"Sale {i}",
+                treatment=variant,
+                product_subtype=subtype,
+                listing_type="sold",
+                sold_date=sold_at,
+                scraped_at=sold_at,
+                platform="ebay",
+            )
+        )
+        sales.append((card_id, subtype or variant, price, sold_at))
+    # Bulk lots and active listings never count
+    test_session.add(
+        MarketPrice(
+            card_id=sample_cards[0].id,
+            price=0.01,
+            title="Bulk lot",
+            treatment="Classic Paper",
+            listing_type="sold",
+            is_bulk_lot=True,
+            sold_date=base + timedelta(days=20),
+            scraped_at=base + timedelta(days=20),
+            platform="ebay",
+        )
+    )
+    test_session.add(
+        MarketPrice(
+            card_id=sample_cards[0].id,
+            price=0.02,
+            title="Active",
+            treatment="Classic Paper",
+            listing_type="active",
+            scraped_at=base + timedelta(days=20),
+            platform="ebay",
+        )
+    )
+    test_session.commit()
+    return sales
+
+
+def stored_snapshots(session):
+    return {
+        (s.card_id, s.treatment, s.snapshot_date.date()): (s.floor_price, s.vwap, s.sales_count)
+        for s in session.exec(select(FMPSnapshot)).all()
+    }
+
+
+class TestWindowStats:
+    """Array window statistics against a per-date loop."""
+
+    def _check(self, times, prices, ends, lookback_days):
+        floors, means, counts = window_stats(times, prices, ends, lookback_days)
+        for i, end in enumerate(ends):
+            window = prices[(times >= end - lookback_days * 86400.0) & (times < end)]
+            assert counts[i] == len(window)
+            if len(window):
+                assert floors[i] == pytest.approx(np.sort(window)[:4].mean())
+                assert means[i] == pytest.approx(window.mean())
+            else:
+                assert np.isnan(floors[i]) and np.isnan(means[i])
+
+    def test_matches_per_date_loop(self):
+        rng = np.random.default_rng(1)
+        times = np.sort(rng.uniform(0, 90 * 86400.0, 500))
+        prices = rng.uniform(1, 50, 500)
+        ends = np.arange(0, 100) * 86400.0
+        self._check(times, prices, ends, 30)
+
+    def test_small_chunks_match(self):
+        rng = np.random.default_rng(2)
+        times = np.sort(rng.uniform(0, 60 * 86400.0, 200))
+        prices = rng.uniform(1, 50, 200)
+        ends = np.arange(0, 70) * 86400.0
+        with patch.object(fmp_snapshots, "_MAX_CELLS", 50):
+            self._check(times, prices, ends, 7)
+
+    def test_fewer_than_four_sales(self):
+        times = np.array([0.0, 10.0])
+        prices = np.array([3.0, 5.0])
+        floors, means, counts = window_stats(times, prices, np.array([5.0, 20.0]), 1)
+        assert counts.tolist() == [1, 2]
+        assert floors.tolist() == [3.0, 4.0]
+        assert means.tolist() == [3.0, 4.0]
+
+
+class TestBuildFmpSnapshots:
+    """Single-pass snapshot build against the per-date definition."""
+
+    def test_matches_reference(self, test_session, history):
+        days = [date(2025, 3, 1) + timedelta(days=i) for i in range(70)]
+        per_day = build_fmp_snapshots(test_session, days[0], days[-1])
+
+        expected = reference_snapshots(history, days)
+        stored = stored_snapshots(test_session)
+        assert stored.keys() == expected.keys()
+        for key, (floor, vwap, count) in expected.items():
+            # Summation order can flip a half-cent rounding tie
+            assert stored[key][0] == pytest.approx(floor, abs=0.011)
+            assert stored[key][1] == pytest.approx(vwap, abs=0.011)
+            assert stored[key][2] == count
+        assert sum(per_day.values()) == len(expected)
+
+    def test_dry_run_writes_nothing(self, test_session, history):
+        per_day = build_fmp_snapshots(test_session, date(2025, 4, 1), date(2025, 4, 5), execute=False)
+        assert sum(per_day.values()) > 0
+        assert stored_snapshots(test_session) == {}
+
+    def test_skips_existing_days(self, test_session, history):
+        build_fmp_snapshots(test_session, date(2025, 4, 2), date(2025, 4, 2))
+        first = len(stored_snapshots(test_session))
+
+        per_day = build_fmp_snapshots(test_session, date(2025, 4, 1), date(2025, 4, 3))
+        assert date(2025, 4, 2) not in per_day
+        assert set(per_day) == {date(2025, 4, 1), date(2025, 4, 3)}
+        assert len(stored_snapshots(test_session)) == first + sum(per_day.values())
+
+    def test_card_filter(self, test_session, history, sample_cards):
+        build_fmp_snapshots(test_session, date(2025, 4, 1), date(2025, 4, 3), card_ids=[sample_cards[1].id])
+        assert {key[0] for key in stored_snapshots(test_session)} == {sample_cards[1].id}
+
+
+class TestCaptureDailyFmpSnapshots:
+    """Incremental daily capture."""
+
+    def test_first_capture_is_yesterday_only(self, test_session, history):
+        total = capture_daily_fmp_snapshots(test_session, now=datetime(2025, 4, 10, 0, 15, tzinfo=timezone.utc))
+        days = {key[2] for key in stored_snapshots(test_session)}
+        assert days == {date(2025, 4, 9)}
+        assert total == len(reference_snapshots(history, [date(2025, 4, 9)]))
+
+    def test_catches_up_from_latest_snapshot(self, test_session, history):
+        build_fmp_snapshots(test_session, date(2025, 4, 5), date(2025, 4, 5))
+
+        capture_daily_fmp_snapshots(test_session, now=datetime(2025, 4, 8, 0, 15, tzinfo=timezone.utc))
+        days = {key[2] for key in stored_snapshots(test_session)}
+        assert days == {date(2025, 4, 5), date(2025, 4, 6), date(2025, 4, 7)}
+
+    def test_up_to_date_is_noop(self, test_session, history):
+        build_fmp_snapshots(test_session, date(2025, 4, 7), date(2025, 4, 7))
+        assert capture_daily_fmp_snapshots(test_session, now=datetime(2025, 4, 8, 1, 0, tzinfo=timezone.utc)) == 0
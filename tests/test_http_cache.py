@@ -0,0 +1,82 @@
+"""
+Tests for pre-encoded JSON responses in app.core.http_cache.
+
+Tests cover:
+- Encoding matches JSONResponse and precompresses large bodies
+- ETag stability and If-None-Match handling
+- Choosing the gzip variant from Accept-Encoding
+"""
+
+import gzip
+import json
+
+from fastapi.responses import JSONResponse
+from starlette.requests import Request
+
+from app.core.http_cache import GZIP_MINIMUM_SIZE, encode_json, encoded_json_response
+
+
+def make_request(**headers) -> Request:
+    raw = [(k.replace("_", "-").lower().encode(), v.encode()) for k, v in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+
+LARGE_PAYLOAD = [{"id": i, "name": f"Card {i}", "floor_price": 12.5} for i in range(100)]
+
+
+class TestEncodeJson:
+    def test_body_matches_json_response(self):
+        payload = {"items": [{"id": 1, "name": "Café"}], "hasMore": False}
+        assert encode_json(payload).body == JSONResponse(content=payload).body
+
+    def test_small_bodies_not_compressed(self):
+        assert encode_json({"id": 1}).gzip_body is None
+
+    def test_large_bodies_precompressed(self):
+        encoded = encode_json(LARGE_PAYLOAD)
+        assert len(encoded.body) >= GZIP_MINIMUM_SIZE
+        assert gzip.decompress(encoded.gzip_body) == encoded.body
+
+    def test_etag_depends_only_on_content(self):
+        assert encode_json(LARGE_PAYLOAD).etag == encode_json(list(LARGE_PAYLOAD)).etag
+        assert encode_json(LARGE_PAYLOAD).etag != encode_json(LARGE_PAYLOAD[:-1]).etag
+        assert encode_json(LARGE_PAYLOAD).etag.startswith('W/"')
+
+
+class TestEncodedJsonResponse:
+    def test_raw_body_without_gzip(self):
+        encoded = encode_json(LARGE_PAYLOAD)
+        response = encoded_json_response(make_request(), encoded, headers={"X-Cache": "HIT"})
+
+        assert response.status_code == 200
+        assert response.body == encoded.body
+        assert "content-encoding" not in response.headers
+        assert response.headers["ETag"] == encoded.etag
+        assert response.headers["X-Cache"] == "HIT"
+        assert json.loads(response.body) == LARGE_PAYLOAD
+
+    def test_gzip_variant_when_accepted(self):
+        encoded = encode_json(LARGE_PAYLOAD)
+        response = encoded_json_response(make_request(accept_encoding="gzip, deflate, br"), encoded)
+
+        assert response.body == encoded.gzip_body
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert response.headers["Vary"] == "Accept-Encoding"
+
+    def test_matching_etag_returns_304(self):
+        encoded = encode_json(LARGE_PAYLOAD)
+        response = encoded_json_response(make_request(if_none_match=f'"other", {encoded.etag}'), encoded)
+
+        assert response.status_code == 304
+        assert response.body == b""
+        assert response.headers["ETag"] == encoded.etag
+
+    def test_strong_form_of_weak_etag_matches(self):
+        encoded = encode_json(LARGE_PAYLOAD)
+        response = encoded_json_response(make_request(if_none_match=encoded.etag.removeprefix("W/")), encoded)
+        assert response.status_code == 304
+
+    def test_stale_etag_returns_body(self):
+        encoded = encode_json(LARGE_PAYLOAD)
+        response = encoded_json_response(make_request(if_none_match='W/"stale"'), encoded)
+        assert response.status_code == 200
@@ -11,8 +11,11 @@ Tests cover:
 """
 
 import pytest
+from datetime import datetime, timezone
 from unittest.mock import MagicMock, patch
 
+from sqlmodel import select
+
 from app.services.market_patterns import (
     MarketPatternsService,
     CardVolatility,
@@ -25,7 +28,10 @@ from app.services.market_patterns import (
     get_market_patterns_service,
     get_deal_detector,
     clear_volatility_cache,
+    clear_treatment_multiplier_cache,
+    refresh_card_treatment_stats,
 )
+from app.models.market import CardTreatmentStats
 
 
 # ============================================
@@ -228,6 +234,76 @@ class TestTreatmentMultipliers:
             assert isinstance(multiplier, float)
 
 
+class TestCardTreatmentStats:
+    """Tests for the card_treatment_stats table and the lookups that read it."""
+
+    @pytest.fixture(autouse=True)
+    def clear_multipliers(self):
+        clear_treatment_multiplier_cache()
+        yield
+        clear_treatment_multiplier_cache()
+
+    def test_refresh_materializes_each_card_treatment(self, test_session, sample_market_prices):
+        assert refresh_card_treatment_stats(test_session) == 6
+        # Rebuilding replaces the previous snapshot
+        assert refresh_card_treatment_stats(test_session) == 6
+
+        rows = {(r.card_id, r.treatment): r for r in test_session.exec(select(CardTreatmentStats)).all()}
+        paper = rows[(1, "Classic Paper")]
+        assert (paper.sales_count, paper.floor_price, paper.multiplier) == (5, 1.75, 1.0)
+        foil = rows[(1, "Classic Foil")]
+        assert (foil.sales_count, foil.floor_price, foil.multiplier) == (3, 6.0, round(6.0 / 1.75, 3))
+        # No Classic Paper sales on card 3: no multiplier
+        assert rows[(3, "Formless Foil")].multiplier is None
+        assert rows[(2, "Classic Paper")].floor_price == 13.75
+
+    def test_available_treatments_read_from_table(self, test_session, sample_market_prices):
+        refresh_card_treatment_stats(test_session)
+        service = MarketPatternsService(test_session)
+
+        available = service.get_available_treatments([1, 3, 999])
+        assert set(available) == {1, 3}
+        assert available[1]["Classic Foil"] == {"floor": 6.0, "count": 3, "multiplier": round(6.0 / 1.75, 3)}
+        assert service.get_available_treatments_for_card(1) == {
+            "Classic Paper": {"floor": 1.75, "count": 5},
+            "Classic Foil": {"floor": 6.0, "count": 3},
+        }
+
+    def test_observed_multipliers_need_enough_cards(self, test_session, sample_cards):
+        now = datetime.now(timezone.utc)
+        for card_id, multiplier in [(1, 2.0), (2, 3.0), (3, 4.0)]:
+            test_session.add(
+                CardTreatmentStats(
+                    card_id=card_id, treatment="Classic Foil", sales_count=5, floor_price=10.0,
+                    multiplier=multiplier, updated_at=now,
+                )
+            )  # fmt: skip
+        test_session.add(
+            CardTreatmentStats(
+                card_id=1, treatment="Stonefoil", sales_count=5, floor_price=500.0, multiplier=50.0, updated_at=now
+            )
+        )
+        test_session.commit()
+        service = MarketPatternsService(test_session)
+
+        multipliers = service.get_treatment_multipliers()
+
+        assert multipliers["Classic Foil"] == 3.0  # median of 3 cards
+        assert multipliers["Stonefoil"] == TREATMENT_MULTIPLIERS["Stonefoil"]  # 1 card: static value kept
+        assert service.estimate_from_treatment_multiplier(10.0, "Classic Paper", "Classic Foil", multipliers) == 30.0
+        # Static table is still the default
+        assert service.estimate_from_treatment_multiplier(10.0, "Classic Paper", "Classic Foil") == 15.5
+
+    def test_failed_stats_read_rolls_back_session(self):
+        session = MagicMock()
+        session.exec.side_effect = Exception("relation card_treatment_stats does not exist")
+        service = MarketPatternsService(session)
+
+        assert service.get_available_treatments([1]) == {}
+        assert service.get_treatment_multipliers() == TREATMENT_MULTIPLIERS
+        assert session.rollback.call_count == 2
+
+
 class TestRarityMultipliers:
     """Tests for rarity multiplier lookups."""
 
@@ -469,6 +545,61 @@ class TestGetCardVolatility:
             assert volatility.coefficient_of_variation == DEFAULT_VOLATILITY
             assert volatility.sales_count == 2
 
+    def test_treatment_volatilities_grouped_query(self):
+        """Specific treatments share one grouped query; None is all treatments combined."""
+        clear_volatility_cache()
+        service = MarketPatternsService()
+        grouped = MagicMock()
+        grouped.fetchall.return_value = [(1, "Classic Paper", 25.0, 5.0, 20.0, 35.0, 10)]
+        overall = MagicMock()
+        overall.fetchall.return_value = [(1, 30.0, 15.0, 10.0, 80.0, 12)]
+
+        with patch("app.services.market_patterns.engine") as mock_engine:
+            mock_conn = MagicMock()
+            mock_conn.execute.side_effect = [overall, grouped]
+            mock_engine.connect.return_value.__enter__.return_value = mock_conn
+
+            volatilities = service.get_treatment_volatilities(1, [None, "Classic Paper", "Classic Foil"])
+            assert mock_conn.execute.call_count == 2
+
+            assert volatilities["Classic Paper"].coefficient_of_variation == 0.2
+            assert volatilities["Classic Foil"].coefficient_of_variation == DEFAULT_VOLATILITY
+            assert volatilities[None].coefficient_of_variation == 0.5
+
+            # Cached per treatment, shared with get_card_volatility()
+            cached = service.get_card_volatility(card_id=1, treatment="Classic Paper")
+            assert cached.coefficient_of_variation == 0.2
+            assert mock_conn.execute.call_count == 2
+
+        clear_volatility_cache()
+
+    def test_volatilities_batch_drops_unrequested_pairs(self):
+        """Card and treatment lists query a superset; only requested pairs are returned and cached."""
+        clear_volatility_cache()
+        service = MarketPatternsService()
+        grouped = MagicMock()
+        grouped.fetchall.return_value = [
+            (1, "Classic Paper", 25.0, 5.0, 20.0, 35.0, 10),
+            (2, "Classic Paper", 50.0, 40.0, 10.0, 90.0, 10),  # not requested
+            (2, "Classic Foil", 50.0, 40.0, 10.0, 90.0, 10),
+        ]
+
+        with patch("app.services.market_patterns.engine") as mock_engine:
+            mock_conn = MagicMock()
+            mock_conn.execute.return_value = grouped
+            mock_engine.connect.return_value.__enter__.return_value = mock_conn
+
+            pairs = [(1, "Classic Paper"), (2, "Classic Foil"), (1, "Classic Paper")]
+            volatilities = service.get_volatilities_batch(pairs)
+
+            assert mock_conn.execute.call_count == 1
+            assert set(volatilities) == {(1, "Classic Paper"), (2, "Classic Foil")}
+            assert volatilities[(2, "Classic Foil")].coefficient_of_variation == 0.8
+            assert service.get_card_volatility(2, "Classic Foil").coefficient_of_variation == 0.8
+            assert mock_conn.execute.call_count == 1
+
+        clear_volatility_cache()
+
 
 # ============================================
 # MarketPatternsService - is_deal Tests
@@ -872,6 +1003,10 @@ class TestFindDealsInListings:
             sales_count=10,
         )
 
+    def _volatilities(self, volatility: CardVolatility):
+        """get_volatilities_batch() side effect returning the same volatility for every pair."""
+        return lambda pairs, days=90: {pair: volatility for pair in pairs}
+
     def test_finds_deals_in_batch(self, detector):
         """Should find deals in a batch of listings."""
         mock_volatility = self._create_mock_volatility(0.15)  # 15% threshold
@@ -882,7 +1017,9 @@ class TestFindDealsInListings:
             {"card_id": 3, "price": 95.00, "floor_price": 100.00},  # 5% - not a deal
         ]
 
-        with patch.object(detector._market_patterns, "get_card_volatility", return_value=mock_volatility):
+        with patch.object(
+            detector._market_patterns, "get_volatilities_batch", side_effect=self._volatilities(mock_volatility)
+        ):
             deals = detector.find_deals_in_listings(listings, min_quality="marginal")
 
         # Should find 2 deals (85.00 and 70.00)
@@ -899,7 +1036,9 @@ class TestFindDealsInListings:
             {"card_id": 4, "price": 90.00, "floor_price": 100.00},  # 10% - not_a_deal
         ]
 
-        with patch.object(detector._market_patterns, "get_card_volatility", return_value=mock_volatility):
+        with patch.object(
+            detector._market_patterns, "get_volatilities_batch", side_effect=self._volatilities(mock_volatility)
+        ):
             deals = detector.find_deals_in_listings(listings, min_quality="marginal")
 
         assert len(deals) == 3  # marginal, good, hot
@@ -914,7 +1053,9 @@ class TestFindDealsInListings:
             {"card_id": 3, "price": 65.00, "floor_price": 100.00},  # hot
         ]
 
-        with patch.object(detector._market_patterns, "get_card_volatility", return_value=mock_volatility):
+        with patch.object(
+            detector._market_patterns, "get_volatilities_batch", side_effect=self._volatilities(mock_volatility)
+        ):
             deals = detector.find_deals_in_listings(listings, min_quality="good")
 
         assert len(deals) == 2  # good, hot only
@@ -929,7 +1070,9 @@ class TestFindDealsInListings:
             {"card_id": 3, "price": 65.00, "floor_price": 100.00},  # hot
         ]
 
-        with patch.object(detector._market_patterns, "get_card_volatility", return_value=mock_volatility):
+        with patch.object(
+            detector._market_patterns, "get_volatilities_batch", side_effect=self._volatilities(mock_volatility)
+        ):
             deals = detector.find_deals_in_listings(listings, min_quality="hot")
 
         assert len(deals) == 1  # hot only
@@ -944,7 +1087,9 @@ class TestFindDealsInListings:
             {"card_id": 3, "price": 75.00, "floor_price": 100.00},  # 25% discount
         ]
 
-        with patch.object(detector._market_patterns, "get_card_volatility", return_value=mock_volatility):
+        with patch.object(
+            detector._market_patterns, "get_volatilities_batch", side_effect=self._volatilities(mock_volatility)
+        ):
             deals = detector.find_deals_in_listings(listings, min_quality="marginal")
 
         # Best discount first
@@ -967,8 +1112,10 @@ class TestFindDealsInListings:
             {"card_id": 1, "price": 85.00},  # No floor_price
         ]
 
-        with patch.object(detector._market_patterns, "get_card_volatility", return_value=mock_volatility):
-            with patch.object(detector.floor_service, "get_floor_price", return_value=mock_floor_result):
+        with patch.object(
+            detector._market_patterns, "get_volatilities_batch", side_effect=self._volatilities(mock_volatility)
+        ):
+            with patch.object(detector.floor_service, "get_floor_prices", return_value={1: mock_floor_result}):
                 deals = detector.find_deals_in_listings(listings, min_quality="marginal")
 
         assert len(deals) == 1
@@ -981,7 +1128,9 @@ class TestFindDealsInListings:
             {"card_id": 1, "price": 85.00, "floor_price": 100.00, "treatment": "Classic Foil"},
         ]
 
-        with patch.object(detector._market_patterns, "get_card_volatility", return_value=mock_volatility):
+        with patch.object(
+            detector._market_patterns, "get_volatilities_batch", side_effect=self._volatilities(mock_volatility)
+        ):
             deals = detector.find_deals_in_listings(listings, min_quality="marginal")
 
         assert len(deals) == 1
@@ -996,12 +1145,79 @@ class TestFindDealsInListings:
             {"card_id": 2, "price": 90.00, "floor_price": 100.00},  # not_a_deal
         ]
 
-        with patch.object(detector._market_patterns, "get_card_volatility", return_value=mock_volatility):
+        with patch.object(
+            detector._market_patterns, "get_volatilities_batch", side_effect=self._volatilities(mock_volatility)
+        ):
             deals = detector.find_deals_in_listings(listings)  # No min_quality
 
         assert len(deals) == 1  # Only marginal included
 
 
+class TestCheckDeals:
+    """Tests for DealDetector.check_deals() page evaluation."""
+
+    @pytest.fixture
+    def detector(self):
+        return DealDetector()
+
+    def test_matches_check_deal_with_batched_lookups(self, detector):
+        volatilities = {
+            (1, None): CardVolatility(1, None, 0.2, 20.0, 10),  # stable: 15% threshold
+            (2, "Classic Foil"): CardVolatility(2, "Classic Foil", 0.8, 90.0, 10),  # volatile: 40% threshold
+            (3, "Classic Foil"): CardVolatility(3, "Classic Foil", 0.4, 50.0, 10),
+        }
+        floors = {None: {1: 100.0, 4: None}, "Classic Foil": {2: 200.0, 3: 50.0}}
+        listings = [
+            {"card_id": 1, "price": 70.0},
+            {"card_id": 2, "price": 100.0, "treatment": "Classic Foil"},
+            {"card_id": 3, "price": 45.0, "treatment": "Classic Foil"},
+            {"card_id": 3, "price": 30.0, "treatment": "Classic Foil", "floor_price": 60.0},
+            {"card_id": 4, "price": 10.0},  # no floor: never a deal
+        ]
+
+        def get_floor_prices(card_ids, treatment):
+            return {card_id: MagicMock(price=floors[treatment][card_id]) for card_id in card_ids}
+
+        def get_floor_price(card_id, treatment):
+            return MagicMock(price=floors[treatment][card_id])
+
+        with (
+            patch.object(detector.floor_service, "get_floor_prices", side_effect=get_floor_prices) as mock_floors,
+            patch.object(
+                detector._market_patterns,
+                "get_volatilities_batch",
+                side_effect=lambda pairs: {pair: volatilities[pair] for pair in pairs},
+            ) as mock_volatilities,
+        ):
+            results = detector.check_deals(listings)
+
+        # One floor lookup per treatment, one volatility lookup for the page
+        assert mock_floors.call_count == 2
+        mock_volatilities.assert_called_once()
+        assert (4, None) not in mock_volatilities.call_args.args[0]
+
+        with (
+            patch.object(detector.floor_service, "get_floor_price", side_effect=get_floor_price),
+            patch.object(
+                detector._market_patterns, "get_card_volatility", side_effect=lambda c, t: volatilities[(c, t)]
+            ),
+        ):
+            expected = [
+                detector.check_deal(
+                    listing["card_id"], listing["price"], listing.get("treatment"), listing.get("floor_price")
+                )
+                for listing in listings
+            ]
+
+        assert results == expected
+        assert [r.deal_quality for r in results] == ["hot", "marginal", "not_a_deal", "hot", "not_a_deal"]
+
+    def test_empty_page(self, detector):
+        with patch.object(detector._market_patterns, "get_volatilities_batch") as mock_volatilities:
+            assert detector.check_deals([]) == []
+        mock_volatilities.assert_not_called()
+
+
 # ============================================
 # Factory Function Tests
 # ============================================
@@ -1,15 +1,67 @@
 """Tests for OrderBookAnalyzer service."""
 
+import csv
+import random
+from collections import defaultdict
+from math import sqrt
+from pathlib import Path
+
+import numpy as np
 import pytest
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from unittest.mock import patch
 
 from app.services.order_book import (
     OrderBookAnalyzer,
     OrderBookResult,
     BucketInfo,
+    OrderBookConfig,
 )
 
+BACKTEST_CSV = Path(__file__).resolve().parents[1] / "data" / "orderbook_backtest.csv"
+
+
+def reference_filter_outliers(prices):
+    """Loop-based _filter_outliers() the vectorized version must match."""
+    if len(prices) < 3:
+        return prices, 0
+    sorted_prices = sorted(prices)
+    gaps = [sorted_prices[i + 1] - sorted_prices[i] for i in range(len(sorted_prices) - 1)]
+    threshold = float(np.mean(gaps)) + OrderBookConfig.OUTLIER_SIGMA_THRESHOLD * float(np.std(gaps))
+    filtered = []
+    for i, price in enumerate(sorted_prices):
+        gap_before = sorted_prices[i] - sorted_prices[i - 1] if i > 0 else 0
+        gap_after = sorted_prices[i + 1] - sorted_prices[i] if i < len(sorted_prices) - 1 else 0
+        if gap_before <= threshold or gap_after <= threshold:
+            filtered.append(price)
+    return filtered, len(prices) - len(filtered)
+
+
+def reference_create_buckets(prices):
+    """Loop-based _create_buckets() the vectorized version must match."""
+    if not prices:
+        return []
+    min_price, max_price = min(prices), max(prices)
+    price_range = max_price - min_price
+    if price_range == 0:
+        return [BucketInfo(min_price, max_price, len(prices))]
+    width = max(
+        OrderBookConfig.MIN_BUCKET_WIDTH, min(OrderBookConfig.MAX_BUCKET_WIDTH, price_range / sqrt(len(prices)))
+    )
+    buckets = []
+    start = min_price
+    while start < max_price:
+        end = start + width
+        if end >= max_price:
+            count = sum(1 for p in prices if start <= p <= max_price)
+            end = max_price
+        else:
+            count = sum(1 for p in prices if start <= p < end)
+        if count > 0:
+            buckets.append(BucketInfo(start, end, count))
+        start = end
+    return buckets
+
 
 class TestBucketInfo:
     """Tests for BucketInfo dataclass."""
@@ -177,6 +229,201 @@ class TestOrderBookAnalyzer:
         assert len(result.buckets) > 0
 
 
+class TestVectorizedBuckets:
+    """_filter_outliers() and _create_buckets() match the loop-based reference exactly."""
+
+    @pytest.fixture
+    def analyzer(self):
+        return OrderBookAnalyzer()
+
+    def price_lists(self):
+        rng = random.Random(11)
+        lists = [
+            [0.0, 5.0, 10.0, 15.0, 20.0],  # prices on bucket edges
+            [1.0, 1.0, 1.0, 2.0],
+            [0.1 * i for i in range(1, 400)],  # accumulated rounding in the edges
+            [1.0, 1.5, 2.0, 2.5, 50.0, 97.0, 98.0, 99.0, 100.0],
+        ]
+        for size in (3, 10, 50, 500, 3000):
+            lists.append([round(rng.lognormvariate(3, 1), 2) for _ in range(size)])
+            lists.append([round(rng.uniform(80, 2000), 2) for _ in range(size)])
+
+        # Realistic price sets: each card/treatment's prices in the backtest data
+        by_group = defaultdict(list)
+        with open(BACKTEST_CSV) as f:
+            for row in csv.DictReader(f):
+                group = by_group[(row["card_id"], row["treatment"])]
+                group.extend([float(row["predicted_floor"]), float(row["next_sale_price"])])
+        lists.extend(by_group.values())
+        return lists
+
+    def test_filter_outliers_matches_reference(self, analyzer):
+        for prices in self.price_lists():
+            assert analyzer._filter_outliers(prices) == reference_filter_outliers(prices)
+
+    def test_create_buckets_matches_reference(self, analyzer):
+        for prices in self.price_lists():
+            assert analyzer._create_buckets(prices) == reference_create_buckets(prices)
+
+
+class TestEstimateFloorsBatch:
+    """Tests for OrderBookAnalyzer.estimate_floors_batch()."""
+
+    @pytest.fixture
+    def analyzer(self):
+        return OrderBookAnalyzer()
+
+    @pytest.fixture
+    def listings(self):
+        now = datetime.now(timezone.utc)
+        active = {
+            1: [
+                {"price": p, "scraped_at": now, "treatment": "Classic Paper", "title": "A"}
+                for p in [10.0, 12.0, 13.0, 14.0, 15.0]
+            ],
+        }
+        sold = {
+            2: [
+                {"price": 15.0, "sold_date": now - timedelta(days=5)},
+                {"price": 18.0, "sold_date": now - timedelta(days=10)},
+            ],
+            # Only older sales: expands to the 90-day window
+            3: [{"price": 30.0, "sold_date": now - timedelta(days=60)}],
+        }
+        return active, sold
+
+    def _estimate_single(self, analyzer, listings, card_id):
+        active, sold = listings
+
+        def fetch_sold(card_id, treatment, days):
+            cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+            return [row for row in sold.get(card_id, []) if row["sold_date"] >= cutoff]
+
+        with (
+            patch.object(OrderBookAnalyzer, "_fetch_active_listings", side_effect=lambda c, t, d: active.get(c, [])),
+            patch.object(OrderBookAnalyzer, "_fetch_sold_listings", side_effect=fetch_sold),
+        ):
+            return analyzer.estimate_floor(card_id)
+
+    def test_batch_matches_single_estimates(self, analyzer, listings):
+        """Active, sales-fallback and expanded-window cards match estimate_floor()."""
+        active, sold = listings
+        with (
+            patch.object(OrderBookAnalyzer, "_fetch_active_listings_batch", return_value=active),
+            patch.object(OrderBookAnalyzer, "_fetch_sold_listings_batch", return_value=sold) as mock_sold,
+        ):
+            results = analyzer.estimate_floors_batch([1, 2, 3, 4])
+
+        # Only cards without enough active listings hit the sold query
+        assert mock_sold.call_args.args[0] == [2, 3, 4]
+        assert set(results) == {1, 2, 3}
+        assert results[1].source == "order_book"
+        assert results[2].source == "sales_fallback"
+        for card_id, result in results.items():
+            assert result.to_dict() == self._estimate_single(analyzer, listings, card_id).to_dict()
+
+    def test_batch_without_sales_fallback(self, analyzer, listings):
+        """allow_sales_fallback=False skips the sold query."""
+        active, _ = listings
+        with (
+            patch.object(OrderBookAnalyzer, "_fetch_active_listings_batch", return_value=active),
+            patch.object(OrderBookAnalyzer, "_fetch_sold_listings_batch") as mock_sold,
+        ):
+            results = analyzer.estimate_floors_batch([1, 2], allow_sales_fallback=False)
+
+        assert set(results) == {1}
+        mock_sold.assert_not_called()
+
+    def test_batch_empty(self, analyzer):
+        assert analyzer.estimate_floors_batch([]) == {}
+
+    def test_expand_sales_window(self, analyzer):
+        """Recent rows win; otherwise the 90-day, then 365-day window is used."""
+        now = datetime.now(timezone.utc)
+        recent = {"price": 1.0, "sold_date": now - timedelta(days=2)}
+        older = {"price": 2.0, "sold_date": now - timedelta(days=60)}
+        oldest = {"price": 3.0, "sold_date": now - timedelta(days=200)}
+
+        assert analyzer._expand_sales_window([recent, older, oldest], 30) == [recent]
+        assert analyzer._expand_sales_window([older, oldest], 30) == [older]
+        assert analyzer._expand_sales_window([oldest], 30) == [oldest]
+        assert analyzer._expand_sales_window([], 30) == []
+
+
+class TestEstimateFloorsByTreatment:
+    """Tests for OrderBookAnalyzer.estimate_floors_by_treatment()."""
+
+    @pytest.fixture
+    def analyzer(self):
+        return OrderBookAnalyzer()
+
+    @pytest.fixture
+    def listings(self):
+        now = datetime.now(timezone.utc)
+        active = [
+            {"price": p, "scraped_at": now, "treatment": "Classic Paper", "title": "A"}
+            for p in [10.0, 12.0, 13.0, 14.0, 15.0]
+        ]
+        sold = [
+            {"price": 40.0, "sold_date": now - timedelta(days=5), "treatment": "Classic Foil", "title": "B"},
+            {"price": 45.0, "sold_date": now - timedelta(days=8), "treatment": "Classic Foil", "title": "B"},
+            # Only an older sale: expands to the 90-day window
+            {"price": 90.0, "sold_date": now - timedelta(days=60), "treatment": "Stonefoil", "title": "C"},
+        ]
+        return active, sold
+
+    def _estimate_single(self, analyzer, listings, treatment):
+        active, sold = listings
+
+        def matching(rows, treatment, cutoff_field=None, days=None):
+            cutoff = datetime.now(timezone.utc) - timedelta(days=days or 365)
+            return [
+                row
+                for row in rows
+                if (treatment is None or row["treatment"] == treatment)
+                and (cutoff_field is None or row[cutoff_field] >= cutoff)
+            ]
+
+        with (
+            patch.object(OrderBookAnalyzer, "_fetch_active_listings", side_effect=lambda c, t, d: matching(active, t)),
+            patch.object(
+                OrderBookAnalyzer, "_fetch_sold_listings", side_effect=lambda c, t, d: matching(sold, t, "sold_date", d)
+            ),
+        ):
+            return analyzer.estimate_floor(1, treatment)
+
+    def test_matches_single_estimates(self, analyzer, listings):
+        """Each treatment and the combined floor match estimate_floor() from two listing queries."""
+        active, sold = listings
+        treatments = ["Classic Paper", "Classic Foil", "Stonefoil", "Promo"]
+        with (
+            patch.object(OrderBookAnalyzer, "_fetch_active_listings_batch", return_value={1: active}) as mock_active,
+            patch.object(OrderBookAnalyzer, "_fetch_sold_listings_batch", return_value={1: sold}) as mock_sold,
+        ):
+            results = analyzer.estimate_floors_by_treatment(1, treatments)
+
+        mock_active.assert_called_once()
+        mock_sold.assert_called_once()
+        assert set(results) == {None, "Classic Paper", "Classic Foil", "Stonefoil"}
+        assert results["Classic Paper"].source == "order_book"
+        assert results["Classic Foil"].source == "sales_fallback"
+        for treatment, result in results.items():
+            assert result.to_dict() == self._estimate_single(analyzer, listings, treatment).to_dict()
+
+    def test_without_sales_fallback(self, analyzer, listings):
+        active, _ = listings
+        with (
+            patch.object(OrderBookAnalyzer, "_fetch_active_listings_batch", return_value={1: active}),
+            patch.object(OrderBookAnalyzer, "_fetch_sold_listings_batch") as mock_sold,
+        ):
+            results = analyzer.estimate_floors_by_treatment(
+                1, ["Classic Paper", "Classic Foil"], allow_sales_fallback=False
+            )
+
+        assert set(results) == {None, "Classic Paper"}
+        mock_sold.assert_not_called()
+
+
 class TestOrderBookResult:
     """Tests for OrderBookResult dataclass."""
 
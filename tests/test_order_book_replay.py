@@ -0,0 +1,191 @@
+"""
+Tests for the in-memory order book replay engine.
+
+Tests cover:
+- replay_backtest() matching the per-point query backtest (loop reference below)
+- identical results across worker counts (process pool)
+- snapshot save/load round trip
+- estimate_at() order book vs sales fallback
+"""
+
+import random
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from app.models.market import MarketPrice
+from app.services.confidence import calculate_orderbook_confidence
+from app.services.order_book_replay import ReplaySnapshot, estimate_at, replay_backtest
+
+AS_OF = datetime(2025, 6, 1, tzinfo=timezone.utc)
+
+
+def reference_estimate(active, sold, as_of):
+    """The original per-point queries: active asks in the window, else recent sales."""
+    cutoff = as_of - timedelta(days=30)
+    prices = [p for t, p in active if cutoff <= t < as_of]
+    source = "order_book"
+    if not prices:
+        prices = sorted(p for t, p in sold if cutoff <= t < as_of)
+        source = "sales_fallback"
+    if not prices:
+        return None
+    spread_pct = ((max(prices) - min(prices)) / min(prices)) * 100 if len(prices) > 1 else 0.0
+    confidence = calculate_orderbook_confidence(
+        total_listings=len(prices),
+        spread_pct=spread_pct,
+        stale_count=0,
+        volatility_cv=0.5,
+        listing_count_weight=0.4,
+        spread_weight=0.3,
+        recency_weight=0.15,
+        volatility_weight=0.15,
+    )
+    if source == "order_book":
+        return round(min(prices), 2), confidence, source, len(prices)
+    sample = prices[:4]
+    return round(sum(sample) / len(sample), 2), round(confidence * 0.5, 3), source, len(prices)
+
+
+def reference_backtest(rows, cards, days=90, min_sales=10):
+    """Loop backtest over plain rows: (card_id, variant, listing_type, at, price)."""
+    counts = {}
+    for card_id, _, listing_type, _, _ in rows:
+        if listing_type == "sold":
+            counts[card_id] = counts.get(card_id, 0) + 1
+    eligible = sorted((c for c in counts if counts[c] >= min_sales), key=lambda c: (-counts[c], c))
+
+    results = []
+    for card_id in eligible:
+        card_rows = [r for r in rows if r[0] == card_id]
+        treatments = sorted({r[1] for r in card_rows if r[2] == "sold" and r[1]}) or [None]
+        for treatment in treatments:
+            selected = [r for r in card_rows if treatment is None or r[1] == treatment]
+            sold = [(r[3], r[4]) for r in selected if r[2] == "sold"]
+            active = [(r[3], r[4]) for r in selected if r[2] == "active"]
+            timeline = [s for s in sold if s[0] >= AS_OF - timedelta(days=days)]
+            if len(timeline) < 5:
+                continue
+            for i in range(0, len(timeline) - 1, max(1, len(timeline) // 10)):
+                at, _ = timeline[i]
+                prediction = reference_estimate(active, sold, at)
+                if prediction is None:
+                    continue
+                next_at, next_price = timeline[i + 1]
+                results.append(
+                    (card_id, cards[card_id], treatment, at, *prediction, next_at, next_price, (next_at - at).days)
+                )
+    return results
+
+
+def as_tuples(results):
+    return [
+        (
+            r.card_id,
+            r.card_name,
+            r.treatment,
+            r.prediction_date,
+            r.predicted_floor,
+            r.confidence,
+            r.source,
+            r.total_listings,
+            r.next_sale_date,
+            r.next_sale_price,
+            r.days_to_sale,
+        )
+        for r in results
+    ]
+
+
+@pytest.fixture
+def history(test_session, sample_cards):
+    """Sold and active listings over ~5 months with distinct timestamps."""
+    rng = random.Random(11)
+    start = AS_OF - timedelta(days=150)
+    rows = []
+    minutes = rng.sample(range(150 * 24 * 60), 900)
+    for i, minute in enumerate(minutes):
+        card = sample_cards[i % len(sample_cards)]
+        listing_type = "sold" if rng.random() < 0.6 else "active"
+        treatment = rng.choice(["Classic Paper", "Classic Foil"])
+        subtype = "Preslab TAG 9" if rng.random() < 0.1 else None
+        at = start + timedelta(minutes=minute)
+        price = round(rng.uniform(1, 60), 2)
+        test_session.add(
+            MarketPrice(
+                card_id=card.id,
+                price=price,
+                title=f"Listing {i}",
+                treatment=treatment,
+                product_subtype=subtype,
+                listing_type=listing_type,
+                sold_date=at if listing_type == "sold" else None,
+                scraped_at=at,
+                platform="ebay",
+            )
+        )
+        rows.append((card.id, subtype or treatment, listing_type, at, price))
+    test_session.commit()
+    rows.sort(key=lambda r: r[3])
+    return rows, {card.id: card.name for card in sample_cards}
+
+
+class TestReplayBacktest:
+    """Replay against the per-point backtest."""
+
+    def test_matches_reference(self, test_session, history):
+        rows, cards = history
+        snapshot = ReplaySnapshot.from_database(test_session)
+        results = replay_backtest(snapshot, days=90, min_sales_per_card=10, now=AS_OF)
+
+        assert results
+        assert as_tuples(results) == reference_backtest(rows, cards)
+        for r in results:
+            assert r.error == pytest.approx(r.predicted_floor - r.next_sale_price)
+
+    def test_since_keeps_results(self, test_session, history):
+        """A snapshot limited to the timeline plus lookback replays identically."""
+        full = ReplaySnapshot.from_database(test_session)
+        recent = ReplaySnapshot.from_database(test_session, since=AS_OF - timedelta(days=120))
+        assert len(recent.sold.price) < len(full.sold.price)
+        assert as_tuples(replay_backtest(recent, now=AS_OF)) == as_tuples(replay_backtest(full, now=AS_OF))
+
+    def test_process_pool_matches_in_process(self, test_session, history):
+        snapshot = ReplaySnapshot.from_database(test_session)
+        serial = replay_backtest(snapshot, now=AS_OF, workers=1)
+        parallel = replay_backtest(snapshot, now=AS_OF, workers=2)
+        assert as_tuples(parallel) == as_tuples(serial)
+
+    def test_save_load_round_trip(self, test_session, history, tmp_path):
+        snapshot = ReplaySnapshot.from_database(test_session)
+        path = tmp_path / "replay.npz"
+        snapshot.save(path)
+        loaded = ReplaySnapshot.load(path)
+
+        assert loaded.as_of == snapshot.as_of
+        assert loaded.card_names == snapshot.card_names
+        assert loaded.variants == snapshot.variants
+        assert as_tuples(replay_backtest(loaded, now=AS_OF)) == as_tuples(replay_backtest(snapshot, now=AS_OF))
+
+    def test_min_sales_excludes_cards(self, test_session, history):
+        snapshot = ReplaySnapshot.from_database(test_session)
+        assert replay_backtest(snapshot, min_sales_per_card=10_000, now=AS_OF) == []
+
+
+class TestEstimateAt:
+    """Point-in-time estimate."""
+
+    def test_lowest_ask(self):
+        estimate = estimate_at(np.array([12.0, 10.0, 15.0]), np.array([1.0]))
+        assert estimate["floor_estimate"] == 10.0
+        assert estimate["source"] == "order_book"
+        assert estimate["total_listings"] == 3
+
+    def test_sales_fallback(self):
+        estimate = estimate_at(np.array([]), np.array([8.0, 2.0, 4.0, 6.0, 10.0]))
+        assert estimate["floor_estimate"] == 5.0
+        assert estimate["source"] == "sales_fallback"
+
+    def test_no_data(self):
+        assert estimate_at(np.array([]), np.array([])) is None
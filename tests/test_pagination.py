@@ -0,0 +1,157 @@
+"""
+Tests for keyset pagination in app.core.pagination.
+
+Tests cover:
+- Cursor encoding round trips (datetimes, numbers) and stays URL-safe
+- Malformed cursors and cursors issued for another sort are rejected
+- keyset_after paging matches OFFSET paging, including tied sort values
+- /cards/{id}/history cursor pages
+"""
+
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlmodel import Session, desc, func, select
+
+from app.api.cards import read_sales_history
+from app.core.pagination import InvalidCursorError, decode_cursor, encode_cursor, keyset_after
+from app.models.market import MarketPrice
+
+
+class TestCursorEncoding:
+    def test_round_trip_datetime(self):
+        value = datetime(2025, 3, 4, 5, 6, 7, 890, tzinfo=timezone.utc)
+        cursor = encode_cursor("sold_date:desc", value, 42)
+        assert decode_cursor(cursor, "sold_date:desc") == (value, 42)
+
+    def test_round_trip_number(self):
+        cursor = encode_cursor("price:asc", 12.5, 7)
+        assert decode_cursor(cursor, "price:asc") == (12.5, 7)
+
+    def test_cursor_is_url_safe(self):
+        cursor = encode_cursor("listed_at:desc", datetime(2025, 1, 1), 10**9)
+        assert all(c.isalnum() or c in "-_" for c in cursor)
+
+    def test_rejects_other_sort(self):
+        cursor = encode_cursor("price:asc", 12.5, 7)
+        with pytest.raises(InvalidCursorError):
+            decode_cursor(cursor, "price:desc")
+
+    @pytest.mark.parametrize("cursor", ["not-a-cursor!", "", "e30", encode_cursor("price:asc", 1, 1)[:-3]])
+    def test_rejects_malformed(self, cursor):
+        with pytest.raises(InvalidCursorError):
+            decode_cursor(cursor, "price:asc")
+
+    def test_rejects_non_int_id(self):
+        import base64
+
+        cursor = base64.urlsafe_b64encode(json.dumps(["price:asc", 1, "7"]).encode()).decode()
+        with pytest.raises(InvalidCursorError):
+            decode_cursor(cursor, "price:asc")
+
+
+@pytest.fixture
+def sold_history(test_session: Session, sample_cards):
+    """25 sold rows for card 1, with repeated dates and some NULL sold_date values."""
+    base = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    for i in range(25):
+        test_session.add(
+            MarketPrice(
+                card_id=1,
+                price=float(i % 4),
+                title=f"Sale {i}",
+                listing_type="sold",
+                sold_date=None if i % 5 == 0 else base + timedelta(days=i // 3),
+                scraped_at=base + timedelta(days=i // 3),
+                platform="ebay",
+            )
+        )
+    test_session.commit()
+
+
+def page_ids(session: Session, sort_expr, descending: bool, page_size: int):
+    """Walk all pages with keyset_after and return the ids in page order."""
+    order = (desc(sort_expr), desc(MarketPrice.id)) if descending else (sort_expr, MarketPrice.id)
+    ids, after = [], None
+    while True:
+        statement = select(MarketPrice.id, sort_expr.label("sort_value")).order_by(*order).limit(page_size)
+        if after:
+            statement = statement.where(keyset_after(sort_expr, MarketPrice.id, *after, descending=descending))
+        rows = session.execute(statement).all()
+        if not rows:
+            return ids
+        ids.extend(row.id for row in rows)
+        cursor = encode_cursor("test", rows[-1].sort_value, rows[-1].id)
+        after = decode_cursor(cursor, "test")
+
+
+class TestKeysetAfter:
+    @pytest.mark.parametrize("descending", [True, False])
+    def test_matches_offset_order_with_ties(self, test_session, sold_history, descending):
+        sort_expr = func.coalesce(MarketPrice.sold_date, MarketPrice.scraped_at)
+        order = (desc(sort_expr), desc(MarketPrice.id)) if descending else (sort_expr, MarketPrice.id)
+        expected = list(test_session.execute(select(MarketPrice.id).order_by(*order)).scalars())
+        assert page_ids(test_session, sort_expr, descending, page_size=4) == expected
+        assert len(expected) == 25
+
+    def test_price_sort(self, test_session, sold_history):
+        expected = list(
+            test_session.execute(select(MarketPrice.id).order_by(MarketPrice.price, MarketPrice.id)).scalars()
+        )
+        assert page_ids(test_session, MarketPrice.price, False, page_size=3) == expected
+
+
+class TestSalesHistoryCursor:
+    def fetch(self, session, **params):
+        params = {"limit": 10, "offset": 0, "cursor": None, "paginated": True, **params}
+        response = read_sales_history("1", session=session, **params)
+        return json.loads(response.body), response.headers
+
+    def test_cursor_pages_match_offset_pages(self, test_session, sold_history):
+        offset_ids = []
+        for offset in (0, 10, 20):
+            body, _ = self.fetch(test_session, offset=offset)
+            offset_ids.extend(item["id"] for item in body["items"])
+
+        cursor_ids, cursor = [], None
+        while True:
+            # offset is ignored once a cursor is given
+            body, headers = self.fetch(test_session, cursor=cursor, offset=999 if cursor else 0)
+            cursor_ids.extend(item["id"] for item in body["items"])
+            cursor = body["nextCursor"]
+            assert body["hasMore"] == (cursor is not None)
+            assert headers.get("x-next-cursor") == cursor
+            if cursor is None:
+                break
+
+        assert cursor_ids == offset_ids
+        assert len(cursor_ids) == 25
+
+    def test_new_sales_do_not_shift_cursor_pages(self, test_session, sold_history):
+        first, _ = self.fetch(test_session)
+        test_session.add(
+            MarketPrice(
+                card_id=1,
+                price=9.0,
+                title="Newest sale",
+                listing_type="sold",
+                sold_date=datetime(2026, 1, 1, tzinfo=timezone.utc),
+                scraped_at=datetime(2026, 1, 1, tzinfo=timezone.utc),
+            )
+        )
+        test_session.commit()
+        second, _ = self.fetch(test_session, cursor=first["nextCursor"])
+        first_ids = {item["id"] for item in first["items"]}
+        assert not first_ids & {item["id"] for item in second["items"]}
+        assert len(second["items"]) == 10
+
+    def test_items_exclude_sort_value(self, test_session, sold_history):
+        body, _ = self.fetch(test_session, limit=1)
+        assert "sort_value" not in body["items"][0]
+
+    def test_invalid_cursor_is_400(self, test_session, sold_history):
+        with pytest.raises(HTTPException) as exc:
+            self.fetch(test_session, cursor=encode_cursor("price:asc", 1.0, 1))
+        assert exc.value.status_code == 400
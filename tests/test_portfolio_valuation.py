@@ -0,0 +1,254 @@
+"""
+Tests for PortfolioValuationService.
+
+Tests cover:
+- treatment_prices() tiers: recent VWAP, last treatment sale, card-level fallback
+- card_prices() tiers: last sale, lowest ask, snapshot, 0.0
+- card_details() card + rarity lookup
+- a fixed number of queries regardless of portfolio size
+- value_history() against the per-day, per-card loop it replaced
+- cached_value_history() eviction on holdings changes and new sales
+"""
+
+import random
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from app.core.cache_invalidation import publish_card_updates
+from app.models.market import MarketPrice, MarketSnapshot
+from app.models.portfolio import PortfolioCard
+from app.services.portfolio_valuation import (
+    PortfolioValuationService,
+    cached_value_history,
+    clear_portfolio_history_cache,
+    invalidate_portfolio_history,
+)
+
+
+@pytest.fixture
+def older_sales(test_session, sample_market_prices):
+    """A Classic Foil sale on card 2 outside the VWAP window, plus a box with only an ask."""
+    old = datetime.now(timezone.utc) - timedelta(days=90)
+    test_session.add_all(
+        [
+            MarketPrice(
+                card_id=2,
+                price=40.0,
+                title="Old foil",
+                treatment="Classic Foil",
+                listing_type="sold",
+                sold_date=old,
+                scraped_at=old,
+                platform="ebay",
+            ),
+            MarketPrice(
+                card_id=4,
+                price=120.0,
+                title="Box ask",
+                treatment="Sealed",
+                listing_type="active",
+                scraped_at=old,
+                platform="ebay",
+            ),
+        ]
+    )
+    test_session.commit()
+
+
+class TestTreatmentPrices:
+    """Treatment-level price tiers."""
+
+    def test_recent_vwap(self, test_session, sample_market_prices):
+        prices = PortfolioValuationService(test_session).treatment_prices([(1, "Classic Paper"), (1, "Classic Foil")])
+        assert prices == {(1, "Classic Paper"): pytest.approx(2.0), (1, "Classic Foil"): pytest.approx(6.0)}
+
+    def test_last_treatment_sale(self, test_session, older_sales):
+        prices = PortfolioValuationService(test_session).treatment_prices([(2, "Classic Foil")])
+        assert prices[(2, "Classic Foil")] == 40.0
+
+    def test_card_level_fallback(self, test_session, older_sales):
+        prices = PortfolioValuationService(test_session).treatment_prices([(2, "Stonefoil"), (4, "Stonefoil")])
+        # Card 2's most recent sale (any treatment), card 4's lowest ask
+        assert prices == {(2, "Stonefoil"): 10.0, (4, "Stonefoil"): 120.0}
+
+    def test_empty(self, test_session):
+        assert PortfolioValuationService(test_session).treatment_prices([]) == {}
+
+    def test_fixed_query_count(self, count_queries, test_session, older_sales):
+        service = PortfolioValuationService(test_session)
+        small = [(1, "Classic Paper"), (2, "Classic Foil"), (4, "Stonefoil")]
+        large = small + [(3, t) for t in ("Formless Foil", "OCM Serialized", "Promo", "Stonefoil")] + [(1, "Gold")]
+
+        with count_queries() as small_queries:
+            service.treatment_prices(small)
+        with count_queries() as large_queries:
+            service.treatment_prices(large)
+
+        # VWAP, last treatment sale, last card sale, lowest ask (every holding has a price by then)
+        assert len(small_queries) == len(large_queries) == 4
+
+
+class TestCardPrices:
+    """Card-level price tiers."""
+
+    def test_last_sale_then_ask(self, test_session, older_sales):
+        prices = PortfolioValuationService(test_session).card_prices([1, 4])
+        # Card 1's paper and foil sales share the latest timestamp; the later row wins
+        assert prices == {1: 5.0, 4: 120.0}
+
+    def test_snapshot_and_zero(self, test_session, sample_cards):
+        test_session.add(MarketSnapshot(card_id=2, min_price=1.0, max_price=2.0, avg_price=1.5, volume=1))
+        test_session.commit()
+
+        prices = PortfolioValuationService(test_session).card_prices([2, 3])
+        assert prices == {2: 1.5, 3: 0.0}
+
+
+class TestCardDetails:
+    """Card and rarity lookup."""
+
+    def test_card_and_rarity(self, test_session, sample_cards):
+        details = PortfolioValuationService(test_session).card_details([1, 2, 999])
+        assert set(details) == {1, 2}
+        card, rarity = details[2]
+        assert card.name == "Test Card Rare"
+        assert rarity is None or rarity.id == card.rarity_id
+
+
+def reference_history(cards, daily_prices, current_prices, start_date, end_date):
+    """Latest daily price on or before each day, else the current price, summed over owned cards."""
+    values, costs = [], []
+    day = start_date
+    while day <= end_date:
+        value = cost = 0.0
+        for card in cards:
+            if card.purchase_date and card.purchase_date > day:
+                continue
+            cost += card.purchase_price
+            prices = daily_prices.get((card.card_id, card.treatment), {})
+            earlier = [d for d in prices if d <= day]
+            value += prices[max(earlier)] if earlier else current_prices[(card.card_id, card.treatment)]
+        values.append(value)
+        costs.append(cost)
+        day += timedelta(days=1)
+    return values, costs
+
+
+class TestValueHistory:
+    """Forward-filled price matrix and the per-user cache."""
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        clear_portfolio_history_cache()
+        yield
+        clear_portfolio_history_cache()
+
+    @pytest.fixture
+    def history_sales(self, test_session, sample_cards):
+        """Random sales over 60 days; returns {(card_id, treatment): {date: avg}}."""
+        rng = random.Random(7)
+        today = datetime.now(timezone.utc).date()
+        by_day: dict = {}
+        for i in range(200):
+            card_id = rng.choice([1, 2, 3])
+            treatment = rng.choice(["Classic Paper", "Classic Foil"])
+            sold = datetime.combine(
+                today - timedelta(days=rng.randint(0, 60)), datetime.min.time(), tzinfo=timezone.utc
+            ) + timedelta(hours=rng.randint(0, 23))
+            price = round(rng.uniform(1, 50), 2)
+            test_session.add(
+                MarketPrice(
+                    card_id=card_id,
+                    price=price,
+                    title=f"Sale {i}",
+                    treatment=treatment,
+                    listing_type="sold",
+                    sold_date=sold,
+                    scraped_at=sold,
+                    platform="ebay",
+                )
+            )
+            by_day.setdefault((card_id, treatment), {}).setdefault(sold.date(), []).append(price)
+        test_session.commit()
+        return {key: {d: sum(p) / len(p) for d, p in days.items()} for key, days in by_day.items()}
+
+    def _holdings(self, today):
+        rng = random.Random(11)
+        return [
+            PortfolioCard(
+                user_id=1,
+                card_id=rng.choice([1, 2, 3, 4]),
+                treatment=rng.choice(["Classic Paper", "Classic Foil", "Stonefoil"]),
+                source="eBay",
+                purchase_price=round(rng.uniform(1, 30), 2),
+                purchase_date=None if i % 5 == 0 else today - timedelta(days=rng.randint(0, 90)),
+            )
+            for i in range(40)
+        ]
+
+    def test_matches_loop(self, test_session, history_sales):
+        today = datetime.now(timezone.utc).date()
+        cards = self._holdings(today)
+        start = today - timedelta(days=30)
+        service = PortfolioValuationService(test_session)
+
+        days, values, costs = service.value_history(cards, start, today)
+
+        daily = {key: {d: p for d, p in prices.items() if d >= start} for key, prices in history_sales.items()}
+        current = service.treatment_prices((c.card_id, c.treatment) for c in cards)
+        expected_values, expected_costs = reference_history(cards, daily, current, start, today)
+        assert days[0] == start and days[-1] == today and len(days) == 31
+        assert values.tolist() == pytest.approx(expected_values)
+        assert costs.tolist() == pytest.approx(expected_costs)
+
+    def test_purchase_date_mask(self, test_session, sample_market_prices):
+        today = datetime.now(timezone.utc).date()
+        card = PortfolioCard(
+            user_id=1,
+            card_id=2,
+            treatment="Classic Paper",
+            source="eBay",
+            purchase_price=9.0,
+            purchase_date=today - timedelta(days=2),
+        )
+
+        _, values, costs = PortfolioValuationService(test_session).value_history(
+            [card], today - timedelta(days=7), today
+        )
+
+        assert costs.tolist() == [0.0] * 5 + [9.0] * 3
+        assert values[:5].tolist() == [0.0] * 5
+        # Card 2's Classic Paper sales: 10 today, 12 yesterday, 15 two days ago
+        assert values[5:].tolist() == pytest.approx([15.0, 12.0, 10.0])
+
+    def test_cached_until_holdings_change(self, count_queries, test_session, history_sales):
+        today = date.today()
+        cards = self._holdings(today)
+        first = cached_value_history(test_session, 1, cards, 30, end_date=today)
+
+        with count_queries() as queries:
+            again = cached_value_history(test_session, 1, cards, 30, end_date=today)
+        assert again is first
+        assert queries == []
+
+        invalidate_portfolio_history(1)
+        changed = cached_value_history(test_session, 1, cards[:10], 30, end_date=today)
+        assert changed["cost_basis_history"][-1]["value"] == pytest.approx(
+            round(sum(c.purchase_price for c in cards[:10]), 2)
+        )
+
+    def test_new_sales_evict(self, test_session, history_sales):
+        today = date.today()
+        cards = self._holdings(today)
+        first = cached_value_history(test_session, 1, cards, 30, end_date=today)
+        other_user = cached_value_history(test_session, 2, cards[:1], 30, end_date=today)
+
+        publish_card_updates({cards[0].card_id}, since=datetime.now(timezone.utc), source="test")
+
+        assert cached_value_history(test_session, 1, cards, 30, end_date=today) is not first
+        # Another user's entry for the same card is evicted too
+        assert cached_value_history(test_session, 2, cards[:1], 30, end_date=today) is not other_user
+
+    def test_empty_portfolio(self, test_session):
+        assert cached_value_history(test_session, 1, [], 30) == {"history": [], "cost_basis_history": []}
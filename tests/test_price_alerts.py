@@ -0,0 +1,237 @@
+"""
+Tests for the price alert engine.
+
+Tests cover:
+- should_trigger() rules: below / above / any, same price, cooldown
+- PriceAlertEngine.evaluate(): card and treatment floors from the batch floor
+  path, user / preference filters, claims, card_ids scoping
+- triggered alerts are queued in the email outbox with their claims
+- ChangedCards: first check and periodic backstop are full sweeps, then new
+  MarketPrice rows, active listings converted to sales and published card
+  updates; cards stay pending until acknowledged
+- check_price_alerts(): skips work when nothing changed, retries cards after a
+  failed evaluation, carries cooldown-blocked alerts into the next check
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlmodel import select
+
+from app.core import security
+from app.core.cache_invalidation import CardUpdateEvent
+from app.models.email_outbox import EmailOutbox, EmailStatus
+from app.models.market import MarketPrice
+from app.models.user import User
+from app.models.watchlist import EmailPreferences, Watchlist
+from app.services import price_alerts
+from app.services.price_alerts import (
+    ALERT_COOLDOWN,
+    FULL_SWEEP_INTERVAL,
+    ChangedCards,
+    PriceAlertEngine,
+    check_price_alerts,
+    should_trigger,
+)
+
+NOW = datetime(2026, 1, 1, 12, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def alerts(test_session, sample_market_prices, sample_user):
+    """
+    Card 1 floors: 1.75 (any treatment), 6.00 (Classic Foil). Card 2 floor: 13.75.
+    """
+    opted_out = User(id=2, email="quiet@example.com", hashed_password=security.get_password_hash("x" * 12))
+    test_session.add(opted_out)
+    test_session.add(EmailPreferences(user_id=2, price_alerts=False))
+    rows = [
+        Watchlist(id=1, user_id=1, card_id=1, alert_type="below", target_price=2.0),
+        Watchlist(id=2, user_id=1, card_id=1, alert_type="below", target_price=7.0, treatment="Classic Foil"),
+        Watchlist(id=3, user_id=1, card_id=2, alert_type="above", target_price=20.0),
+        Watchlist(id=4, user_id=1, card_id=2, alert_type="any", target_price=1.0, notify_email=False),
+        Watchlist(id=5, user_id=2, card_id=1, alert_type="below", target_price=2.0),
+    ]
+    test_session.add_all(rows)
+    test_session.commit()
+    return rows
+
+
+class TestShouldTrigger:
+    """Trigger rules."""
+
+    @pytest.mark.parametrize(
+        "alert_type,price,expected",
+        [
+            ("below", 9.0, True),
+            ("below", 11.0, False),
+            ("above", 11.0, True),
+            ("above", 9.0, False),
+            ("any", 9.0, True),
+        ],
+    )
+    def test_alert_types(self, alert_type, price, expected):
+        assert should_trigger(alert_type, 10.0, price, None, None, NOW) is expected
+
+    def test_same_price_and_cooldown(self):
+        assert not should_trigger("below", 10.0, 5.0, 5.001, None, NOW)
+        assert not should_trigger("below", 10.0, 5.0, 6.0, NOW - timedelta(minutes=30), NOW)
+        # Naive timestamps from the database are UTC
+        assert should_trigger("below", 10.0, 5.0, 6.0, (NOW - timedelta(hours=2)).replace(tzinfo=None), NOW)
+
+
+class TestEvaluate:
+    """Set-based evaluation against batch floors."""
+
+    def test_fires_and_claims(self, test_session, alerts):
+        triggered = PriceAlertEngine(test_session).evaluate(now=NOW)
+
+        assert {t.watchlist_id: t.alert_data["current_price"] for t in triggered} == {
+            1: pytest.approx(1.75),
+            2: pytest.approx(6.0),
+        }
+        first = next(t for t in triggered if t.watchlist_id == 1)
+        assert first.email == "test@example.com"
+        assert first.user_name == "test"
+        assert first.alert_data["treatment"] == "Any Treatment"
+
+        test_session.expire_all()
+        claimed = test_session.get(Watchlist, 1)
+        assert claimed.last_alerted_price == pytest.approx(1.75)
+        assert claimed.last_alerted_at is not None
+        assert test_session.get(Watchlist, 3).last_alerted_at is None
+
+    def test_claimed_alerts_do_not_fire_again(self, test_session, alerts):
+        engine = PriceAlertEngine(test_session)
+        assert engine.evaluate(now=NOW)
+        assert engine.evaluate(now=NOW + timedelta(hours=2)) == []
+
+    def test_scoped_to_card_ids(self, test_session, alerts):
+        engine = PriceAlertEngine(test_session)
+        assert engine.evaluate({2}, now=NOW) == []
+        assert engine.evaluate(set(), now=NOW) == []
+        assert {t.watchlist_id for t in engine.evaluate({1}, now=NOW)} == {1, 2}
+
+
+class TestOutbox:
+    """Triggered alerts are queued for delivery with their claims."""
+
+    def test_queues_triggered_alerts(self, test_session, alerts):
+        PriceAlertEngine(test_session).evaluate(now=NOW)
+
+        queued = test_session.exec(select(EmailOutbox)).all()
+        assert {(e.kind, e.to_email, e.status) for e in queued} == {
+            ("price_alert", "test@example.com", EmailStatus.PENDING)
+        }
+        assert sorted(e.payload["current_price"] for e in queued) == pytest.approx([1.75, 6.0])
+        assert {e.payload["treatment"] for e in queued} == {"Any Treatment", "Classic Foil"}
+
+
+def drain(tracker, session, now=None):
+    pending = tracker.pending(session, now=now)
+    tracker.acknowledge(pending, now=now)
+    return pending.card_ids
+
+
+class TestChangedCards:
+    """Which cards a check evaluates."""
+
+    def test_first_check_and_backstop_are_full_sweeps(self, test_session, sample_market_prices):
+        tracker = ChangedCards()
+        assert drain(tracker, test_session, NOW) is None
+        assert drain(tracker, test_session, NOW + timedelta(minutes=5)) == set()
+        assert drain(tracker, test_session, NOW + FULL_SWEEP_INTERVAL) is None
+
+    def test_new_rows_and_published_updates(self, test_session, sample_market_prices):
+        tracker = ChangedCards()
+        drain(tracker, test_session)
+
+        test_session.add(
+            MarketPrice(card_id=2, price=9.0, title="New sale", listing_type="sold", sold_date=NOW, platform="ebay")
+        )
+        test_session.commit()
+        tracker.on_card_update(CardUpdateEvent(card_ids=frozenset({3}), since=None))
+
+        assert drain(tracker, test_session) == {2, 3}
+        assert drain(tracker, test_session) == set()
+
+    def test_active_listing_converted_to_sale(self, test_session, sample_market_prices):
+        listing = MarketPrice(
+            card_id=3,
+            price=9.0,
+            title="Tracked listing",
+            listing_type="active",
+            scraped_at=datetime.now(timezone.utc) - timedelta(hours=2),
+            platform="ebay",
+        )
+        test_session.add(listing)
+        test_session.commit()
+        tracker = ChangedCards()
+        drain(tracker, test_session)
+        assert drain(tracker, test_session) == set()
+
+        # A worker in another process converts it in place: same id, new scraped_at
+        listing.listing_type = "sold"
+        listing.sold_date = listing.scraped_at = datetime.now(timezone.utc)
+        test_session.add(listing)
+        test_session.commit()
+
+        assert drain(tracker, test_session) == {3}
+        assert drain(tracker, test_session) == set()
+
+    def test_unacknowledged_cards_stay_pending(self, test_session, sample_market_prices):
+        tracker = ChangedCards()
+        drain(tracker, test_session)
+        test_session.add(
+            MarketPrice(card_id=2, price=9.0, title="New sale", listing_type="sold", sold_date=NOW, platform="ebay")
+        )
+        test_session.commit()
+        tracker.add({3})
+
+        first = tracker.pending(test_session)
+        assert first.card_ids == {2, 3}
+        # Not acknowledged (evaluation failed): the same cards come back
+        tracker.add({4})
+        assert tracker.pending(test_session).card_ids == {2, 3, 4}
+
+        # Card 4 was updated after the acknowledged check read its cards
+        tracker.acknowledge(first)
+        assert drain(tracker, test_session) == {4}
+
+    def test_check_skips_when_nothing_changed(self, test_engine, test_session, alerts, monkeypatch):
+        monkeypatch.setattr(price_alerts, "changed_cards", ChangedCards())
+
+        assert check_price_alerts(bind=test_engine) == (-1, 2)
+        assert check_price_alerts(bind=test_engine) == (0, 0)
+        assert len(test_session.exec(select(EmailOutbox)).all()) == 2
+
+    def test_failed_check_is_retried(self, test_engine, test_session, alerts, monkeypatch):
+        monkeypatch.setattr(price_alerts, "changed_cards", ChangedCards())
+        evaluate = PriceAlertEngine.evaluate
+
+        def fail(self, card_ids=None, now=None):
+            raise RuntimeError("floor lookup failed")
+
+        monkeypatch.setattr(PriceAlertEngine, "evaluate", fail)
+        with pytest.raises(RuntimeError):
+            check_price_alerts(bind=test_engine)
+
+        monkeypatch.setattr(PriceAlertEngine, "evaluate", evaluate)
+        assert check_price_alerts(bind=test_engine) == (-1, 2)
+
+    def test_cooldown_blocked_alerts_are_carried(self, test_engine, test_session, alerts, monkeypatch):
+        monkeypatch.setattr(price_alerts, "changed_cards", ChangedCards())
+        recent = datetime.now(timezone.utc) - timedelta(minutes=30)
+        blocked = test_session.get(Watchlist, 1)
+        blocked.last_alerted_at, blocked.last_alerted_price = recent, 1.9
+        test_session.commit()
+
+        # Alert 1 is held back by the cooldown; card 1 is evaluated again next check
+        assert check_price_alerts(bind=test_engine) == (-1, 1)
+        assert check_price_alerts(bind=test_engine) == (1, 0)
+
+        blocked = test_session.get(Watchlist, 1)
+        blocked.last_alerted_at = recent - ALERT_COOLDOWN
+        test_session.commit()
+        assert check_price_alerts(bind=test_engine) == (1, 1)
+        assert check_price_alerts(bind=test_engine) == (0, 0)
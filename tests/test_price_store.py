@@ -0,0 +1,180 @@
+"""
+Tests for the in-memory columnar price store (app/services/price_store.py).
+
+Tests cover:
+- Loading the window and the rows() query API (listing type, since, treatment, bulk lots, variants)
+- Incremental refresh (new ids, listings converted to sales) and per-card reloads (updates, deletes)
+- Reloads triggered by publish_card_updates()
+- Memory budget
+- SalesFloorEngine reading sales from the store
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import List
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from sqlmodel import Session, select
+
+from app.core.cache_invalidation import publish_card_updates, subscribe, unsubscribe
+from app.models.market import MarketPrice
+from app.services.floor_engine import SalesFloorEngine
+from app.services.price_store import FLAG_BULK_LOT, PriceStore
+
+
+@pytest.fixture
+def store(test_engine, sample_market_prices: List[MarketPrice]) -> PriceStore:
+    store = PriceStore(days=365, max_mb=64)
+    assert store.load(test_engine)
+    return store
+
+
+def add_sale(session: Session, card_id: int, price: float, **fields) -> MarketPrice:
+    now = datetime.now(timezone.utc)
+    sale = MarketPrice(
+        card_id=card_id, price=price, title=f"Sale {price}", listing_type="sold",
+        sold_date=now - timedelta(days=1), scraped_at=now, **fields,
+    )  # fmt: skip
+    session.add(sale)
+    session.commit()
+    return sale
+
+
+class TestLoadAndQuery:
+    """Tests for PriceStore.load() and rows()."""
+
+    def test_loads_every_row(self, store, test_session, sample_market_prices):
+        assert store.ready and store.covers(90) and not store.covers(400)
+        sold = [p for p in sample_market_prices if p.listing_type == "sold"]
+
+        rows = store.rows([1, 2, 3])
+        assert sorted(rows.ids.tolist()) == sorted(p.id for p in sold)
+        # Sorted by card, then id
+        assert rows.card_ids.tolist() == sorted(rows.card_ids.tolist())
+
+    def test_filters(self, store, sample_market_prices):
+        foil = store.rows([1], treatment="Classic Foil")
+        assert sorted(foil.prices.tolist()) == [5.0, 6.0, 7.0]
+        assert set(foil.treatments) == {"Classic Foil"}
+
+        active = store.rows([3], listing_type="active")
+        expected = [p.id for p in sample_market_prices if p.card_id == 3 and p.listing_type == "active"]
+        assert active.ids.tolist() == expected
+
+        recent = store.rows([1], treatment="Classic Paper", since=datetime.now(timezone.utc) - timedelta(days=1.5))
+        assert sorted(recent.prices.tolist()) == [1.0, 1.5]
+
+        assert len(store.rows([999])) == 0
+        assert len(store.rows([1], treatment="Unknown Treatment")) == 0
+
+    def test_bulk_lots_and_variants(self, test_engine, test_session, sample_market_prices):
+        add_sale(test_session, 4, 80.0, product_subtype="Collector Booster Box")
+        add_sale(test_session, 4, 5.0, is_bulk_lot=True)
+        store = PriceStore(days=365, max_mb=64)
+        store.load(test_engine)
+
+        rows = store.rows([4])
+        assert rows.prices.tolist() == [80.0]
+        assert rows.variants.tolist() == ["Collector Booster Box"]
+
+        with_bulk = store.rows([4], include_bulk_lots=True)
+        assert len(with_bulk) == 2
+        assert (with_bulk.flags & FLAG_BULK_LOT).tolist() == [0, FLAG_BULK_LOT]
+        assert with_bulk.variants.tolist() == ["Collector Booster Box", "Classic Paper"]
+
+    def test_memory_budget(self, test_engine, sample_market_prices):
+        store = PriceStore(days=365, max_mb=0)
+        assert not store.load(test_engine)
+        assert not store.ready
+        with pytest.raises(RuntimeError):
+            store.rows([1])
+
+
+class TestUpdates:
+    """Tests for refresh(), reload_cards() and card update events."""
+
+    def test_refresh_appends_new_ids(self, store, test_engine, test_session):
+        before = len(store.rows([2]))
+        new = add_sale(test_session, 2, 9.0)
+
+        assert store.refresh(test_engine) == 1
+        rows = store.rows([2])
+        assert len(rows) == before + 1
+        assert new.id in rows.ids.tolist()
+        assert store.refresh(test_engine) == 0
+
+    def test_refresh_picks_up_listings_converted_to_sales(self, test_engine, test_session, sample_market_prices):
+        now = datetime.now(timezone.utc)
+        listing = MarketPrice(
+            card_id=2, price=8.0, title="Listing", listing_type="active", scraped_at=now - timedelta(hours=3)
+        )
+        test_session.add(listing)
+        test_session.commit()
+        store = PriceStore(days=365, max_mb=64)
+        assert store.load(test_engine)
+        assert listing.id in store.rows([2], listing_type="active").ids.tolist()
+
+        # The scraper converts a tracked listing in place: same id, new scraped_at
+        listing.listing_type = "sold"
+        listing.price = 7.5
+        listing.sold_date = now
+        listing.scraped_at = now
+        test_session.add(listing)
+        test_session.commit()
+
+        assert store.refresh(test_engine) == 0
+        sold = store.rows([2])
+        assert 7.5 in sold.prices[sold.ids == listing.id].tolist()
+        assert listing.id not in store.rows([2], listing_type="active").ids.tolist()
+        all_ids = store.rows([2], listing_type=None).ids.tolist()
+        assert len(all_ids) == len(set(all_ids))
+
+    def test_reload_cards_picks_up_updates_and_deletes(self, store, test_engine, test_session):
+        sales = test_session.exec(select(MarketPrice).where(MarketPrice.card_id == 2)).all()
+        sales[0].price = 1.0
+        test_session.add(sales[0])
+        test_session.delete(sales[1])
+        test_session.commit()
+
+        store.reload_cards([2], test_engine)
+        prices = store.rows([2]).prices.tolist()
+        assert 1.0 in prices
+        assert len(prices) == len(sales) - 1
+        # Other cards untouched
+        assert len(store.rows([1], treatment="Classic Foil")) == 3
+
+    def test_reloads_on_card_update_event(self, store, test_engine, test_session):
+        subscribe(store.on_card_update)
+        try:
+            add_sale(test_session, 1, 0.25)
+            with patch("app.services.price_store.engine", test_engine):
+                publish_card_updates([1], source="test")
+        finally:
+            unsubscribe(store.on_card_update)
+
+        assert 0.25 in store.rows([1]).prices.tolist()
+
+
+class TestFloorEngineFromStore:
+    """SalesFloorEngine.load() reads eBay/OpenSea sales from a loaded store."""
+
+    def test_same_floors_as_database(self, store, test_session):
+        from_db = SalesFloorEngine.load([1, 2, 3], days=90, session=test_session)
+        with patch("app.services.floor_engine.get_price_store", return_value=store):
+            with patch.object(SalesFloorEngine, "_load_marketprice") as mock_query:
+                from_store = SalesFloorEngine.load([1, 2, 3], days=90, session=test_session)
+                mock_query.assert_not_called()
+
+        assert from_store.floors([30, 90]) == from_db.floors([30, 90])
+        assert from_store.floors([30], by_variant=True) == from_db.floors([30], by_variant=True)
+        assert from_store.treatment_floors(90) == from_db.treatment_floors(90)
+        assert np.array_equal(np.sort(from_store.prices), np.sort(from_db.prices))
+
+    def test_window_beyond_store_uses_database(self, test_engine, test_session, sample_market_prices):
+        short = PriceStore(days=30, max_mb=64)
+        short.load(test_engine)
+        with patch("app.services.floor_engine.get_price_store", return_value=short):
+            with patch.object(SalesFloorEngine, "_load_marketprice", return_value=[]) as mock_query:
+                SalesFloorEngine.load([1], days=90, session=test_session)
+                mock_query.assert_called_once()
@@ -0,0 +1,229 @@
+"""
+Tests for the bulk sale export (app/services/sales_export.py, /export/sales).
+
+Tests cover:
+- Export query filters (date range, platform, product type) and (scraped_at, id) ordering
+- NDJSON and CSV streaming in fetch-size chunks
+- Resuming from a row's cursor without repeats or gaps, including active
+  listings converted to sales after the cursor; legacy id cursors
+- Export API key budget separate from the per-request API key limits
+- Per-key concurrent stream slots
+"""
+
+import csv
+import io
+import json
+from datetime import datetime, timedelta, timezone
+from typing import List
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException
+from sqlmodel import Session
+
+from app.api import export as export_api
+from app.api.deps import require_export_api_key
+from app.core.anti_scraping import api_key_limiter, export_limiter
+from app.core.pagination import InvalidCursorError, encode_cursor
+from app.models.api_key import APIKey
+from app.models.card import Card
+from app.models.market import MarketPrice
+from app.models.user import User
+from app.services.sales_export import (
+    EXPORT_CURSOR_SORT,
+    EXPORT_FIELDS,
+    LEGACY_EXPORT_CURSOR_SORT,
+    build_sales_export_query,
+    decode_export_cursor,
+    stream_sales_export,
+)
+
+
+@pytest.fixture
+def export_prices(test_session: Session, sample_market_prices: List[MarketPrice], sample_cards: List[Card]):
+    """Fixture sales plus an OpenSea sale, an old box sale and a sale with no sold_date."""
+    now = datetime.now(timezone.utc)
+    extra = [
+        MarketPrice(
+            card_id=2, price=20.0, title="Test Card Rare NFT", listing_type="sold", platform="opensea",
+            sold_date=now - timedelta(days=2), scraped_at=now,
+        ),
+        MarketPrice(
+            card_id=4, price=90.0, title="Test Box sealed", listing_type="sold", platform="ebay",
+            sold_date=now - timedelta(days=200), scraped_at=now - timedelta(days=200),
+        ),
+        MarketPrice(
+            card_id=1, price=4.0, title="Test Card Common undated", listing_type="sold", platform="ebay",
+            sold_date=None, scraped_at=now - timedelta(days=1),
+        ),
+    ]  # fmt: skip
+    for price in extra:
+        test_session.add(price)
+    test_session.commit()
+    return sample_market_prices + extra
+
+
+def sold(prices: List[MarketPrice]) -> List[MarketPrice]:
+    return [p for p in prices if p.listing_type == "sold"]
+
+
+def read_ndjson(engine, statement) -> List[dict]:
+    body = b"".join(stream_sales_export(engine, statement, "ndjson"))
+    return [json.loads(line) for line in body.decode().splitlines()]
+
+
+class TestExportQuery:
+    """Tests for build_sales_export_query()."""
+
+    def test_all_sold_rows_in_scrape_order(self, test_engine, export_prices):
+        rows = read_ndjson(test_engine, build_sales_export_query())
+        ids = [row["id"] for row in rows]
+        assert ids == [p.id for p in sorted(sold(export_prices), key=lambda p: (p.scraped_at, p.id))]
+        assert list(rows[0]) == EXPORT_FIELDS
+
+    def test_joined_card_fields(self, test_engine, export_prices):
+        rows = read_ndjson(test_engine, build_sales_export_query(product_type="Box"))
+        assert len(rows) == 1
+        assert rows[0]["card_name"] == "Test Box"
+        assert rows[0]["product_type"] == "Box"
+
+    def test_platform_filter(self, test_engine, export_prices):
+        rows = read_ndjson(test_engine, build_sales_export_query(platform="opensea"))
+        assert [row["title"] for row in rows] == ["Test Card Rare NFT"]
+
+    def test_date_range_uses_scraped_at_fallback(self, test_engine, export_prices):
+        now = datetime.now(timezone.utc)
+        rows = read_ndjson(test_engine, build_sales_export_query(start=now - timedelta(days=30)))
+        titles = {row["title"] for row in rows}
+        assert "Test Card Common undated" in titles
+        assert "Test Box sealed" not in titles
+
+        old = read_ndjson(test_engine, build_sales_export_query(end=now - timedelta(days=30)))
+        assert [row["title"] for row in old] == ["Test Box sealed"]
+
+
+class TestExportStreaming:
+    """Tests for stream_sales_export()."""
+
+    def test_chunks_by_fetch_size(self, test_engine, export_prices):
+        with patch("app.services.sales_export.settings.EXPORT_FETCH_SIZE", 5):
+            chunks = list(stream_sales_export(test_engine, build_sales_export_query(), "ndjson"))
+        total = len(sold(export_prices))
+        assert len(chunks) == -(-total // 5)
+        assert sum(chunk.count(b"\n") for chunk in chunks) == total
+
+    def test_csv_matches_ndjson(self, test_engine, export_prices):
+        statement = build_sales_export_query()
+        body = b"".join(stream_sales_export(test_engine, statement, "csv")).decode()
+        reader = csv.DictReader(io.StringIO(body))
+        assert reader.fieldnames == EXPORT_FIELDS
+
+        csv_rows = list(reader)
+        json_rows = read_ndjson(test_engine, statement)
+        assert [int(r["id"]) for r in csv_rows] == [r["id"] for r in json_rows]
+        assert [r["cursor"] for r in csv_rows] == [r["cursor"] for r in json_rows]
+        assert csv_rows[0]["sold_date"] == json_rows[0]["sold_date"]
+
+    def test_empty_csv_has_header(self, test_engine, export_prices):
+        body = b"".join(stream_sales_export(test_engine, build_sales_export_query(platform="none"), "csv"))
+        assert body.decode().strip() == ",".join(EXPORT_FIELDS)
+
+    def test_resume_from_cursor(self, test_engine, export_prices):
+        full = read_ndjson(test_engine, build_sales_export_query())
+
+        resumed = read_ndjson(test_engine, build_sales_export_query(**decode_export_cursor(full[5]["cursor"])))
+        assert full[:6] + resumed == full
+
+    def test_resume_includes_listing_converted_after_cursor(self, test_engine, test_session, export_prices):
+        listing = MarketPrice(
+            card_id=1, price=3.0, title="Tracked listing", listing_type="active", platform="ebay",
+            scraped_at=datetime.now(timezone.utc) - timedelta(days=3),
+        )  # fmt: skip
+        test_session.add(listing)
+        test_session.commit()
+        newer = MarketPrice(card_id=2, price=8.0, title="Newer sale", listing_type="sold", platform="ebay")
+        test_session.add(newer)
+        test_session.commit()
+        last = read_ndjson(test_engine, build_sales_export_query())[-1]
+        assert last["id"] == newer.id > listing.id
+
+        # scripts/scrape_card.py converts in place: same (lower) id, new scraped_at
+        listing.listing_type = "sold"
+        listing.sold_date = listing.scraped_at = datetime.now(timezone.utc)
+        test_session.add(listing)
+        test_session.commit()
+
+        resumed = read_ndjson(test_engine, build_sales_export_query(**decode_export_cursor(last["cursor"])))
+        assert [row["id"] for row in resumed] == [listing.id]
+
+    def test_legacy_id_cursor(self, test_engine, export_prices):
+        legacy = encode_cursor(LEGACY_EXPORT_CURSOR_SORT, 3, 3)
+        assert decode_export_cursor(legacy) == {"after_id": 3}
+
+        rows = read_ndjson(test_engine, build_sales_export_query(**decode_export_cursor(legacy)))
+        assert sorted(row["id"] for row in rows) == sorted(p.id for p in sold(export_prices) if p.id > 3)
+
+        for invalid in (encode_cursor("scraped_at:desc", 3, 3), encode_cursor(EXPORT_CURSOR_SORT, 3, 3)):
+            with pytest.raises(InvalidCursorError):
+                decode_export_cursor(invalid)
+
+    def test_unknown_format_rejected(self, test_engine):
+        with pytest.raises(ValueError):
+            list(stream_sales_export(test_engine, build_sales_export_query(), "xml"))
+
+
+class TestExportApiKey:
+    """Tests for require_export_api_key()."""
+
+    RAW_KEY = "wt_export_test_key"
+
+    @pytest.fixture
+    def api_key(self, test_session: Session, sample_user: User) -> APIKey:
+        key = APIKey(
+            user_id=sample_user.id,
+            key_hash=APIKey.hash_key(self.RAW_KEY),
+            key_prefix=APIKey.get_prefix(self.RAW_KEY),
+            rate_limit_per_minute=1,
+        )
+        test_session.add(key)
+        test_session.commit()
+        yield key
+        for limiter in (export_limiter, api_key_limiter):
+            limiter._minute_requests.pop(key.key_hash, None)
+            limiter._day_requests.pop(key.key_hash, None)
+
+    def test_requires_key(self, test_session):
+        with pytest.raises(HTTPException) as exc_info:
+            require_export_api_key(None, test_session)
+        assert exc_info.value.status_code == 401
+
+    def test_own_budget(self, test_session, api_key, sample_user):
+        """Exports don't consume the key's per-request budget, and have their own limit."""
+        with patch("app.api.deps.settings.EXPORT_RATE_LIMIT_PER_MINUTE", 2):
+            for _ in range(2):
+                db_key, user = require_export_api_key(self.RAW_KEY, test_session)
+                assert user.id == sample_user.id
+            with pytest.raises(HTTPException) as exc_info:
+                require_export_api_key(self.RAW_KEY, test_session)
+        assert exc_info.value.status_code == 429
+
+        assert api_key_limiter.check_limit(api_key.key_hash, per_minute=api_key.rate_limit_per_minute)[0]
+        assert db_key.requests_today == 0
+        assert db_key.requests_total == 2
+
+
+class TestExportStreamSlots:
+    """Tests for the per-key concurrent export limit."""
+
+    def test_slot_released_when_stream_closes(self):
+        with patch("app.api.export.settings.EXPORT_MAX_CONCURRENT_PER_KEY", 1):
+            assert export_api._acquire_stream("key")
+            assert not export_api._acquire_stream("key")
+
+            stream = export_api._held_stream(iter([b"a", b"b"]), "key")
+            assert next(stream) == b"a"
+            stream.close()  # client disconnected mid-stream
+
+            assert export_api._acquire_stream("key")
+            export_api._release_stream("key")
+        assert "key" not in export_api._active_streams
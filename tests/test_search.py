@@ -0,0 +1,89 @@
+"""
+Tests for trigram search in app.services.search.
+
+Tests cover:
+- Trigram extraction and similarity matching pg_trgm's results
+- The SQLite similarity() fallback: fuzzy matches and similarity ranking
+- LIKE wildcard escaping in search terms
+- PostgreSQL compilation to the indexable % operator
+"""
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlmodel import Session, select
+
+from app.models.card import Card
+from app.services.search import (
+    contains,
+    like_pattern,
+    matches,
+    ranked,
+    trigram_similarity,
+    trigrams,
+)
+
+
+class TestTrigrams:
+    def test_word_padding(self):
+        # SELECT show_trgm('cat') -> {"  c"," ca","at ",cat}
+        assert trigrams("cat") == {"  c", " ca", "cat", "at "}
+
+    def test_lowercases_and_splits_words(self):
+        assert trigrams("Ember-Flame") == trigrams("ember flame")
+
+    def test_similarity_matches_pg_trgm(self):
+        # SELECT similarity('word', 'two words') -> 0.363636
+        assert trigram_similarity("word", "two words") == pytest.approx(0.363636, abs=1e-6)
+
+    def test_identical_and_disjoint(self):
+        assert trigram_similarity("Ember", "ember") == 1.0
+        assert trigram_similarity("abc", "xyz") == 0.0
+
+    def test_none_and_empty(self):
+        assert trigram_similarity(None, "abc") == 0.0
+        assert trigram_similarity("", "abc") == 0.0
+
+
+@pytest.fixture
+def search_cards(test_session: Session, sample_rarities):
+    names = ["Ember the Flame", "Ember Drake", "Tide Caller", "Flame Warden", "100% Foil"]
+    for i, name in enumerate(names, start=1):
+        test_session.add(Card(id=i, name=name, set_name="Test Set", rarity_id=1))
+    test_session.commit()
+
+
+def search_names(session: Session, term: str):
+    statement = select(Card.name).where(matches(Card.name, term)).order_by(*ranked(Card.name, term), Card.id)
+    return list(session.exec(statement))
+
+
+class TestSqliteFallback:
+    def test_substring_match(self, test_session, search_cards):
+        assert set(search_names(test_session, "flame")) == {"Ember the Flame", "Flame Warden"}
+
+    def test_typo_matches_by_similarity(self, test_session, search_cards):
+        assert search_names(test_session, "Tide Caler")[0] == "Tide Caller"
+
+    def test_ranks_closest_first(self, test_session, search_cards):
+        # Both contain "ember"; the shorter name shares a larger share of trigrams
+        assert search_names(test_session, "ember") == ["Ember Drake", "Ember the Flame"]
+
+    def test_no_match(self, test_session, search_cards):
+        assert search_names(test_session, "zzzz") == []
+
+    def test_wildcards_are_literal(self, test_session, search_cards):
+        statement = select(Card.name).where(contains(Card.name, "0%"))
+        assert list(test_session.exec(statement)) == ["100% Foil"]
+        assert list(test_session.exec(select(Card.name).where(contains(Card.name, "_")))) == []
+
+
+class TestSql:
+    def test_like_pattern_escapes(self):
+        assert like_pattern("50%_off\\") == "%50\\%\\_off\\\\%"
+
+    def test_postgres_uses_trigram_operator(self):
+        statement = select(Card.id).where(matches(Card.name, "ember"))
+        sql = str(statement.compile(dialect=postgresql.psycopg.dialect()))
+        assert "card.name %% " in sql
+        assert "ILIKE" in sql
+        assert "similarity" not in sql